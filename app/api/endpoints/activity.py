@@ -1,26 +1,142 @@
-from fastapi import APIRouter, HTTPException, Path
+from fastapi import APIRouter, HTTPException, Path, Query
+from app.config import (ACTIVITY_CACHE_SIZE, ACTIVITY_CACHE_TTL_SECONDS, ACTIVITY_DAY_CLOSED_AFTER_SECONDS,
+                        ACTIVITY_PAGE_SIZE)
 from app.db.mongodb import collection
-from app.models.schema import DailyActivityRecord, DailyActivitySummary, DailyActivityResponse
-from typing import List
-from datetime import datetime, date, time, timezone
+from app.models.schema import DailyActivitySummary, DailyActivityResponse
+from collections import OrderedDict
+from typing import Optional, Tuple
+from datetime import datetime, date, time, timedelta, timezone
 import logging
+import time as clock
 
-# TODO: INDEXING - Consider an index on (nickname, timestamp) for optimal query performance in /activity/daily.
-# TODO: TESTS - Add unit tests for date parsing, date range generation (including timezone handling), and aggregation of daily activity stats (mocking MongoDB).
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["User Activity"])
 
+# Índice (app/db/indexes.py): (nickname, timestamp, _id), recorrido en sentido inverso
+DAILY_SORT = [("timestamp", 1)]
+
+# Máximo de registros por página: la salida del $facet es un único documento
+# (límite de 16 MB de BSON), así que nunca se piden todos los registros del día
+DAILY_MAX_PAGE_SIZE = 1000
+
+# Campos de DailyActivityRecord: el resto del registro no sale de MongoDB
+DAILY_RECORD_PROJECTION = {
+    "_id": {"$toString": "$_id"},
+    "timestamp": 1,
+    "predicted_label": 1,
+    "expected_label": 1,
+    "confidence": 1,
+    "evaluation": 1,
+}
+
+
+def build_daily_filter(nickname: str, day: date) -> dict:
+    """Filtro de MongoDB de /activity/daily (también lo usa app/check_query_plans.py)."""
+    # Define date range for the query (from start of day to end of day in UTC)
+    # MongoDB stores timestamps as UTC (e.g., from datetime.utcnow())
+    start_datetime = datetime.combine(day, time.min).replace(tzinfo=timezone.utc)
+    end_datetime = datetime.combine(day, time.max).replace(tzinfo=timezone.utc)
+
+    return {
+        "nickname": nickname,
+        "timestamp": {
+            "$gte": start_datetime,
+            "$lte": end_datetime  # Use $lte to include records at the very end of the day
+        }
+    }
+
+
+def build_daily_pipeline(nickname: str, day: date, skip: int = 0, limit: Optional[int] = None) -> list:
+    """
+    Resumen y página de registros del día en una sola agregación.
+
+    El ``$sort`` va antes del ``$facet`` para que lo resuelva el índice; el
+    resumen se agrupa en MongoDB y los registros salen proyectados. La página
+    lleva siempre ``$limit`` (``ACTIVITY_PAGE_SIZE`` si no se indica, como
+    mucho ``DAILY_MAX_PAGE_SIZE``): el ``$facet`` devuelve un solo documento y
+    un día con muchos intentos no cabría en 16 MB.
+    """
+    limit = min(limit or ACTIVITY_PAGE_SIZE, DAILY_MAX_PAGE_SIZE)
+    records = [{"$skip": skip}] if skip else []
+    records.append({"$limit": limit})
+    records.append({"$project": DAILY_RECORD_PROJECTION})
+    return [
+        {"$match": build_daily_filter(nickname, day)},
+        {"$sort": dict(DAILY_SORT)},
+        {"$facet": {
+            "summary": [{"$group": {
+                "_id": None,
+                "total_practices": {"$sum": 1},
+                "correct_practices": {"$sum": {"$cond": [{"$eq": ["$evaluation", "CORRECTO"]}, 1, 0]}},
+                "doubtful_practices": {"$sum": {"$cond": [{"$eq": ["$evaluation", "DUDOSO"]}, 1, 0]}},
+                "incorrect_practices": {"$sum": {"$cond": [{"$eq": ["$evaluation", "INCORRECTO"]}, 1, 0]}},
+            }}],
+            "records": records,
+        }},
+    ]
+
+
+def day_is_closed(day: date, now: Optional[datetime] = None) -> bool:
+    """
+    Un día UTC ya no cambia cuando terminó hace más de ``ACTIVITY_DAY_CLOSED_AFTER_SECONDS``.
+
+    El margen cubre los registros del final del día que siguen en el buffer
+    write-behind; un spool reinsertado tras una caída larga puede añadir
+    registros más tarde, y para eso está el TTL de la caché.
+    """
+    now = now or datetime.now(timezone.utc)
+    day_end = datetime.combine(day, time.max).replace(tzinfo=timezone.utc)
+    return now > day_end + timedelta(seconds=ACTIVITY_DAY_CLOSED_AFTER_SECONDS)
+
+
+class DailyActivityCache:
+    """Respuestas de días cerrados por (nickname, fecha, página), LRU con TTL."""
+
+    def __init__(self, ttl: float = ACTIVITY_CACHE_TTL_SECONDS, max_entries: int = ACTIVITY_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[DailyActivityResponse]:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= clock.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: Tuple, response: DailyActivityResponse) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (response, clock.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+daily_cache = DailyActivityCache()
+
+
 @router.get("/activity/daily/{nickname}/{date_str}",
             response_model=DailyActivityResponse,
             summary="Get daily activity for a user",
-            description="Retrieves a summary and detailed records of a user's practice activity for a specific day."
+            description="Retrieves a summary and detailed records of a user's practice activity for a specific day. "
+                        "The summary always covers the whole day; records are paginated with skip/limit "
+                        "(ACTIVITY_PAGE_SIZE records per page by default, at most 1000). "
+                        "Responses for past UTC days are cached, since those days no longer change."
             )
 # TODO: AUTHENTICATION - The 'nickname' path parameter should be re-evaluated.
 # Typically, a user would fetch their own activity via an authenticated route (e.g., /users/me/activity/{date_str}).
 # Accessing other users' activity would require admin privileges and a different path structure.
 async def get_daily_activity(
     nickname: str = Path(..., description="User's nickname", example="usuario123"),
-    date_str: str = Path(..., description="Date in YYYY-MM-DD format", example="2023-10-28", regex=r"^\d{4}-\d{2}-\d{2}$")
+    date_str: str = Path(..., description="Date in YYYY-MM-DD format", example="2023-10-28", regex=r"^\d{4}-\d{2}-\d{2}$"),
+    skip: int = Query(0, ge=0, description="Number of records of the day to skip"),
+    limit: Optional[int] = Query(None, ge=1, le=DAILY_MAX_PAGE_SIZE,
+                                 description="Maximum number of records to return (ACTIVITY_PAGE_SIZE by default)")
 ):
     try:
         parsed_date = datetime.strptime(date_str, "%Y-%m-%d").date()
@@ -28,74 +144,40 @@ async def get_daily_activity(
         logger.warning("Invalid date format received: %s", date_str)
         raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
 
-    # Define date range for the query (from start of day to end of day in UTC)
-    # MongoDB stores timestamps as UTC (e.g., from datetime.utcnow())
-    start_datetime = datetime.combine(parsed_date, time.min).replace(tzinfo=timezone.utc)
-    end_datetime = datetime.combine(parsed_date, time.max).replace(tzinfo=timezone.utc)
-
-    mongo_filter = {
-        "nickname": nickname,
-        "timestamp": {
-            "$gte": start_datetime,
-            "$lte": end_datetime  # Use $lte to include records at the very end of the day
-        }
-    }
-
-    activity_records: List[DailyActivityRecord] = []
-    total_practices = 0
-    correct_practices = 0
-    doubtful_practices = 0
-    incorrect_practices = 0
+    limit = limit or ACTIVITY_PAGE_SIZE
+    closed = day_is_closed(parsed_date)
+    cache_key = (nickname, date_str, skip, limit)
+    if closed:
+        cached = daily_cache.get(cache_key)
+        if cached is not None:
+            return cached
 
     try:
-        cursor = collection.find(mongo_filter).sort("timestamp", 1) # Sort by time ascending
-
-        async for doc in cursor:
-            total_practices += 1
-            evaluation = doc.get("evaluation")
-            if evaluation == "CORRECTO":
-                correct_practices += 1
-            elif evaluation == "DUDOSO":
-                doubtful_practices += 1
-            elif evaluation == "INCORRECTO":
-                incorrect_practices += 1
-            
-            # Ensure timestamp is a datetime object. MongoDB stores BSON dates, which the driver converts to datetime.
-            record_timestamp = doc.get("timestamp")
-            if not isinstance(record_timestamp, datetime):
-                # This case should ideally not happen if data is inserted correctly
-                logger.warning("Record with _id %s has invalid timestamp format.", str(doc.get("_id")))
-                # Default to a placeholder or skip, here we'll use epoch for now if missing or wrong type
-                record_timestamp = datetime.fromtimestamp(0, tz=timezone.utc)
-
-
-            # Prepare the document for Pydantic model instantiation, ensuring aliasing works
-            doc["_id"] = str(doc.get("_id")) # Convert ObjectId to string, key remains "_id"
-            
-            # Ensure all fields expected by DailyActivityRecord are present or have defaults
-            # Pydantic will map doc["_id"] to DailyActivityRecord.id due to the alias.
-            # Other fields in doc that match DailyActivityRecord fields will also be mapped.
-            # If extra fields exist in doc, they will be ignored by default unless model config forbids it.
-            activity_records.append(DailyActivityRecord(**doc))
-
-        if total_practices == 0:
+        facets = await collection.aggregate(build_daily_pipeline(nickname, parsed_date, skip, limit)).to_list(length=1)
+        facet = facets[0] if facets else {}
+        summary = (facet.get("summary") or [{}])[0]
+        summary.pop("_id", None)
+
+        if not summary.get("total_practices"):
             logger.info("No activity found for user '%s' on date '%s'", nickname, date_str)
             # Return 200 with empty records and zeroed summary as per preference
 
-        summary = DailyActivitySummary(
-            total_practices=total_practices,
-            correct_practices=correct_practices,
-            doubtful_practices=doubtful_practices,
-            incorrect_practices=incorrect_practices
-        )
-
-        return DailyActivityResponse(
+        response = DailyActivityResponse(
             nickname=nickname,
             date=date_str,
-            summary=summary,
-            records=activity_records
+            summary=DailyActivitySummary(
+                total_practices=summary.get("total_practices", 0),
+                correct_practices=summary.get("correct_practices", 0),
+                doubtful_practices=summary.get("doubtful_practices", 0),
+                incorrect_practices=summary.get("incorrect_practices", 0)
+            ),
+            records=facet.get("records", [])
         )
 
     except Exception as e:
         logger.error("Error fetching daily activity for user '%s' on date '%s': %s", nickname, date_str, e, exc_info=True)
         raise HTTPException(status_code=500, detail="An unexpected error occurred while fetching daily activity.")
+
+    if closed:
+        daily_cache.put(cache_key, response)
+    return response
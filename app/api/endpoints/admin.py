@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Header, HTTPException
+from pydantic import BaseModel, Field
+from typing import Optional
+
+from app.config import ADMIN_TOKEN
+from app.services.predictor import model_registry
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+class ActivateModelRequest(BaseModel):
+    version: str = Field(..., example="2025-06-01", description="Nombre del directorio de la versión en el registro de modelos.")
+
+
+def _check_token(token: Optional[str]):
+    # Sin ADMIN_TOKEN configurado los endpoints de administración quedan deshabilitados
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Endpoints de administración deshabilitados (ADMIN_TOKEN no definido).")
+    if token != ADMIN_TOKEN:
+        raise HTTPException(status_code=401, detail="Token de administración inválido.")
+
+
+@router.get("/models",
+            summary="List model versions",
+            description="Lists the versions available in the model registry and the one currently serving predictions.")
+async def list_models(x_admin_token: Optional[str] = Header(None)):
+    _check_token(x_admin_token)
+    active = model_registry.active()
+    return {
+        "versions": model_registry.list_versions(),
+        "active": active.info() if active else None,
+    }
+
+
+@router.post("/models/activate",
+             summary="Hot-swap the served model version",
+             description="Loads and warms the requested version next to the active one, then swaps it in atomically. In-flight requests finish on the previous version.")
+async def activate_model(body: ActivateModelRequest, x_admin_token: Optional[str] = Header(None)):
+    _check_token(x_admin_token)
+    try:
+        version = await model_registry.activate(body.version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"No se pudo activar la versión '{body.version}': {str(e)}")
+    return {"active": version.info()}
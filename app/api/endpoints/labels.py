@@ -1,8 +1,6 @@
 from fastapi import APIRouter, HTTPException
-import pandas as pd
-import os
 import logging
-from app.config import DATASET_PATH
+from app.services.label_catalog import label_catalog
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -10,35 +8,15 @@ logger = logging.getLogger(__name__)
 @router.get("/labels",
             response_model=list[dict],
             summary="Obtener etiquetas de señas y sus niveles",
-            description="Retorna una lista de señas médicas únicas con su nivel (principiante, intermedio o avanzado).")
+            description="Retorna una lista de señas médicas únicas con su nivel (principiante, intermedio o avanzado). Se sirve desde el catálogo en memoria, que solo relee el dataset cuando cambia.")
 def get_labels():
-    dataset_path = str(DATASET_PATH)
-
-    if not os.path.exists(dataset_path):
-        logger.error("Dataset file not found at %s", dataset_path)
-        raise HTTPException(status_code=404, detail="Archivo de dataset no encontrado.")
-
     try:
-        df = pd.read_csv(dataset_path, header=None)
-
-        if df.empty or df.shape[1] < 2:
-            raise HTTPException(status_code=500, detail="El dataset está vacío o no tiene suficientes columnas.")
-
-        label_col = df.columns[-2]  # penúltima columna
-        level_col = df.columns[-1]  # última columna
-
-        df = df[[label_col, level_col]].dropna().drop_duplicates()
-
-        # Validar niveles permitidos
-        valid_levels = {"principiante", "intermedio", "avanzado"}
-        df = df[df[level_col].str.lower().isin(valid_levels)]
-
-        result = df.rename(columns={label_col: "label", level_col: "level"}) \
-                   .sort_values(by=["level", "label"]) \
-                   .to_dict(orient="records")
-
-        return result
-
+        entries = label_catalog.levels()
     except Exception as e:
         logger.exception("Error procesando el archivo del dataset.")
-        raise HTTPException(status_code=500, detail=f"Error leyendo etiquetas y niveles: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error leyendo etiquetas y niveles: {str(e)}")
+
+    if not entries:
+        logger.error("No hay etiquetas con nivel en el catálogo (dataset: %s)", label_catalog.dataset_path)
+        raise HTTPException(status_code=404, detail="Archivo de dataset no encontrado o sin etiquetas con nivel.")
+    return entries
@@ -1,17 +1,58 @@
 import traceback
+from typing import Optional
 
-from fastapi import APIRouter, HTTPException
-from app.models.schema import PredictRequest, PredictResponse
-from app.services.predictor import predict_sequence  # Ya guarda en MongoDB internamente
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from app.models.schema import PredictBatchRequest, PredictBatchResponse, PredictRequest, PredictResponse
+from app.utils.wire_format import decode_sequence
+from app.services.predictor import predict_batch, predict_sequence, model_registry, record_buffer, stats_cache  # Ya guarda en MongoDB internamente
+from app.config import BATCH_WINDOW_MS, BATCH_MAX_SIZE
+from app.db.mongodb import global_counters, progress_rollups
 
 router = APIRouter()
 
+BINARY_CONTENT_TYPE = "application/octet-stream"
+
+_PREDICT_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": PredictRequest.model_json_schema()},
+            BINARY_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+
+async def _parse_predict_request(http_request: Request, expected_label: Optional[str],
+                                 nickname: Optional[str]) -> PredictRequest:
+    body = await http_request.body()
+    try:
+        if http_request.headers.get("content-type", "").startswith(BINARY_CONTENT_TYPE):
+            if expected_label is None:
+                raise HTTPException(status_code=422, detail="El parámetro 'expected_label' es obligatorio con cuerpo binario.")
+            try:
+                array = decode_sequence(body)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return PredictRequest.from_array(array, expected_label, nickname)
+        return PredictRequest.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False))
+
+
 @router.post("/predict",
              response_model=PredictResponse,
              summary="Predict a medical sign from a sequence of keypoints",
-             description="Receives a sequence of keypoints representing a medical sign, processes it, and returns the predicted sign label, confidence, and evaluation. The prediction record is saved to the database."
+             description="Receives a sequence of keypoints representing a medical sign, processes it, and returns the predicted sign label, confidence, and evaluation. The prediction record is saved to the database. "
+                         "Accepts JSON (`sequence` as nested lists or `sequence_b64`) or an `application/octet-stream` body in the binary wire format, with `expected_label` and `nickname` as query parameters.",
+             openapi_extra=_PREDICT_BODY
              )
-async def predict(request: PredictRequest):
+async def predict(http_request: Request,
+                  expected_label: Optional[str] = Query(None, description="Only for binary bodies: the expected medical sign label."),
+                  nickname: Optional[str] = Query(None, description="Only for binary bodies: optional user's nickname.")):
+    request = await _parse_predict_request(http_request, expected_label, nickname)
     try:
         print("📩 Entrada recibida:")
         print(request.dict())
@@ -23,3 +64,42 @@ async def predict(request: PredictRequest):
         print("❌ Excepción en predict():", str(e))
         traceback.print_exc()  # 🔥 Esto mostrará el error real en consola
         raise HTTPException(status_code=500, detail=f"Error interno en la predicción: {str(e)}")
+
+
+@router.post("/predict/batch",
+             response_model=PredictBatchResponse,
+             summary="Score many sequences in one request",
+             description="Receives up to PREDICT_BATCH_MAX_ITEMS sequences, each with the fields of a /predict request. All valid sequences run in a single forward pass and their records and stats are written in bulk. "
+                         "Invalid items are reported in their own `error` field without failing the rest of the batch."
+             )
+async def predict_many(request: PredictBatchRequest):
+    try:
+        return await predict_batch(request.items)
+    except Exception as e:
+        print("❌ Excepción en predict_many():", str(e))
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error interno en la predicción por lotes: {str(e)}")
+
+
+@router.get("/predict/stats",
+            summary="Inference batching statistics",
+            description="Returns batch-size and queue-wait statistics of the in-process micro-batching scheduler, useful to tune BATCH_WINDOW_MS against p99 latency. "
+                        "With PREDICT_CASCADE=1 it also reports how many sequences the small model resolved and how many escalated to the CNN-LSTM. "
+                        "`write_buffer` reports the depth, spool size and flush latency of the write-behind buffer for prediction records, "
+                        "`stats_cache` the hit rate of the per-student statistics cache, "
+                        "and `progress_rollups` / `global_counters` the writes and pending updates of the "
+                        "read-side aggregates maintained on insert."
+            )
+async def predict_stats():
+    active = model_registry.active()
+    return {
+        "model_version": active.name if active else None,
+        "window_ms": BATCH_WINDOW_MS,
+        "max_batch_size": BATCH_MAX_SIZE,
+        **model_registry.stats.snapshot(),
+        "cascade": active.cascade.snapshot() if active and active.cascade else None,
+        "write_buffer": record_buffer.snapshot(),
+        "stats_cache": stats_cache.snapshot(),
+        "progress_rollups": progress_rollups.snapshot(),
+        "global_counters": global_counters.snapshot(),
+    }
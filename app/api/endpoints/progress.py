@@ -1,14 +1,150 @@
 from fastapi import APIRouter, HTTPException, Query
-from app.db.mongodb import collection
+from app.config import PROGRESS_SOURCE
+from app.db.mongodb import collection, progress_collection
 from app.models.schema import ProgressItem
 from typing import List, Optional
 import logging
 
-# TODO: INDEXING - Consider an index on (nickname, expected_label, timestamp) or (expected_label, nickname, timestamp) to optimize the /progress aggregation, especially when filtered by nickname. Also, (timestamp) is used for last_attempt.
-# TODO: TESTS - Add unit tests for the progress aggregation pipeline, covering different data scenarios (e.g., no data, data for one label, data for multiple labels, with/without nickname filter) and division by zero handling (mocking MongoDB).
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# /progress lee progress_rollups (app/db/progress_rollups.py); con nickname es una lectura
+# del índice único (nickname, label), sin él se agrupan los acumulados de todos los alumnos
+def build_rollups_pipeline(nickname: Optional[str] = None) -> list:
+    """Pipeline de /progress sobre progress_rollups (también lo usa app/check_query_plans.py)."""
+    if nickname:
+        return [{"$match": {"nickname": nickname}}, {"$sort": {"label": 1}}]
+    return [
+        {"$group": {
+            "_id": "$label",
+            "total_attempts": {"$sum": "$total_attempts"},
+            "correct_attempts": {"$sum": "$correct_attempts"},
+            "doubtful_attempts": {"$sum": "$doubtful_attempts"},
+            "incorrect_attempts": {"$sum": "$incorrect_attempts"},
+            "confidence_sum": {"$sum": "$confidence_sum"},
+            "min_confidence": {"$min": "$min_confidence"},
+            "max_confidence": {"$max": "$max_confidence"},
+            "last_attempt": {"$max": "$last_attempt"},
+        }},
+        {"$set": {"label": "$_id"}},
+        {"$sort": {"label": 1}},
+    ]
+
+
+def _rate(count: int, total: int) -> float:
+    return round(count / total * 100, 2) if total else 0.0
+
+
+def progress_item(rollup: dict) -> dict:
+    """Fila de /progress a partir de un acumulado (mismos campos que la agregación del historial)."""
+    total = rollup.get("total_attempts", 0)
+
+    def rounded(value):
+        return round(value, 2) if value is not None else None
+
+    return {
+        "label": rollup["label"],
+        "total_attempts": total,
+        "correct_attempts": rollup.get("correct_attempts", 0),
+        "doubtful_attempts": rollup.get("doubtful_attempts", 0),
+        "incorrect_attempts": rollup.get("incorrect_attempts", 0),
+        "success_rate": _rate(rollup.get("correct_attempts", 0), total),
+        "doubtful_rate": _rate(rollup.get("doubtful_attempts", 0), total),
+        "incorrect_rate": _rate(rollup.get("incorrect_attempts", 0), total),
+        "average_confidence": rounded(rollup.get("confidence_sum", 0.0) / total) if total else None,
+        "max_confidence": rounded(rollup.get("max_confidence")),
+        "min_confidence": rounded(rollup.get("min_confidence")),
+        "last_attempt": rollup.get("last_attempt"),
+    }
+
+
+# Índice (app/db/indexes.py): (nickname, expected_label, timestamp) con el filtro por nickname;
+# sin filtro la agregación recorre todos los registros
+def build_progress_pipeline(nickname: Optional[str] = None) -> list:
+    """Pipeline de /progress sobre el historial completo (PROGRESS_SOURCE=aggregate)."""
+    # Filtro base
+    match_stage = {}
+    if nickname:
+        match_stage["nickname"] = nickname
+
+    pipeline = [
+        {"$match": match_stage} if match_stage else {"$match": {}}, # Match documents (filter by nickname if provided)
+        {
+            "$group": {  # Group by expected_label
+                "_id": "$expected_label",
+                "total_attempts": {"$sum": 1},
+                "correct_attempts": {
+                    "$sum": {"$cond": [{"$eq": ["$evaluation", "CORRECTO"]}, 1, 0]}
+                },
+                "doubtful_attempts": {
+                    "$sum": {"$cond": [{"$eq": ["$evaluation", "DUDOSO"]}, 1, 0]}
+                },
+                "incorrect_attempts": {
+                    "$sum": {"$cond": [{"$eq": ["$evaluation", "INCORRECTO"]}, 1, 0]}
+                },
+                "average_confidence": {"$avg": "$confidence"},
+                "max_confidence": {"$max": "$confidence"},
+                "min_confidence": {"$min": "$confidence"},
+                "last_attempt": {"$max": "$timestamp"}
+            }
+        },
+        {
+            "$project": {  # Reshape the output
+                "label": "$_id",
+                "total_attempts": 1,
+                "correct_attempts": 1,
+                "doubtful_attempts": 1,
+                "incorrect_attempts": 1,
+                # Division by zero: MongoDB's $divide operator returns null if the divisor is zero,
+                # or if both dividend and divisor are zero. If the dividend is non-zero and divisor is zero,
+                # it returns an error in older versions or +/- Infinity in newer versions (5.0+).
+                # The $multiply by 100 and $round operations will propagate null, resulting in null rates,
+                # which is acceptable as it indicates no attempts or an undefined rate.
+                "success_rate": {
+                    "$cond": {
+                        "if": {"$eq": ["$total_attempts", 0]},
+                        "then": 0.0, # Explicitly return 0.0 if total_attempts is 0
+                        "else": {
+                            "$round": [
+                                {"$multiply": [{"$divide": ["$correct_attempts", "$total_attempts"]}, 100]}, 2
+                            ]
+                        }
+                    }
+                },
+                "doubtful_rate": {
+                    "$cond": {
+                        "if": {"$eq": ["$total_attempts", 0]},
+                        "then": 0.0,
+                        "else": {
+                            "$round": [
+                                {"$multiply": [{"$divide": ["$doubtful_attempts", "$total_attempts"]}, 100]}, 2
+                            ]
+                        }
+                    }
+                },
+                "incorrect_rate": {
+                     "$cond": {
+                        "if": {"$eq": ["$total_attempts", 0]},
+                        "then": 0.0,
+                        "else": {
+                            "$round": [
+                                {"$multiply": [{"$divide": ["$incorrect_attempts", "$total_attempts"]}, 100]}, 2
+                            ]
+                        }
+                    }
+                },
+                "average_confidence": {"$round": ["$average_confidence", 2]}, # $avg returns null if no documents, $round will propagate null
+                "max_confidence": {"$round": ["$max_confidence", 2]}, # $max returns null if no documents, $round will propagate null
+                "min_confidence": {"$round": ["$min_confidence", 2]}, # $min returns null if no documents, $round will propagate null
+                "last_attempt": 1,
+                "_id": 0  # Exclude the default _id field
+            }
+        },
+        {"$sort": {"label": 1}} # Sort results by label
+    ]
+    return pipeline
+
+
 @router.get("/progress",
             response_model=List[ProgressItem],
             tags=["Registros"],
@@ -20,95 +156,10 @@ logger = logging.getLogger(__name__)
 # If admin access to other users' progress is needed, that should be handled by specific roles/permissions.
 async def get_progress(nickname: Optional[str] = Query(None, description="Filtrar por nickname del usuario para obtener su progreso específico.")):
     try:
-        # Filtro base
-        match_stage = {}
-        if nickname:
-            match_stage["nickname"] = nickname
-
-        pipeline = [
-            {"$match": match_stage} if match_stage else {"$match": {}}, # Match documents (filter by nickname if provided)
-            {
-                "$group": {  # Group by expected_label
-                    "_id": "$expected_label",
-                    "total_attempts": {"$sum": 1},
-                    "correct_attempts": {
-                        "$sum": {"$cond": [{"$eq": ["$evaluation", "CORRECTO"]}, 1, 0]}
-                    },
-                    "doubtful_attempts": {
-                        "$sum": {"$cond": [{"$eq": ["$evaluation", "DUDOSO"]}, 1, 0]}
-                    },
-                    "incorrect_attempts": {
-                        "$sum": {"$cond": [{"$eq": ["$evaluation", "INCORRECTO"]}, 1, 0]}
-                    },
-                    "average_confidence": {"$avg": "$confidence"},
-                    "max_confidence": {"$max": "$confidence"},
-                    "min_confidence": {"$min": "$confidence"},
-                    "last_attempt": {"$max": "$timestamp"}
-                }
-            },
-            {
-                "$project": {  # Reshape the output
-                    "label": "$_id",
-                    "total_attempts": 1,
-                    "correct_attempts": 1,
-                    "doubtful_attempts": 1,
-                    "incorrect_attempts": 1,
-                    # Division by zero: MongoDB's $divide operator returns null if the divisor is zero,
-                    # or if both dividend and divisor are zero. If the dividend is non-zero and divisor is zero,
-                    # it returns an error in older versions or +/- Infinity in newer versions (5.0+).
-                    # The $multiply by 100 and $round operations will propagate null, resulting in null rates,
-                    # which is acceptable as it indicates no attempts or an undefined rate.
-                    "success_rate": {
-                        "$cond": {
-                            "if": {"$eq": ["$total_attempts", 0]},
-                            "then": 0.0, # Explicitly return 0.0 if total_attempts is 0
-                            "else": {
-                                "$round": [
-                                    {"$multiply": [{"$divide": ["$correct_attempts", "$total_attempts"]}, 100]}, 2
-                                ]
-                            }
-                        }
-                    },
-                    "doubtful_rate": {
-                        "$cond": {
-                            "if": {"$eq": ["$total_attempts", 0]},
-                            "then": 0.0,
-                            "else": {
-                                "$round": [
-                                    {"$multiply": [{"$divide": ["$doubtful_attempts", "$total_attempts"]}, 100]}, 2
-                                ]
-                            }
-                        }
-                    },
-                    "incorrect_rate": {
-                         "$cond": {
-                            "if": {"$eq": ["$total_attempts", 0]},
-                            "then": 0.0,
-                            "else": {
-                                "$round": [
-                                    {"$multiply": [{"$divide": ["$incorrect_attempts", "$total_attempts"]}, 100]}, 2
-                                ]
-                            }
-                        }
-                    },
-                    "average_confidence": {"$round": ["$average_confidence", 2]}, # $avg returns null if no documents, $round will propagate null
-                    "max_confidence": {"$round": ["$max_confidence", 2]}, # $max returns null if no documents, $round will propagate null
-                    "min_confidence": {"$round": ["$min_confidence", 2]}, # $min returns null if no documents, $round will propagate null
-                    "last_attempt": 1,
-                    "_id": 0  # Exclude the default _id field
-                }
-            },
-            {"$sort": {"label": 1}} # Sort results by label
-        ]
-
-        cursor = collection.aggregate(pipeline)
-        result = []
-        async for doc in cursor:
-            # Handle potential nulls from aggregation if needed before Pydantic validation,
-            # though Pydantic should handle Optional fields correctly.
-            # For example, if average_confidence could be null and Pydantic expects float:
-            # doc['average_confidence'] = doc.get('average_confidence') if doc.get('average_confidence') is not None else 0.0
-            result.append(doc)
+        if PROGRESS_SOURCE == "aggregate":
+            result = [doc async for doc in collection.aggregate(build_progress_pipeline(nickname))]
+        else:
+            result = [progress_item(doc) async for doc in progress_collection.aggregate(build_rollups_pipeline(nickname))]
         
         if not result and nickname:
             logger.info("No progress data found for nickname: %s", nickname)
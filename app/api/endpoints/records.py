@@ -1,32 +1,30 @@
-# TODO: INDEXING - Consider compound indexes on (nickname, timestamp), (evaluation, timestamp) and (timestamp) for optimal query performance in /records.
-# TODO: TESTS - Add unit tests for filter construction logic and pagination (mocking MongoDB).
 from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from app.db.mongodb import collection
+from app.config import EXPORT_BATCH_SIZE, RECORDS_TOTAL_CACHE_SIZE, RECORDS_TOTAL_TTL_SECONDS
+from app.services.record_export import EXPORT_PROJECTION, EXPORTERS, MEDIA_TYPES, parquet_available
+from bson import ObjectId
+from bson.errors import InvalidId
+from collections import OrderedDict
 from datetime import datetime, timezone
 from typing import Optional, List
+import base64
+import binascii
+import json
+import logging
+import time
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-@router.get("/records", tags=["Registros"])
-async def get_records(
-    response: Response,
-    # TODO: AUTHENTICATION - The 'nickname' filter parameter may need adjustment based on auth roles.
-    # Standard users should perhaps only see their own records (implicitly filtered by auth user ID).
-    # Admins might be able to use this filter, or a more specific user ID filter.
-    nickname: Optional[str] = Query(None, description="Filter by user's nickname"),
-    date_from: Optional[datetime] = Query(None, description="Filter records from this date (ISO format). Example: 2023-01-01T00:00:00Z"),
-    date_to: Optional[datetime] = Query(None, description="Filter records up to this date (ISO format). Example: 2023-01-31T23:59:59Z"),
-    evaluation: Optional[str] = Query(None, description="Filter by evaluation type: CORRECTO, DUDOSO, INCORRECTO", regex="^(CORRECTO|DUDOSO|INCORRECTO)$"),
-    skip: int = Query(0, ge=0, description="Number of records to skip for pagination"),
-    limit: int = Query(10, ge=1, le=100, description="Maximum number of records to return per page")
-):
-    """
-    Retrieves a paginated and filterable list of prediction records.
+# Orden total (timestamp, _id) para paginar por clave; índices (app/db/indexes.py):
+# (nickname, timestamp, _id), (evaluation, timestamp, _id) y (timestamp, _id)
+RECORDS_SORT = [("timestamp", -1), ("_id", -1)]
 
-    Allows filtering by nickname, date range, and evaluation type.
-    The 'X-Total-Count' header in the response indicates the total number of records
-    matching the filter criteria.
-    """
+
+def build_records_filter(nickname: Optional[str] = None, date_from: Optional[datetime] = None,
+                         date_to: Optional[datetime] = None, evaluation: Optional[str] = None) -> dict:
+    """Filtro de MongoDB de /records (también lo usa app/check_query_plans.py)."""
     mongo_filter = {}
 
     if nickname:
@@ -51,20 +49,122 @@ async def get_records(
     if evaluation:
         mongo_filter["evaluation"] = evaluation
 
+    return mongo_filter
+
+
+def encode_cursor(doc: dict) -> str:
+    """Cursor opaco con la clave (timestamp, _id) del último registro de la página."""
+    timestamp = doc["timestamp"]
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    raw = json.dumps([int(timestamp.timestamp() * 1000), str(doc["_id"])], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """``(timestamp, _id)`` de un cursor de ``encode_cursor``; ``ValueError`` si no es válido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        millis, oid = json.loads(raw)
+        return datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc), ObjectId(oid)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, InvalidId) as e:
+        raise ValueError("Cursor no válido") from e
+
+
+def after_cursor(mongo_filter: dict, cursor: Optional[str]) -> dict:
+    """
+    Filtro de la página siguiente al cursor en orden (timestamp, _id) descendente.
+
+    El ``$lte`` acota el rango del índice; el ``$or`` solo desempata los
+    registros con el mismo timestamp que el último de la página anterior.
+    """
+    if not cursor:
+        return mongo_filter
+    timestamp, oid = decode_cursor(cursor)
+    keyset = {"timestamp": {"$lte": timestamp}, "$or": [{"timestamp": {"$lt": timestamp}}, {"_id": {"$lt": oid}}]}
+    return {"$and": [mongo_filter, keyset]} if mongo_filter else keyset
+
+
+class TotalCountCache:
+    """Totales de /records por filtro durante ``ttl`` segundos (sin filtro: ``estimated_document_count``)."""
+
+    def __init__(self, ttl: float = RECORDS_TOTAL_TTL_SECONDS, max_entries: int = RECORDS_TOTAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, coll, mongo_filter: dict) -> int:
+        if not mongo_filter:
+            # Metadatos de la colección: no lee documentos
+            return await coll.estimated_document_count()
+        key = json.dumps(mongo_filter, sort_keys=True, default=str)
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        total = await coll.count_documents(mongo_filter)
+        self._entries[key] = (total, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return total
+
+
+total_counts = TotalCountCache()
+
+
+@router.get("/records", tags=["Registros"])
+async def get_records(
+    response: Response,
+    # TODO: AUTHENTICATION - The 'nickname' filter parameter may need adjustment based on auth roles.
+    # Standard users should perhaps only see their own records (implicitly filtered by auth user ID).
+    # Admins might be able to use this filter, or a more specific user ID filter.
+    nickname: Optional[str] = Query(None, description="Filter by user's nickname"),
+    date_from: Optional[datetime] = Query(None, description="Filter records from this date (ISO format). Example: 2023-01-01T00:00:00Z"),
+    date_to: Optional[datetime] = Query(None, description="Filter records up to this date (ISO format). Example: 2023-01-31T23:59:59Z"),
+    evaluation: Optional[str] = Query(None, description="Filter by evaluation type: CORRECTO, DUDOSO, INCORRECTO", regex="^(CORRECTO|DUDOSO|INCORRECTO)$"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    skip: int = Query(0, ge=0, description="Deprecated: number of records to skip (slow on deep pages, use cursor). Ignored when cursor is given"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum number of records to return per page"),
+    include_total: bool = Query(True, description="Send X-Total-Count (approximate, see below)")
+):
+    """
+    Retrieves a paginated and filterable list of prediction records.
+
+    Allows filtering by nickname, date range, and evaluation type. Records are
+    ordered by (timestamp, _id) descending; when there are more records the
+    'X-Next-Cursor' response header carries an opaque cursor for the next page,
+    so every page costs the same regardless of depth.
+    The 'X-Total-Count' header is approximate: without filters it comes from the
+    collection metadata, and with filters it is cached for RECORDS_TOTAL_TTL_SECONDS.
+    """
+    mongo_filter = build_records_filter(nickname, date_from, date_to, evaluation)
+    try:
+        page_filter = after_cursor(mongo_filter, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        total_count = await collection.count_documents(mongo_filter)
-        
-        documentos = collection.find(mongo_filter).sort("timestamp", -1).skip(skip).limit(limit)
-        
+        documentos = collection.find(page_filter).sort(RECORDS_SORT)
+        if skip and not cursor:
+            documentos = documentos.skip(skip)
+        # Un registro de más indica si hay página siguiente
+        documentos = documentos.limit(limit + 1)
+
         registros = []
+        last = None
         async for doc in documentos:
+            if len(registros) == limit:
+                response.headers["X-Next-Cursor"] = encode_cursor(last)
+                break
+            last = {"timestamp": doc.get("timestamp"), "_id": doc["_id"]}
             doc["_id"] = str(doc["_id"])
             # Ensure timestamp is converted to ISO format string
             if isinstance(doc.get("timestamp"), datetime):
                 doc["timestamp"] = doc["timestamp"].isoformat()
             registros.append(doc)
-        
-        response.headers["X-Total-Count"] = str(total_count)
+
+        if include_total:
+            response.headers["X-Total-Count"] = str(await total_counts.get(collection, mongo_filter))
         return registros
     except Exception as e:
         # Log the exception details for debugging
@@ -72,3 +172,43 @@ async def get_records(
         # logger = logging.getLogger(__name__)
         # logger.error(f"Error querying records: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error al consultar los registros: {str(e)}")
+
+
+async def _logged(chunks, fmt: str):
+    """Propaga los errores a mitad de la exportación tras registrarlos."""
+    try:
+        async for chunk in chunks:
+            yield chunk
+    except Exception:
+        # Las cabeceras ya se enviaron: el error corta la conexión sin el trozo final,
+        # así el cliente ve una respuesta incompleta en vez de un archivo truncado
+        logger.exception("Error exporting records as %s", fmt)
+        raise
+
+
+@router.get("/records/export", tags=["Registros"])
+async def export_records(
+    nickname: Optional[str] = Query(None, description="Filter by user's nickname"),
+    date_from: Optional[datetime] = Query(None, description="Filter records from this date (ISO format). Example: 2023-01-01T00:00:00Z"),
+    date_to: Optional[datetime] = Query(None, description="Filter records up to this date (ISO format). Example: 2023-01-31T23:59:59Z"),
+    evaluation: Optional[str] = Query(None, description="Filter by evaluation type: CORRECTO, DUDOSO, INCORRECTO", regex="^(CORRECTO|DUDOSO|INCORRECTO)$"),
+    fmt: str = Query("ndjson", alias="format", description="Output format: ndjson, csv or parquet", regex="^(ndjson|csv|parquet)$"),
+):
+    """
+    Streams every prediction record matching the filters, without pagination.
+
+    Uses the same filters as /records and the same (timestamp, _id) descending
+    order. The response is chunked and built from a single MongoDB cursor, so
+    server memory stays constant regardless of the number of records.
+    Parquet is written in row groups and requires pyarrow on the server.
+    """
+    if fmt == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="La exportación Parquet requiere pyarrow en el servidor")
+
+    mongo_filter = build_records_filter(nickname, date_from, date_to, evaluation)
+    documentos = collection.find(mongo_filter, EXPORT_PROJECTION).sort(RECORDS_SORT).batch_size(EXPORT_BATCH_SIZE)
+    return StreamingResponse(
+        _logged(EXPORTERS[fmt](documentos), fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="predictions.{fmt}"'},
+    )
@@ -0,0 +1,93 @@
+import json
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from app.config import SEQUENCE_FRAMES, STREAM_STRIDE
+from app.services import streaming
+from app.services.streaming import StreamSession, parse_frames
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# 1013 = "Try Again Later": cupo de sesiones lleno
+CLOSE_TRY_AGAIN_LATER = 1013
+
+
+@router.websocket("/ws/predict")
+async def predict_stream(websocket: WebSocket, expected_label: Optional[str] = None, stride: Optional[int] = None):
+    """
+    Reconocimiento en vivo sobre una ventana deslizante de 35 frames.
+
+    El cliente envía frames según los captura: mensajes binarios con ``n * 42``
+    float32 little-endian, o JSON ``{"frame": [...]}`` / ``{"frames": [[...], ...]}``.
+    ``{"type": "reset"}`` vacía la ventana. Cada ``stride`` frames el servidor
+    responde ``{"type": "prediction", "frame", "predicted_label", "confidence",
+    "recognized", "model_version"}`` (más ``evaluation`` si se indicó ``expected_label``).
+
+    Con ``STREAM_INFERENCE=incremental`` las predicciones son las mismas pero
+    cada frame avanza el estado del modelo (en el executor de inferencia) en
+    lugar de mandar la ventana completa al batcher.
+    """
+    await websocket.accept()
+    limiter = streaming.stream_sessions
+    if not limiter.try_acquire():
+        await websocket.send_json({"type": "error", "detail": "Demasiadas sesiones de streaming activas, inténtalo más tarde."})
+        await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+        return
+
+    session = StreamSession(stride=stride or STREAM_STRIDE, expected_label=expected_label)
+
+    async def run(window, frame):
+        try:
+            result = await streaming.predict_window(window, session.expected_label)
+            message = {"type": "prediction", "frame": frame, **result}
+        except Exception as e:
+            logger.error("❌ Error en la inferencia de streaming: %s", e)
+            message = {"type": "error", "detail": f"Error interno en la predicción: {e}"}
+        try:
+            await websocket.send_json(message)
+        except (WebSocketDisconnect, RuntimeError):
+            # El cliente se desconectó durante la inferencia; el bucle principal cierra la sesión
+            pass
+
+    try:
+        version = await streaming.incremental_version()
+        if version is not None:
+            session.use_incremental(version)
+        await websocket.send_json({"type": "ready", "window": SEQUENCE_FRAMES, "stride": session.stride,
+                                   "mode": "incremental" if session.incremental is not None else "window"})
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                if message.get("bytes") is not None:
+                    frames = parse_frames(message["bytes"])
+                else:
+                    payload = json.loads(message.get("text") or "{}")
+                    if not isinstance(payload, dict):
+                        raise ValueError('El mensaje JSON debe ser un objeto: {"frame": [...]} o {"frames": [[...], ...]}.')
+                    if payload.get("type") == "reset":
+                        session.reset()
+                        continue
+                    frames = parse_frames(payload["frames"] if "frames" in payload else payload.get("frame"))
+            except (ValueError, KeyError) as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            if session.incremental is not None:
+                version = await streaming.incremental_version()
+                if version is not None and version is not session.model_version:
+                    # Hot swap: el estado es de la versión anterior, se empieza de nuevo
+                    session.use_incremental(version)
+                for frame, window, probabilities in await streaming.push_incremental(session, frames):
+                    result = streaming.describe_window(window, session.model_version, probabilities, session.expected_label)
+                    await websocket.send_json({"type": "prediction", "frame": frame, **result})
+            elif session.add_frames(frames):
+                session.start(run)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
+        limiter.release()
@@ -0,0 +1,117 @@
+"""
+Calibra los umbrales de la cascada LSTM -> CNN-LSTM sobre el split de validación.
+
+Pasa las secuencias de validación de ``load_dataset`` por los dos modelos,
+elige un umbral de confianza por clase para el modelo pequeño que no pierda
+más de ``--max-accuracy-loss`` de precisión respecto al CNN-LSTM solo, y
+escribe la sección ``cascade`` de ``thresholds.json`` en ``--out-dir``. Imprime
+la precisión de cada modelo y de la cascada, la fracción de secuencias que
+el CNN-LSTM sigue viendo y el coste medido por secuencia (motor NumPy) de
+cada modelo y de la cascada, para comprobar que compensa.
+
+El LSTM(64) de ``train_lstm_model.py`` recorre los 35 frames de uno en uno
+mientras que el CNN-LSTM llega a su LSTM con 7 pasos, así que con lotes de
+una secuencia el modelo pequeño no es más rápido; la cascada solo ahorra si
+la fracción escalada es baja y los lotes son grandes.
+
+Uso:
+    python -m app.calibrate_cascade [--small lstm_model.h5] [--big cnn_lstm_model.h5]
+                                    [--max-accuracy-loss 0.01] [--out-dir app/models] [--dry-run]
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from .config import CNN_LSTM_MODEL_PATH, LSTM_MODEL_PATH, MODELS_DIR
+from .data_loader import load_dataset
+from .services.cascade import calibrate_thresholds, cascade_report
+from .services.numpy_engine import NumpyCNNLSTM
+
+THRESHOLDS_FILE = "thresholds.json"
+COST_BATCH_SIZES = (1, 32)
+
+
+def cost_per_sequence_us(engine: NumpyCNNLSTM, batch_size: int, repeats: int = 30) -> float:
+    """Mediana del forward pass por secuencia, en µs, con lotes de ``batch_size``."""
+    batch = np.random.default_rng(0).standard_normal((batch_size, 35, 42)).astype(np.float32)
+    engine.predict(batch)
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        engine.predict(batch)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings)) * 1e6 / batch_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrar los umbrales de la cascada LSTM -> CNN-LSTM")
+    parser.add_argument("--small", default=str(LSTM_MODEL_PATH), help="Modelo pequeño (.h5 o .npz)")
+    parser.add_argument("--big", default=str(CNN_LSTM_MODEL_PATH), help="CNN-LSTM (.h5 o .npz)")
+    parser.add_argument("--max-accuracy-loss", type=float, default=0.01,
+                        help="Pérdida de precisión admitida frente al CNN-LSTM solo (0.01 = 1 punto)")
+    parser.add_argument("--min-confidence", type=float, default=0.5,
+                        help="Umbral mínimo por clase (probabilidad 0-1)")
+    parser.add_argument("--out-dir", default=str(MODELS_DIR), help="Directorio del thresholds.json a actualizar")
+    parser.add_argument("--dry-run", action="store_true", help="Solo imprimir el informe")
+    args = parser.parse_args()
+
+    _, X_val, _, y_val, encoder = load_dataset()
+    small_model, big_model = NumpyCNNLSTM.load(args.small), NumpyCNNLSTM.load(args.big)
+    small_probs = small_model.predict(X_val)
+    big_probs = big_model.predict(X_val)
+
+    thresholds = calibrate_thresholds(small_probs, big_probs, y_val, args.max_accuracy_loss, args.min_confidence)
+    report = cascade_report(small_probs, big_probs, y_val, thresholds)
+
+    labels = [str(label) for label in encoder.classes_]
+    small_pred = np.argmax(small_probs, axis=1)
+    print(f"{'clase':<28} {'umbral %':>9} {'escalan':>9}")
+    for c, label in enumerate(labels):
+        rows = small_pred == c
+        escalated = rows & (small_probs.max(axis=1) < thresholds[c])
+        threshold = f"{thresholds[c] * 100:9.2f}" if np.isfinite(thresholds[c]) else f"{'—':>9}"
+        print(f"{label:<28} {threshold} {int(escalated.sum()):>4}/{int(rows.sum()):<4}")
+    print(f"📊 Precisión LSTM: {report['small_accuracy']:.4f}  CNN-LSTM: {report['big_accuracy']:.4f}  "
+          f"cascada: {report['cascade_accuracy']:.4f} (pérdida {report['accuracy_loss']:.4f})")
+    print(f"📉 El CNN-LSTM sigue viendo el {report['escalation_rate'] * 100:.1f}% de las secuencias "
+          f"({report['samples']} de validación)")
+
+    # Coste esperado: todas pasan por el pequeño y las escaladas además por el grande
+    report["cost_us"] = {}
+    for batch_size in COST_BATCH_SIZES:
+        small_us = cost_per_sequence_us(small_model, batch_size)
+        big_us = cost_per_sequence_us(big_model, batch_size)
+        cascade_us = small_us + report["escalation_rate"] * big_us
+        report["cost_us"][batch_size] = {"small": round(small_us, 1), "big": round(big_us, 1),
+                                         "cascade": round(cascade_us, 1)}
+        verdict = "✅" if cascade_us < big_us else "⚠️ no compensa"
+        print(f"⏱️ Lote {batch_size}: LSTM {small_us:.0f} µs, CNN-LSTM {big_us:.0f} µs, "
+              f"cascada {cascade_us:.0f} µs por secuencia {verdict}")
+
+    if args.dry_run:
+        return report
+
+    path = os.path.join(args.out_dir, THRESHOLDS_FILE)
+    current = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            current = json.load(f)
+    current["cascade"] = {
+        # Las clases sin umbral escalan siempre
+        "per_class": {label: float(thresholds[c] * 100) for c, label in enumerate(labels) if np.isfinite(thresholds[c])},
+        "max_accuracy_loss": args.max_accuracy_loss,
+        "calibrated_at": datetime.utcnow().isoformat(),
+        "validation": report,
+    }
+    with open(path, "w") as f:
+        json.dump(current, f, indent=2, ensure_ascii=False)
+    print(f"✅ Umbrales de cascada guardados en: {path}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
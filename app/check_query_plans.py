@@ -0,0 +1,194 @@
+"""
+Comprueba con ``explain()`` que las consultas de los endpoints de lectura usan índices.
+
+Toma el filtro, el orden y el pipeline reales de cada endpoint (los
+constructores de ``app/api/endpoints``), pide a MongoDB el plan ganador y
+falla si alguno recorre la colección entera (``COLLSCAN``) o ordena en
+memoria (``SORT`` sobre documentos; los ``$sort`` después de un ``$group``
+ordenan resultados ya agrupados y no cuentan).
+
+``/progress`` sin nickname (todos los acumulados de ``progress_rollups``) y
+el ``X-Total-Count`` de ``/records`` sin filtros agregan todos los
+documentos y no pueden evitar leerlos: se informan pero solo fallan con
+``--strict``. Con la colección vacía o inexistente el
+plan es ``EOF`` y no dice nada; conviene ejecutarlo contra una copia con
+datos.
+
+Uso:
+    python -m app.check_query_plans [--ensure-indexes] [--strict] [--nickname alumno]
+"""
+import argparse
+import asyncio
+import sys
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Set
+
+# Etapas cuyo plan no dice nada sobre índices (colección vacía o inexistente)
+EMPTY_STAGES = {"EOF"}
+
+
+def _walk(node, found: list) -> Set[str]:
+    """Recorre un plan; añade a ``found`` cada ``(etapa, etapas por debajo)`` y devuelve las de este nodo."""
+    below: Set[str] = set()
+    if isinstance(node, dict):
+        for key, value in node.items():
+            # Solo el plan ganador; slotBasedPlan es la traducción SBE del mismo árbol
+            if key in ("rejectedPlans", "slotBasedPlan"):
+                continue
+            below |= _walk(value, found)
+        if isinstance(node.get("stage"), str):
+            found.append((node["stage"], set(below)))
+            below.add(node["stage"])
+    elif isinstance(node, list):
+        for item in node:
+            below |= _walk(item, found)
+    return below
+
+
+def _winning_plans(node):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "winningPlan":
+                yield value
+            elif key != "rejectedPlans":
+                yield from _winning_plans(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _winning_plans(item)
+
+
+def plan_stages(explain: dict) -> List[tuple]:
+    """Etapas de los planes ganadores de un ``explain`` (find o aggregate, motor clásico o SBE)."""
+    found = []
+    for plan in _winning_plans(explain):
+        _walk(plan, found)
+    return found
+
+
+def plan_problems(explain: dict) -> List[str]:
+    """``COLLSCAN`` y ``SORT`` en memoria sobre documentos del plan ganador."""
+    problems = []
+    for stage, below in plan_stages(explain):
+        if stage == "COLLSCAN":
+            problems.append("COLLSCAN")
+        elif stage == "SORT" and "GROUP" not in below:
+            problems.append("SORT en memoria")
+    return problems
+
+
+def index_names(explain: dict) -> List[str]:
+    names = []
+
+    def visit(node):
+        if isinstance(node, dict):
+            if node.get("indexName") and node["indexName"] not in names:
+                names.append(node["indexName"])
+            for key, value in node.items():
+                if key not in ("rejectedPlans", "slotBasedPlan"):
+                    visit(value)
+        elif isinstance(node, list):
+            for item in node:
+                visit(item)
+
+    for plan in _winning_plans(explain):
+        visit(plan)
+    return names
+
+
+def endpoint_queries(nickname: str) -> List[dict]:
+    """Consultas reales de cada endpoint de lectura, con valores de ejemplo."""
+    from bson import ObjectId
+
+    from app.api.endpoints.activity import build_daily_pipeline
+    from app.api.endpoints.progress import build_rollups_pipeline
+    from app.api.endpoints.records import RECORDS_SORT, after_cursor, build_records_filter, encode_cursor
+    from app.db.global_counters import GLOBAL_DISTRIBUTION_PIPELINE
+    from app.db.progress_rollups import build_history_pipeline
+
+    now = datetime.now(timezone.utc)
+    week_ago = now - timedelta(days=7)
+    records = [
+        ("/records", build_records_filter()),
+        ("/records?nickname", build_records_filter(nickname=nickname)),
+        ("/records?evaluation", build_records_filter(evaluation="CORRECTO")),
+        ("/records?date_from&date_to", build_records_filter(date_from=week_ago, date_to=now)),
+        ("/records?nickname&evaluation&date_from",
+         build_records_filter(nickname=nickname, date_from=week_ago, evaluation="INCORRECTO")),
+    ]
+    queries = [{"name": name, "filter": f, "sort": RECORDS_SORT, "limit": 11} for name, f in records]
+    # Página siguiente por cursor, con y sin filtros
+    cursor = encode_cursor({"timestamp": week_ago, "_id": ObjectId()})
+    queries += [
+        {"name": f"{name} (cursor)", "filter": after_cursor(f, cursor), "sort": RECORDS_SORT, "limit": 11}
+        for name, f in records[:2]
+    ]
+    # /records/export: mismo filtro y orden, sin límite
+    queries.append({"name": "/records/export?nickname", "filter": records[1][1], "sort": RECORDS_SORT})
+    # count_documents de X-Total-Count: el mismo pipeline que arma pymongo; sin filtro cuenta todo
+    queries += [
+        {"name": f"{name} (X-Total-Count)", "pipeline": [{"$match": f}, {"$group": {"_id": 1, "n": {"$sum": 1}}}],
+         "full_scan": not f}
+        for name, f in records
+    ]
+    queries += [
+        {"name": "/activity/daily", "pipeline": build_daily_pipeline(nickname, date.today(), 0, 100)},
+        {"name": "/progress?nickname", "pipeline": build_rollups_pipeline(nickname), "collection": "progress_rollups"},
+        {"name": "/progress", "pipeline": build_rollups_pipeline(None), "collection": "progress_rollups",
+         "full_scan": True},
+        {"name": "progress_rollups check --nickname", "pipeline": build_history_pipeline(nickname)},
+        {"name": "global_counters backfill", "pipeline": GLOBAL_DISTRIBUTION_PIPELINE},
+    ]
+    return queries
+
+
+async def explain(collection, query: dict) -> dict:
+    if query.get("collection"):
+        collection = collection.database[query["collection"]]
+    if "pipeline" in query:
+        return await collection.database.command("aggregate", collection.name,
+                                                 pipeline=query["pipeline"], explain=True)
+    cursor = collection.find(query["filter"])
+    if query.get("sort"):
+        cursor = cursor.sort(query["sort"])
+    if query.get("limit"):
+        cursor = cursor.limit(query["limit"])
+    return await cursor.explain()
+
+
+async def check(collection, queries: List[dict], strict: bool = False) -> bool:
+    ok = True
+    print(f"{'consulta':<48} {'índices':<40} resultado")
+    for query in queries:
+        result = await explain(collection, query)
+        problems = plan_problems(result)
+        stages = {stage for stage, _ in plan_stages(result)}
+        indexes = ", ".join(index_names(result)) or "—"
+        if problems and query.get("full_scan") and not strict:
+            verdict = f"⚠️ {', '.join(problems)} (agrega todos los registros)"
+        elif problems:
+            verdict = f"❌ {', '.join(problems)}"
+            ok = False
+        elif stages and stages <= EMPTY_STAGES:
+            verdict = "⚠️ colección vacía: plan no representativo"
+        else:
+            verdict = "✅"
+        print(f"{query['name']:<48} {indexes:<40} {verdict}")
+    return ok
+
+
+async def _main():
+    parser = argparse.ArgumentParser(description="Comprobar los planes de consulta de los endpoints de lectura")
+    parser.add_argument("--ensure-indexes", action="store_true", help="Crear antes los índices de app/db/indexes.py")
+    parser.add_argument("--strict", action="store_true", help="Fallar también en las agregaciones de todos los registros")
+    parser.add_argument("--nickname", default="check_query_plans", help="Nickname de ejemplo para los filtros")
+    args = parser.parse_args()
+
+    from app.db.mongodb import collection, db
+    if args.ensure_indexes:
+        from app.db.indexes import ensure_indexes
+        await ensure_indexes(db)
+    return await check(collection, endpoint_queries(args.nickname), args.strict)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(_main()) else 1)
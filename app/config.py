@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Base directories
@@ -10,6 +11,40 @@ DATASET_PATH = DATA_DIR / "dataset_medico.csv"
 LSTM_MODEL_PATH = MODELS_DIR / "lstm_model.h5"
 CNN_LSTM_MODEL_PATH = MODELS_DIR / "cnn_lstm_model.h5"
 ENCODER_PATH = MODELS_DIR / "label_encoder.pkl"
+NUMPY_WEIGHTS_PATH = MODELS_DIR / "cnn_lstm_model.npz"
+LSTM_NUMPY_WEIGHTS_PATH = MODELS_DIR / "lstm_model.npz"
+# Bundle único (pesos, etiquetas, normalización, umbrales y especificación de entrada)
+BUNDLE_FILENAME = "cnn_lstm.bundle"
+MODEL_BUNDLE_PATH = Path(os.getenv("MODEL_BUNDLE_PATH", str(MODELS_DIR / BUNDLE_FILENAME)))
+TFLITE_DIR = MODELS_DIR / "tflite"
+
+# Segundos entre comprobaciones (en segundo plano) de cambios en el dataset para el
+# catálogo de etiquetas; 0 lo desactiva y el dataset solo se lee al arrancar
+LABEL_CATALOG_CHECK_SECONDS = float(os.getenv("LABEL_CATALOG_CHECK_SECONDS", "5"))
+
+# Input spec: secuencias de 35 frames x 42 valores (21 landmarks x,y por mano)
+SEQUENCE_FRAMES = 35
+SEQUENCE_FEATURES = 42
+
+# Reconocimiento en vivo por WebSocket (/ws/predict): inferencia cada
+# STREAM_STRIDE frames sobre los últimos SEQUENCE_FRAMES, con un máximo de
+# STREAM_MAX_SESSIONS sesiones simultáneas
+STREAM_STRIDE = int(os.getenv("STREAM_STRIDE", "4"))
+STREAM_MAX_SESSIONS = int(os.getenv("STREAM_MAX_SESSIONS", "100"))
+# STREAM_INFERENCE: "window" (ventana completa por el batcher) o "incremental"
+# (estado conv + LSTM por sesión, un paso por frame en el executor de inferencia; rinde con
+# STREAM_STRIDE múltiplo de 4 y no se activa con z-score por posición ni con el executor "process")
+STREAM_INFERENCE = os.getenv("STREAM_INFERENCE", "window")
+
+# Umbrales de confianza (%) por defecto; los bundles y thresholds.json los pueden sobrescribir
+UMBRAL_CONFIANZA = 75.0
+UMBRAL_RECHAZO = 20.0
+UMBRAL_POR_CLASE = {
+    "dolor": 95.0,  # más exigente
+    "yo": 70.0,
+    "a_mi_me_duele_la_cabeza": 70.0,
+    "tengo_fiebre_y_tos": 70.0
+}
 
 # Training parameters
 EPOCHS = 25
@@ -22,6 +57,106 @@ RANDOM_STATE = 42
 LSTM_PLOT_PATH = MODELS_DIR / "loss_plot_lstm.png"
 CNN_LSTM_PLOT_PATH = MODELS_DIR / "loss_plot_cnn_lstm.png"
 METRICS_JSON_PATH = MODELS_DIR / "metrics.json"
+TFLITE_METRICS_JSON_PATH = MODELS_DIR / "tflite_metrics.json"
 CONFUSION_MATRIX_PATH = MODELS_DIR / "confusion_matrix.png"
 REPORT_PATH = MODELS_DIR / "classification_report.txt"
 INFERENCE_LOG_PATH = MODELS_DIR / "inference_log.csv"
+
+# Inference batching (micro-batching de peticiones concurrentes a /predict)
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "5"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_STATS_WINDOW = int(os.getenv("BATCH_STATS_WINDOW", "1000"))
+# Cascada: el LSTM pequeño resuelve las secuencias claras y solo las dudosas pasan al CNN-LSTM
+# (requiere lstm_model.h5/.npz y umbrales "cascade" de python -m app.calibrate_cascade)
+PREDICT_CASCADE = os.getenv("PREDICT_CASCADE", "0") == "1"
+# Máximo de secuencias por petición a /predict/batch (se evalúan en un único forward pass)
+PREDICT_BATCH_MAX_ITEMS = int(os.getenv("PREDICT_BATCH_MAX_ITEMS", "500"))
+
+# Buffer write-behind de los registros de predicción (app/db/write_buffer.py):
+# insert_many cada WRITE_BUFFER_FLUSH_MS o al llegar a WRITE_BUFFER_MAX_ITEMS;
+# con MongoDB caído los lotes van al spool y se reinsertan al recuperarse
+WRITE_BUFFER_MAX_ITEMS = int(os.getenv("WRITE_BUFFER_MAX_ITEMS", "500"))
+WRITE_BUFFER_FLUSH_MS = float(os.getenv("WRITE_BUFFER_FLUSH_MS", "1000"))
+WRITE_BUFFER_MAX_PENDING = int(os.getenv("WRITE_BUFFER_MAX_PENDING", "20000"))
+WRITE_BUFFER_SPOOL_PATH = Path(os.getenv("WRITE_BUFFER_SPOOL_PATH", str(BASE_DIR / "spool" / "predictions.jsonl")))
+
+# Caché en proceso de prediction_stats por (expected_label, nickname)
+# (app/db/stats_cache.py): las entradas vigentes responden sin leer de MongoDB
+# y se reconcilian al caducar; STATS_CACHE_TTL_SECONDS=0 la desactiva
+STATS_CACHE_MAX_ENTRIES = int(os.getenv("STATS_CACHE_MAX_ENTRIES", "10000"))
+STATS_CACHE_TTL_SECONDS = float(os.getenv("STATS_CACHE_TTL_SECONDS", "30"))
+STATS_CACHE_FLUSH_MS = float(os.getenv("STATS_CACHE_FLUSH_MS", "1000"))
+
+# Crear al arrancar los índices de app/db/indexes.py (idempotente)
+MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "1") == "1"
+
+# X-Total-Count de /records: total por filtro cacheado estos segundos (sin filtro
+# se usa estimated_document_count) y número máximo de filtros en caché
+RECORDS_TOTAL_TTL_SECONDS = float(os.getenv("RECORDS_TOTAL_TTL_SECONDS", "30"))
+RECORDS_TOTAL_CACHE_SIZE = int(os.getenv("RECORDS_TOTAL_CACHE_SIZE", "1000"))
+
+# Origen de /progress: "rollups" lee los acumulados de progress_rollups (mantenidos al
+# insertar, ver app/db/progress_rollups.py); "aggregate" agrupa todo el historial
+PROGRESS_SOURCE = os.getenv("PROGRESS_SOURCE", "rollups")
+
+# /stats/global_distribution: "counters" suma los documentos evaluations:* de
+# global_counters (app/db/global_counters.py); "aggregate" agrupa todo el historial.
+# GLOBAL_COUNTER_SHARDS es el número de documentos entre los que se reparten las escrituras
+GLOBAL_DISTRIBUTION_SOURCE = os.getenv("GLOBAL_DISTRIBUTION_SOURCE", "counters")
+GLOBAL_COUNTER_SHARDS = int(os.getenv("GLOBAL_COUNTER_SHARDS", "16"))
+
+# /activity/daily: las respuestas de días UTC ya cerrados (terminados hace más de
+# ACTIVITY_DAY_CLOSED_AFTER_SECONDS, margen para el buffer write-behind) se cachean
+ACTIVITY_CACHE_TTL_SECONDS = float(os.getenv("ACTIVITY_CACHE_TTL_SECONDS", "86400"))
+ACTIVITY_CACHE_SIZE = int(os.getenv("ACTIVITY_CACHE_SIZE", "1000"))
+ACTIVITY_DAY_CLOSED_AFTER_SECONDS = float(os.getenv("ACTIVITY_DAY_CLOSED_AFTER_SECONDS", "300"))
+# Registros por página cuando no se pasa ?limit= (máximo 1000, como el parámetro): el
+# resultado del $facet es un único documento y no puede pasar de 16 MB
+ACTIVITY_PAGE_SIZE = min(max(int(os.getenv("ACTIVITY_PAGE_SIZE", "1000")), 1), 1000)
+
+# /records/export (app/services/record_export.py): documentos por lote del cursor,
+# filas por trozo de NDJSON/CSV y filas por row group de Parquet
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+EXPORT_PARQUET_ROW_GROUP_ROWS = int(os.getenv("EXPORT_PARQUET_ROW_GROUP_ROWS", "50000"))
+
+# Inference executor: saca el forward pass del event loop de uvicorn
+# INFERENCE_EXECUTOR: "thread" | "process" | "inline" (inline = en el event loop, solo depuración)
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread")
+# Hilos internos de TensorFlow (0 = que TensorFlow decida)
+TF_INTRA_OP_THREADS = int(os.getenv("TF_INTRA_OP_THREADS", "0"))
+TF_INTER_OP_THREADS = int(os.getenv("TF_INTER_OP_THREADS", "0"))
+# Forward passes simultáneos; por defecto núcleos / hilos intra-op
+INFERENCE_MAX_CONCURRENCY = int(
+    os.getenv(
+        "INFERENCE_MAX_CONCURRENCY",
+        str(max(1, (os.cpu_count() or 1) // TF_INTRA_OP_THREADS) if TF_INTRA_OP_THREADS else 1),
+    )
+)
+
+# Ruta de inferencia compilada (tf.function con firma fija (None, 35, 42))
+INFERENCE_XLA = os.getenv("INFERENCE_XLA", "0") == "1"
+# Tamaños de lote que se trazan/compilan en el warm-up de arranque
+WARMUP_BATCH_SIZES = tuple(
+    int(n) for n in os.getenv("WARMUP_BATCH_SIZES", "1,2,4,8,16,32").split(",") if n.strip()
+)
+
+# Backend de inferencia: "tensorflow" (tf.function sobre Keras), "numpy"
+# (motor NumPy puro, no importa TensorFlow; lee NUMPY_WEIGHTS_PATH o el .h5)
+# o "tflite" (intérprete TFLite, una instancia por hilo del executor)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "tensorflow")
+# Variante TFLite servida: "float32", "float16" o "int8" (rango dinámico)
+TFLITE_VARIANT = os.getenv("TFLITE_VARIANT", "float16")
+TFLITE_MODEL_PATH = Path(os.getenv("TFLITE_MODEL_PATH", str(TFLITE_DIR / f"cnn_lstm_{TFLITE_VARIANT}.tflite")))
+
+# Registro de modelos versionados: MODEL_REGISTRY_DIR/<versión>/ con un
+# cnn_lstm.bundle o los archivos sueltos (pesos, label_encoder.pkl,
+# thresholds.json); el archivo CURRENT indica la versión activa.
+# Sin versiones se sirven los archivos de MODELS_DIR.
+MODEL_REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", str(MODELS_DIR / "registry")))
+# Versión a activar al arrancar (por defecto la de CURRENT o la más reciente)
+MODEL_VERSION = os.getenv("MODEL_VERSION", "")
+# Segundos entre comprobaciones de CURRENT para hacer hot swap (0 = desactivado)
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "0"))
+# Token para los endpoints /admin (sin token configurado quedan deshabilitados)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
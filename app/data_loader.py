@@ -8,7 +8,24 @@ from .config import DATA_PATH, TEST_SIZE, RANDOM_STATE
 FRAMES = 35
 FEATURES = 42
 
-def load_dataset():
+def zscore_stats(X):
+    """Media y desviación por columna de los 1470 valores aplanados (35x42)."""
+    mean = X.mean(axis=0)
+    std = X.std(axis=0) + 1e-6  # evitar división por cero
+    return mean.astype(np.float32), std.astype(np.float32)
+
+
+def apply_zscore(X, mean, std):
+    """Z-score (x - media) / desviación; acepta lotes aplanados (N, 1470) o (N, 35, 42)."""
+    return (X - mean.reshape(X.shape[1:])) / std.reshape(X.shape[1:])
+
+
+def load_dataset(return_stats=False):
+    """Carga, normaliza y divide el dataset.
+
+    Con ``return_stats=True`` devuelve además ``(mean, std)`` con forma (35, 42),
+    las mismas estadísticas que aplica la etapa de preprocesado del bundle al servir.
+    """
     # 1. Cargar y barajar el dataset
     try:
         df = pd.read_csv(DATA_PATH, header=None, encoding="utf-8")
@@ -24,9 +41,8 @@ def load_dataset():
     # nivel = df.iloc[:, -1].values                # (opcional) último campo, lo ignoramos
 
     # 3. Aplicar Z-score: (x - media) / desviación
-    mean = X.mean(axis=0)
-    std = X.std(axis=0) + 1e-6  # evitar división por cero
-    X = (X - mean) / std
+    mean, std = zscore_stats(X)
+    X = apply_zscore(X, mean, std)
 
     # 4. Redimensionar a [num_samples, 35, 42]
     X = X.reshape((-1, FRAMES, FEATURES))
@@ -44,5 +60,8 @@ def load_dataset():
     print("📊 X media:", np.mean(X), "std:", np.std(X))
     print("🟢 y clases:", encoder.classes_)
 
+    if return_stats:
+        stats = (mean.reshape((FRAMES, FEATURES)), std.reshape((FRAMES, FEATURES)))
+        return X_train, X_test, y_train, y_test, encoder, stats
     return X_train, X_test, y_train, y_test, encoder
 
@@ -0,0 +1,164 @@
+"""
+Contadores globales por evaluación para ``/stats/global_distribution``.
+
+Se reparten entre ``shards`` documentos de ``global_counters``
+(``_id`` = ``evaluations:<n>``, campo ``counts`` = evaluación -> número) para
+que los workers no escriban todos sobre el mismo documento. Como
+``progress_rollups``, el buffer write-behind llama a ``GlobalCounters.apply``
+con los registros que acaba de insertar: se cuentan en proceso y se suman con
+un único ``$inc`` sobre un shard elegido al azar. ``read`` suma todos los
+documentos ``evaluations:*``, no solo los ``shards`` actuales: si se baja
+``GLOBAL_COUNTER_SHARDS``, lo que ya se escribió en los shards altos (o lo que
+sigan escribiendo workers con la configuración anterior) se sigue contando.
+``shards`` solo decide dónde se escribe. El coste no depende del número de
+predicciones.
+
+Igual que los acumulados de ``/progress``, van por detrás de ``predictions``
+lo que tarda un flush del buffer. Las cuentas que no se pudieron escribir se
+reintentan con el siguiente ``apply`` y con ``flush`` al cerrar la
+aplicación. ``check`` y ``backfill`` comparan y reconstruyen los contadores
+desde el historial:
+
+    python -m app.db.global_counters backfill
+    python -m app.db.global_counters check
+"""
+import argparse
+import asyncio
+import random
+import sys
+from collections import Counter
+from typing import Dict, List
+
+from pymongo import UpdateOne
+
+from app.config import GLOBAL_COUNTER_SHARDS
+
+COUNTER = "evaluations"
+
+# Cuentas por evaluación desde el historial (backfill, comprobación y
+# GLOBAL_DISTRIBUTION_SOURCE=aggregate); el $match usa el índice (evaluation, timestamp, _id)
+GLOBAL_DISTRIBUTION_PIPELINE = [
+    {"$match": {"evaluation": {"$exists": True, "$ne": None}}},
+    {"$group": {"_id": "$evaluation", "count": {"$sum": 1}}},
+    {"$project": {"evaluation_type": "$_id", "count": 1, "_id": 0}}
+]
+
+
+def shard_id(shard: int) -> str:
+    return f"{COUNTER}:{shard}"
+
+
+def _countable(evaluation) -> bool:
+    # El valor va en el nombre del campo ("counts.<evaluación>")
+    return isinstance(evaluation, str) and evaluation != "" and "." not in evaluation and not evaluation.startswith("$")
+
+
+class GlobalCounters:
+    """Contadores por evaluación repartidos en ``shards`` documentos."""
+
+    def __init__(self, collection, shards: int = GLOBAL_COUNTER_SHARDS):
+        self.collection = collection
+        self.shards = max(int(shards), 1)
+        # Cuentas que no se pudieron escribir; viajan con el siguiente apply
+        self._pending: Counter = Counter()
+        self.applied = 0
+        self.writes = 0
+        self.failed_writes = 0
+
+    async def apply(self, docs: List[dict]) -> None:
+        """Suma las evaluaciones de ``docs`` (registros ya insertados) a un shard al azar."""
+        self._pending.update(doc["evaluation"] for doc in docs if _countable(doc.get("evaluation")))
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Escribe las cuentas pendientes en un shard al azar; si falla, siguen en ``_pending``."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, Counter()
+        try:
+            await self.collection.update_one(
+                {"_id": shard_id(random.randrange(self.shards))},
+                {"$inc": {f"counts.{evaluation}": n for evaluation, n in pending.items()}},
+                upsert=True,
+            )
+        except Exception as e:
+            self.failed_writes += 1
+            self._pending.update(pending)
+            print(f"⚠️ No se pudieron actualizar los contadores globales ({sum(pending.values())} evaluaciones):", str(e))
+            return
+        self.writes += 1
+        self.applied += sum(pending.values())
+
+    async def read(self) -> Dict[str, int]:
+        """Evaluación -> número total, sumando todos los shards que haya, sea cual sea ``self.shards``."""
+        totals: Counter = Counter()
+        async for doc in self.collection.find({"_id": {"$regex": f"^{COUNTER}:"}}):
+            totals.update(doc.get("counts") or {})
+        return dict(totals)
+
+    def snapshot(self) -> dict:
+        return {
+            "shards": self.shards,
+            "applied": self.applied,
+            "writes": self.writes,
+            "failed_writes": self.failed_writes,
+            "pending": sum(self._pending.values()),
+        }
+
+
+async def history_counts(predictions) -> Dict[str, int]:
+    """Evaluación -> número calculado desde ``predictions``."""
+    counts = {}
+    async for item in predictions.aggregate(GLOBAL_DISTRIBUTION_PIPELINE):
+        if _countable(item.get("evaluation_type")):
+            counts[item["evaluation_type"]] = item.get("count", 0)
+    return counts
+
+
+async def backfill(predictions, counters: GlobalCounters) -> Dict[str, int]:
+    """Deja en el shard 0 las cuentas del historial y vacía el resto; devuelve las cuentas."""
+    counts = await history_counts(predictions)
+    await counters.collection.bulk_write([
+        UpdateOne({"_id": shard_id(i)}, {"$set": {"counts": counts if i == 0 else {}}}, upsert=True)
+        for i in range(counters.shards)
+    ], ordered=True)
+    # Shards de una configuración anterior con más documentos
+    await counters.collection.delete_many({
+        "_id": {"$regex": f"^{COUNTER}:", "$nin": [shard_id(i) for i in range(counters.shards)]}
+    })
+    return counts
+
+
+async def check(predictions, counters: GlobalCounters) -> Dict[str, dict]:
+    """Evaluaciones cuyo contador no coincide con el historial (vacío si todo cuadra)."""
+    expected, actual = await history_counts(predictions), await counters.read()
+    return {
+        evaluation: {"history": expected.get(evaluation, 0), "counters": actual.get(evaluation, 0)}
+        for evaluation in sorted(set(expected) | set(actual))
+        if expected.get(evaluation, 0) != actual.get(evaluation, 0)
+    }
+
+
+async def _main() -> bool:
+    parser = argparse.ArgumentParser(description="Reconstruir o comprobar los contadores de /stats/global_distribution")
+    parser.add_argument("command", choices=["backfill", "check"])
+    args = parser.parse_args()
+
+    from app.db.mongodb import collection, global_counters
+    if args.command == "backfill":
+        counts = await backfill(collection, global_counters)
+        print(f"✅ Contadores reconstruidos desde el historial: {counts}")
+        return True
+    problems = await check(collection, global_counters)
+    for evaluation, diff in problems.items():
+        print(f"❌ {evaluation}: historial {diff['history']}, contadores {diff['counters']}")
+    if not problems:
+        print("✅ Los contadores coinciden con el historial")
+    return not problems
+
+
+__all__ = ["GLOBAL_DISTRIBUTION_PIPELINE", "GlobalCounters", "backfill", "check", "history_counts"]
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(_main()) else 1)
@@ -0,0 +1,105 @@
+"""
+Índices de MongoDB que necesitan los endpoints de lectura y las estadísticas.
+
+``ensure_indexes`` los crea de forma idempotente (``createIndexes`` no hace
+nada si ya existe un índice igual); la API lo lanza al arrancar con
+``MONGO_ENSURE_INDEXES=1`` y también se puede ejecutar como migración:
+
+    python -m app.db.indexes
+
+``app/check_query_plans.py`` comprueba con ``explain()`` que las consultas de
+cada endpoint los usan.
+"""
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# dropIndexes de un índice que ya no existe (otro worker lo borró antes)
+INDEX_NOT_FOUND = 27
+
+# Colección -> índices declarados
+INDEXES: Dict[str, List[IndexModel]] = {
+    "predictions": [
+        # /records por alumno y /activity/daily (filtro por nickname, orden por fecha);
+        # el _id completa el orden (timestamp, _id) de la paginación por cursor
+        IndexModel([("nickname", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+                   name="nickname_timestamp_id"),
+        # /records por evaluación y el recuento desde el historial de global_counters
+        IndexModel([("evaluation", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+                   name="evaluation_timestamp_id"),
+        # /records sin filtro o solo por rango de fechas
+        IndexModel([("timestamp", DESCENDING), ("_id", DESCENDING)], name="timestamp_id"),
+        # Backfill y comprobación de progress_rollups por alumno (y /progress con PROGRESS_SOURCE=aggregate)
+        IndexModel([("nickname", ASCENDING), ("expected_label", ASCENDING), ("timestamp", DESCENDING)],
+                   name="nickname_expected_label_timestamp"),
+    ],
+    "prediction_stats": [
+        # Destino de los upsert de /predict: sin él cada $inc recorre la colección
+        # y dos upsert simultáneos pueden crear documentos duplicados
+        IndexModel([("expected_label", ASCENDING), ("nickname", ASCENDING)],
+                   name="expected_label_nickname", unique=True),
+    ],
+    "progress_rollups": [
+        # Un acumulado por (nickname, etiqueta): destino de los upsert y lectura de /progress
+        IndexModel([("nickname", ASCENDING), ("label", ASCENDING)], name="nickname_label", unique=True),
+    ],
+}
+
+
+# Índices sustituidos por los de arriba; ensure_indexes los borra si existen
+SUPERSEDED_INDEXES: Dict[str, List[str]] = {
+    "predictions": ["nickname_timestamp", "evaluation_timestamp", "timestamp"],
+}
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """
+    Crea los índices declarados en ``INDEXES``; devuelve los nombres por colección.
+
+    Antes borra los de ``SUPERSEDED_INDEXES`` que queden de versiones
+    anteriores; con varios workers arrancando a la vez el índice puede
+    desaparecer entre la consulta y el borrado, y eso no es un error. Un
+    índice que no se puede borrar o crear (p. ej. otro con el mismo nombre y
+    otra definición, o duplicados que impiden el único) se registra y no
+    detiene el resto.
+    """
+    created = {}
+    for name, index_names in SUPERSEDED_INDEXES.items():
+        existing = await db[name].index_information()
+        for index_name in index_names:
+            if index_name not in existing:
+                continue
+            try:
+                await db[name].drop_index(index_name)
+            except OperationFailure as e:
+                if e.code != INDEX_NOT_FOUND:
+                    logger.error("❌ No se pudo eliminar el índice %s.%s: %s", name, index_name, e)
+                continue
+            logger.info("🗑️ Índice sustituido eliminado: %s.%s", name, index_name)
+    for name, indexes in INDEXES.items():
+        created[name] = []
+        for index in indexes:
+            try:
+                created[name] += await db[name].create_indexes([index])
+            except OperationFailure as e:
+                logger.error("❌ No se pudo crear el índice %s.%s: %s", name, index.document["name"], e)
+    return created
+
+
+async def _main():
+    from app.db.mongodb import db
+    created = await ensure_indexes(db)
+    for name, indexes in created.items():
+        print(f"✅ {name}: {', '.join(indexes) or '—'}")
+
+
+__all__ = ["INDEXES", "ensure_indexes"]
+
+
+if __name__ == "__main__":
+    import asyncio
+    asyncio.run(_main())
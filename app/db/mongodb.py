@@ -1,4 +1,8 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from app.db.global_counters import GlobalCounters
+from app.db.progress_rollups import ProgressRollups
+from app.db.stats_cache import StatsCache
+from app.db.write_buffer import WriteBehindBuffer
 import os
 from dotenv import load_dotenv
 
@@ -16,9 +20,30 @@ if not MONGO_URI:
 MONGO_DB = "sign_language"
 MONGO_COLLECTION = "predictions"
 MONGO_STATS_COLLECTION = "prediction_stats"
+MONGO_PROGRESS_COLLECTION = "progress_rollups"
+MONGO_COUNTERS_COLLECTION = "global_counters"
 
 # Cliente y conexión
 client = AsyncIOMotorClient(MONGO_URI)
 db = client[MONGO_DB]
 collection = db[MONGO_COLLECTION]
 stats_collection = db[MONGO_STATS_COLLECTION]
+progress_collection = db[MONGO_PROGRESS_COLLECTION]
+counters_collection = db[MONGO_COUNTERS_COLLECTION]
+
+# Acumulados de /progress por (nickname, etiqueta): se actualizan con cada inserción del buffer
+progress_rollups = ProgressRollups(progress_collection)
+# Contadores por evaluación de /stats/global_distribution, repartidos en varios documentos
+global_counters = GlobalCounters(counters_collection)
+
+
+async def _after_insert(docs):
+    # Cada uno registra y reintenta sus propios fallos
+    await progress_rollups.apply(docs)
+    await global_counters.apply(docs)
+
+
+# Los registros de predicción se insertan en bloque desde el buffer write-behind
+record_buffer = WriteBehindBuffer(collection, on_insert=_after_insert)
+# Estadísticas por alumno y seña: caché LRU con TTL, incrementos escritos en diferido
+stats_cache = StatsCache(stats_collection)
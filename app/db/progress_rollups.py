@@ -0,0 +1,228 @@
+"""
+Acumulados de ``/progress`` por (nickname, etiqueta) en ``progress_rollups``.
+
+Cada documento guarda los contadores por evaluación, la suma, el mínimo y el
+máximo de la confianza y la fecha del último intento. El buffer write-behind
+llama a ``ProgressRollups.apply`` con los registros que acaba de insertar: se
+agregan por clave y se escriben con un ``bulk_write`` de upserts con ``$inc``,
+``$min`` y ``$max``, atómico por documento aunque escriban varios workers. Así
+``/progress`` con nickname lee como mucho un documento por etiqueta en vez de
+agrupar todo el historial.
+
+Los acumulados van por detrás de ``predictions`` lo que tarda un flush del
+buffer. Si el ``bulk_write`` falla, los incrementos se guardan en
+``_pending`` y viajan con el siguiente; al cerrar la aplicación ``flush``
+los intenta una última vez. Solo se pierden si el proceso muere (o MongoDB
+sigue sin responder al cerrar) con incrementos aún en ``_pending``; los registros de un ``insert_many`` que
+falló a medias se cuentan una vez al reinsertarlos desde el spool (ver
+``write_buffer``). ``check`` detecta esas diferencias y ``backfill`` las
+corrige:
+
+    python -m app.db.progress_rollups backfill [--nickname alumno]
+    python -m app.db.progress_rollups check [--nickname alumno]
+
+``backfill`` reconstruye los acumulados desde el historial. Los registros que
+se inserten mientras corre pueden quedar contados dos veces o ninguna; para
+un resultado exacto conviene ejecutarlo sin tráfico y comprobar después con
+``check``.
+"""
+import argparse
+import asyncio
+import math
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ReplaceOne, UpdateOne
+
+RollupKey = Tuple[Optional[str], str]
+
+# Evaluación -> contador del acumulado
+EVALUATION_COUNTERS = {
+    "CORRECTO": "correct_attempts",
+    "DUDOSO": "doubtful_attempts",
+    "INCORRECTO": "incorrect_attempts",
+}
+COUNTERS = ("total_attempts", "correct_attempts", "doubtful_attempts", "incorrect_attempts", "confidence_sum")
+
+
+def _delta(doc: dict) -> dict:
+    confidence = doc.get("confidence")
+    delta = {counter: 0 for counter in COUNTERS}
+    delta["total_attempts"] = 1
+    counter = EVALUATION_COUNTERS.get(doc.get("evaluation"))
+    if counter:
+        delta[counter] = 1
+    if isinstance(confidence, (int, float)):
+        delta["confidence_sum"] = float(confidence)
+        delta["min_confidence"] = delta["max_confidence"] = float(confidence)
+    if doc.get("timestamp") is not None:
+        delta["last_attempt"] = doc["timestamp"]
+    return delta
+
+
+def _merge(target: dict, delta: dict) -> dict:
+    for counter in COUNTERS:
+        target[counter] = target.get(counter, 0) + delta.get(counter, 0)
+    for field, pick in (("min_confidence", min), ("max_confidence", max), ("last_attempt", max)):
+        if delta.get(field) is not None:
+            target[field] = delta[field] if target.get(field) is None else pick(target[field], delta[field])
+    return target
+
+
+def _update(key: RollupKey, delta: dict) -> UpdateOne:
+    update = {"$inc": {counter: delta[counter] for counter in COUNTERS}}
+    if delta.get("min_confidence") is not None:
+        update["$min"] = {"min_confidence": delta["min_confidence"]}
+        update["$max"] = {"max_confidence": delta["max_confidence"]}
+    if delta.get("last_attempt") is not None:
+        update.setdefault("$max", {})["last_attempt"] = delta["last_attempt"]
+    return UpdateOne({"nickname": key[0], "label": key[1]}, update, upsert=True)
+
+
+class ProgressRollups:
+    """Mantiene ``progress_rollups`` a partir de los registros insertados."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        # Incrementos que no se pudieron escribir; viajan con el siguiente apply
+        self._pending: Dict[RollupKey, dict] = {}
+        self.applied = 0
+        self.writes = 0
+        self.failed_writes = 0
+
+    async def apply(self, docs: List[dict]) -> None:
+        """Suma ``docs`` (registros de ``predictions`` ya insertados) a sus acumulados."""
+        for doc in docs:
+            if doc.get("expected_label") is None:
+                continue
+            _merge(self._pending.setdefault((doc.get("nickname"), doc["expected_label"]), {}), _delta(doc))
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Escribe los incrementos pendientes; si falla, siguen en ``_pending``."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            await self.collection.bulk_write([_update(key, delta) for key, delta in pending.items()], ordered=False)
+        except Exception as e:
+            self.failed_writes += 1
+            for key, delta in pending.items():
+                _merge(self._pending.setdefault(key, {}), delta)
+            print(f"⚠️ No se pudieron actualizar {len(pending)} acumulados de progreso:", str(e))
+            return
+        self.writes += 1
+        self.applied += sum(delta["total_attempts"] for delta in pending.values())
+
+    def snapshot(self) -> dict:
+        return {
+            "applied": self.applied,
+            "writes": self.writes,
+            "failed_writes": self.failed_writes,
+            "pending_keys": len(self._pending),
+        }
+
+
+def build_history_pipeline(nickname: Optional[str] = None) -> list:
+    """Acumulados calculados desde ``predictions`` (backfill y comprobación)."""
+    return [
+        {"$match": {"nickname": nickname} if nickname else {}},
+        {"$group": {
+            "_id": {"nickname": "$nickname", "label": "$expected_label"},
+            "total_attempts": {"$sum": 1},
+            **{
+                counter: {"$sum": {"$cond": [{"$eq": ["$evaluation", evaluation]}, 1, 0]}}
+                for evaluation, counter in EVALUATION_COUNTERS.items()
+            },
+            "confidence_sum": {"$sum": "$confidence"},
+            "min_confidence": {"$min": "$confidence"},
+            "max_confidence": {"$max": "$confidence"},
+            "last_attempt": {"$max": "$timestamp"},
+        }},
+    ]
+
+
+async def _history(predictions, nickname: Optional[str]) -> Dict[RollupKey, dict]:
+    rollups = {}
+    async for doc in predictions.aggregate(build_history_pipeline(nickname), allowDiskUse=True):
+        key = (doc["_id"].get("nickname"), doc["_id"].get("label"))
+        if key[1] is None:
+            continue
+        rollups[key] = {field: value for field, value in doc.items() if field != "_id"}
+    return rollups
+
+
+async def backfill(predictions, rollups, nickname: Optional[str] = None, batch: int = 1000) -> int:
+    """Sustituye los acumulados por los calculados desde el historial; devuelve cuántos escribió."""
+    history = await _history(predictions, nickname)
+    ops = [
+        ReplaceOne({"nickname": key[0], "label": key[1]}, {"nickname": key[0], "label": key[1], **values}, upsert=True)
+        for key, values in history.items()
+    ]
+    for start in range(0, len(ops), batch):
+        await rollups.bulk_write(ops[start:start + batch], ordered=False)
+    # Acumulados sin registros detrás (p. ej. historial borrado)
+    stale = [
+        doc["_id"] async for doc in rollups.find({"nickname": nickname} if nickname else {})
+        if (doc.get("nickname"), doc.get("label")) not in history
+    ]
+    if stale:
+        await rollups.delete_many({"_id": {"$in": stale}})
+    return len(ops)
+
+
+def _differs(expected, actual) -> bool:
+    if isinstance(expected, float) or isinstance(actual, float):
+        if expected is None or actual is None:
+            return expected is not actual
+        # Sumas de float en distinto orden
+        return not math.isclose(expected, actual, rel_tol=1e-9, abs_tol=1e-6)
+    return expected != actual
+
+
+async def check(predictions, rollups, nickname: Optional[str] = None) -> List[dict]:
+    """Diferencias entre ``progress_rollups`` y la agregación del historial (vacía si coinciden)."""
+    history = await _history(predictions, nickname)
+    stored = {
+        (doc.get("nickname"), doc.get("label")): doc
+        async for doc in rollups.find({"nickname": nickname} if nickname else {})
+    }
+    fields = COUNTERS + ("min_confidence", "max_confidence", "last_attempt")
+    problems = []
+    for key in sorted(set(history) | set(stored), key=lambda k: (k[0] or "", k[1])):
+        expected, actual = history.get(key), stored.get(key)
+        if expected is None or actual is None:
+            problems.append({"nickname": key[0], "label": key[1],
+                             "problem": "sin historial" if expected is None else "sin acumulado"})
+            continue
+        diff = {field: {"history": expected.get(field), "rollup": actual.get(field)}
+                for field in fields if _differs(expected.get(field), actual.get(field))}
+        if diff:
+            problems.append({"nickname": key[0], "label": key[1], "problem": "distinto", "fields": diff})
+    return problems
+
+
+async def _main() -> bool:
+    parser = argparse.ArgumentParser(description="Reconstruir o comprobar los acumulados de /progress")
+    parser.add_argument("command", choices=["backfill", "check"])
+    parser.add_argument("--nickname", default=None, help="Solo los acumulados de este alumno")
+    args = parser.parse_args()
+
+    from app.db.mongodb import collection, progress_collection
+    if args.command == "backfill":
+        written = await backfill(collection, progress_collection, args.nickname)
+        print(f"✅ {written} acumulados reconstruidos desde el historial")
+        return True
+    problems = await check(collection, progress_collection, args.nickname)
+    for problem in problems:
+        print(f"❌ {problem['nickname']!r} / {problem['label']}: {problem['problem']} {problem.get('fields', '')}")
+    if not problems:
+        print("✅ Los acumulados coinciden con el historial")
+    return not problems
+
+
+__all__ = ["ProgressRollups", "backfill", "build_history_pipeline", "check"]
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(_main()) else 1)
@@ -0,0 +1,222 @@
+"""
+Caché en proceso de ``prediction_stats`` por (etiqueta esperada, nickname).
+
+``/predict`` devuelve la tasa de acierto y la confianza media del alumno para
+esa seña, y el mismo worker suele haber atendido su intento anterior. Con la
+entrada en caché y vigente, el worker aplica su propio incremento a la copia
+local y responde sin leer de MongoDB; los incrementos se acumulan por clave y
+se escriben con un ``bulk_write`` de ``$inc`` cada ``flush_interval``.
+
+La reconciliación es perezosa: al caducar la entrada (``ttl`` segundos desde
+la última lectura) o si no estaba en caché, el siguiente incremento se hace
+con ``find_one_and_update`` (junto con lo que quedara pendiente de esa clave)
+y el documento devuelto, que ya incluye los incrementos de los demás
+workers, sustituye a la copia local.
+
+Desfase con varios workers: las cifras que devuelve un worker pueden no
+incluir los intentos atendidos por otros durante como mucho ``ttl`` segundos,
+más el ``flush_interval`` que tardan esos otros en escribir sus incrementos.
+Los incrementos propios nunca se pierden de la respuesta ni de MongoDB
+(salvo caída del proceso antes del siguiente flush): si al reconciliar una
+clave hay un flush en vuelo con incrementos suyos, la lectura espera a que
+ese ``bulk_write`` termine.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+
+from app.config import STATS_CACHE_FLUSH_MS, STATS_CACHE_MAX_ENTRIES, STATS_CACHE_TTL_SECONDS
+
+StatsKey = Tuple[str, Optional[str]]
+COUNTERS = ("total", "correct", "confidence_sum")
+
+
+def _add(target: dict, inc: dict) -> dict:
+    for field in COUNTERS:
+        target[field] = target.get(field, 0) + inc.get(field, 0)
+    return target
+
+
+def _filter(key: StatsKey) -> dict:
+    return {"expected_label": key[0], "nickname": key[1]}
+
+
+class StatsCache:
+    """LRU con TTL delante de ``stats_collection``; los incrementos se escriben en diferido."""
+
+    def __init__(self, collection, max_entries: int = STATS_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = STATS_CACHE_TTL_SECONDS, flush_ms: float = STATS_CACHE_FLUSH_MS):
+        self.collection = collection
+        self.max_entries = max(int(max_entries), 0)
+        self.ttl = max(float(ttl_seconds), 0.0)
+        self.flush_interval = max(flush_ms, 1.0) / 1000.0
+        # clave -> (contadores, instante en que caduca)
+        self._entries: "OrderedDict[StatsKey, Tuple[dict, float]]" = OrderedDict()
+        # Incrementos aplicados en caché y aún no escritos en MongoDB
+        self._pending: Dict[StatsKey, dict] = {}
+        # Incrementos del flush en curso y el future que se resuelve al terminar
+        self._in_flight: Dict[StatsKey, dict] = {}
+        self._flushing: Optional[asyncio.Future] = None
+        self._lock = None
+        self._timer = None
+        self._loop = None
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def _ensure_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        # El temporizador y el lock pertenecen al event loop que los creó
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._timer = None
+
+    def _ensure_timer(self) -> None:
+        self._ensure_loop()
+        if self._timer is None or self._timer.done():
+            self._timer = self._loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _cached(self, key: StatsKey) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _store(self, key: StatsKey, doc: dict) -> dict:
+        stats = {field: doc.get(field, 0) for field in COUNTERS}
+        if self.enabled:
+            self._entries[key] = (stats, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                # Los incrementos pendientes de la clave expulsada siguen en _pending
+                self._entries.popitem(last=False)
+        return dict(stats)
+
+    async def increment(self, key: StatsKey, inc: dict) -> dict:
+        """Suma ``inc`` a los contadores de ``key`` y devuelve los contadores resultantes."""
+        return (await self.increment_many({key: inc}))[key]
+
+    async def increment_many(self, incs: Dict[StatsKey, dict]) -> Dict[StatsKey, dict]:
+        """
+        Como ``increment`` para varias claves (``/predict/batch``).
+
+        Las claves vigentes en caché no tocan MongoDB; las demás se
+        reconcilian con una ida y vuelta (``find_one_and_update``) o, si son
+        varias, con un ``bulk_write`` y un ``find``.
+        """
+        if self.enabled:
+            self._ensure_timer()
+        result, misses, previous = {}, {}, {}
+        for key, inc in incs.items():
+            stats = self._cached(key)
+            if stats is None:
+                misses[key] = inc
+                continue
+            self.hits += 1
+            _add(stats, inc)
+            _add(self._pending.setdefault(key, {}), inc)
+            result[key] = dict(stats)
+        if not misses:
+            return result
+
+        if self._flushing is not None and not self._flushing.done() and self._in_flight.keys() & misses.keys():
+            # Leer antes de que el flush escriba esos incrementos los dejaría fuera durante todo el ttl
+            await asyncio.shield(self._flushing)
+        for key in misses:
+            # Lo pendiente de la clave viaja con la reconciliación
+            previous[key] = self._pending.pop(key, None)
+            misses[key] = _add(dict(previous[key] or {}), misses[key])
+
+        self.misses += len(misses)
+        try:
+            if len(misses) == 1:
+                key, inc = next(iter(misses.items()))
+                doc = await self.collection.find_one_and_update(
+                    _filter(key), {"$inc": inc}, upsert=True, return_document=ReturnDocument.AFTER
+                )
+                docs = {key: doc}
+            else:
+                await self.collection.bulk_write([
+                    UpdateOne(_filter(key), {"$inc": inc}, upsert=True) for key, inc in misses.items()
+                ], ordered=False)
+                docs = {
+                    (doc.get("expected_label"), doc.get("nickname")): doc
+                    async for doc in self.collection.find({"$or": [_filter(key) for key in misses]})
+                }
+        except Exception:
+            # Lo que ya estaba pendiente vuelve a la cola; el incremento de esta petición falla con ella
+            for key, inc in previous.items():
+                if inc:
+                    _add(self._pending.setdefault(key, {}), inc)
+            raise
+        for key in misses:
+            result[key] = self._store(key, docs.get(key, {}))
+        return result
+
+    async def flush(self) -> None:
+        """Escribe los incrementos pendientes en un solo ``bulk_write``; si falla se reintentan después."""
+        self._ensure_loop()
+        async with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            self._in_flight, self._flushing = pending, self._loop.create_future()
+            try:
+                await self.collection.bulk_write([
+                    UpdateOne(_filter(key), {"$inc": inc}, upsert=True) for key, inc in pending.items()
+                ], ordered=False)
+            except Exception as e:
+                self.failed_flushes += 1
+                for key, inc in pending.items():
+                    _add(self._pending.setdefault(key, {}), inc)
+                print(f"⚠️ No se pudieron escribir las estadísticas de {len(pending)} alumnos:", str(e))
+                return
+            finally:
+                self._in_flight = {}
+                self._flushing.set_result(None)
+            self.flushes += 1
+
+    async def close(self) -> None:
+        """Detiene el temporizador y escribe lo pendiente."""
+        if self._timer is not None and not self._timer.done():
+            # Con el lock tomado el temporizador no está a mitad de un bulk_write
+            async with self._lock:
+                self._timer.cancel()
+        if self._pending:
+            await self.flush()
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "pending_keys": len(self._pending),
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+__all__ = ["StatsCache"]
@@ -0,0 +1,266 @@
+"""
+Buffer write-behind para los registros de predicción.
+
+``add``/``extend`` solo encolan en memoria; los registros se insertan con
+``insert_many(ordered=False)`` cuando el buffer llega a ``max_items`` o cada
+``flush_interval`` segundos, así la latencia de MongoDB no llega a la
+respuesta y cada ida y vuelta lleva cientos de documentos.
+
+Si MongoDB no responde, el lote se añade a un spool local (un JSON por línea,
+solo append) y se reinserta después de la siguiente inserción correcta. Cada
+registro recibe su ``_id`` al encolarse, de modo que reinsertar un lote que
+llegó a escribirse en parte solo produce errores de clave duplicada, que se
+ignoran.
+
+``on_insert`` recibe, tras cada ``insert_many``, los documentos que se
+insertaron de verdad (sin los rechazados); lo usan ``progress_rollups`` y
+``global_counters`` para mantener sus acumulados, así que cada documento
+debe llegarle una sola vez:
+
+- un ``insert_many`` que falla sin ``BulkWriteError`` (p. ej. un timeout)
+  puede haber escrito parte del lote. Sus documentos van al spool marcados
+  como intentados y, al reinsertarlos, los que ya existían (clave duplicada)
+  también se entregan a ``on_insert``: nadie los había contado;
+- los duplicados de documentos no marcados (ya contados) se descartan;
+- ``<spool>.replay.done`` guarda cuántos documentos del ``.replay`` ya se
+  insertaron y contaron, para no volver a contarlos si el proceso muere a
+  mitad de la reinserción.
+"""
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Iterable, List, Optional
+
+import numpy as np
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError
+
+from app.config import (
+    WRITE_BUFFER_FLUSH_MS,
+    WRITE_BUFFER_MAX_ITEMS,
+    WRITE_BUFFER_MAX_PENDING,
+    WRITE_BUFFER_SPOOL_PATH,
+)
+
+DUPLICATE_KEY = 11000
+# Campo del spool (no llega a MongoDB): el documento pudo escribirse en un insert_many fallido
+ATTEMPTED = "_spool_attempted"
+
+
+class WriteBehindBuffer:
+    """Acumula documentos y los inserta en bloque en ``collection``."""
+
+    def __init__(self, collection, max_items: int = WRITE_BUFFER_MAX_ITEMS,
+                 flush_ms: float = WRITE_BUFFER_FLUSH_MS, spool_path=WRITE_BUFFER_SPOOL_PATH,
+                 max_pending: int = WRITE_BUFFER_MAX_PENDING, stats_window: int = 1000,
+                 on_insert: Optional[Callable[[List[dict]], Awaitable[None]]] = None):
+        self.collection = collection
+        self.on_insert = on_insert
+        self.max_items = max(int(max_items), 1)
+        self.flush_interval = max(flush_ms, 1.0) / 1000.0
+        self.spool_path = str(spool_path)
+        # Por encima de este número en memoria (MongoDB lento o caído) se escribe directo al spool
+        self.max_pending = max(int(max_pending), self.max_items)
+        self._pending: List[dict] = []
+        self._lock = None
+        self._timer = None
+        self._loop = None
+        self._flush_tasks = set()
+        # Métricas
+        self.flushed = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.spooled = self._count_spool()
+        self.replayed = 0
+        self.last_error: Optional[str] = None
+        self.flush_ms = deque(maxlen=stats_window)
+
+    def _ensure_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        # El temporizador y el lock pertenecen al event loop que los creó
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._timer = None
+
+    def _ensure_timer(self) -> None:
+        self._ensure_loop()
+        if self._timer is None or self._timer.done():
+            self._timer = self._loop.create_task(self._run())
+
+    def add(self, doc: dict) -> None:
+        """Encola un documento sin esperar a MongoDB."""
+        self.extend([doc])
+
+    def extend(self, docs: Iterable[dict]) -> None:
+        self._ensure_timer()
+        for doc in docs:
+            doc.setdefault("_id", ObjectId())
+            self._pending.append(doc)
+        if len(self._pending) > self.max_pending:
+            # No crecer sin límite mientras MongoDB no responde
+            overflow, self._pending = self._pending[:-self.max_items], self._pending[-self.max_items:]
+            self._spool(overflow)
+        # Un solo flush por tamaño en vuelo; si al terminar vuelve a estar lleno se lanza otro
+        if len(self._pending) >= self.max_items and not self._flush_tasks:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        task = self._loop.create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task) -> None:
+        self._flush_tasks.discard(task)
+        if len(self._pending) >= self.max_items and not self._flush_tasks:
+            self._schedule_flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Inserta lo pendiente; si falla lo manda al spool. Tras un éxito reinserta el spool."""
+        self._ensure_loop()
+        async with self._lock:
+            # Solo lo encolado hasta ahora; lo que llegue durante el insert espera al siguiente flush
+            docs, self._pending = self._pending, []
+            for start in range(0, len(docs), self.max_items):
+                end = start + self.max_items
+                if not await self._insert(docs[start:end]):
+                    self._spool(docs[start:end], attempted=True)
+                    self._spool(docs[end:])
+                    return
+            if self.spooled:
+                await self._replay()
+
+    async def _insert(self, batch: List[dict], attempted=frozenset()) -> bool:
+        """``False`` si MongoDB no está disponible (el lote debe ir al spool).
+
+        ``attempted``: ``_id`` de documentos que pudo escribir un intento
+        anterior sin que ``on_insert`` los recibiera.
+        """
+        started = time.perf_counter()
+        inserted = batch
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Duplicados de un lote ya escrito en parte: el documento ya está en MongoDB;
+            # si lo escribió un intento fallido todavía no se ha contado
+            failed = {err.get("index") for err in e.details.get("writeErrors", [])
+                      if err.get("code") != DUPLICATE_KEY or batch[err.get("index")]["_id"] not in attempted}
+            inserted = [doc for i, doc in enumerate(batch) if i not in failed]
+            errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != DUPLICATE_KEY]
+            if errors:
+                self.last_error = errors[0].get("errmsg", str(e))
+                print(f"❌ {len(errors)} registros de predicción rechazados por MongoDB:", self.last_error)
+        except Exception as e:
+            self.failed_flushes += 1
+            self.last_error = str(e)
+            print(f"⚠️ MongoDB no disponible, {len(batch)} registros al spool:", str(e))
+            return False
+        self.flushes += 1
+        self.flushed += len(batch)
+        self.flush_ms.append((time.perf_counter() - started) * 1000.0)
+        if self.on_insert is not None and inserted:
+            try:
+                await self.on_insert(inserted)
+            except Exception as e:
+                # Los registros ya están en MongoDB: un fallo aquí no los manda al spool
+                print("⚠️ Error tras insertar registros de predicción:", str(e))
+        return True
+
+    def _spool(self, docs: List[dict], attempted: bool = False) -> None:
+        if not docs:
+            return
+        os.makedirs(os.path.dirname(self.spool_path) or ".", exist_ok=True)
+        with open(self.spool_path, "a", encoding="utf-8") as f:
+            f.writelines(json_util.dumps({**doc, ATTEMPTED: True} if attempted else doc) + "\n" for doc in docs)
+        self.spooled += len(docs)
+
+    def _count_spool(self) -> int:
+        count = 0
+        for path in (self.spool_path, self.spool_path + ".replay"):
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    count += sum(1 for line in f if line.strip())
+        return max(count - self._replay_done(), 0)
+
+    def _replay_done(self) -> int:
+        done_path = self.spool_path + ".replay.done"
+        if not os.path.exists(done_path):
+            return 0
+        with open(done_path, encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+
+    def _set_replay_done(self, count: int) -> None:
+        done_path = self.spool_path + ".replay.done"
+        with open(done_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(str(count))
+        os.replace(done_path + ".tmp", done_path)
+
+    async def _replay(self) -> None:
+        """Reinserta el spool por lotes; lo que no entra vuelve al spool."""
+        replaying = self.spool_path + ".replay"
+        # Un .replay de un intento anterior interrumpido se reinserta primero
+        if not os.path.exists(replaying):
+            if not os.path.exists(self.spool_path):
+                self.spooled = 0
+                return
+            os.replace(self.spool_path, replaying)
+        with open(replaying, encoding="utf-8") as f:
+            docs = [json_util.loads(line) for line in f if line.strip()]
+        # Lo ya insertado y contado por un intento anterior interrumpido
+        done = self._replay_done()
+        replayed = 0
+        for start in range(done, len(docs), self.max_items):
+            end = start + self.max_items
+            batch = docs[start:end]
+            attempted = {doc["_id"] for doc in batch if doc.pop(ATTEMPTED, False)}
+            if not await self._insert(batch, attempted):
+                self._spool(batch, attempted=True)
+                self._spool(docs[end:])
+                break
+            replayed += len(batch)
+            self._set_replay_done(min(end, len(docs)))
+        os.remove(replaying)
+        if os.path.exists(replaying + ".done"):
+            os.remove(replaying + ".done")
+        self.replayed += replayed
+        self.spooled = self._count_spool()
+        if replayed:
+            print(f"✅ Spool reinsertado: {replayed} registros de predicción")
+
+    async def close(self) -> None:
+        """Detiene el temporizador y vacía el buffer (al spool si MongoDB no responde)."""
+        if self._timer is not None and not self._timer.done():
+            # Con el lock tomado el temporizador no está a mitad de un insert_many
+            async with self._lock:
+                self._timer.cancel()
+        if self._flush_tasks:
+            await asyncio.gather(*list(self._flush_tasks), return_exceptions=True)
+        if self._pending or self.spooled:
+            await self.flush()
+
+    def snapshot(self) -> dict:
+        latencies = np.fromiter(self.flush_ms, dtype=np.float64)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (None, None, None)
+        return {
+            "depth": len(self._pending),
+            "spooled": self.spooled,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "replayed": self.replayed,
+            "flush_ms": {
+                "p50": round(float(p50), 3) if p50 is not None else None,
+                "p95": round(float(p95), 3) if p95 is not None else None,
+                "p99": round(float(p99), 3) if p99 is not None else None,
+            },
+            "last_error": self.last_error,
+        }
+
+
+__all__ = ["WriteBehindBuffer"]
@@ -0,0 +1,82 @@
+import json
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+from sklearn.metrics import accuracy_score, f1_score
+
+from .data_loader import load_dataset
+from .model_utils import load_keras_model, export_tflite, TFLITE_VARIANTS
+from .services.tflite_engine import TFLiteModel
+from .config import (
+    CNN_LSTM_MODEL_PATH,
+    TFLITE_DIR,
+    TFLITE_METRICS_JSON_PATH,
+    BATCH_MAX_SIZE,
+)
+
+
+def _latency_ms(predict_fn, X, batch_size, repeats=3):
+    """Milisegundos por llamada: una secuencia (single) y un lote completo (batch)."""
+    predict_fn(X[:batch_size])  # warm-up
+    single = []
+    for _ in range(repeats):
+        for i in range(min(len(X), 50)):
+            started = time.perf_counter()
+            predict_fn(X[i:i + 1])
+            single.append((time.perf_counter() - started) * 1000.0)
+    batch = X[:batch_size]
+    if len(batch) < batch_size:
+        batch = np.resize(X, (batch_size,) + X.shape[1:])
+    batched = []
+    for _ in range(repeats * 5):
+        started = time.perf_counter()
+        predict_fn(batch)
+        batched.append((time.perf_counter() - started) * 1000.0)
+    return float(np.median(single)), float(np.median(batched))
+
+
+def _evaluate(predict_fn, X_test, y_test, batch_size):
+    y_pred = np.argmax(predict_fn(X_test), axis=1)
+    single_ms, batch_ms = _latency_ms(predict_fn, X_test, batch_size)
+    return {
+        "accuracy": accuracy_score(y_test, y_pred),
+        "f1_macro": f1_score(y_test, y_pred, average='macro'),
+        "f1_weighted": f1_score(y_test, y_pred, average='weighted'),
+        "latency_single_ms": round(single_ms, 4),
+        "latency_batch_ms": round(batch_ms, 4),
+        "batch_size": batch_size,
+    }
+
+
+def main(variants=TFLITE_VARIANTS, batch_size=BATCH_MAX_SIZE):
+    X_train, X_test, y_train, y_test, encoder = load_dataset()
+    X_test = X_test.astype(np.float32)
+    model = load_keras_model(CNN_LSTM_MODEL_PATH)
+
+    paths = export_tflite(model, TFLITE_DIR, variants)
+
+    # Referencia: la misma ruta compilada que sirve la API con el backend TensorFlow
+    serve = tf.function(lambda x: model(x, training=False),
+                        input_signature=[tf.TensorSpec((None,) + X_test.shape[1:], tf.float32)])
+    report = {"keras": _evaluate(lambda x: serve(x).numpy(), X_test, y_test, batch_size)}
+    report["keras"]["size_kb"] = round(os.path.getsize(CNN_LSTM_MODEL_PATH) / 1024, 1)
+
+    for variant, path in paths.items():
+        engine = TFLiteModel(path)
+        report[variant] = _evaluate(engine.predict, X_test, y_test, batch_size)
+        report[variant]["size_kb"] = round(os.path.getsize(path) / 1024, 1)
+
+    for name, metrics in report.items():
+        print(f"{name:>8}: acc={metrics['accuracy']:.4f} f1_macro={metrics['f1_macro']:.4f} "
+              f"single={metrics['latency_single_ms']:.3f} ms batch={metrics['latency_batch_ms']:.3f} ms "
+              f"size={metrics['size_kb']} KB")
+
+    with open(TFLITE_METRICS_JSON_PATH, 'w') as f:
+        json.dump(report, f)
+    return report
+
+
+if __name__ == '__main__':
+    main()
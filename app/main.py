@@ -2,6 +2,7 @@ from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.api.router import router as api_router
+import asyncio
 import logging
 import traceback
 
@@ -52,6 +53,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cabeceras de paginación de /records y nombre de archivo de /records/export legibles desde el navegador
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "Content-Disposition"],
 )
 
 # Evento de inicio para logging
@@ -59,11 +62,61 @@ app.add_middleware(
 async def startup_event():
     logger.info("🚀 Medical Sign Recognition API iniciada exitosamente")
     logger.info("📚 Documentación disponible en /docs")
+    # Cargar modelo/encoder y trazar la inferencia en segundo plano: el servidor
+    # acepta conexiones de inmediato y /ready responde 503 hasta terminar
+    app.state.preload_task = asyncio.create_task(_preload_models())
+    from app.config import LABEL_CATALOG_CHECK_SECONDS, MODEL_REGISTRY_POLL_SECONDS, MONGO_ENSURE_INDEXES
+    if MONGO_ENSURE_INDEXES:
+        app.state.indexes_task = asyncio.create_task(_ensure_indexes())
+    if LABEL_CATALOG_CHECK_SECONDS > 0:
+        from app.services.label_catalog import label_catalog
+        app.state.labels_watch_task = asyncio.create_task(label_catalog.watch(LABEL_CATALOG_CHECK_SECONDS))
+    if MODEL_REGISTRY_POLL_SECONDS > 0:
+        from app.services.predictor import model_registry
+        app.state.registry_watch_task = asyncio.create_task(model_registry.watch(MODEL_REGISTRY_POLL_SECONDS))
+
+async def _ensure_indexes():
+    from app.db.indexes import ensure_indexes
+    from app.db.mongodb import db
+    try:
+        created = await ensure_indexes(db)
+        logger.info("🗂️ Índices de MongoDB listos: %s", created)
+    except Exception as e:
+        logger.error("❌ No se pudieron crear los índices de MongoDB: %s", e)
+
+async def _preload_models():
+    from app.services.label_catalog import label_catalog
+    from app.services.predictor import model_registry
+    try:
+        # Leer el dataset una sola vez; /predict y /labels consultan el catálogo en memoria
+        await asyncio.get_running_loop().run_in_executor(None, label_catalog.refresh)
+    except Exception as e:
+        logger.error("❌ No se pudo cargar el catálogo de etiquetas: %s", e)
+    try:
+        status = await model_registry.preload()
+        logger.info("🔥 Modelo %s cargado en %s ms, warm-up en %s ms",
+                    status["model_version"], status["load_ms"], status["warmup_ms"])
+    except Exception as e:
+        logger.error("❌ Precarga del modelo fallida: %s", e)
     
 # Evento de cierre para logging  
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("🛑 Medical Sign Recognition API cerrándose")
+    for name in ("registry_watch_task", "labels_watch_task"):
+        watch_task = getattr(app.state, name, None)
+        if watch_task is not None:
+            watch_task.cancel()
+    from app.services.predictor import inference_executor, record_buffer, stats_cache
+    # Insertar (o mandar al spool) los registros que siguen en el buffer write-behind
+    await record_buffer.close()
+    # Incrementos de /progress y de los contadores globales que no se pudieron escribir en el último apply
+    from app.db.mongodb import global_counters, progress_rollups
+    await progress_rollups.flush()
+    await global_counters.flush()
+    # Escribir los incrementos de estadísticas que solo están en la caché
+    await stats_cache.close()
+    inference_executor.shutdown(wait=False)
 
 # Montar las rutas del API
 app.include_router(api_router)
@@ -91,3 +144,14 @@ async def health_check():
     """
     logger.info("Health check realizado")
     return {"status": "ok"}
+
+@app.get("/ready", tags=["Health Check"])
+async def readiness_check():
+    """
+    Readiness probe for the load balancer.
+    Returns 503 until the model and encoder are loaded and warm-up has finished,
+    along with load and warm-up durations in milliseconds.
+    """
+    from app.services.predictor import model_registry
+    status = model_registry.readiness()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
@@ -1,12 +1,48 @@
+import os
 import matplotlib.pyplot as plt
 import joblib
+import tensorflow as tf
 from tensorflow.keras.models import load_model
 
+# Variantes TFLite: int8 es cuantización de rango dinámico (pesos int8, activaciones float)
+TFLITE_VARIANTS = ("float32", "float16", "int8")
+
 
 def save_model(model, path):
     model.save(path)
 
 
+def tflite_variant_path(out_dir, variant):
+    return os.path.join(str(out_dir), f"cnn_lstm_{variant}.tflite")
+
+
+def export_tflite(model, out_dir, variants=TFLITE_VARIANTS):
+    """Convierte el modelo Keras a TFLite en las variantes pedidas.
+
+    Los LSTM de Keras solo se convierten con batch estático, así que el
+    modelo se exporta con batch 1; el intérprete procesa los lotes fila a fila.
+    """
+    os.makedirs(str(out_dir), exist_ok=True)
+    inputs = tf.keras.Input(shape=model.input_shape[1:], batch_size=1)
+    fixed_batch = tf.keras.Model(inputs, model(inputs))
+
+    paths = {}
+    for variant in variants:
+        if variant not in TFLITE_VARIANTS:
+            raise ValueError(f"Variante TFLite desconocida: {variant}")
+        converter = tf.lite.TFLiteConverter.from_keras_model(fixed_batch)
+        if variant != "float32":
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if variant == "float16":
+            converter.target_spec.supported_types = [tf.float16]
+        path = tflite_variant_path(out_dir, variant)
+        with open(path, "wb") as f:
+            f.write(converter.convert())
+        paths[variant] = path
+        print(f"✅ Modelo TFLite ({variant}) guardado en: {path}")
+    return paths
+
+
 def load_keras_model(path):
     return load_model(path)
 
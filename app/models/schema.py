@@ -1,60 +1,182 @@
 # TODO: TESTS - Add unit tests for Pydantic model validators, especially for PredictRequest sequence and label validation.
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from pydantic import (BaseModel, ConfigDict, Field, PlainSerializer, PlainValidator, PrivateAttr, ValidationError,
+                      ValidationInfo, WithJsonSchema, model_validator, validator)
+from typing import Annotated, Any, List, Optional, Tuple
 from datetime import datetime
-import os
-import pandas as pd
-from app.config import DATASET_PATH
+import numpy as np
+from app.config import PREDICT_BATCH_MAX_ITEMS
+from app.services.label_catalog import label_catalog
+from app.utils.wire_format import decode_sequence_b64
+
+SEQUENCE_MIN_FRAMES = 30
+SEQUENCE_FEATURES = 42
+
+
+def _describe_invalid_sequence(value) -> str:
+    """Mensaje de error detallado; solo se recorre la secuencia si la conversión falló."""
+    if not isinstance(value, (list, tuple)):
+        return "La secuencia debe ser una lista de frames."
+    for frame in value:
+        if not isinstance(frame, (list, tuple)):
+            return f"Cada frame en la secuencia debe ser una lista de valores, pero se encontró {frame!r}."
+        if len(frame) != SEQUENCE_FEATURES:
+            return f"Cada frame en la secuencia debe tener exactamente 42 valores (keypoints), pero se encontró un frame con {len(frame)} valores."
+    for frame in value:
+        for val in frame:
+            try:
+                float(val)
+            except Exception:
+                return f"Valor no convertible a float: {val}"
+    return "La secuencia no se pudo convertir a un arreglo numérico."
+
+
+def check_sequence_array(array: np.ndarray) -> np.ndarray:
+    """Forma (frames >= 30, 42) y valores finitos; común a JSON y formato binario."""
+    if array.ndim != 2 or array.shape[1] != SEQUENCE_FEATURES:
+        if array.size == 0:
+            raise ValueError("La secuencia debe tener al menos 30 frames, pero se recibieron 0.")
+        raise ValueError(f"Cada frame en la secuencia debe tener exactamente 42 valores (keypoints), pero la secuencia tiene forma {array.shape}.")
+    if array.shape[0] < SEQUENCE_MIN_FRAMES:
+        raise ValueError(f"La secuencia debe tener al menos 30 frames, pero se recibieron {array.shape[0]}.")
+    if not np.isfinite(array).all():
+        raise ValueError("La secuencia contiene valores NaN o infinitos.")
+    return array
+
+
+def to_sequence_array(value) -> np.ndarray:
+    """Convierte la secuencia a float32 con una sola llamada a NumPy y la valida."""
+    try:
+        array = np.asarray(value, dtype=np.float32)
+    except (TypeError, ValueError):
+        raise ValueError(_describe_invalid_sequence(value))
+    return check_sequence_array(array)
+
+
+# En el modelo la secuencia queda como ndarray (35, 42) float32; en OpenAPI sigue siendo una lista de listas
+SequenceArray = Annotated[
+    np.ndarray,
+    PlainValidator(to_sequence_array),
+    PlainSerializer(lambda array: array.tolist(), return_type=List[List[float]], when_used="json"),
+    WithJsonSchema({"type": "array", "items": {"type": "array", "items": {"type": "number"}}}),
+]
 
-# Cargar etiquetas válidas desde el CSV
-def load_labels():
-    dataset_path = str(DATASET_PATH)
-    if not os.path.exists(dataset_path):
-        return []
-    df = pd.read_csv(dataset_path, header=None)
-    label_col = df.columns[-2]
-    return df[label_col].dropna().unique().tolist()
-
-VALID_LABELS = load_labels()
 
 class PredictRequest(BaseModel):
-    sequence: List[List[float]] = Field(..., example=[[0.1] * 42] * 35, description="Sequence of keypoints, typically 35 frames with 42 keypoints each.")
+    sequence: Optional[SequenceArray] = Field(None, example=[[0.1] * 42] * 35, description="Sequence of keypoints, typically 35 frames with 42 keypoints each.")
+    sequence_b64: Optional[str] = Field(None, description="Alternative to 'sequence': the binary wire format (see app/utils/wire_format.py) encoded as base64.")
     expected_label: str = Field(..., example="tengo_fiebre_y_tos", description="The expected medical sign label for this sequence.")
     nickname: Optional[str] = Field(None, example="usuario123", description="Optional user's nickname for tracking purposes.")
 
-    @validator("sequence")
-    def validate_sequence(cls, value):
-        if len(value) < 30:
-            raise ValueError(f"La secuencia debe tener al menos 30 frames, pero se recibieron {len(value)}.")
-        for frame in value:
-            if len(frame) != 42:
-                raise ValueError(f"Cada frame en la secuencia debe tener exactamente 42 valores (keypoints), pero se encontró un frame con {len(frame)} valores.")
-            for i, val in enumerate(frame):
-                try:
-                    frame[i] = float(val)
-                except Exception:
-                    raise ValueError(f"Valor no convertible a float: {val}")
-
-        return value
+    # Secuencia validada (JSON o formato binario) lista para el modelo
+    _array: Optional[np.ndarray] = PrivateAttr(default=None)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray, expected_label: str, nickname: Optional[str] = None) -> "PredictRequest":
+        """Petición a partir de un cuerpo ``application/octet-stream`` ya decodificado."""
+        data = {"expected_label": expected_label, "nickname": nickname}
+        return cls.model_validate(data, context={"array": array})
+
+    def sequence_array(self) -> np.ndarray:
+        return self._array
+
+    @model_validator(mode="after")
+    def attach_sequence_array(self, info: ValidationInfo):
+        array = (info.context or {}).get("array")
+        if array is None and self.sequence_b64 is not None:
+            array = decode_sequence_b64(self.sequence_b64)
+        if array is None:
+            if self.sequence is None:
+                raise ValueError("Se requiere 'sequence' o 'sequence_b64'.")
+            # Ya convertida y validada por to_sequence_array
+            self._array = self.sequence
+            return self
+        self._array = check_sequence_array(array)
+        return self
 
     @validator("expected_label")
     def validate_label(cls, value):
         print("🔄 Validando etiqueta:", value)
         value = value.strip().lower()
-        valid_labels = [label.strip().lower() for label in load_labels()]
-        print("📋 Etiquetas válidas cargadas:", valid_labels)
-        if value not in valid_labels:
+        if value not in label_catalog:
             raise ValueError(f"La etiqueta '{value}' no es válida. Por favor, use una etiqueta conocida.")
         return value
 
 
+def _error_message(error: ValidationError) -> str:
+    return "; ".join(err["msg"].removeprefix("Value error, ") for err in error.errors(include_url=False))
+
+
+def parse_batch_items(items: List[Any]) -> Tuple[List[Optional[PredictRequest]], List[Optional[str]]]:
+    """
+    Valida los elementos de ``/predict/batch``; devuelve ``(peticiones, errores)`` por posición.
+
+    Si todos traen ``sequence`` como listas de igual forma se convierten con
+    una única llamada a NumPy y cada elemento solo valida su vista del array
+    y su etiqueta. Si no (secuencias de distinta longitud, base64, datos
+    corruptos), cada elemento se valida por separado. Un elemento inválido
+    deja su error y ``None`` sin afectar a los demás.
+    """
+    requests: List[Optional[PredictRequest]] = [None] * len(items)
+    errors: List[Optional[str]] = [None] * len(items)
+
+    stacked = None
+    if items and all(isinstance(item, dict) and isinstance(item.get("sequence"), list) for item in items):
+        try:
+            stacked = np.asarray([item["sequence"] for item in items], dtype=np.float32)
+        except (TypeError, ValueError):
+            stacked = None
+        if stacked is not None and stacked.ndim != 3:
+            stacked = None
+
+    for i, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError("Cada elemento debe ser un objeto con 'sequence' y 'expected_label'.")
+            if stacked is not None:
+                extra = {key: value for key, value in item.items() if key != "sequence"}
+                requests[i] = PredictRequest.model_validate(extra, context={"array": stacked[i]})
+            else:
+                requests[i] = PredictRequest.model_validate(item)
+        except ValidationError as e:
+            errors[i] = _error_message(e)
+        except ValueError as e:
+            errors[i] = str(e)
+    return requests, errors
+
+
+class PredictBatchRequest(BaseModel):
+    # Sin validar aquí: cada elemento se valida aparte para que sus errores no tumben el lote
+    items: List[Any] = Field(..., min_length=1, max_length=PREDICT_BATCH_MAX_ITEMS,
+                             description="Sequences to score, each with the same fields as a /predict request (sequence or sequence_b64, expected_label, nickname).")
+
+
 class PredictResponse(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
     predicted_label: str = Field(..., description="La etiqueta predicha por el modelo.", example="dolor_de_cabeza")
     confidence: float = Field(..., description="La confianza de la predicción, en porcentaje (0-100).", example=95.5)
     evaluation: str = Field(..., description="Evaluación de la predicción (CORRECTO, DUDOSO, INCORRECTO).", example="CORRECTO") # "CORRECTO", "DUDOSO", "INCORRECTO"
     observation: Optional[str] = Field(None, description="Observación adicional, especialmente si la evaluación es INCORRECTO (puede incluir sugerencias).", example="Intenta separar más los movimientos.")
     success_rate: Optional[float] = Field(None, description="Tasa de éxito histórica para la etiqueta esperada (y usuario, si se proporcionó), en porcentaje.", example=75.0)
     average_confidence: Optional[float] = Field(None, description="Confianza promedio histórica para la etiqueta esperada (y usuario, si se proporcionó), en porcentaje.", example=82.3)
+    model_version: Optional[str] = Field(None, description="Versión del modelo que sirvió la predicción.", example="2025-06-01")
+
+
+class PredictBatchItemResult(BaseModel):
+    index: int = Field(..., description="Posición del elemento en la petición.", example=0)
+    nickname: Optional[str] = Field(None, description="Nickname enviado con el elemento.", example="usuario123")
+    result: Optional[PredictResponse] = Field(None, description="Predicción del elemento; nula si el elemento no es válido.")
+    error: Optional[str] = Field(None, description="Motivo por el que el elemento no se evaluó.", example="La secuencia contiene valores NaN o infinitos.")
+
+
+class PredictBatchResponse(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
+    model_version: Optional[str] = Field(None, description="Versión del modelo que sirvió el lote.", example="2025-06-01")
+    total: int = Field(..., description="Elementos recibidos.", example=100)
+    succeeded: int = Field(..., description="Elementos evaluados.", example=98)
+    failed: int = Field(..., description="Elementos con error de validación.", example=2)
+    results: List[PredictBatchItemResult] = Field(..., description="Un resultado por elemento, en el orden de la petición.")
 
 
 class ProgressItem(BaseModel):
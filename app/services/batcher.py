@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import BATCH_WINDOW_MS, BATCH_MAX_SIZE, BATCH_STATS_WINDOW
+from app.services.inference_executor import InferenceExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class BatchStats:
+    """Estadísticas acumuladas del batcher (tamaño de lote y espera en cola)."""
+
+    def __init__(self, window: int = BATCH_STATS_WINDOW):
+        self.total_batches = 0
+        self.total_requests = 0
+        self.batch_sizes: Deque[int] = deque(maxlen=window)
+        self.queue_waits_ms: Deque[float] = deque(maxlen=window)
+        self.forward_ms: Deque[float] = deque(maxlen=window)
+
+    def record(self, batch_size: int, waits_ms: List[float], forward_ms: float) -> None:
+        self.total_batches += 1
+        self.total_requests += batch_size
+        self.batch_sizes.append(batch_size)
+        self.queue_waits_ms.extend(waits_ms)
+        self.forward_ms.append(forward_ms)
+
+    @staticmethod
+    def _percentiles(values) -> dict:
+        if not values:
+            return {"p50": None, "p95": None, "p99": None, "max": None}
+        arr = np.fromiter(values, dtype=np.float64)
+        p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+        return {
+            "p50": round(float(p50), 3),
+            "p95": round(float(p95), 3),
+            "p99": round(float(p99), 3),
+            "max": round(float(arr.max()), 3),
+        }
+
+    def snapshot(self) -> dict:
+        sizes = list(self.batch_sizes)
+        histogram = {}
+        for size in sizes:
+            histogram[size] = histogram.get(size, 0) + 1
+        return {
+            "total_batches": self.total_batches,
+            "total_requests": self.total_requests,
+            "avg_batch_size": round(sum(sizes) / len(sizes), 3) if sizes else None,
+            "batch_size_histogram": dict(sorted(histogram.items())),
+            "queue_wait_ms": self._percentiles(self.queue_waits_ms),
+            "forward_ms": self._percentiles(self.forward_ms),
+        }
+
+
+class InferenceBatcher:
+    """
+    Agrupa peticiones concurrentes de inferencia en un único forward pass.
+
+    Cada llamada a ``submit`` encola una secuencia ``(35, 42)``; un worker
+    asíncrono espera como máximo ``window_ms`` (o hasta ``max_batch_size``
+    secuencias), apila el lote en un tensor ``(N, 35, 42)``, ejecuta
+    ``predict_fn`` una sola vez y devuelve a cada corrutina su fila de
+    probabilidades.
+
+    Con un ``executor`` el forward pass corre fuera del event loop y hasta
+    ``executor.max_concurrency`` lotes pueden estar en vuelo; mientras todos
+    los slots están ocupados las peticiones nuevas se acumulan en la cola y
+    forman el siguiente lote.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[np.ndarray], np.ndarray],
+        window_ms: float = BATCH_WINDOW_MS,
+        max_batch_size: int = BATCH_MAX_SIZE,
+        executor: Optional[InferenceExecutor] = None,
+        stats: Optional[BatchStats] = None,
+    ):
+        self._predict_fn = predict_fn
+        self.executor = executor
+        self.window = max(window_ms, 0.0) / 1000.0
+        self.max_batch_size = max(int(max_batch_size), 1)
+        # Se puede compartir entre batchers (p. ej. una instancia por versión del modelo)
+        self.stats = stats if stats is not None else BatchStats()
+        self._queue = None
+        self._worker = None
+        self._loop = None
+        self._slots = None
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        # El worker y la cola pertenecen al event loop que los creó
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            slots = self.executor.max_concurrency if self.executor is not None else 1
+            self._slots = asyncio.Semaphore(slots)
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, sequence: np.ndarray) -> np.ndarray:
+        """Encola una secuencia y espera su vector de probabilidades."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((sequence, future, time.perf_counter()))
+        return await future
+
+    async def run_batch(self, inputs: np.ndarray) -> np.ndarray:
+        """
+        Forward pass de un lote ya formado ``(N, 35, 42)`` sin pasar por la cola.
+
+        Lo usa ``/predict/batch``: el lote entero va en una sola llamada. No
+        toma un slot del worker (el worker ocioso retiene uno mientras espera
+        la cola); el semáforo del executor ya limita los forward passes
+        simultáneos.
+        """
+        started = time.perf_counter()
+        outputs = np.asarray(await self._forward(inputs.astype(np.float32, copy=False)))
+        self.stats.record(len(inputs), [0.0] * len(inputs), (time.perf_counter() - started) * 1000.0)
+        return outputs
+
+    async def close(self) -> None:
+        """Detiene el worker tras despachar lo que ya estaba en cola; los lotes en vuelo terminan igual."""
+        if self._worker is None or self._worker.done():
+            return
+        await self._queue.put(None)
+        await self._worker
+
+    async def _collect(self) -> Tuple[List[Tuple[np.ndarray, asyncio.Future, float]], bool]:
+        """Forma un lote; el segundo valor indica que llegó la señal de cierre."""
+        item = await self._queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = self._loop.time() + self.window
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                item = self._queue.get_nowait()
+            else:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self) -> None:
+        while True:
+            # Esperar un slot libre antes de formar el lote (backpressure)
+            await self._slots.acquire()
+            try:
+                batch, closing = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            if batch:
+                task = self._loop.create_task(self._dispatch(batch))
+                task.add_done_callback(lambda _: self._slots.release())
+            else:
+                self._slots.release()
+            # Lo encolado después de la señal de cierre se sigue atendiendo
+            if closing and self._queue.empty():
+                return
+
+    async def _forward(self, inputs: np.ndarray) -> np.ndarray:
+        if self.executor is None:
+            return self._predict_fn(inputs)
+        return await self.executor.run(self._predict_fn, inputs)
+
+    async def _dispatch(self, batch) -> None:
+        pending = [(seq, fut, t) for seq, fut, t in batch if not fut.cancelled()]
+        if not pending:
+            return
+
+        started = time.perf_counter()
+        waits_ms = [(started - enqueued) * 1000.0 for _, _, enqueued in pending]
+        try:
+            inputs = np.stack([seq for seq, _, _ in pending]).astype(np.float32, copy=False)
+            outputs = np.asarray(await self._forward(inputs))
+        except Exception as exc:
+            logger.error("Error en el forward pass del lote (%d secuencias): %s", len(pending), exc)
+            for _, fut, _ in pending:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+        forward_ms = (time.perf_counter() - started) * 1000.0
+
+        self.stats.record(len(pending), waits_ms, forward_ms)
+        for i, (_, fut, _) in enumerate(pending):
+            if not fut.done():
+                fut.set_result(outputs[i])
+
+
+__all__ = ["InferenceBatcher", "BatchStats"]
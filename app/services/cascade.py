@@ -0,0 +1,197 @@
+"""
+Cascada de modelos: el LSTM pequeño primero y el CNN-LSTM solo si duda.
+
+``app/train_lstm_model.py`` entrena un modelo mucho más barato (un LSTM(64) y
+dos Dense) con el mismo dataset y el mismo ``LabelEncoder``. Con
+``PREDICT_CASCADE=1`` cada versión que trae ese modelo y sus umbrales lo pasa
+primero: si la probabilidad de su clase más probable supera el umbral
+calibrado de esa clase se devuelve su resultado; si no, la secuencia escala
+al CNN-LSTM de la versión. Los umbrales los elige ``app/calibrate_cascade.py``
+sobre el split de validación para no perder más de la precisión indicada.
+
+El modelo pequeño corre siempre en el motor NumPy (sin TensorFlow ni
+trazado) y tiene su propio micro-batching.
+"""
+import os
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.services.batcher import BatchStats, InferenceBatcher
+from app.services.inference_executor import InferenceExecutor
+
+# Nombres de archivo del modelo pequeño en un directorio de versión
+CASCADE_MODEL_FILENAME = "lstm_model.h5"
+CASCADE_WEIGHTS_FILENAME = "lstm_model.npz"
+
+
+class CascadeStats:
+    """Secuencias resueltas por el modelo pequeño y escaladas al CNN-LSTM."""
+
+    def __init__(self):
+        self.total = 0
+        self.accepted = 0
+        self.escalated = 0
+
+    def record(self, accepted: int, escalated: int) -> None:
+        self.total += accepted + escalated
+        self.accepted += accepted
+        self.escalated += escalated
+
+    def snapshot(self) -> dict:
+        return {
+            "total": self.total,
+            "accepted": self.accepted,
+            "escalated": self.escalated,
+            "escalation_rate": round(self.escalated / self.total, 4) if self.total else None,
+        }
+
+
+class ModelCascade:
+    """
+    Primera etapa de la cascada: modelo pequeño, umbrales por clase y su batcher.
+
+    ``thresholds`` es ``{"per_class": {etiqueta: %}}`` (sección ``cascade`` de
+    ``thresholds.json`` o del bundle). Las clases sin umbral escalan siempre.
+    """
+
+    def __init__(self, inference_fn, labels: List[str], thresholds: dict,
+                 executor: Optional[InferenceExecutor] = None, predict_fn: Optional[Callable] = None):
+        self.inference_fn = inference_fn
+        self.labels = list(labels)
+        per_class = thresholds.get("per_class", {})
+        # Probabilidad mínima (0-1) por índice de clase; inf = nunca se acepta
+        self.thresholds = np.array(
+            [per_class[label] / 100.0 if per_class.get(label) is not None else np.inf for label in self.labels]
+        )
+        # ``predict_fn``: lo que ejecuta el batcher si no es ``inference_fn`` en este proceso
+        # (con un pool de procesos, ver ``model_registry.run_registry_model``)
+        self.batcher = InferenceBatcher(predict_fn or self._run_model, executor=executor, stats=BatchStats())
+        self.stats = CascadeStats()
+
+    def _run_model(self, batch: np.ndarray) -> np.ndarray:
+        return np.asarray(self.inference_fn(batch))
+
+    def accepts(self, probabilities: np.ndarray) -> np.ndarray:
+        """Máscara de las filas que el modelo pequeño resuelve sin escalar."""
+        probabilities = np.atleast_2d(probabilities)
+        class_index = np.argmax(probabilities, axis=1)
+        confidence = probabilities[np.arange(len(probabilities)), class_index]
+        return confidence >= self.thresholds[class_index]
+
+    def snapshot(self) -> dict:
+        return {**self.stats.snapshot(), "small_model": self.batcher.stats.snapshot()}
+
+
+def load_cascade_engine(model_path: str, weights_path: str, input_affine=None):
+    """
+    Motor NumPy del modelo pequeño (``.npz`` si existe, si no el ``.h5``).
+
+    ``input_affine`` es el preprocesado del bundle (``ModelBundle.input_affine``):
+    el CNN-LSTM del bundle lo lleva dentro y el modelo pequeño se entrenó con
+    los datos ya normalizados, así que se antepone como primera operación.
+    """
+    from app.services.numpy_engine import AFFINE, NumpyCNNLSTM
+
+    path = weights_path if weights_path and os.path.exists(weights_path) else model_path
+    if not path or not os.path.exists(path):
+        raise FileNotFoundError(f"No existe el modelo pequeño ({model_path})")
+    engine = NumpyCNNLSTM.load(path)
+    if input_affine is not None:
+        engine.ops.insert(0, (AFFINE,) + tuple(input_affine))
+    return engine
+
+
+def build_cascade(model_path: str, weights_path: str, labels: List[str], thresholds: dict,
+                  input_affine=None, executor: Optional[InferenceExecutor] = None,
+                  predict_fn: Optional[Callable] = None) -> ModelCascade:
+    """Carga el modelo pequeño (ver ``load_cascade_engine``) y comprueba umbrales y clases."""
+    if not thresholds or not thresholds.get("per_class"):
+        raise ValueError("No hay umbrales de cascada (ejecutar python -m app.calibrate_cascade)")
+    engine = load_cascade_engine(model_path, weights_path, input_affine)
+    classes = engine.predict(np.zeros((1, 35, 42), dtype=np.float32)).shape[-1]
+    if classes != len(labels):
+        raise ValueError(f"El modelo pequeño tiene {classes} clases y la versión {len(labels)}")
+    return ModelCascade(engine.predict, labels, thresholds, executor=executor, predict_fn=predict_fn)
+
+
+# ---- Calibración offline (app/calibrate_cascade.py) ----
+
+def calibrate_thresholds(small_probs: np.ndarray, big_probs: np.ndarray, y_true: np.ndarray,
+                         max_accuracy_loss: float = 0.01, min_confidence: float = 0.5) -> np.ndarray:
+    """
+    Umbral por clase (probabilidad 0-1, ``inf`` = escalar siempre) que minimiza el tráfico al CNN-LSTM.
+
+    Aceptar las secuencias de una clase por encima de un umbral cambia la
+    precisión en ``acierto_pequeño - acierto_grande`` por secuencia. Se parte
+    de escalar todo (precisión del CNN-LSTM) y, mientras quede presupuesto
+    (``max_accuracy_loss`` sobre el total de validación), se baja el umbral de
+    la clase que acepta más secuencias por cada acierto perdido. Nunca se baja
+    de ``min_confidence``.
+    """
+    small_pred = np.argmax(small_probs, axis=1)
+    small_conf = small_probs[np.arange(len(small_probs)), small_pred]
+    # Pérdida de aceptar cada secuencia: 1 si solo acertaba el grande, -1 si solo el pequeño
+    delta = (np.argmax(big_probs, axis=1) == y_true).astype(int) - (small_pred == y_true).astype(int)
+    budget = max_accuracy_loss * len(y_true)
+
+    candidates: Dict[int, tuple] = {}
+    for c in range(small_probs.shape[1]):
+        rows = np.flatnonzero((small_pred == c) & (small_conf >= min_confidence))
+        if not len(rows):
+            continue
+        order = rows[np.argsort(-small_conf[rows], kind="stable")]
+        conf = small_conf[order]
+        loss = np.concatenate([[0], np.cumsum(delta[order])])
+        # Solo se puede cortar entre confianzas distintas (los empates van juntos)
+        cuts = np.concatenate([np.flatnonzero(np.diff(conf) < 0) + 1, [len(conf)]])
+        candidates[c] = (conf, loss, cuts)
+
+    accepted = {c: 0 for c in candidates}
+    spent = 0.0
+    while True:
+        best = None
+        for c, (conf, loss, cuts) in candidates.items():
+            current = accepted[c]
+            for k in cuts[cuts > current]:
+                extra_loss = loss[k] - loss[current]
+                if spent + extra_loss > budget:
+                    continue
+                score = (extra_loss / (k - current), -(k - current))
+                if best is None or score < best[0]:
+                    best = (score, c, k, extra_loss)
+        if best is None:
+            break
+        _, c, k, extra_loss = best
+        accepted[c] = k
+        spent += extra_loss
+
+    thresholds = np.full(small_probs.shape[1], np.inf)
+    for c, k in accepted.items():
+        if k:
+            thresholds[c] = candidates[c][0][k - 1]
+    return thresholds
+
+
+def cascade_report(small_probs: np.ndarray, big_probs: np.ndarray, y_true: np.ndarray,
+                   thresholds: np.ndarray) -> dict:
+    """Precisión de cada modelo y de la cascada, y fracción de secuencias que escalan."""
+    small_pred = np.argmax(small_probs, axis=1)
+    big_pred = np.argmax(big_probs, axis=1)
+    small_conf = small_probs[np.arange(len(small_probs)), small_pred]
+    accept = small_conf >= thresholds[small_pred]
+    final = np.where(accept, small_pred, big_pred)
+    big_accuracy = float(np.mean(big_pred == y_true))
+    cascade_accuracy = float(np.mean(final == y_true))
+    return {
+        "samples": int(len(y_true)),
+        "small_accuracy": round(float(np.mean(small_pred == y_true)), 4),
+        "big_accuracy": round(big_accuracy, 4),
+        "cascade_accuracy": round(cascade_accuracy, 4),
+        "accuracy_loss": round(big_accuracy - cascade_accuracy, 4),
+        "escalation_rate": round(float(1.0 - accept.mean()), 4),
+    }
+
+
+__all__ = ["ModelCascade", "CascadeStats", "build_cascade", "load_cascade_engine", "calibrate_thresholds",
+           "cascade_report", "CASCADE_MODEL_FILENAME", "CASCADE_WEIGHTS_FILENAME"]
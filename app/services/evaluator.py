@@ -1,5 +1,7 @@
 from typing import Tuple
 
+import numpy as np
+
 
 def evaluate_prediction(predicted_label: str, expected_label: str, confidence: float, threshold: float = 75.0) -> Tuple[str, bool]:
     """Return evaluation label and correctness boolean."""
@@ -10,3 +12,13 @@ def evaluate_prediction(predicted_label: str, expected_label: str, confidence: f
         evaluation = "INCORRECTO"
         correct = False
     return evaluation, correct
+
+
+def evaluate_predictions(predicted_labels, expected_labels, confidences, threshold: float = 75.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized ``evaluate_prediction``: arrays of evaluation labels and correctness booleans."""
+    predicted = np.char.lower(np.asarray(predicted_labels, dtype=str))
+    expected = np.char.lower(np.asarray(expected_labels, dtype=str))
+    match = predicted == expected
+    confident = np.asarray(confidences, dtype=np.float64) >= threshold
+    evaluation = np.where(match, np.where(confident, "CORRECTO", "DUDOSO"), "INCORRECTO")
+    return evaluation, match & confident
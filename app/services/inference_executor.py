@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+
+from app.config import (
+    INFERENCE_EXECUTOR,
+    INFERENCE_MAX_CONCURRENCY,
+    TF_INTRA_OP_THREADS,
+    TF_INTER_OP_THREADS,
+    INFERENCE_BACKEND,
+)
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ("thread", "process", "inline")
+
+
+def configure_tf_threading(intra_op: int = TF_INTRA_OP_THREADS, inter_op: int = TF_INTER_OP_THREADS) -> None:
+    """Aplica los hilos intra/inter-op de TensorFlow (antes de la primera inferencia)."""
+    if (not intra_op and not inter_op) or INFERENCE_BACKEND in ("numpy", "tflite"):
+        return
+    try:
+        import tensorflow as tf
+    except ImportError:
+        return
+    try:
+        if intra_op:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+        if inter_op:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+    except RuntimeError as e:
+        # TensorFlow ya está inicializado en este proceso: los hilos no se pueden cambiar
+        logger.warning("No se pudieron ajustar los hilos de TensorFlow: %s", e)
+
+
+def _init_process_worker() -> None:
+    configure_tf_threading()
+
+
+class InferenceExecutor:
+    """
+    Ejecuta el forward pass fuera del event loop.
+
+    ``kind="thread"`` usa un pool de hilos dedicado (TensorFlow libera el GIL
+    durante la inferencia); ``kind="process"`` usa un pool de procesos, donde
+    cada proceso carga su propia copia del modelo y la función enviada debe
+    ser importable a nivel de módulo; ``kind="inline"`` ejecuta en el propio
+    event loop (comportamiento anterior, útil para depurar). El semáforo
+    limita los forward passes simultáneos a ``max_concurrency``.
+    """
+
+    def __init__(self, kind: str = INFERENCE_EXECUTOR, max_concurrency: int = INFERENCE_MAX_CONCURRENCY):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"INFERENCE_EXECUTOR debe ser uno de {EXECUTOR_KINDS}, no '{kind}'")
+        self.kind = kind
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self._executor: Optional[Executor] = None
+        self._semaphore = None
+        self._loop = None
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.kind == "inline":
+            return None
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_concurrency, initializer=_init_process_worker
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrency, thread_name_prefix="inference"
+                )
+            logger.info("Executor de inferencia '%s' con %d workers", self.kind, self.max_concurrency)
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(self, fn: Callable[[np.ndarray], np.ndarray], batch: np.ndarray) -> np.ndarray:
+        async with self._get_semaphore():
+            executor = self._get_executor()
+            if executor is None:
+                return fn(batch)
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, batch)
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+
+__all__ = ["InferenceExecutor", "configure_tf_threading", "EXECUTOR_KINDS"]
@@ -0,0 +1,201 @@
+"""
+Catálogo en memoria de las etiquetas de señas.
+
+Reúne en un único diccionario, indexado por la etiqueta normalizada
+(``strip().lower()``):
+
+- la etiqueta y su nivel, de las dos últimas columnas de ``dataset_medico.csv``;
+- el índice de clase del modelo activo (bundle o ``label_encoder.pkl``), que el
+  registro de modelos actualiza en cada hot swap.
+
+``/labels`` no sale de ese diccionario sino de ``levels``: los pares
+(etiqueta, nivel) distintos del dataset tal como están escritos, como los
+devolvía la lectura con pandas.
+
+El CSV se lee una vez al arrancar y solo se vuelve a leer si cambia: ``watch``
+compara cada ``LABEL_CATALOG_CHECK_SECONDS`` el ``mtime``/tamaño del archivo y,
+si cambiaron, su hash, en un hilo del executor por defecto (como el watcher
+del registro de modelos). Las consultas no tocan el archivo: la comprobación
+de pertenencia es una búsqueda en un dict. Lo comparten el validador de
+``PredictRequest``, ``/labels`` y el predictor.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from app.config import DATASET_PATH, LABEL_CATALOG_CHECK_SECONDS
+
+logger = logging.getLogger(__name__)
+
+VALID_LEVELS = ("principiante", "intermedio", "avanzado")
+
+
+def normalize_label(label) -> str:
+    return str(label).strip().lower()
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_dataset_labels(path: str) -> List[Tuple[str, str]]:
+    """
+    Pares (etiqueta, nivel) distintos de las dos últimas columnas, en orden de
+    aparición y tal como están en el archivo, sin parsear los 1470 valores de
+    cada fila. Se descartan las filas sin etiqueta; sin nivel, queda ``""``.
+    """
+    pairs: Dict[Tuple[str, str], None] = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            fields = line.rstrip("\r\n").rsplit(",", 2)
+            if len(fields) < 3:
+                continue
+            label, level = fields[-2].strip('"'), fields[-1].strip('"')
+            if label:
+                pairs.setdefault((label, level), None)
+    return list(pairs)
+
+
+def _labels_with_level(pairs) -> Dict[str, Optional[str]]:
+    """Etiqueta -> nivel normalizado para validar; una etiqueta sin nivel válido queda con ``None``."""
+    labels: Dict[str, Optional[str]] = {}
+    for label, level in pairs:
+        label, level = label.strip(), level.strip().lower()
+        if not label:
+            continue
+        if level in VALID_LEVELS:
+            labels[label] = level
+        else:
+            labels.setdefault(label, None)
+    return labels
+
+
+class LabelCatalog:
+    """Etiquetas válidas con su nivel e índice de clase; se refresca solo si cambia el dataset."""
+
+    def __init__(self, dataset_path=DATASET_PATH, check_seconds: float = LABEL_CATALOG_CHECK_SECONDS):
+        self.dataset_path = str(dataset_path)
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._dataset_pairs: List[Tuple[str, str]] = []
+        self._dataset_labels: Dict[str, Optional[str]] = {}
+        self._class_labels: List[str] = []
+        # Se reemplaza entero en cada cambio: las lecturas no necesitan el lock
+        self._entries: Dict[str, dict] = {}
+        self._signature = None
+        self._hash = None
+        self._loaded = False
+        self.reloads = 0
+
+    @classmethod
+    def from_labels(cls, labels, levels: Optional[dict] = None) -> "LabelCatalog":
+        """Catálogo fijo, sin dataset (tests y benchmarks)."""
+        catalog = cls(dataset_path="", check_seconds=float("inf"))
+        catalog._dataset_pairs = [(label, (levels or {})[label]) for label in labels if (levels or {}).get(label)]
+        catalog._dataset_labels = {label: (levels or {}).get(label) for label in labels}
+        catalog._loaded = True
+        catalog._rebuild()
+        return catalog
+
+    # ---- Carga ----
+
+    def refresh(self, force: bool = False) -> bool:
+        """Relee el dataset si cambió su ``mtime``/tamaño y su hash; devuelve si hubo recarga."""
+        with self._lock:
+            if not self.dataset_path:
+                return False
+            try:
+                stat = os.stat(self.dataset_path)
+            except FileNotFoundError:
+                changed = self._signature is not None or not self._loaded
+                self._signature = self._hash = None
+                self._dataset_pairs = []
+                self._dataset_labels = {}
+                self._loaded = True
+                if changed:
+                    self._rebuild()
+                return changed
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature and not force:
+                return False
+            # mtime distinto no implica contenido distinto (touch, copia, despliegue)
+            digest = _file_hash(self.dataset_path)
+            self._signature = signature
+            if digest == self._hash and not force:
+                return False
+            self._hash = digest
+            self._dataset_pairs = read_dataset_labels(self.dataset_path)
+            self._dataset_labels = _labels_with_level(self._dataset_pairs)
+            self._loaded = True
+            self._rebuild()
+            self.reloads += 1
+            logger.info("🏷️ Catálogo de etiquetas cargado: %d etiquetas (%s)", len(self._entries), self.dataset_path)
+            return True
+
+    def set_class_labels(self, labels) -> None:
+        """Índices de clase del modelo activo (lo llama el registro al activar una versión)."""
+        with self._lock:
+            self._class_labels = [str(label) for label in labels] if labels is not None else []
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        entries = {}
+        for label, level in self._dataset_labels.items():
+            entries[normalize_label(label)] = {"label": label, "level": level, "class_index": None}
+        for index, label in enumerate(self._class_labels):
+            entry = entries.setdefault(normalize_label(label), {"label": label, "level": None, "class_index": None})
+            entry["class_index"] = index
+        self._entries = entries
+
+    async def watch(self, poll_seconds: Optional[float] = None) -> None:
+        """Relee el dataset en segundo plano cuando cambia, fuera del event loop."""
+        poll_seconds = self.check_seconds if poll_seconds is None else poll_seconds
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(poll_seconds)
+            try:
+                await loop.run_in_executor(None, self.refresh)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("❌ No se pudo releer el catálogo de etiquetas: %s", e)
+
+    # ---- Consultas ----
+
+    def __contains__(self, label) -> bool:
+        return normalize_label(label) in self._entries
+
+    def get(self, label) -> Optional[dict]:
+        return self._entries.get(normalize_label(label))
+
+    def labels(self) -> List[str]:
+        return [entry["label"] for entry in self._entries.values()]
+
+    def entries(self, with_level: bool = False) -> List[dict]:
+        """Copias de las entradas ordenadas por nivel y etiqueta."""
+        entries = [dict(entry) for entry in self._entries.values() if entry["level"] or not with_level]
+        return sorted(entries, key=lambda e: (e["level"] is None, e["level"] or "", e["label"]))
+
+    def levels(self) -> List[dict]:
+        """
+        Pares ``{"label", "level"}`` distintos del dataset con nivel válido, tal
+        como están escritos (``/labels``), ordenados por nivel y etiqueta. Una
+        etiqueta con varios niveles aparece una vez por nivel.
+        """
+        pairs = [(level, label) for label, level in self._dataset_pairs if level.lower() in VALID_LEVELS]
+        return [{"label": label, "level": level} for level, label in sorted(pairs)]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+label_catalog = LabelCatalog()
+
+__all__ = ["LabelCatalog", "label_catalog", "normalize_label", "read_dataset_labels", "VALID_LEVELS"]
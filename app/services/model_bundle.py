@@ -0,0 +1,322 @@
+"""
+Bundle autodescriptivo del modelo: un solo archivo con todo lo necesario para servir.
+
+Contenido:
+    - pesos de cada capa (con la configuración de Keras para reconstruir el grafo)
+    - tabla índice -> etiqueta (sustituye a ``label_encoder.pkl``; no importa sklearn)
+    - estadísticas de normalización (mean / std) y la etapa de preprocesado que las usa
+    - umbrales de confianza
+    - especificación de entrada (frames, features, dtype)
+
+La etapa ``preprocessing`` (hoy solo ``zscore``, el mismo de
+``data_loader.load_dataset``) forma parte del modelo servido: el motor NumPy
+la ejecuta como una operación afín sobre el lote completo y el modelo Keras
+la lleva como capa ``Normalization`` dentro del grafo. Así el cliente envía
+los landmarks sin normalizar y servir usa exactamente el preprocesado del
+entrenamiento.
+
+Formato: ``MAGIC`` + cabecera JSON + arrays crudos alineados a 64 bytes. Los
+arrays se leen con ``np.memmap`` sin copiarlos: cargar un bundle es leer la
+cabecera y mapear el archivo.
+
+Uso:
+    python -m app.services.model_bundle build [--model ruta.h5] [--encoder ruta.pkl] [--out ruta.bundle]
+    python -m app.services.model_bundle info ruta.bundle
+"""
+import argparse
+import json
+import os
+import struct
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+MAGIC = b"SIGNBNDL"
+BUNDLE_FORMAT = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<8sIQ")  # magic, formato, longitud de la cabecera
+PREPROCESSING_STAGES = ("zscore",)
+
+
+class LabelTable:
+    """Tabla índice -> etiqueta con la interfaz de ``LabelEncoder`` que usa el predictor."""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(list(classes), dtype=object)
+        self._index = {label: i for i, label in enumerate(self.classes_)}
+
+    def inverse_transform(self, encoded_labels):
+        return [self.classes_[int(i)] for i in encoded_labels]
+
+    def transform(self, labels):
+        return np.array([self._index[label] for label in labels], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.classes_)
+
+
+class ModelBundle:
+    """Modelo, etiquetas, normalización, umbrales y especificación de entrada de una versión."""
+
+    def __init__(self, model_config: dict, layers: List[dict], labels, mean=None, std=None,
+                 thresholds: Optional[dict] = None, input_spec: Optional[dict] = None,
+                 version: Optional[str] = None, created_at: Optional[str] = None,
+                 preprocessing: Optional[List[dict]] = None):
+        self.model_config = model_config
+        # [{"class_name", "config", "weights": {nombre: array}}], el formato de numpy_engine._read_keras_h5
+        self.layers = layers
+        self.labels = labels if isinstance(labels, LabelTable) else LabelTable(labels)
+        self.mean = mean
+        self.std = std
+        self.thresholds = thresholds or {}
+        self.input_spec = input_spec or {"frames": 35, "features": 42, "dtype": "float32"}
+        self.version = version
+        self.created_at = created_at or datetime.utcnow().isoformat()
+        self.preprocessing = preprocessing or []
+        for stage in self.preprocessing:
+            if stage.get("type") not in PREPROCESSING_STAGES:
+                raise ValueError(f"Etapa de preprocesado no soportada: {stage.get('type')}")
+            if stage["type"] == "zscore" and (mean is None or std is None):
+                raise ValueError("La etapa zscore requiere mean y std")
+
+    # ------------------------------------------------------------ construcción
+    @classmethod
+    def from_keras(cls, model, labels, mean=None, std=None, thresholds=None, version=None,
+                   zscore=False) -> "ModelBundle":
+        """Bundle a partir de un modelo Keras en memoria (lo usa el entrenamiento).
+
+        Con ``zscore=True`` el modelo servido normaliza la entrada con ``mean``/``std``.
+        """
+        model_config = json.loads(model.to_json())
+        by_name = {layer.name: layer for layer in model.layers}
+        layers = []
+        for layer_config in model_config["config"]["layers"]:
+            layer = by_name.get(layer_config["config"]["name"])
+            weights = {}
+            if layer is not None:
+                for w in layer.weights:
+                    name = getattr(w, "path", w.name).rsplit("/", 1)[-1].split(":")[0]
+                    weights[name] = np.asarray(w.numpy(), dtype=np.float32)
+            layers.append({"class_name": layer_config["class_name"], "config": layer_config["config"], "weights": weights})
+        return cls(model_config, layers, labels, mean, std, thresholds, _input_spec(model_config), version,
+                   preprocessing=[{"type": "zscore"}] if zscore else None)
+
+    @classmethod
+    def from_files(cls, model_path: str, encoder_path: str, mean=None, std=None,
+                   thresholds=None, version=None) -> "ModelBundle":
+        """Bundle a partir de los archivos sueltos actuales (.h5, .pkl); requiere h5py y joblib.
+
+        ``mean``/``std`` (forma (35, 42)) activan la etapa zscore; salen de
+        ``data_loader.load_dataset(return_stats=True)``.
+        """
+        import h5py
+        import joblib
+        from app.services.numpy_engine import _read_keras_h5
+
+        with h5py.File(model_path, "r") as f:
+            model_config = json.loads(f.attrs["model_config"])
+        layers = _read_keras_h5(model_path)
+        encoder = joblib.load(encoder_path)
+        zscore = mean is not None and std is not None
+        return cls(model_config, layers, list(encoder.classes_), mean, std, thresholds,
+                   _input_spec(model_config), version, preprocessing=[{"type": "zscore"}] if zscore else None)
+
+    # ---------------------------------------------------------- serialización
+    def save(self, path: str) -> str:
+        arrays: Dict[str, np.ndarray] = {}
+        layers = []
+        for i, layer in enumerate(self.layers):
+            refs = {}
+            for name, value in layer["weights"].items():
+                key = f"layers/{i}/{name}"
+                arrays[key] = value
+                refs[name] = key
+            layers.append({"class_name": layer["class_name"], "config": layer["config"], "weights": refs})
+        for name in ("mean", "std"):
+            if getattr(self, name) is not None:
+                arrays[name] = getattr(self, name)
+
+        index, offset = {}, 0
+        for key, value in arrays.items():
+            value = np.ascontiguousarray(value)
+            arrays[key] = value
+            index[key] = {"dtype": value.dtype.str, "shape": list(value.shape), "offset": offset}
+            offset = _align(offset + value.nbytes)
+
+        header = json.dumps({
+            "format": BUNDLE_FORMAT,
+            "version": self.version,
+            "created_at": self.created_at,
+            "input_spec": self.input_spec,
+            "labels": [str(label) for label in self.labels.classes_],
+            "thresholds": self.thresholds,
+            "preprocessing": self.preprocessing,
+            "model_config": self.model_config,
+            "layers": layers,
+            "arrays": index,
+        }).encode("utf-8")
+        data_start = _align(_PREFIX.size + len(header))
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_PREFIX.pack(MAGIC, BUNDLE_FORMAT, len(header)))
+            f.write(header)
+            for key, value in arrays.items():
+                f.seek(data_start + index[key]["offset"])
+                f.write(value.tobytes())
+        os.replace(tmp_path, path)
+        return str(path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "ModelBundle":
+        """Lee la cabecera y mapea los arrays (de solo lectura) sin copiarlos."""
+        with open(path, "rb") as f:
+            magic, fmt, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} no es un bundle de modelo")
+            if fmt > BUNDLE_FORMAT:
+                raise ValueError(f"Formato de bundle {fmt} no soportado (máximo {BUNDLE_FORMAT})")
+            header = json.loads(f.read(header_len).decode("utf-8"))
+            data_start = _align(_PREFIX.size + header_len)
+            if mmap:
+                buffer = np.memmap(path, dtype=np.uint8, mode="r")
+            else:
+                f.seek(0)
+                buffer = np.frombuffer(f.read(), dtype=np.uint8)
+
+        def array(key):
+            spec = header["arrays"][key]
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"], dtype=np.int64))
+            return np.frombuffer(buffer, dtype=dtype, count=count,
+                                 offset=data_start + spec["offset"]).reshape(spec["shape"])
+
+        layers = [
+            {"class_name": layer["class_name"], "config": layer["config"],
+             "weights": {name: array(key) for name, key in layer["weights"].items()}}
+            for layer in header["layers"]
+        ]
+        return cls(
+            header["model_config"], layers, header["labels"],
+            mean=array("mean") if "mean" in header["arrays"] else None,
+            std=array("std") if "std" in header["arrays"] else None,
+            thresholds=header.get("thresholds"), input_spec=header.get("input_spec"),
+            version=header.get("version"), created_at=header.get("created_at"),
+            preprocessing=header.get("preprocessing"),
+        )
+
+    # ----------------------------------------------------------- preprocesado
+    def input_affine(self):
+        """Preprocesado como ``x * scale + shift`` (forma (35, 42)), o ``None`` si no hay etapas."""
+        if not self.preprocessing:
+            return None
+        # zscore es la única etapa soportada: (x - mean) / std == x * (1 / std) - mean / std
+        shape = (self.input_spec["frames"], self.input_spec["features"])
+        mean = np.asarray(self.mean, dtype=np.float64).reshape(shape)
+        inv_std = 1.0 / np.asarray(self.std, dtype=np.float64).reshape(shape)
+        return inv_std.astype(np.float32), (-mean * inv_std).astype(np.float32)
+
+    # ------------------------------------------------------------------ modelos
+    def build_numpy_engine(self):
+        """Motor NumPy con el preprocesado como primera operación (un multiply-add sobre el lote)."""
+        from app.services.numpy_engine import AFFINE, NumpyCNNLSTM, _fold_layers
+
+        ops = _fold_layers(self.layers)
+        affine = self.input_affine()
+        if affine is not None:
+            ops.insert(0, (AFFINE,) + affine)
+        return NumpyCNNLSTM(ops)
+
+    def build_keras_model(self):
+        import tensorflow as tf
+
+        if self.model_config.get("class_name") == "Sequential":
+            # La configuración guardada en .h5 no incluye "module"; Sequential se reconstruye directamente
+            model = tf.keras.Sequential.from_config(self.model_config["config"])
+        else:
+            model = tf.keras.models.model_from_json(json.dumps(self.model_config))
+        by_name = {layer.name: layer for layer in model.layers}
+        for layer in self.layers:
+            target = by_name.get(layer["config"]["name"])
+            if target is not None and layer["weights"]:
+                target.set_weights(list(layer["weights"].values()))
+        if not self.preprocessing:
+            return model
+
+        # Normalización dentro del grafo: el tf.function / XLA la fusiona con la primera convolución
+        shape = (self.input_spec["frames"], self.input_spec["features"])
+        inputs = tf.keras.Input(shape=shape, dtype="float32")
+        x = tf.keras.layers.Normalization(
+            axis=(1, 2), mean=np.asarray(self.mean).reshape(shape),
+            variance=np.square(np.asarray(self.std, dtype=np.float64)).reshape(shape), name="zscore",
+        )(inputs)
+        return tf.keras.Model(inputs, model(x), name=f"{model.name}_serving")
+
+    def info(self) -> dict:
+        return {
+            "version": self.version,
+            "created_at": self.created_at,
+            "input_spec": self.input_spec,
+            "labels": len(self.labels),
+            "thresholds": self.thresholds,
+            "preprocessing": [stage["type"] for stage in self.preprocessing],
+            "parameters": int(sum(w.size for layer in self.layers for w in layer["weights"].values())),
+        }
+
+
+def _align(n: int) -> int:
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _input_spec(model_config: dict) -> dict:
+    spec = {"frames": 35, "features": 42, "dtype": "float32"}
+    for layer in model_config.get("config", {}).get("layers", []):
+        shape = layer["config"].get("batch_shape") or layer["config"].get("batch_input_shape")
+        if shape and len(shape) == 3:
+            spec.update(frames=shape[1], features=shape[2], dtype=layer["config"].get("dtype") or "float32")
+            if isinstance(spec["dtype"], dict):
+                spec["dtype"] = "float32"
+            break
+    return spec
+
+
+def main():
+    from app.config import (
+        CNN_LSTM_MODEL_PATH, ENCODER_PATH, MODEL_BUNDLE_PATH,
+        UMBRAL_CONFIANZA, UMBRAL_RECHAZO, UMBRAL_POR_CLASE,
+    )
+
+    parser = argparse.ArgumentParser(description="Bundle de modelo autodescriptivo")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Crear un bundle desde los archivos .h5/.pkl/.npy actuales")
+    build.add_argument("--model", default=str(CNN_LSTM_MODEL_PATH))
+    build.add_argument("--encoder", default=str(ENCODER_PATH))
+    build.add_argument("--no-zscore", action="store_true",
+                       help="No incluir la etapa zscore (por defecto se calcula del dataset de entrenamiento)")
+    build.add_argument("--version", default=None)
+    build.add_argument("--out", default=str(MODEL_BUNDLE_PATH))
+    info = sub.add_parser("info", help="Mostrar la cabecera de un bundle")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        thresholds = {"default": UMBRAL_CONFIANZA, "reject": UMBRAL_RECHAZO, "per_class": UMBRAL_POR_CLASE}
+        mean = std = None
+        if not args.no_zscore:
+            from app.data_loader import load_dataset
+            *_, (mean, std) = load_dataset(return_stats=True)
+        bundle = ModelBundle.from_files(args.model, args.encoder, mean, std, thresholds,
+                                        args.version or datetime.utcnow().strftime("%Y%m%d-%H%M%S"))
+        bundle.save(args.out)
+        print(f"✅ Bundle guardado en: {args.out}")
+    elif args.command == "info":
+        print(json.dumps(ModelBundle.load(args.path).info(), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
+
+
+__all__ = ["ModelBundle", "LabelTable", "BUNDLE_FORMAT"]
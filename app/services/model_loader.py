@@ -1,20 +1,42 @@
 import os
+import time
+import threading
 import joblib  # Usamos joblib para evitar errores de pickle
-from app.config import CNN_LSTM_MODEL_PATH, ENCODER_PATH
+import numpy as np
+from app.config import (
+    CNN_LSTM_MODEL_PATH,
+    ENCODER_PATH,
+    SEQUENCE_FRAMES,
+    SEQUENCE_FEATURES,
+    INFERENCE_XLA,
+    WARMUP_BATCH_SIZES,
+    INFERENCE_BACKEND,
+    NUMPY_WEIGHTS_PATH,
+    TFLITE_MODEL_PATH,
+)
+from app.services.inference_executor import configure_tf_threading
+
+# Con los backends NumPy y TFLite no se importa TensorFlow (arranque rápido y menos RSS por worker)
+NUMPY_BACKEND = INFERENCE_BACKEND == "numpy"
+TFLITE_BACKEND = INFERENCE_BACKEND == "tflite"
+LIGHT_BACKEND = NUMPY_BACKEND or TFLITE_BACKEND
 
 try:
+    if LIGHT_BACKEND:
+        raise ImportError(f"INFERENCE_BACKEND={INFERENCE_BACKEND}")
     import tensorflow as tf
     TENSORFLOW_AVAILABLE = True
 except ImportError:
     # Mock TensorFlow for development/testing when TensorFlow is not available
-    print("⚠️ TensorFlow no disponible. Modo de desarrollo activo.")
+    if not LIGHT_BACKEND:
+        print("⚠️ TensorFlow no disponible. Modo de desarrollo activo.")
     TENSORFLOW_AVAILABLE = False
     
     class MockModel:
-        def predict(self, data):
-            # Return mock prediction for development
+        def predict(self, data, verbose=0):
+            # Return mock prediction for development (one row per sequence in the batch)
             import numpy as np
-            return np.array([[0.8, 0.1, 0.1]])  # Mock confidence scores
+            return np.tile([0.8, 0.1, 0.1], (len(data), 1))  # Mock confidence scores
     
     class MockEncoder:
         def __init__(self):
@@ -40,14 +62,27 @@ except ImportError:
 # Rutas desde configuración centralizada
 MODEL_PATH = os.getenv("MODEL_PATH", str(CNN_LSTM_MODEL_PATH))
 ENCODER_PATH_STR = os.getenv("ENCODER_PATH", str(ENCODER_PATH))
+NUMPY_WEIGHTS_PATH_STR = os.getenv("NUMPY_WEIGHTS_PATH", str(NUMPY_WEIGHTS_PATH))
+TFLITE_MODEL_PATH_STR = str(TFLITE_MODEL_PATH)
 
 # Variables globales para lazy loading
 _model = None
 _encoder = None
+_inference_fn = None
+# Single-flight: peticiones concurrentes esperan a la primera carga en vez de repetirla
+_load_lock = threading.RLock()
 
 def _validate_paths():
     """Valida que los archivos de modelo y encoder existan."""
-    if not os.path.exists(MODEL_PATH):
+    if TFLITE_BACKEND:
+        if not os.path.exists(TFLITE_MODEL_PATH_STR):
+            raise OSError(
+                f"❌ TFLite model not found at {TFLITE_MODEL_PATH_STR}. "
+                "Run `python -m app.evaluate_tflite` or set TFLITE_MODEL_PATH."
+            )
+    elif NUMPY_BACKEND and os.path.exists(NUMPY_WEIGHTS_PATH_STR):
+        pass
+    elif not os.path.exists(MODEL_PATH):
         raise OSError(
             f"❌ Model file not found at {MODEL_PATH}. "
             "Check MODEL_PATH or place cnn_lstm_model.h5 in the models/ folder."
@@ -59,38 +94,151 @@ def _validate_paths():
             "Check ENCODER_PATH or place label_encoder.pkl in the models/ folder."
         )
 
+def load_model_from(model_path=None, weights_path=None, tflite_path=None):
+    """Carga el modelo del backend configurado desde rutas explícitas (sin caché).
+
+    ``model_path`` es el ``.h5`` de Keras, ``weights_path`` el ``.npz`` del motor
+    NumPy y ``tflite_path`` el ``.tflite``; cada backend usa solo la suya.
+    """
+    if NUMPY_BACKEND:
+        from app.services.numpy_engine import NumpyCNNLSTM
+        weights_path = weights_path if weights_path and os.path.exists(weights_path) else model_path
+        print(f"🔄 Cargando motor NumPy desde {weights_path}...")
+        model = NumpyCNNLSTM.load(weights_path)
+        print("✅ Motor NumPy cargado exitosamente")
+        return model
+
+    if TFLITE_BACKEND:
+        from app.services.tflite_engine import TFLiteModel
+        print(f"🔄 Cargando modelo TFLite desde {tflite_path}...")
+        model = TFLiteModel(tflite_path)
+        print("✅ Modelo TFLite cargado exitosamente")
+        return model
+
+    if not TENSORFLOW_AVAILABLE:
+        print("🔄 Mock: Creando modelo simulado para desarrollo")
+        return MockModel()
+
+    configure_tf_threading()
+    print(f"🔄 Cargando modelo CNN-LSTM desde {model_path}...")
+    model = tf.keras.models.load_model(model_path)
+    print("✅ Modelo cargado exitosamente")
+    return model
+
+def load_bundle_from(bundle_path, tflite_path=None):
+    """Carga un bundle en un solo paso, sin sklearn.
+
+    Devuelve ``(modelo, bundle)``: el modelo para el backend configurado, con
+    el preprocesado del bundle incluido, y el bundle con la tabla de etiquetas,
+    la normalización y los umbrales. El backend TFLite sigue leyendo su
+    ``.tflite`` de ``tflite_path`` y aplica el preprocesado antes del intérprete.
+    """
+    from app.services.model_bundle import ModelBundle
+
+    print(f"🔄 Cargando bundle desde {bundle_path}...")
+    bundle = ModelBundle.load(bundle_path)
+    if NUMPY_BACKEND:
+        model = bundle.build_numpy_engine()
+    elif TFLITE_BACKEND:
+        from app.services.tflite_engine import TFLiteModel
+        model = TFLiteModel(tflite_path, input_affine=bundle.input_affine())
+    elif not TENSORFLOW_AVAILABLE:
+        model = MockModel()
+    else:
+        configure_tf_threading()
+        model = bundle.build_keras_model()
+    print(f"✅ Bundle {bundle.version} cargado ({len(bundle.labels)} clases)")
+    return model, bundle
+
+def load_encoder_from(encoder_path):
+    """Carga un label encoder desde una ruta explícita (sin caché)."""
+    if not TENSORFLOW_AVAILABLE and not LIGHT_BACKEND:
+        print("🔄 Mock: Creando encoder simulado para desarrollo")
+        return MockEncoder()
+    print(f"🔄 Cargando encoder desde {encoder_path}...")
+    encoder = joblib.load(encoder_path)
+    print("✅ Encoder cargado exitosamente")
+    return encoder
+
+def build_inference_fn(model):
+    """
+    Devuelve un callable compilado ``fn(batch) -> np.ndarray`` para lotes (N, 35, 42).
+
+    Envuelve el modelo en un ``tf.function`` con firma fija ``(None, 35, 42)``
+    (opcionalmente con XLA si ``INFERENCE_XLA=1``), evitando el data adapter y
+    los callbacks que ``model.predict`` construye en cada llamada. Con
+    ``INFERENCE_BACKEND=numpy`` o ``tflite`` devuelve directamente el forward
+    pass de ese backend.
+    """
+    if LIGHT_BACKEND:
+        return model.predict
+    if not TENSORFLOW_AVAILABLE:
+        return lambda batch: np.asarray(model.predict(batch, verbose=0))
+
+    @tf.function(
+        input_signature=[tf.TensorSpec(shape=(None, SEQUENCE_FRAMES, SEQUENCE_FEATURES), dtype=tf.float32)],
+        jit_compile=INFERENCE_XLA,
+    )
+    def _serve(batch):
+        return model(batch, training=False)
+
+    def inference_fn(batch):
+        return _serve(tf.convert_to_tensor(batch, dtype=tf.float32)).numpy()
+
+    print(f"✅ Función de inferencia compilada (XLA={'sí' if INFERENCE_XLA else 'no'})")
+    return inference_fn
+
 def get_model():
     """Carga el modelo de forma diferida (lazy loading)."""
     global _model
-    if _model is None:
-        if not TENSORFLOW_AVAILABLE:
-            print("🔄 Mock: Creando modelo simulado para desarrollo")
-            _model = MockModel()
-            return _model
-            
-        _validate_paths()
-        print("🔄 Cargando modelo CNN-LSTM...")
-        _model = tf.keras.models.load_model(MODEL_PATH)
-        print("✅ Modelo cargado exitosamente")
+    if _model is not None:
+        return _model
+    with _load_lock:
+        if _model is None:
+            if TENSORFLOW_AVAILABLE or LIGHT_BACKEND:
+                _validate_paths()
+            _model = load_model_from(MODEL_PATH, NUMPY_WEIGHTS_PATH_STR, TFLITE_MODEL_PATH_STR)
     return _model
 
 def get_encoder():
     """Carga el encoder de forma diferida (lazy loading)."""
     global _encoder
-    if _encoder is None:
-        if not TENSORFLOW_AVAILABLE:
-            print("🔄 Mock: Creando encoder simulado para desarrollo")
-            _encoder = MockEncoder()
-            return _encoder
-            
-        _validate_paths()
-        print("🔄 Cargando encoder...")
-        _encoder = joblib.load(ENCODER_PATH_STR)
-        print("✅ Encoder cargado exitosamente")
+    if _encoder is not None:
+        return _encoder
+    with _load_lock:
+        if _encoder is None:
+            if TENSORFLOW_AVAILABLE or LIGHT_BACKEND:
+                _validate_paths()
+            _encoder = load_encoder_from(ENCODER_PATH_STR)
     return _encoder
 
+def get_inference_fn():
+    """Función de inferencia compilada del modelo por defecto (ver ``build_inference_fn``)."""
+    global _inference_fn
+    if _inference_fn is not None:
+        return _inference_fn
+    with _load_lock:
+        if _inference_fn is None:
+            _inference_fn = build_inference_fn(get_model())
+    return _inference_fn
+
+def warmup_inference(batch_sizes=WARMUP_BATCH_SIZES, inference_fn=None):
+    """Traza la función de inferencia para los tamaños de lote habituales.
+
+    Devuelve los milisegundos que tomó la primera llamada con cada tamaño.
+    """
+    inference_fn = inference_fn or get_inference_fn()
+    timings = {}
+    for batch_size in batch_sizes:
+        dummy = np.zeros((batch_size, SEQUENCE_FRAMES, SEQUENCE_FEATURES), dtype=np.float32)
+        started = time.perf_counter()
+        inference_fn(dummy)
+        timings[batch_size] = round((time.perf_counter() - started) * 1000.0, 2)
+    print("🔥 Warm-up de inferencia (ms por tamaño de lote):", timings)
+    return timings
+
 # Solo validar rutas al importar, NO cargar los modelos (solo si TensorFlow está disponible)
-if TENSORFLOW_AVAILABLE:
+if TENSORFLOW_AVAILABLE or LIGHT_BACKEND:
     try:
         _validate_paths()
         print("✅ Rutas de modelo y encoder validadas")
@@ -108,4 +256,7 @@ def model():
 def encoder():
     return get_encoder()
 
-__all__ = ["get_model", "get_encoder", "model", "encoder"]
+__all__ = [
+    "get_model", "get_encoder", "get_inference_fn", "warmup_inference",
+    "load_model_from", "load_encoder_from", "load_bundle_from", "build_inference_fn", "model", "encoder",
+]
@@ -0,0 +1,438 @@
+"""
+Registro de versiones del modelo con hot swap sin reiniciar la API.
+
+Layout de ``MODEL_REGISTRY_DIR``::
+
+    registry/
+        CURRENT                  # nombre de la versión activa
+        20250601-120000/
+            cnn_lstm.bundle      # bundle único (ver model_bundle); si existe se usa solo él
+        2025-06-01/
+            cnn_lstm_model.h5    # o cnn_lstm_model.npz / cnn_lstm_<variante>.tflite según el backend
+            label_encoder.pkl
+            thresholds.json      # opcional: {"default": 75.0, "reject": 20.0, "per_class": {...}, "cascade": {...}}
+            lstm_model.h5        # opcional: modelo pequeño de la cascada (o lstm_model.npz)
+
+Activar una versión la carga y calienta junto a la activa y después cambia la
+referencia de golpe: las peticiones que ya tomaron la versión anterior
+terminan con ella y las nuevas usan la nueva. Sin versiones en el registro se
+sirven los archivos planos de ``MODELS_DIR`` como versión ``base``.
+
+Con ``INFERENCE_EXECUTOR=process`` el batcher no envía el modelo al pool:
+envía ``run_registry_model`` con el registro y el nombre de la versión, y
+cada proceso carga esa versión la primera vez que le llega un lote.
+"""
+import asyncio
+import functools
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from app.config import (
+    BUNDLE_FILENAME,
+    LSTM_MODEL_PATH,
+    LSTM_NUMPY_WEIGHTS_PATH,
+    MODEL_BUNDLE_PATH,
+    MODEL_REGISTRY_DIR,
+    MODEL_VERSION,
+    PREDICT_CASCADE,
+    STREAM_INFERENCE,
+    WARMUP_BATCH_SIZES,
+    TFLITE_VARIANT,
+)
+from app.services import model_loader
+from app.services.batcher import BatchStats, InferenceBatcher
+from app.services.cascade import CASCADE_MODEL_FILENAME, CASCADE_WEIGHTS_FILENAME, build_cascade, load_cascade_engine
+from app.services.inference_executor import InferenceExecutor
+from app.services.label_catalog import LabelCatalog
+
+logger = logging.getLogger(__name__)
+
+BASE_VERSION = "base"
+CURRENT_FILE = "CURRENT"
+THRESHOLDS_FILE = "thresholds.json"
+
+
+class ModelVersion:
+    """Una versión cargada: modelo, encoder, umbrales y su propio batcher."""
+
+    def __init__(self, name, model, encoder, inference_fn, thresholds=None,
+                 executor: Optional[InferenceExecutor] = None, stats: Optional[BatchStats] = None,
+                 source: Optional[str] = None, predict_fn: Optional[Callable] = None):
+        self.name = name
+        self.model = model
+        self.encoder = encoder
+        # Tabla índice -> etiqueta resuelta una vez (LabelEncoder, LabelTable del bundle o mock)
+        classes = getattr(encoder, "classes_", None)
+        self.labels = [str(label) for label in classes] if classes is not None else None
+        self.inference_fn = inference_fn
+        self.thresholds = thresholds or {}
+        self.source = source
+        self.loaded_at = datetime.utcnow()
+        self.load_ms = None
+        self.warmup_ms = None
+        self.warmup_batches_ms = None
+        # Motor incremental para /ws/predict (solo con STREAM_INFERENCE=incremental)
+        self.streaming_engine = None
+        # Modelo pequeño que filtra las secuencias claras (solo con PREDICT_CASCADE=1)
+        self.cascade = None
+        # Un batcher por versión: un lote nunca mezcla secuencias de dos versiones.
+        # ``predict_fn`` sustituye a ``inference_fn`` en el batcher (pool de procesos)
+        self.batcher = InferenceBatcher(predict_fn or self._run_model, executor=executor, stats=stats)
+
+    def _run_model(self, batch: np.ndarray) -> np.ndarray:
+        return np.asarray(self.inference_fn(batch))
+
+    async def submit(self, sequence: np.ndarray) -> np.ndarray:
+        """Probabilidades de una secuencia: del modelo pequeño si las acepta, si no del CNN-LSTM."""
+        if self.cascade is None:
+            return await self.batcher.submit(sequence)
+        probabilities = await self.cascade.batcher.submit(sequence)
+        if self.cascade.accepts(probabilities)[0]:
+            self.cascade.stats.record(1, 0)
+            return probabilities
+        self.cascade.stats.record(0, 1)
+        return await self.batcher.submit(sequence)
+
+    async def run_batch(self, batch: np.ndarray) -> np.ndarray:
+        """Como ``submit`` para un lote ``(N, 35, 42)``: solo las filas dudosas pasan por el CNN-LSTM."""
+        if self.cascade is None:
+            return await self.batcher.run_batch(batch)
+        probabilities = await self.cascade.batcher.run_batch(batch)
+        escalate = ~self.cascade.accepts(probabilities)
+        self.cascade.stats.record(int(len(batch) - escalate.sum()), int(escalate.sum()))
+        if escalate.any():
+            probabilities = probabilities.copy()
+            probabilities[escalate] = await self.batcher.run_batch(batch[escalate])
+        return probabilities
+
+    def label(self, class_index: int) -> str:
+        if self.labels is not None:
+            return self.labels[class_index]
+        return self.encoder.inverse_transform([class_index])[0]
+
+    def info(self) -> dict:
+        return {
+            "version": self.name,
+            "source": self.source,
+            "loaded_at": self.loaded_at.isoformat(),
+            "load_ms": self.load_ms,
+            "warmup_ms": self.warmup_ms,
+        }
+
+
+class ModelRegistry:
+    """Resuelve, carga y activa versiones del modelo."""
+
+    def __init__(self, root=MODEL_REGISTRY_DIR, executor: Optional[InferenceExecutor] = None,
+                 stats: Optional[BatchStats] = None, warmup_batch_sizes=WARMUP_BATCH_SIZES,
+                 label_catalog: Optional[LabelCatalog] = None):
+        self.root = Path(root)
+        self.executor = executor
+        # Catálogo de etiquetas al que se publican los índices de clase de la versión activa
+        self.label_catalog = label_catalog
+        # Estadísticas compartidas por los batchers de todas las versiones
+        self.stats = stats if stats is not None else BatchStats()
+        self.warmup_batch_sizes = warmup_batch_sizes
+        self._active: Optional[ModelVersion] = None
+        self._activate_lock = None
+        self._current_mtime = None
+        self.status = {
+            "ready": False,
+            "loading": False,
+            "error": None,
+            "model_version": None,
+            "load_ms": None,
+            "warmup_ms": None,
+            "warmup_batches_ms": None,
+        }
+
+    # ---- Resolución de versiones ----
+
+    def list_versions(self):
+        if not self.root.is_dir():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+    def _read_current(self) -> Optional[str]:
+        current = self.root / CURRENT_FILE
+        if current.is_file():
+            name = current.read_text().strip()
+            return name or None
+        return None
+
+    def resolve_initial(self) -> str:
+        """``MODEL_VERSION``, si no el archivo ``CURRENT``, si no la versión más reciente, si no ``base``."""
+        current_file = self.root / CURRENT_FILE
+        # Punto de partida del watcher: solo reacciona a cambios posteriores al arranque
+        self._current_mtime = current_file.stat().st_mtime if current_file.is_file() else None
+        if MODEL_VERSION:
+            return MODEL_VERSION
+        current = self._read_current()
+        if current:
+            return current
+        versions = self.list_versions()
+        return versions[-1] if versions else BASE_VERSION
+
+    @staticmethod
+    def _check_name(name: str) -> None:
+        # La versión llega de /admin/models/activate o de CURRENT: un solo componente dentro del registro
+        if not name or name in (".", "..") or name != Path(name).name or "\\" in name:
+            raise ValueError(f"Nombre de versión no válido: '{name}'")
+
+    def _paths(self, name: str) -> dict:
+        self._check_name(name)
+        if name == BASE_VERSION and not (self.root / name).is_dir():
+            return {
+                "dir": str(Path(model_loader.MODEL_PATH).parent),
+                "bundle": str(MODEL_BUNDLE_PATH),
+                "model": model_loader.MODEL_PATH,
+                "weights": model_loader.NUMPY_WEIGHTS_PATH_STR,
+                "tflite": model_loader.TFLITE_MODEL_PATH_STR,
+                "encoder": model_loader.ENCODER_PATH_STR,
+                "cascade_model": str(LSTM_MODEL_PATH),
+                "cascade_weights": str(LSTM_NUMPY_WEIGHTS_PATH),
+            }
+        version_dir = self.root / name
+        if not version_dir.is_dir():
+            raise FileNotFoundError(f"La versión '{name}' no existe en {self.root}")
+        return {
+            "dir": str(version_dir),
+            "bundle": str(version_dir / BUNDLE_FILENAME),
+            "model": str(version_dir / "cnn_lstm_model.h5"),
+            "weights": str(version_dir / "cnn_lstm_model.npz"),
+            "tflite": str(version_dir / f"cnn_lstm_{TFLITE_VARIANT}.tflite"),
+            "encoder": str(version_dir / "label_encoder.pkl"),
+            "cascade_model": str(version_dir / CASCADE_MODEL_FILENAME),
+            "cascade_weights": str(version_dir / CASCADE_WEIGHTS_FILENAME),
+        }
+
+    # ---- Carga ----
+
+    @staticmethod
+    def _check_files(paths: dict) -> None:
+        if not (model_loader.TENSORFLOW_AVAILABLE or model_loader.LIGHT_BACKEND):
+            return  # modo desarrollo: modelo y encoder simulados
+        required = [paths["tflite"]] if model_loader.TFLITE_BACKEND else []
+        if not os.path.exists(paths["bundle"]):
+            # Sin bundle: archivos sueltos (pesos del backend + encoder)
+            if not model_loader.TFLITE_BACKEND and not (model_loader.NUMPY_BACKEND and os.path.exists(paths["weights"])):
+                required.append(paths["model"])
+            required.append(paths["encoder"])
+        for path in required:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"❌ Falta {path}")
+
+    @staticmethod
+    def _load_thresholds(version_dir: str) -> dict:
+        thresholds = {}
+        thresholds_path = os.path.join(version_dir, THRESHOLDS_FILE)
+        if os.path.exists(thresholds_path):
+            with open(thresholds_path) as f:
+                thresholds = json.load(f)
+        return thresholds
+
+    def _load_streaming_engine(self, model, source):
+        from app.services.streaming_engine import build_streaming_engine
+
+        try:
+            if self.executor is not None and self.executor.kind == "process":
+                # El estado de cada sesión vive en este proceso; no se puede mandar al pool
+                raise ValueError("requiere INFERENCE_EXECUTOR=thread o inline")
+            return build_streaming_engine(model, source)
+        except Exception as e:
+            # Sin motor incremental las sesiones siguen con la ventana completa
+            logger.warning("⚠️ Modo streaming incremental no disponible: %s", e)
+            return None
+
+    def _load_cascade(self, paths: dict, version: ModelVersion, input_affine=None):
+        # Umbrales del bundle o, si no los trae, de thresholds.json junto a los pesos
+        thresholds = version.thresholds.get("cascade") or self._load_thresholds(paths["dir"]).get("cascade")
+        try:
+            if version.labels is None:
+                raise ValueError("la versión no tiene tabla de etiquetas")
+            return build_cascade(paths["cascade_model"], paths["cascade_weights"], version.labels, thresholds,
+                                 input_affine=input_affine, executor=self.executor,
+                                 predict_fn=self._process_predict_fn(version.name, cascade=True))
+        except Exception as e:
+            # Sin cascada todas las secuencias van al CNN-LSTM
+            logger.warning("⚠️ Cascada no disponible para '%s': %s", version.name, e)
+            return None
+
+    def _process_predict_fn(self, name: str, cascade: bool = False) -> Optional[Callable]:
+        """Con un pool de procesos, lo que envía el batcher: serializable y sin el modelo dentro."""
+        if self.executor is None or self.executor.kind != "process":
+            return None
+        return functools.partial(run_registry_model, str(self.root), name, cascade)
+
+    @staticmethod
+    def _load_model(paths: dict):
+        """``(modelo, encoder, umbrales, origen, preprocesado)`` del bundle o de los archivos sueltos.
+
+        La normalización solo existe en el bundle, fusionada en el modelo
+        (``preprocesado``); los archivos sueltos se sirven sin normalizar.
+        """
+        if os.path.exists(paths["bundle"]):
+            # Un solo archivo: pesos, etiquetas, normalización y umbrales
+            model, bundle = model_loader.load_bundle_from(paths["bundle"], paths["tflite"])
+            return model, bundle.labels, bundle.thresholds, paths["bundle"], bundle.input_affine()
+        model = model_loader.load_model_from(paths["model"], paths["weights"], paths["tflite"])
+        encoder = model_loader.load_encoder_from(paths["encoder"])
+        return model, encoder, ModelRegistry._load_thresholds(paths["dir"]), paths["dir"], None
+
+    def load(self, name: str) -> ModelVersion:
+        """Carga y calienta una versión sin activarla (bloqueante: correr fuera del event loop)."""
+        paths = self._paths(name)
+        self._check_files(paths)
+
+        started = time.perf_counter()
+        model, encoder, thresholds, source, input_affine = self._load_model(paths)
+        inference_fn = model_loader.build_inference_fn(model)
+        version = ModelVersion(name, model, encoder, inference_fn, thresholds,
+                               executor=self.executor, stats=self.stats, source=source,
+                               predict_fn=self._process_predict_fn(name))
+        if STREAM_INFERENCE == "incremental":
+            version.streaming_engine = self._load_streaming_engine(model, source)
+        if PREDICT_CASCADE:
+            version.cascade = self._load_cascade(paths, version, input_affine)
+        version.load_ms = round((time.perf_counter() - started) * 1000.0, 2)
+
+        started = time.perf_counter()
+        version.warmup_batches_ms = model_loader.warmup_inference(self.warmup_batch_sizes, inference_fn)
+        version.warmup_ms = round((time.perf_counter() - started) * 1000.0, 2)
+        return version
+
+    def load_inference_fn(self, name: str, cascade: bool = False) -> Callable:
+        """Solo la función de inferencia de una versión (o de su modelo pequeño), sin batcher ni warm-up."""
+        paths = self._paths(name)
+        if not cascade:
+            self._check_files(paths)
+            return model_loader.build_inference_fn(self._load_model(paths)[0])
+        input_affine = None
+        if os.path.exists(paths["bundle"]):
+            from app.services.model_bundle import ModelBundle
+            input_affine = ModelBundle.load(paths["bundle"]).input_affine()
+        return load_cascade_engine(paths["cascade_model"], paths["cascade_weights"], input_affine).predict
+
+    # ---- Activación ----
+
+    def _lock(self) -> asyncio.Lock:
+        if self._activate_lock is None:
+            self._activate_lock = asyncio.Lock()
+        return self._activate_lock
+
+    def active(self) -> Optional[ModelVersion]:
+        return self._active
+
+    async def get_active(self) -> ModelVersion:
+        """Versión activa; la primera llamada carga la versión inicial (una sola vez)."""
+        if self._active is not None:
+            return self._active
+        async with self._lock():
+            if self._active is None:
+                await self._activate_locked(self.resolve_initial())
+        return self._active
+
+    async def activate(self, name: str, persist: bool = True) -> ModelVersion:
+        """Carga ``name`` junto a la versión activa y la intercambia de forma atómica."""
+        async with self._lock():
+            version = await self._activate_locked(name)
+        if persist and name != BASE_VERSION:
+            self._write_current(name)
+        return version
+
+    async def _activate_locked(self, name: str) -> ModelVersion:
+        self.status.update(loading=True, error=None)
+        try:
+            version = await asyncio.get_running_loop().run_in_executor(None, self.load, name)
+        except Exception as e:
+            self.status["error"] = str(e)
+            raise
+        finally:
+            self.status["loading"] = False
+        await self.swap(version)
+        return version
+
+    async def swap(self, version: ModelVersion) -> None:
+        """Instala una versión ya cargada; el batcher de la anterior se cierra al vaciarse."""
+        previous, self._active = self._active, version
+        if self.label_catalog is not None and version.labels is not None:
+            self.label_catalog.set_class_labels(version.labels)
+        self.status.update(
+            ready=True,
+            model_version=version.name,
+            load_ms=version.load_ms,
+            warmup_ms=version.warmup_ms,
+            warmup_batches_ms=version.warmup_batches_ms,
+        )
+        logger.info("🔁 Modelo activo: %s (antes: %s)", version.name, previous.name if previous else None)
+        if previous is not None and previous is not version:
+            await previous.batcher.close()
+            if previous.cascade is not None:
+                await previous.cascade.batcher.close()
+
+    def _write_current(self, name: str) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        current = self.root / CURRENT_FILE
+        tmp = current.with_suffix(".tmp")
+        tmp.write_text(name + "\n")
+        os.replace(tmp, current)
+        self._current_mtime = current.stat().st_mtime
+
+    async def preload(self) -> dict:
+        """Carga y calienta la versión inicial; actualiza el estado que expone ``/ready``."""
+        await self.get_active()
+        return self.readiness()
+
+    def readiness(self) -> dict:
+        return dict(self.status)
+
+    async def watch(self, poll_seconds: float) -> None:
+        """Hot swap por archivo: activa la versión escrita en ``CURRENT`` cuando cambia."""
+        current = self.root / CURRENT_FILE
+        while True:
+            await asyncio.sleep(poll_seconds)
+            try:
+                mtime = current.stat().st_mtime if current.is_file() else None
+                if mtime is None or mtime == self._current_mtime:
+                    continue
+                self._current_mtime = mtime
+                name = self._read_current()
+                if name and (self._active is None or name != self._active.name):
+                    logger.info("📂 CURRENT cambió a '%s', activando...", name)
+                    await self.activate(name, persist=False)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("❌ No se pudo activar la versión de CURRENT: %s", e)
+
+
+# Funciones de inferencia ya cargadas en este proceso del pool: (registro, versión, cascada) -> fn
+_worker_inference_fns = {}
+
+
+def run_registry_model(root: str, name: str, cascade: bool, batch: np.ndarray) -> np.ndarray:
+    """
+    Forward pass de una versión dentro de un proceso del pool (``INFERENCE_EXECUTOR=process``).
+
+    El batcher envía ``partial(run_registry_model, root, name, cascade)``, que se
+    serializa por nombre. La primera llamada en cada proceso carga la versión
+    (o su modelo pequeño) y la guarda; al cargar otra se descartan las anteriores.
+    """
+    key = (root, name, cascade)
+    inference_fn = _worker_inference_fns.get(key)
+    if inference_fn is None:
+        inference_fn = ModelRegistry(root, warmup_batch_sizes=()).load_inference_fn(name, cascade)
+        for old in [k for k in _worker_inference_fns if k[0] == root and k[2] == cascade]:
+            del _worker_inference_fns[old]
+        _worker_inference_fns[key] = inference_fn
+    return np.asarray(inference_fn(batch))
+
+
+__all__ = ["ModelRegistry", "ModelVersion", "BASE_VERSION", "run_registry_model"]
@@ -0,0 +1,296 @@
+"""
+Motor de inferencia en NumPy puro para el modelo CNN-LSTM.
+
+Reproduce el forward pass de ``train_cnn_lstm_model.build_model``
+(Conv1D -> BatchNorm -> MaxPool -> Dropout x2, dos LSTM y dos Dense) sin
+importar TensorFlow. Los pesos se leen del ``.h5`` de Keras (requiere
+``h5py``) o de un ``.npz`` exportado con ``export_npz`` (solo NumPy).
+
+Las BatchNormalization se pliegan en los pesos al cargar. En esta
+arquitectura la BN va después del ReLU de la convolución, así que su
+transformación afín se propaga a través del MaxPool (que conmuta con una
+escala positiva; para escalas negativas se usa el mínimo) y se absorbe en
+el kernel y el bias de la capa siguiente (la segunda Conv1D y el kernel de
+entrada del primer LSTM). El resultado es exacto, no una aproximación.
+
+Uso:
+    python -m app.services.numpy_engine export [--model ruta.h5] [--out ruta.npz]
+"""
+import argparse
+import json
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Tipos de operación del grafo plegado
+CONV, POOL, LSTM, DENSE, AFFINE = "conv", "pool", "lstm", "dense", "affine"
+
+
+def _sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def _activate(x, activation):
+    if activation in (None, "linear"):
+        return x
+    if activation == "relu":
+        return np.maximum(x, 0.0)
+    if activation == "tanh":
+        return np.tanh(x)
+    if activation == "sigmoid":
+        return _sigmoid(x)
+    if activation == "softmax":
+        e = np.exp(x - x.max(axis=-1, keepdims=True))
+        return e / e.sum(axis=-1, keepdims=True)
+    raise ValueError(f"Activación no soportada: {activation}")
+
+
+def _read_keras_h5(path: str) -> List[dict]:
+    """Lee la configuración y los pesos de un modelo Sequential guardado en .h5."""
+    import h5py
+
+    layers = []
+    with h5py.File(path, "r") as f:
+        config = json.loads(f.attrs["model_config"])
+        weights_group = f["model_weights"] if "model_weights" in f else f
+        for layer in config["config"]["layers"]:
+            name = layer["config"]["name"]
+            weights = {}
+            if name in weights_group:
+                group = weights_group[name]
+                for weight_name in group.attrs.get("weight_names", []):
+                    if isinstance(weight_name, bytes):
+                        weight_name = weight_name.decode("utf-8")
+                    weights[weight_name.rsplit("/", 1)[-1]] = np.asarray(group[weight_name], dtype=np.float32)
+            layers.append({"class_name": layer["class_name"], "config": layer["config"], "weights": weights})
+    return layers
+
+
+def _fold_layers(layers: List[dict]) -> List[tuple]:
+    """Convierte las capas de Keras en operaciones NumPy plegando BatchNorm y Dropout."""
+    ops: List[tuple] = []
+    pending: Optional[Tuple[np.ndarray, np.ndarray]] = None  # afín y = a * x + b pendiente
+
+    def absorb_into_kernel(kernel, bias):
+        """Aplica el afín pendiente a la entrada de un kernel (..., in, out)."""
+        scale, shift = pending
+        in_axis = (1,) * (kernel.ndim - 2) + (-1, 1)
+        folded_bias = bias + (kernel * shift.reshape(in_axis)).reshape(-1, kernel.shape[-1]).sum(axis=0)
+        folded_kernel = kernel * scale.reshape(in_axis)
+        return folded_kernel.astype(np.float32), folded_bias.astype(np.float32)
+
+    for layer in layers:
+        kind, cfg, w = layer["class_name"], layer["config"], layer["weights"]
+
+        if kind in ("InputLayer", "Dropout"):
+            continue
+
+        if kind == "BatchNormalization":
+            gamma = w.get("gamma", np.ones_like(w["moving_mean"]))
+            beta = w.get("beta", np.zeros_like(w["moving_mean"]))
+            scale = gamma / np.sqrt(w["moving_variance"] + cfg.get("epsilon", 1e-3))
+            shift = beta - w["moving_mean"] * scale
+            if pending is not None:
+                scale, shift = pending[0] * scale, pending[1] * scale + shift
+                pending = None
+            last = ops[-1] if ops else None
+            if last is not None and last[0] in (CONV, DENSE) and last[3] in (None, "linear"):
+                # BN directamente tras una capa lineal: se pliega en sus pesos
+                ops[-1] = (last[0], last[1] * scale, last[2] * scale + shift, last[3])
+            else:
+                pending = (scale.astype(np.float32), shift.astype(np.float32))
+            continue
+
+        if kind == "MaxPooling1D":
+            pool_size = cfg["pool_size"][0] if isinstance(cfg["pool_size"], list) else cfg["pool_size"]
+            strides = cfg.get("strides") or pool_size
+            strides = strides[0] if isinstance(strides, list) else strides
+            if strides != pool_size or cfg.get("padding", "valid") != "valid":
+                raise ValueError("Solo se soporta MaxPooling1D con padding='valid' y strides == pool_size")
+            # max(a*x+b) = a*max(x)+b si a >= 0; si a < 0 es a*min(x)+b
+            use_min = pending[0] < 0 if pending is not None else None
+            ops.append((POOL, pool_size, use_min))
+            continue
+
+        if kind == "Conv1D":
+            strides = cfg.get("strides", [1])
+            dilation = cfg.get("dilation_rate", [1])
+            if cfg.get("padding") != "valid" or list(strides) != [1] or list(dilation) != [1]:
+                raise ValueError("Solo se soporta Conv1D con padding='valid', strides=1 y dilation=1")
+            kernel, bias = w["kernel"], w.get("bias", np.zeros(w["kernel"].shape[-1], np.float32))
+            if pending is not None:
+                kernel, bias = absorb_into_kernel(kernel, bias)
+                pending = None
+            ops.append((CONV, kernel, bias, cfg.get("activation")))
+            continue
+
+        if kind == "LSTM":
+            if cfg.get("activation") != "tanh" or cfg.get("recurrent_activation") != "sigmoid":
+                raise ValueError("Solo se soporta LSTM con activation='tanh' y recurrent_activation='sigmoid'")
+            if cfg.get("go_backwards") or cfg.get("stateful"):
+                raise ValueError("LSTM go_backwards/stateful no soportado")
+            kernel, recurrent, bias = w["kernel"], w["recurrent_kernel"], w["bias"]
+            if pending is not None:
+                kernel, bias = absorb_into_kernel(kernel, bias)
+                pending = None
+            ops.append((LSTM, kernel, recurrent, bias, bool(cfg.get("return_sequences"))))
+            continue
+
+        if kind == "Dense":
+            kernel, bias = w["kernel"], w.get("bias", np.zeros(w["kernel"].shape[-1], np.float32))
+            if pending is not None:
+                kernel, bias = absorb_into_kernel(kernel, bias)
+                pending = None
+            ops.append((DENSE, kernel, bias, cfg.get("activation")))
+            continue
+
+        raise ValueError(f"Capa no soportada por el motor NumPy: {kind}")
+
+    if pending is not None:
+        ops.append((AFFINE, pending[0], pending[1]))
+    return ops
+
+
+class NumpyCNNLSTM:
+    """Forward pass en NumPy, vectorizado sobre un lote de N secuencias."""
+
+    def __init__(self, ops: List[tuple]):
+        self.ops = ops
+
+    # ------------------------------------------------------------------ carga
+    @classmethod
+    def from_keras_h5(cls, path: str) -> "NumpyCNNLSTM":
+        return cls(_fold_layers(_read_keras_h5(path)))
+
+    @classmethod
+    def from_npz(cls, path: str) -> "NumpyCNNLSTM":
+        data = np.load(path, allow_pickle=False)
+        spec = json.loads(str(data["__spec__"]))
+        ops = []
+        for i, (kind, extra) in enumerate(spec):
+            if kind == CONV or kind == DENSE:
+                ops.append((kind, data[f"{i}_kernel"], data[f"{i}_bias"], extra))
+            elif kind == LSTM:
+                ops.append((kind, data[f"{i}_kernel"], data[f"{i}_recurrent"], data[f"{i}_bias"], extra))
+            elif kind == POOL:
+                use_min = data[f"{i}_use_min"] if f"{i}_use_min" in data else None
+                ops.append((kind, extra, use_min))
+            elif kind == AFFINE:
+                ops.append((kind, data[f"{i}_scale"], data[f"{i}_shift"]))
+        return cls(ops)
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyCNNLSTM":
+        if str(path).endswith(".npz"):
+            return cls.from_npz(path)
+        return cls.from_keras_h5(path)
+
+    def save_npz(self, path: str) -> None:
+        arrays, spec = {}, []
+        for i, op in enumerate(self.ops):
+            kind = op[0]
+            if kind in (CONV, DENSE):
+                arrays[f"{i}_kernel"], arrays[f"{i}_bias"] = op[1], op[2]
+                spec.append((kind, op[3]))
+            elif kind == LSTM:
+                arrays[f"{i}_kernel"], arrays[f"{i}_recurrent"], arrays[f"{i}_bias"] = op[1], op[2], op[3]
+                spec.append((kind, op[4]))
+            elif kind == POOL:
+                if op[2] is not None:
+                    arrays[f"{i}_use_min"] = op[2]
+                spec.append((kind, op[1]))
+            elif kind == AFFINE:
+                arrays[f"{i}_scale"], arrays[f"{i}_shift"] = op[1], op[2]
+                spec.append((kind, None))
+        arrays["__spec__"] = np.array(json.dumps(spec))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez(path, **arrays)
+
+    # ------------------------------------------------------------- inferencia
+    @staticmethod
+    def _conv1d(x, kernel, bias):
+        width = kernel.shape[0]
+        steps = x.shape[1] - width + 1
+        # im2col: (N, T', width * C) @ (width * C, O)
+        cols = np.concatenate([x[:, k:k + steps, :] for k in range(width)], axis=-1)
+        return cols @ kernel.reshape(-1, kernel.shape[-1]) + bias
+
+    @staticmethod
+    def _maxpool1d(x, pool_size, use_min):
+        steps = x.shape[1] // pool_size
+        windows = x[:, :steps * pool_size, :].reshape(x.shape[0], steps, pool_size, x.shape[2])
+        pooled = windows.max(axis=2)
+        if use_min is not None and use_min.any():
+            pooled = np.where(use_min, windows.min(axis=2), pooled)
+        return pooled
+
+    @staticmethod
+    def _lstm(x, kernel, recurrent, bias, return_sequences):
+        batch, steps, _ = x.shape
+        units = recurrent.shape[0]
+        # Proyección de la entrada para todos los pasos a la vez; compuertas en orden Keras i, f, c, o
+        projected = x @ kernel + bias
+        h = np.zeros((batch, units), dtype=x.dtype)
+        c = np.zeros((batch, units), dtype=x.dtype)
+        outputs = []
+        for t in range(steps):
+            z = projected[:, t, :] + h @ recurrent
+            i = _sigmoid(z[:, :units])
+            f = _sigmoid(z[:, units:2 * units])
+            g = np.tanh(z[:, 2 * units:3 * units])
+            o = _sigmoid(z[:, 3 * units:])
+            c = f * c + i * g
+            h = o * np.tanh(c)
+            if return_sequences:
+                outputs.append(h)
+        return np.stack(outputs, axis=1) if return_sequences else h
+
+    def predict(self, batch, verbose=0) -> np.ndarray:
+        """Probabilidades para un lote ``(N, 35, 42)`` (o una secuencia ``(35, 42)``)."""
+        x = np.asarray(batch, dtype=np.float32)
+        if x.ndim == 2:
+            x = x[None, ...]
+        for op in self.ops:
+            kind = op[0]
+            if kind == CONV:
+                x = _activate(self._conv1d(x, op[1], op[2]), op[3])
+            elif kind == POOL:
+                x = self._maxpool1d(x, op[1], op[2])
+            elif kind == LSTM:
+                x = self._lstm(x, op[1], op[2], op[3], op[4])
+            elif kind == DENSE:
+                x = _activate(x @ op[1] + op[2], op[3])
+            elif kind == AFFINE:
+                x = x * op[1] + op[2]
+        return x
+
+    __call__ = predict
+
+
+def export_npz(model_path: str, out_path: str) -> str:
+    """Exporta los pesos plegados de un ``.h5`` a ``.npz`` para servir sin TensorFlow ni h5py."""
+    NumpyCNNLSTM.from_keras_h5(str(model_path)).save_npz(str(out_path))
+    print(f"✅ Pesos NumPy exportados en: {out_path}")
+    return str(out_path)
+
+
+def main():
+    from app.config import CNN_LSTM_MODEL_PATH, NUMPY_WEIGHTS_PATH
+
+    parser = argparse.ArgumentParser(description="Motor NumPy del CNN-LSTM")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Exportar pesos plegados a .npz")
+    export.add_argument("--model", default=str(CNN_LSTM_MODEL_PATH))
+    export.add_argument("--out", default=str(NUMPY_WEIGHTS_PATH))
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_npz(args.model, args.out)
+
+
+if __name__ == "__main__":
+    main()
+
+
+__all__ = ["NumpyCNNLSTM", "export_npz"]
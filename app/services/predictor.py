@@ -1,26 +1,20 @@
 import os
 import numpy as np
 from datetime import datetime
-from app.services.model_loader import get_model, get_encoder
-from app.services.evaluator import evaluate_prediction
-from app.models.schema import PredictRequest, PredictResponse
-from app.db.mongodb import collection, stats_collection
-from app.config import DATASET_PATH, MODELS_DIR
-
-UMBRAL_CONFIANZA = 75.0
-UMBRAL_RECHAZO = 20.0
-
-# Umbrales específicos por clase
-UMBRAL_POR_CLASE = {
-    "dolor": 95.0,  # más exigente
-    "yo": 70.0,
-    "a_mi_me_duele_la_cabeza": 70.0,
-    "tengo_fiebre_y_tos": 70.0
-}
-
-# Carga normalización
-MEAN = np.load(str(MODELS_DIR / "mean.npy"))
-STD = np.load(str(MODELS_DIR / "std.npy"))
+from app.services.model_registry import ModelRegistry
+from app.services.inference_executor import InferenceExecutor
+from app.services.evaluator import evaluate_prediction, evaluate_predictions
+from app.services.label_catalog import label_catalog, normalize_label
+from app.models.schema import (PredictBatchItemResult, PredictBatchResponse, PredictRequest, PredictResponse,
+                               parse_batch_items)
+from app.db.mongodb import record_buffer, stats_cache
+# Umbrales por defecto; cada versión del modelo puede traer los suyos
+from app.config import UMBRAL_CONFIANZA, UMBRAL_RECHAZO, UMBRAL_POR_CLASE
+
+# El forward pass corre en un executor acotado para no bloquear el event loop
+inference_executor = InferenceExecutor()
+# Versiones del modelo; cada una micro-batchea sus peticiones concurrentes en un solo forward pass
+model_registry = ModelRegistry(executor=inference_executor, label_catalog=label_catalog)
 
 def es_secuencia_invalida(seq: np.ndarray) -> bool:
     if np.count_nonzero(seq) < 0.5 * seq.size:
@@ -29,8 +23,36 @@ def es_secuencia_invalida(seq: np.ndarray) -> bool:
         return True
     return False
 
+def secuencias_invalidas(batch: np.ndarray) -> np.ndarray:
+    """``es_secuencia_invalida`` vectorizada sobre un lote ``(N, 35, 42)``."""
+    flat = batch.reshape(len(batch), -1)
+    return (np.count_nonzero(flat, axis=1) < 0.5 * flat.shape[1]) | (np.var(flat, axis=1) < 1e-3)
+
+def top_prediccion(model_version, probabilities):
+    """Etiqueta de la clase más probable, su probabilidad (0-1) y la confianza en %."""
+    class_index = int(np.argmax(probabilities))
+    raw_conf = float(probabilities[class_index])
+    if raw_conf > 1.0:
+        raw_conf /= 100.0
+    return model_version.label(class_index), raw_conf, round(raw_conf * 100, 2)
+
+def umbrales(model_version, predicted_label):
+    """Umbral general, específico de la clase y de rechazo (%) de la versión, con los de config por defecto."""
+    thresholds = model_version.thresholds
+    umbral_confianza = thresholds.get("default", UMBRAL_CONFIANZA)
+    umbral_especifico = thresholds.get("per_class", UMBRAL_POR_CLASE).get(predicted_label, umbral_confianza)
+    return umbral_confianza, umbral_especifico, thresholds.get("reject", UMBRAL_RECHAZO)
+
+def _observacion(predicted_label, expected_label):
+    if normalize_label(predicted_label) != expected_label:
+        return (
+            f"La seña detectada fue '{predicted_label}', pero esperábamos '{expected_label}'. "
+            f"Porfavor vuelve a intentarlo. ¡Recuerda que aún soy un modelo en Desarrollo!"
+        )
+    return None  # Puedes agregar más lógica si deseas mensajes personalizados para aciertos
+
 async def predict_sequence(data: PredictRequest) -> PredictResponse:
-    sequence = np.array(data.sequence, dtype=np.float32)
+    sequence = data.sequence_array()
 
     if sequence.shape != (35, 42):
         raise ValueError("La secuencia debe tener forma (35, 42)")
@@ -49,41 +71,34 @@ async def predict_sequence(data: PredictRequest) -> PredictResponse:
             average_confidence=None
         )
 
-    # Obtener modelo y encoder de forma lazy
-    model = get_model()
-    encoder = get_encoder()
-    
-    prediction = model.predict(np.array([sequence]), verbose=0)
-    print("📊 Vector de predicción completo:", prediction[0])
-    for i, val in enumerate(prediction[0]):
+    # Fijar la versión al inicio: un hot swap posterior no afecta a esta petición
+    model_version = await model_registry.get_active()
+    probabilities = await model_version.submit(sequence)
+    print("📊 Vector de predicción completo:", probabilities)
+    for i, val in enumerate(probabilities):
         print(f"Clase {i} → {val}")
 
-    class_index = int(np.argmax(prediction))
-    raw_conf = float(prediction[0][class_index])
-    if raw_conf > 1.0:
-        raw_conf /= 100.0
-    confidence = round(raw_conf * 100, 2)
-
-    predicted_label = encoder.inverse_transform([class_index])[0]
-    umbral_especifico = UMBRAL_POR_CLASE.get(predicted_label, UMBRAL_CONFIANZA)
+    predicted_label, raw_conf, confidence = top_prediccion(model_version, probabilities)
+    umbral_confianza, umbral_especifico, umbral_rechazo = umbrales(model_version, predicted_label)
 
-    if confidence < max(UMBRAL_RECHAZO, umbral_especifico):
+    if confidence < max(umbral_rechazo, umbral_especifico):
         return PredictResponse(
             predicted_label="ninguna",
             confidence=confidence,
             evaluation="NO_RECONOCIDA",
             observation=f"La seña de '{predicted_label}' tiene confianza {confidence}%, por debajo del umbral ({umbral_especifico}%).",
             success_rate=None,
-            average_confidence=None
+            average_confidence=None,
+            model_version=model_version.name
         )
 
-    print("🔍 Predicción cruda:", prediction[0])
+    print("🔍 Predicción cruda:", probabilities)
     print("🔍 Confianza (raw):", raw_conf)
     print("🔍 Etiqueta predicha:", predicted_label)
     print("🔎 Primer frame recibido desde frontend:", sequence[0])
 
     evaluation, correct = evaluate_prediction(
-        predicted_label, data.expected_label, confidence, UMBRAL_CONFIANZA
+        predicted_label, data.expected_label, confidence, umbral_confianza
     )
     print("🏷️  Etiqueta predicha:", predicted_label)
     print("📈  Confianza:", confidence)
@@ -91,13 +106,7 @@ async def predict_sequence(data: PredictRequest) -> PredictResponse:
     print("🎯  Evaluación:", evaluation)
 
     # Nueva observación si fue "a suerte"
-    if predicted_label != data.expected_label:
-        observation = (
-            f"La seña detectada fue '{predicted_label}', pero esperábamos '{data.expected_label}'. "
-            f"Porfavor vuelve a intentarlo. ¡Recuerda que aún soy un modelo en Desarrollo!"
-        )
-    else:
-        observation = None  # Puedes agregar más lógica si deseas mensajes personalizados para aciertos
+    observation = _observacion(predicted_label, data.expected_label)
 
     registro = {
         "nickname": data.nickname,
@@ -107,20 +116,17 @@ async def predict_sequence(data: PredictRequest) -> PredictResponse:
         "confidence": confidence,
         "evaluation": evaluation,
         "observation": observation,
+        "model_version": model_version.name,
         "timestamp": datetime.utcnow()
     }
-    await collection.insert_one(registro)
-
-    stats_filter = {"expected_label": data.expected_label, "nickname": data.nickname}
-    update = {
-        "$inc": {
-            "total": 1,
-            "correct": 1 if correct else 0,
-            "confidence_sum": confidence,
-        }
-    }
-    await stats_collection.update_one(stats_filter, update, upsert=True)
-    stats_doc = await stats_collection.find_one(stats_filter)
+    # El registro no influye en la respuesta: lo inserta el buffer write-behind
+    record_buffer.add(registro)
+
+    # Con la entrada en caché no hay ida y vuelta: el incremento se escribe en diferido
+    stats_doc = await stats_cache.increment(
+        (data.expected_label, data.nickname),
+        {"total": 1, "correct": 1 if correct else 0, "confidence_sum": confidence},
+    )
 
     total = stats_doc.get("total", 0)
     correct_count = stats_doc.get("correct", 0)
@@ -135,5 +141,130 @@ async def predict_sequence(data: PredictRequest) -> PredictResponse:
         evaluation=evaluation,
         observation=observation,
         success_rate=round(success_rate * 100, 2) if success_rate else None,
-        average_confidence=round(average_confidence, 2) if average_confidence else None
+        average_confidence=round(average_confidence, 2) if average_confidence else None,
+        model_version=model_version.name
+    )
+
+def _nickname(item):
+    nickname = item.get("nickname") if isinstance(item, dict) else None
+    return nickname if isinstance(nickname, str) else None
+
+async def predict_batch(items) -> PredictBatchResponse:
+    """
+    Evalúa un lote de ``/predict/batch`` con la misma lógica que ``predict_sequence``.
+
+    Un solo forward pass para todas las secuencias válidas, umbrales y
+    evaluación vectorizados, los registros al buffer write-behind y las
+    estadísticas agregadas por (etiqueta, nickname) a través de la caché.
+    """
+    requests, errors = parse_batch_items(items)
+    for i, request in enumerate(requests):
+        if request is not None and request.sequence_array().shape != (35, 42):
+            errors[i] = "La secuencia debe tener forma (35, 42)"
+            requests[i] = None
+    valid = [i for i, request in enumerate(requests) if request is not None]
+    responses = {}
+    model_version = None
+    print(f"📦 Lote recibido: {len(items)} secuencias, {len(valid)} válidas")
+
+    if valid:
+        # Fijar la versión al inicio: un hot swap posterior no afecta a este lote
+        model_version = await model_registry.get_active()
+        sequences = np.stack([requests[i].sequence_array() for i in valid])
+        invalid = secuencias_invalidas(sequences)
+        for i in np.asarray(valid)[invalid]:
+            responses[int(i)] = PredictResponse(
+                predicted_label="ninguna",
+                confidence=0.0,
+                evaluation="NO_RECONOCIDA",
+                observation="La secuencia enviada está vacía, tiene muchos ceros o es demasiado uniforme.",
+            )
+        scored = [i for i, bad in zip(valid, invalid) if not bad]
+        if scored:
+            probabilities = await model_version.run_batch(sequences[~invalid])
+            class_index = np.argmax(probabilities, axis=1)
+            raw_conf = probabilities[np.arange(len(scored)), class_index].astype(np.float64)
+            raw_conf = np.where(raw_conf > 1.0, raw_conf / 100.0, raw_conf)
+            confidences = np.round(raw_conf * 100, 2)
+
+            # Etiqueta y umbral de cada clase una sola vez; después todo es indexación
+            class_labels = np.array([model_version.label(c) for c in range(probabilities.shape[1])], dtype=object)
+            class_thresholds = [umbrales(model_version, label) for label in class_labels]
+            umbral_confianza = umbrales(model_version, None)[0]
+            umbral_especifico = np.array([t[1] for t in class_thresholds])[class_index]
+            umbral_rechazo = np.array([max(t[2], t[1]) for t in class_thresholds])[class_index]
+
+            predicted = class_labels[class_index]
+            expected = np.array([requests[i].expected_label for i in scored], dtype=object)
+            recognized = confidences >= umbral_rechazo
+            evaluations, correct = evaluate_predictions(predicted, expected, confidences, umbral_confianza)
+
+            timestamp = datetime.utcnow()
+            registros, stats_inc = [], {}
+            for row, i in enumerate(scored):
+                request = requests[i]
+                label, confidence = str(predicted[row]), float(confidences[row])
+                if not recognized[row]:
+                    responses[i] = PredictResponse(
+                        predicted_label="ninguna",
+                        confidence=confidence,
+                        evaluation="NO_RECONOCIDA",
+                        observation=f"La seña de '{label}' tiene confianza {confidence}%, por debajo del umbral ({float(umbral_especifico[row])}%).",
+                        model_version=model_version.name
+                    )
+                    continue
+                observation = _observacion(label, request.expected_label)
+                registros.append({
+                    "nickname": request.nickname,
+                    "sequence_shape": (35, 42),
+                    "predicted_label": label,
+                    "expected_label": request.expected_label,
+                    "confidence": confidence,
+                    "evaluation": str(evaluations[row]),
+                    "observation": observation,
+                    "model_version": model_version.name,
+                    "timestamp": timestamp
+                })
+                inc = stats_inc.setdefault((request.expected_label, request.nickname),
+                                           {"total": 0, "correct": 0, "confidence_sum": 0.0})
+                inc["total"] += 1
+                inc["correct"] += int(correct[row])
+                inc["confidence_sum"] += confidence
+                responses[i] = PredictResponse(
+                    predicted_label=label,
+                    confidence=confidence,
+                    evaluation=str(evaluations[row]),
+                    observation=observation,
+                    model_version=model_version.name
+                )
+
+            if registros:
+                record_buffer.extend(registros)
+                stats_docs = await stats_cache.increment_many(stats_inc)
+                for i in scored:
+                    response = responses[i]
+                    if response.evaluation == "NO_RECONOCIDA":
+                        continue
+                    doc = stats_docs.get((requests[i].expected_label, requests[i].nickname), {})
+                    total = doc.get("total", 0)
+                    success_rate = (doc.get("correct", 0) / total) if total else None
+                    average_confidence = (doc.get("confidence_sum", 0.0) / total) if total else None
+                    response.success_rate = round(success_rate * 100, 2) if success_rate else None
+                    response.average_confidence = round(average_confidence, 2) if average_confidence else None
+
+    results = [
+        PredictBatchItemResult(
+            index=i,
+            nickname=request.nickname if request is not None else _nickname(item),
+            result=responses.get(i),
+            error=errors[i]
+        )
+        for i, (item, request) in enumerate(zip(items, requests))
+    ]
+    return PredictBatchResponse(
+        model_version=model_version.name if model_version else None,
+        total=len(items),
+        succeeded=len(responses),
+        failed=len(items) - len(responses),
+        results=results
     )
@@ -0,0 +1,160 @@
+"""
+Exportación de registros de ``predictions`` en NDJSON, CSV o Parquet.
+
+Cada formato es un generador asíncrono que consume un cursor de Motor y va
+devolviendo bytes para un ``StreamingResponse``: en memoria solo hay un lote
+del cursor y un trozo de salida (``chunk_rows`` filas, o un row group de
+``row_group_rows`` filas en Parquet), sea cual sea el tamaño del resultado.
+"""
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterable, AsyncIterator, Dict, List
+
+from app.config import EXPORT_CHUNK_ROWS, EXPORT_PARQUET_ROW_GROUP_ROWS
+
+# Columnas exportadas, en orden; "id" es el _id del registro
+EXPORT_FIELDS = (
+    "id", "timestamp", "nickname", "expected_label", "predicted_label",
+    "evaluation", "confidence", "observation", "model_version",
+)
+# Proyección del find: la forma de la secuencia y demás campos no viajan
+EXPORT_PROJECTION = {field: 1 for field in EXPORT_FIELDS if field != "id"}
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _row(doc: dict) -> dict:
+    row = {field: doc.get(field) for field in EXPORT_FIELDS}
+    row["id"] = str(doc.get("_id"))
+    timestamp = row["timestamp"]
+    if isinstance(timestamp, datetime) and timestamp.tzinfo is None:
+        # MongoDB guarda UTC y Motor lo devuelve sin zona
+        row["timestamp"] = timestamp.replace(tzinfo=timezone.utc)
+    return row
+
+
+async def _row_chunks(docs: AsyncIterable[dict], size: int) -> AsyncIterator[List[dict]]:
+    chunk = []
+    async for doc in docs:
+        chunk.append(_row(doc))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def ndjson_chunks(docs: AsyncIterable[dict], chunk_rows: int = EXPORT_CHUNK_ROWS) -> AsyncIterator[bytes]:
+    """Un objeto JSON por línea."""
+    async for rows in _row_chunks(docs, chunk_rows):
+        yield "".join(
+            json.dumps({k: _iso(v) for k, v in row.items()}, ensure_ascii=False) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+async def csv_chunks(docs: AsyncIterable[dict], chunk_rows: int = EXPORT_CHUNK_ROWS) -> AsyncIterator[bytes]:
+    """CSV con cabecera; los valores nulos quedan vacíos."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    async for rows in _row_chunks(docs, chunk_rows):
+        writer.writerows([[_iso(row[field]) for field in EXPORT_FIELDS] for row in rows])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Solo la cabecera: resultado vacío
+        yield buffer.getvalue().encode("utf-8")
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino de ``ParquetWriter`` que acumula lo escrito hasta que se recoge."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _parquet_schema(pa):
+    return pa.schema([
+        ("id", pa.string()),
+        ("timestamp", pa.timestamp("ms", tz="UTC")),
+        ("nickname", pa.string()),
+        ("expected_label", pa.string()),
+        ("predicted_label", pa.string()),
+        ("evaluation", pa.string()),
+        ("confidence", pa.float64()),
+        ("observation", pa.string()),
+        ("model_version", pa.string()),
+    ])
+
+
+def _write_row_group(pa, writer, schema, rows: List[dict]) -> None:
+    columns: Dict[str, list] = {field: [row[field] for row in rows] for field in EXPORT_FIELDS}
+    writer.write_table(pa.Table.from_pydict(columns, schema=schema), row_group_size=len(rows))
+
+
+async def parquet_chunks(docs: AsyncIterable[dict],
+                         row_group_rows: int = EXPORT_PARQUET_ROW_GROUP_ROWS) -> AsyncIterator[bytes]:
+    """
+    Parquet escrito por row groups de ``row_group_rows`` filas.
+
+    Cada row group se envía en cuanto está escrito; el pie con los metadatos
+    va en el último trozo. Codificar y comprimir un row group lleva tiempo,
+    así que se hace en un hilo aparte para no bloquear el event loop. Requiere
+    ``pyarrow``.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _parquet_schema(pa)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        async for rows in _row_chunks(docs, row_group_rows):
+            await asyncio.to_thread(_write_row_group, pa, writer, schema, rows)
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+EXPORTERS = {"ndjson": ndjson_chunks, "csv": csv_chunks, "parquet": parquet_chunks}
+
+
+__all__ = ["EXPORT_FIELDS", "EXPORT_PROJECTION", "EXPORTERS", "MEDIA_TYPES", "parquet_available"]
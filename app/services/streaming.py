@@ -0,0 +1,236 @@
+"""
+Reconocimiento en vivo: ventana deslizante sobre los frames que envía el cliente.
+
+Cada sesión de ``/ws/predict`` guarda los últimos ``SEQUENCE_FRAMES`` frames en
+un ``FrameRingBuffer`` preasignado (el ``SequenceRecorder`` de ``app/legacy``
+sin ``list.pop(0)``) y cada ``STREAM_STRIDE`` frames manda la ventana al
+batcher de la versión activa, el mismo camino que ``/predict``: las ventanas de
+todas las sesiones se agrupan en los mismos forward passes.
+
+Con ``STREAM_INFERENCE=incremental`` la sesión lleva además el estado del
+motor incremental de la versión (``streaming_engine``): cada frame avanza las
+convoluciones y los LSTM un paso y la predicción de cada ventana sale en
+cuanto llega su último frame, sin volver a pasar los 35. Esos pasos corren en
+el executor de inferencia, como los forward passes del batcher.
+"""
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import SEQUENCE_FEATURES, SEQUENCE_FRAMES, STREAM_INFERENCE, STREAM_MAX_SESSIONS, STREAM_STRIDE
+from app.services.evaluator import evaluate_prediction
+from app.services.label_catalog import normalize_label
+
+
+class FrameRingBuffer:
+    """
+    Últimos ``window`` frames en un buffer preasignado.
+
+    Cada frame se escribe dos veces (posición ``p`` y ``p + window``) en un
+    array ``(2 * window, features)``, así la ventana ordenada del más antiguo
+    al más reciente es siempre el slice contiguo ``[p, p + window)``: añadir
+    un frame es O(1) y leer la ventana no copia.
+    """
+
+    def __init__(self, window: int = SEQUENCE_FRAMES, features: int = SEQUENCE_FEATURES):
+        self.window = window
+        self.features = features
+        self._buffer = np.zeros((2 * window, features), dtype=np.float32)
+        self._pos = 0
+        self.count = 0
+
+    def push(self, frame: np.ndarray) -> None:
+        self._buffer[self._pos] = frame
+        self._buffer[self._pos + self.window] = frame
+        self._pos = (self._pos + 1) % self.window
+        self.count += 1
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.window
+
+    def view(self) -> np.ndarray:
+        """Ventana actual (vista de solo lectura; copiarla si se usa tras el siguiente ``push``)."""
+        view = self._buffer[self._pos:self._pos + self.window]
+        view.flags.writeable = False
+        return view
+
+    def reset(self) -> None:
+        self._buffer[:] = 0.0
+        self._pos = 0
+        self.count = 0
+
+
+class StreamSession:
+    """Estado de una conexión: buffer de frames, cadencia de inferencia y la inferencia en curso."""
+
+    def __init__(self, stride: int = STREAM_STRIDE, window: int = SEQUENCE_FRAMES,
+                 expected_label: Optional[str] = None):
+        self.buffer = FrameRingBuffer(window)
+        self.stride = max(int(stride), 1)
+        self.expected_label = normalize_label(expected_label) if expected_label else None
+        # La primera ventana completa se evalúa en cuanto llega su último frame
+        self._since_last = self.stride - window
+        self._pending: Optional[asyncio.Task] = None
+        self.predictions = 0
+        self.skipped = 0
+        # Modo incremental: versión fijada y su estado conv + LSTM
+        self.model_version = None
+        self.incremental = None
+
+    def use_incremental(self, model_version) -> None:
+        """Pasa la sesión al motor incremental de ``model_version`` (empieza por la siguiente ventana)."""
+        self.model_version = model_version
+        self.incremental = model_version.streaming_engine.new_state(self.stride)
+        self.buffer.reset()
+
+    def push_incremental(self, frames: np.ndarray) -> List[Tuple[int, np.ndarray, np.ndarray]]:
+        """Avanza el estado frame a frame; devuelve ``(frame, ventana, probabilidades)`` de las ventanas completadas."""
+        results = []
+        for frame in frames:
+            self.buffer.push(frame)
+            for _, probabilities in self.incremental.push(frame):
+                self.predictions += 1
+                # Copia: los frames siguientes del mismo mensaje sobrescriben el buffer
+                results.append((self.buffer.count, self.buffer.view().copy(), probabilities))
+        return results
+
+    def add_frames(self, frames: np.ndarray) -> bool:
+        """Añade ``(n, features)`` frames; devuelve si toca inferir sobre la ventana actual."""
+        for frame in frames:
+            self.buffer.push(frame)
+        self._since_last += len(frames)
+        return self.buffer.full and self._since_last >= self.stride
+
+    def start(self, run: Callable[[np.ndarray, int], Awaitable[None]]) -> bool:
+        """Lanza ``run(ventana, frame)`` sobre la ventana actual salvo que la anterior siga en curso."""
+        if self._pending is not None and not self._pending.done():
+            # No acumular ventanas atrasadas: se reintenta con el siguiente frame
+            self.skipped += 1
+            return False
+        self._since_last = 0
+        self.predictions += 1
+        self._pending = asyncio.get_running_loop().create_task(run(self.buffer.view().copy(), self.buffer.count))
+        return True
+
+    def reset(self) -> None:
+        self.buffer.reset()
+        self._since_last = self.stride - self.buffer.window
+        if self.incremental is not None:
+            self.incremental.reset()
+
+    async def close(self) -> None:
+        """Cancela la inferencia en curso y recoge su resultado, también si ya terminó con error."""
+        if self._pending is None:
+            return
+        if not self._pending.done():
+            self._pending.cancel()
+        try:
+            await self._pending
+        except (asyncio.CancelledError, Exception):
+            pass
+
+
+class SessionLimiter:
+    """Cupo de sesiones de streaming simultáneas (todo ocurre en el event loop, sin locks)."""
+
+    def __init__(self, max_sessions: int = STREAM_MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self.active = 0
+
+    def try_acquire(self) -> bool:
+        if self.active >= self.max_sessions:
+            return False
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active = max(self.active - 1, 0)
+
+
+def parse_frames(data, features: int = SEQUENCE_FEATURES) -> np.ndarray:
+    """Frames de un mensaje: bytes float32 little-endian o lista JSON; ``(n, features)`` finitos."""
+    if isinstance(data, (bytes, bytearray)):
+        if len(data) == 0 or len(data) % (4 * features):
+            raise ValueError(f"El mensaje binario debe contener múltiplos de {features} valores float32.")
+        frames = np.frombuffer(data, dtype="<f4").reshape(-1, features)
+    else:
+        try:
+            frames = np.asarray(data, dtype=np.float32)
+        except (TypeError, ValueError):
+            raise ValueError("Los frames deben ser listas de números.")
+        if frames.ndim == 1:
+            frames = frames[np.newaxis, :]
+        if frames.ndim != 2 or frames.shape[1] != features:
+            raise ValueError(f"Cada frame debe tener exactamente {features} valores.")
+    if not np.isfinite(frames).all():
+        raise ValueError("Los frames contienen valores NaN o infinitos.")
+    return frames
+
+
+def describe_prediction(model_version, probabilities: np.ndarray, expected_label: Optional[str] = None) -> dict:
+    """Etiqueta, confianza y reconocimiento de una ventana con los umbrales de la versión."""
+    # Imports diferidos: el predictor arrastra la capa de MongoDB
+    from app.services.predictor import top_prediccion, umbrales
+
+    predicted_label, _, confidence = top_prediccion(model_version, probabilities)
+    umbral_confianza, umbral_especifico, umbral_rechazo = umbrales(model_version, predicted_label)
+    result = {
+        "predicted_label": predicted_label,
+        "confidence": confidence,
+        "recognized": confidence >= max(umbral_rechazo, umbral_especifico),
+        "model_version": model_version.name,
+    }
+    if expected_label:
+        result["evaluation"], _ = evaluate_prediction(predicted_label, expected_label, confidence, umbral_confianza)
+    return result
+
+
+def describe_window(window: np.ndarray, model_version, probabilities: np.ndarray,
+                    expected_label: Optional[str] = None) -> dict:
+    """Como ``describe_prediction``, pero descarta las ventanas vacías o uniformes como ``/predict``."""
+    from app.services.predictor import es_secuencia_invalida
+
+    if es_secuencia_invalida(window):
+        return {"predicted_label": "ninguna", "confidence": 0.0, "recognized": False, "model_version": None}
+    return describe_prediction(model_version, probabilities, expected_label)
+
+
+async def predict_window(window: np.ndarray, expected_label: Optional[str] = None) -> dict:
+    """Inferencia de una ventana por el batcher de la versión activa."""
+    from app.services.predictor import es_secuencia_invalida, model_registry
+
+    if es_secuencia_invalida(window):
+        return {"predicted_label": "ninguna", "confidence": 0.0, "recognized": False, "model_version": None}
+
+    model_version = await model_registry.get_active()
+    probabilities = await model_version.submit(window)
+    return describe_prediction(model_version, probabilities, expected_label)
+
+
+async def push_incremental(session: StreamSession, frames: np.ndarray) -> List[Tuple[int, np.ndarray, np.ndarray]]:
+    """``session.push_incremental`` en el executor de inferencia, fuera del event loop.
+
+    El semáforo del executor limita los pasos simultáneos; mientras espera, la
+    sesión no lee más mensajes del socket.
+    """
+    from app.services.predictor import inference_executor
+
+    return await inference_executor.run(session.push_incremental, frames)
+
+
+async def incremental_version():
+    """Versión activa si el modo incremental está activado y la versión tiene motor incremental."""
+    if STREAM_INFERENCE != "incremental":
+        return None
+    from app.services.predictor import model_registry
+
+    version = await model_registry.get_active()
+    return version if version.streaming_engine is not None else None
+
+
+stream_sessions = SessionLimiter()
+
+__all__ = ["FrameRingBuffer", "StreamSession", "SessionLimiter", "parse_frames", "predict_window",
+           "describe_prediction", "describe_window", "push_incremental", "incremental_version", "stream_sessions"]
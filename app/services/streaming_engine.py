@@ -0,0 +1,285 @@
+"""
+Inferencia incremental del CNN-LSTM para streaming, frame a frame.
+
+Con la ventana deslizante de ``/ws/predict`` cada predicción vuelve a pasar
+las dos Conv1D y los dos LSTM por los 35 frames. Este motor reutiliza las
+operaciones plegadas de ``NumpyCNNLSTM`` y guarda el estado entre llamadas:
+
+- la cola del campo receptivo de cada Conv1D (los últimos ``width - 1``
+  vectores de entrada) y el acumulador de cada MaxPool;
+- el estado oculto y de celda (h, c) de cada LSTM.
+
+Así cada frame nuevo cuesta como mucho un paso de cada capa.
+
+El modelo se entrenó con ventanas de 35 frames que empiezan con el LSTM a
+cero, así que arrastrar un único estado indefinidamente no reproduce sus
+predicciones. Por eso cada ventana evaluada es un "carril" (lane): se abre uno
+cada ``stride`` frames y, cuando ha consumido su ventana, la cabeza densa
+devuelve exactamente lo mismo que ``NumpyCNNLSTM.predict`` sobre esos 35
+frames.
+
+Las etapas convolucionales son invariantes a desplazamientos, así que los
+carriles con el mismo desfase respecto al stride total de los MaxPool
+comparten un único flujo convolucional. También comparten la proyección de
+entrada del primer LSTM; con ``stride`` múltiplo de 4 (el stride total de esta
+arquitectura) hay un solo flujo por sesión. Si el bundle trae un z-score por
+posición (35, 42), la etapa convolucional depende de dónde empieza la ventana
+y cada carril lleva la suya: con ~9 flujos por sesión sale más caro que la
+ventana completa, así que ``build_streaming_engine`` no ofrece el modo
+incremental para esos modelos (salvo que el z-score sea igual en todas las
+posiciones, en cuyo caso se pliega a uno por feature).
+"""
+import bisect
+import os
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import SEQUENCE_FRAMES
+from app.services.numpy_engine import AFFINE, CONV, DENSE, LSTM, POOL, NumpyCNNLSTM, _activate, _sigmoid
+
+
+class _ConvStream:
+    """Capas previas al primer LSTM en modo incremental: un frame entra, sale 0 o 1 vector."""
+
+    def __init__(self, ops: List[tuple], start: int, total_stride: int):
+        self.ops = ops
+        self.start = start
+        self.total_stride = total_stride
+        self.frames = 0
+        self.emitted = 0
+        self._state = [deque(maxlen=op[1].shape[0]) if op[0] == CONV else [] for op in ops]
+
+    def push(self, frame: np.ndarray) -> Optional[Tuple[int, np.ndarray]]:
+        """Procesa un frame; devuelve ``(primer frame de su campo receptivo, vector)`` si hay salida."""
+        x = frame
+        position = self.frames
+        self.frames += 1
+        for op, state in zip(self.ops, self._state):
+            kind = op[0]
+            if kind == AFFINE:
+                scale, shift = op[1], op[2]
+                x = x * (scale[position] if scale.ndim == 2 else scale) + (shift[position] if shift.ndim == 2 else shift)
+            elif kind == CONV:
+                state.append(x)
+                if len(state) < state.maxlen:
+                    return None
+                kernel = op[1]
+                x = _activate(np.concatenate(state) @ kernel.reshape(-1, kernel.shape[-1]) + op[2], op[3])
+            elif kind == POOL:
+                state.append(x)
+                if len(state) < op[1]:
+                    return None
+                window = np.stack(state)
+                state.clear()
+                pooled = window.max(axis=0)
+                if op[2] is not None and op[2].any():
+                    pooled = np.where(op[2], window.min(axis=0), pooled)
+                x = pooled
+        out_start = self.start + self.total_stride * self.emitted
+        self.emitted += 1
+        return out_start, x
+
+
+class _LaneGroup:
+    """
+    Carriles que comparten un flujo convolucional.
+
+    Su estado (h, c) vive en filas contiguas, de la ventana más antigua a la
+    más reciente, así que los carriles que avanzan en un paso son siempre un
+    prefijo de las filas y se actualizan sin apilar.
+    """
+
+    def __init__(self, stream: _ConvStream, lstm_units: List[int]):
+        self.stream = stream
+        self.starts: List[int] = []
+        self.steps: List[int] = []
+        self.h = [np.zeros((0, units), dtype=np.float32) for units in lstm_units]
+        self.c = [np.zeros((0, units), dtype=np.float32) for units in lstm_units]
+        # inicio de la ventana -> probabilidades, pendientes de entregar
+        self.results: Dict[int, np.ndarray] = {}
+
+    def add_lane(self, start: int) -> None:
+        self.starts.append(start)
+        self.steps.append(0)
+        self.h = [np.concatenate([h, np.zeros((1, h.shape[1]), np.float32)]) for h in self.h]
+        self.c = [np.concatenate([c, np.zeros((1, c.shape[1]), np.float32)]) for c in self.c]
+
+    def pop_oldest(self) -> Tuple[int, np.ndarray]:
+        start = self.starts.pop(0)
+        self.steps.pop(0)
+        last_h = self.h[-1][0].copy()
+        self.h = [h[1:] for h in self.h]
+        self.c = [c[1:] for c in self.c]
+        return start, last_h
+
+    @property
+    def idle(self) -> bool:
+        return not self.starts and not self.results
+
+
+def _collapse_affine(op: tuple) -> tuple:
+    """Un afín (35, 42) con todas las filas iguales se reduce a uno por feature (42,)."""
+    if op[0] != AFFINE or np.ndim(op[1]) != 2:
+        return op
+    scale, shift = op[1], op[2]
+    if np.array_equal(scale, np.broadcast_to(scale[0], scale.shape)) and \
+            np.array_equal(shift, np.broadcast_to(shift[0], shift.shape)):
+        return (AFFINE, scale[0], shift[0])
+    return op
+
+
+class StreamingCNNLSTM:
+    """Motor incremental construido sobre las operaciones plegadas de ``NumpyCNNLSTM``."""
+
+    def __init__(self, ops: List[tuple], window: int = SEQUENCE_FRAMES):
+        kinds = [op[0] for op in ops]
+        if LSTM not in kinds:
+            raise ValueError("El modo streaming requiere al menos una capa LSTM")
+        first_lstm = kinds.index(LSTM)
+        last_lstm = len(kinds) - 1 - kinds[::-1].index(LSTM)
+        if any(kind != LSTM for kind in kinds[first_lstm:last_lstm + 1]):
+            raise ValueError("El modo streaming requiere las capas LSTM consecutivas")
+        if any(kind not in (DENSE, AFFINE) for kind in kinds[last_lstm + 1:]):
+            raise ValueError("Tras el último LSTM solo se admiten capas densas")
+        if any(kind not in (AFFINE, CONV, POOL) for kind in kinds[:first_lstm]):
+            raise ValueError("Antes del primer LSTM solo se admiten Conv1D, MaxPool y afines")
+
+        self.window = window
+        self.conv_ops = [_collapse_affine(op) for op in ops[:first_lstm]]
+        self.lstm_ops = ops[first_lstm:last_lstm + 1]
+        self.head_ops = ops[last_lstm + 1:]
+        self.lstm_units = [op[2].shape[0] for op in self.lstm_ops]
+        # Un afín por posición (z-score (35, 42)) impide compartir el flujo convolucional entre ventanas
+        self.positional = any(op[0] == AFFINE and np.ndim(op[1]) == 2 for op in self.conv_ops)
+
+        steps, total_stride = window, 1
+        for op in self.conv_ops:
+            if op[0] == CONV:
+                steps -= op[1].shape[0] - 1
+            elif op[0] == POOL:
+                steps //= op[1]
+                total_stride *= op[1]
+        if steps < 1:
+            raise ValueError(f"Una ventana de {window} frames no produce pasos para el LSTM")
+        self.lstm_steps = steps
+        self.total_stride = total_stride
+
+    @classmethod
+    def from_engine(cls, engine: NumpyCNNLSTM, window: int = SEQUENCE_FRAMES) -> "StreamingCNNLSTM":
+        return cls(engine.ops, window)
+
+    def new_state(self, stride: int) -> "IncrementalState":
+        return IncrementalState(self, stride)
+
+    # ---- Pasos vectorizados sobre los carriles que reciben el mismo vector ----
+
+    def lstm_step(self, x: np.ndarray, group: _LaneGroup, rows: int) -> None:
+        """Avanza un paso los LSTM de las primeras ``rows`` filas de ``group`` con la entrada ``x``."""
+        inputs = x[np.newaxis, :]
+        for layer, op in enumerate(self.lstm_ops):
+            kernel, recurrent, bias, units = op[1], op[2], op[3], op[2].shape[0]
+            h, c = group.h[layer][:rows], group.c[layer][:rows]
+            # En la primera capa la proyección de la entrada es la misma para todos los carriles
+            z = inputs @ kernel + bias + h @ recurrent
+            i = _sigmoid(z[:, :units])
+            f = _sigmoid(z[:, units:2 * units])
+            g = np.tanh(z[:, 2 * units:3 * units])
+            o = _sigmoid(z[:, 3 * units:])
+            c[:] = f * c + i * g
+            h[:] = o * np.tanh(c)
+            inputs = h
+
+    def head(self, h: np.ndarray) -> np.ndarray:
+        x = h[np.newaxis, :]
+        for op in self.head_ops:
+            if op[0] == DENSE:
+                x = _activate(x @ op[1] + op[2], op[3])
+            else:
+                x = x * op[1] + op[2]
+        return x[0]
+
+
+class IncrementalState:
+    """
+    Estado de una sesión de streaming.
+
+    ``push(frame)`` devuelve las predicciones de las ventanas que terminan en
+    ese frame como ``[(inicio, probabilidades)]``. Con ``stride`` k la ventana
+    ``[s, s + window)`` se abre en cada ``s`` múltiplo de k y su resultado se
+    entrega al recibir el frame ``s + window - 1``, igual que la ventana
+    deslizante.
+    """
+
+    def __init__(self, engine: StreamingCNNLSTM, stride: int):
+        self.engine = engine
+        self.stride = max(int(stride), 1)
+        self.count = 0
+        self._groups: Dict[object, _LaneGroup] = {}
+
+    def reset(self) -> None:
+        self.count = 0
+        self._groups.clear()
+
+    def push(self, frame: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+        engine = self.engine
+        f = self.count
+        if f % self.stride == 0:
+            key = ("lane", f) if engine.positional else ("phase", f % engine.total_stride)
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _LaneGroup(_ConvStream(engine.conv_ops, f, engine.total_stride),
+                                                      engine.lstm_units)
+            group.add_lane(f)
+        self.count += 1
+
+        frame = np.asarray(frame, dtype=np.float32)
+        delivered = []
+        for key, group in list(self._groups.items()):
+            output = group.stream.push(frame)
+            if output is not None and group.starts:
+                out_start, x = output
+                # Carriles cuya ventana ya empezó cuando empieza el campo receptivo de este vector
+                rows = bisect.bisect_right(group.starts, out_start)
+                if rows:
+                    engine.lstm_step(x, group, rows)
+                    for row in range(rows):
+                        group.steps[row] += 1
+                    while group.steps and group.steps[0] == engine.lstm_steps:
+                        start, last_h = group.pop_oldest()
+                        group.results[start] = engine.head(last_h)
+            # Entregar al completar la ventana (aunque sus últimos frames no afecten a la salida)
+            start = self.count - engine.window
+            if start in group.results:
+                delivered.append((start, group.results.pop(start)))
+            if group.idle:
+                del self._groups[key]
+        return delivered
+
+
+def build_streaming_engine(model, source: Optional[str] = None) -> StreamingCNNLSTM:
+    """
+    Motor incremental para una versión: del motor NumPy servido, del bundle o del ``.h5``.
+
+    Falla (y la versión sigue con la ventana completa) si la normalización
+    depende de la posición en la ventana: cada carril necesitaría su propio
+    flujo convolucional y el modo incremental sería más lento.
+    """
+    if isinstance(model, NumpyCNNLSTM):
+        engine = StreamingCNNLSTM.from_engine(model)
+    elif source and str(source).endswith(".bundle"):
+        from app.services.model_bundle import ModelBundle
+        engine = StreamingCNNLSTM.from_engine(ModelBundle.load(source).build_numpy_engine())
+    elif source:
+        h5_path = source if str(source).endswith(".h5") else os.path.join(source, "cnn_lstm_model.h5")
+        engine = StreamingCNNLSTM.from_engine(NumpyCNNLSTM.from_keras_h5(h5_path))
+    else:
+        raise ValueError("No hay pesos disponibles para el modo streaming")
+    if engine.positional:
+        raise ValueError("el modelo normaliza con un z-score por posición (35, 42); "
+                         "la ventana completa es más rápida que un flujo convolucional por ventana")
+    return engine
+
+
+__all__ = ["StreamingCNNLSTM", "IncrementalState", "build_streaming_engine"]
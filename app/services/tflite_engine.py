@@ -0,0 +1,80 @@
+"""
+Backend TFLite para servir las variantes exportadas con ``model_utils.export_tflite``.
+
+Cada hilo del executor de inferencia obtiene su propio intérprete (un
+intérprete TFLite no es seguro entre hilos); el modelo se lee de disco una
+sola vez y todos los intérpretes comparten esos bytes.
+"""
+import threading
+
+import numpy as np
+
+
+def _interpreter_class():
+    """Prefiere runtimes ligeros; TensorFlow completo solo como último recurso."""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+class TFLiteModel:
+    """Pool de intérpretes TFLite, uno por hilo, con la interfaz ``predict(batch)``."""
+
+    def __init__(self, path: str, num_threads: int = 1, input_affine=None):
+        self.path = str(path)
+        self.num_threads = num_threads
+        # Preprocesado del bundle (scale, shift); el .tflite exportado recibe la entrada ya normalizada
+        self.input_affine = input_affine
+        with open(self.path, "rb") as f:
+            self._content = f.read()
+        self._interpreter_cls = _interpreter_class()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.interpreters_created = 0
+
+    def _get_interpreter(self):
+        state = getattr(self._local, "state", None)
+        if state is None:
+            interpreter = self._interpreter_cls(model_content=self._content, num_threads=self.num_threads)
+            interpreter.allocate_tensors()
+            input_detail = interpreter.get_input_details()[0]
+            output_index = interpreter.get_output_details()[0]["index"]
+            state = (interpreter, input_detail, output_index)
+            self._local.state = state
+            with self._lock:
+                self.interpreters_created += 1
+        return state
+
+    def predict(self, batch, verbose=0) -> np.ndarray:
+        interpreter, input_detail, output_index = self._get_interpreter()
+        x = np.asarray(batch, dtype=input_detail["dtype"])
+        if x.ndim == 2:
+            x = x[None, ...]
+        if self.input_affine is not None:
+            scale, shift = self.input_affine
+            x = (x * scale + shift).astype(input_detail["dtype"], copy=False)
+        model_batch = int(input_detail["shape"][0])
+        outputs = []
+        # El modelo exportado tiene batch estático: se recorre el lote en trozos de ese tamaño
+        for start in range(0, len(x), model_batch):
+            chunk = x[start:start + model_batch]
+            if len(chunk) < model_batch:
+                chunk = np.concatenate([chunk, np.zeros((model_batch - len(chunk),) + chunk.shape[1:], chunk.dtype)])
+            interpreter.set_tensor(input_detail["index"], chunk)
+            interpreter.invoke()
+            outputs.append(interpreter.get_tensor(output_index).copy())
+        return np.concatenate(outputs)[:len(x)]
+
+    __call__ = predict
+
+
+__all__ = ["TFLiteModel"]
@@ -12,15 +12,25 @@ from sklearn.utils.class_weight import compute_class_weight
 from sklearn.metrics import classification_report, confusion_matrix
 import pandas as pd
 import os
+from datetime import datetime
 
 from .data_loader import load_dataset
 from .model_utils import save_model, save_encoder, plot_metrics
+from .services.numpy_engine import export_npz
+from .services.model_bundle import ModelBundle
 from .config import (
     EPOCHS,
     BATCH_SIZE,
     CNN_LSTM_MODEL_PATH,
+    NUMPY_WEIGHTS_PATH,
     ENCODER_PATH,
     CNN_LSTM_PLOT_PATH,
+    MODEL_BUNDLE_PATH,
+    MODEL_REGISTRY_DIR,
+    BUNDLE_FILENAME,
+    UMBRAL_CONFIANZA,
+    UMBRAL_RECHAZO,
+    UMBRAL_POR_CLASE,
 )
 
 
@@ -83,19 +93,11 @@ def plot_confusion(y_true, y_pred, encoder, save_path=None):
 
 
 def main():
-    X_train, X_test, y_train, y_test, encoder = load_dataset()
-    # ✅ Calcular y guardar mean y std de todo X_train para normalización posterior
-    mean = np.mean(X_train, axis=(0, 1))  # Promedio por cada feature
-    std = np.std(X_train, axis=(0, 1))  # Desviación estándar por cada feature
-
-    # 💾 Guardar en archivos binarios .npy
-    os.makedirs("app/models", exist_ok=True)
-    np.save("app/models/mean.npy", mean)
-    np.save("app/models/std.npy", std)
-
-    print("\n📁 mean.npy y std.npy guardados correctamente en app/models/")
-    print("🧠 Ejemplo de mean[:5]:", mean[:5])
-    print("🧠 Ejemplo de std[:5]:", std[:5])
+    # ✅ mean/std del z-score que aplica load_dataset: viajan en el bundle como etapa de
+    # preprocesado del modelo servido, así /predict recibe landmarks sin normalizar
+    X_train, X_test, y_train, y_test, encoder, (mean, std) = load_dataset(return_stats=True)
+    print("🧠 Ejemplo de mean[0][:5]:", mean[0][:5])
+    print("🧠 Ejemplo de std[0][:5]:", std[0][:5])
 
     # 🔍 Verificación rápida del dataset cargado
     print("\n🔍 Ejemplo de valores normalizados:")
@@ -209,7 +211,17 @@ def main():
     )
 
     save_model(model, CNN_LSTM_MODEL_PATH)
+    export_npz(CNN_LSTM_MODEL_PATH, NUMPY_WEIGHTS_PATH)  # pesos para INFERENCE_BACKEND=numpy
     save_encoder(encoder, ENCODER_PATH)
+
+    # 📦 Bundle único versionado: pesos, etiquetas, normalización, umbrales y forma de entrada
+    version = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    thresholds = {"default": UMBRAL_CONFIANZA, "reject": UMBRAL_RECHAZO, "per_class": UMBRAL_POR_CLASE}
+    bundle = ModelBundle.from_keras(model, encoder.classes_, mean, std, thresholds, version, zscore=True)
+    bundle.save(str(MODEL_BUNDLE_PATH))
+    bundle.save(str(MODEL_REGISTRY_DIR / version / BUNDLE_FILENAME))
+    print(f"📦 Bundle {version} guardado en {MODEL_BUNDLE_PATH} y en el registro ({MODEL_REGISTRY_DIR / version})")
+
     plot_metrics(history, CNN_LSTM_PLOT_PATH)
 
     print("\n📊 Evaluación en test set completo:")
@@ -1,6 +1,6 @@
 import numpy as np
 import csv
-from app.services.model_loader import get_model, get_encoder
+from app.services.model_loader import get_inference_fn, get_encoder
 from app.config import DATASET_PATH
 
 # Ruta del archivo CSV con una secuencia a probar
@@ -25,12 +25,12 @@ def main():
     print("📈 Varianza:", np.var(secuencia))
     print("🎯 Primeros valores del primer frame:", secuencia[0][:5])
 
-    # Obtener modelo y encoder de forma lazy
-    model = get_model()
+    # Obtener función de inferencia compilada y encoder de forma lazy
+    inference_fn = get_inference_fn()
     encoder = get_encoder()
 
     # Predicción
-    prediction = model.predict(np.array([secuencia]), verbose=0)
+    prediction = inference_fn(np.array([secuencia], dtype=np.float32))
     y_pred = np.argmax(prediction)
     predicted_label = encoder.inverse_transform([y_pred])[0]
     confidence = float(prediction[0][y_pred]) * 100
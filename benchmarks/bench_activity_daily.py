@@ -0,0 +1,198 @@
+"""
+Benchmark: ``/activity/daily`` de un alumno con miles de intentos en un día.
+
+    legacy     find del día con todos los campos, recuento en Python y un
+               DailyActivityRecord por documento (implementación anterior)
+    facet      la agregación $facet del endpoint: resumen en el servidor y
+               registros proyectados (``--limit`` por página; 0 = la página
+               por defecto, ``ACTIVITY_PAGE_SIZE``)
+    cached     el mismo día ya cerrado servido desde ``daily_cache``
+
+Sin ``--mongo-uri`` solo se mide la parte de Python (construir y serializar la
+respuesta a partir de lo que devolvería MongoDB) y el tamaño en BSON de lo que
+viaja por la red. Con ``--mongo-uri`` se siembran los intentos en una base de
+datos temporal (se borra al terminar) y se mide la petición completa.
+
+Resultado de referencia (1 vCPU, Python 3.11, pydantic 2.7, sin mongod, 5000
+intentos en el día; página por defecto de 1000 registros):
+    modo           red KB     p50 ms     p95 ms
+    legacy         1523.4      33.52      68.00
+    facet(100)       16.2       1.39       2.06
+    facet(1000)     162.1       6.75      11.70
+    cached              —       1.12       1.27
+
+Con una página de 100 registros la respuesta cuesta ~25x menos en Python y
+viaja ~95x menos por la red; sin ``?limit=`` sale la página por defecto, y
+ningún día devuelve un ``$facet`` mayor de lo que ocupan 1000 registros
+proyectados (muy lejos de los 16 MB). Estos tiempos son solo de la parte de
+Python: la latencia de la agregación en MongoDB está pendiente de medir con
+``--mongo-uri`` contra un ``mongod`` real, que aquí no estaba disponible.
+
+Uso:
+    python -m benchmarks.bench_activity_daily [--attempts 5000] [--limit 100] [--repeats 50]
+        [--mongo-uri mongodb://localhost:27017]
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+import bson
+import numpy as np
+from bson import ObjectId
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+from app.api.endpoints import activity  # noqa: E402
+from app.models.schema import DailyActivityRecord, DailyActivityResponse, DailyActivitySummary  # noqa: E402
+
+DAY = date(2025, 1, 2)
+EVALUATIONS = ("CORRECTO", "INCORRECTO", "DUDOSO")
+
+
+def make_records(n: int, nickname: str = "alumno_intenso"):
+    start = datetime.combine(DAY, datetime.min.time())
+    return [{
+        "_id": ObjectId(),
+        "nickname": nickname,
+        "sequence_shape": [35, 42],
+        "predicted_label": f"clase_{i % 20}",
+        "expected_label": f"clase_{i % 20}",
+        "confidence": 50.0 + i % 50,
+        "evaluation": EVALUATIONS[i % 3],
+        "observation": "Intento registrado para el benchmark de actividad diaria",
+        "model_version": "2025-06-01",
+        "timestamp": start + timedelta(seconds=i * 86400 // max(n, 1)),
+    } for i in range(n)]
+
+
+def legacy_response(nickname: str, docs) -> DailyActivityResponse:
+    """Lo que hacía el endpoint antes con los documentos completos del día."""
+    records, counts = [], {"CORRECTO": 0, "DUDOSO": 0, "INCORRECTO": 0}
+    for doc in docs:
+        doc = dict(doc)
+        if doc.get("evaluation") in counts:
+            counts[doc["evaluation"]] += 1
+        doc["_id"] = str(doc.get("_id"))
+        records.append(DailyActivityRecord(**doc))
+    return DailyActivityResponse(
+        nickname=nickname, date=DAY.isoformat(),
+        summary=DailyActivitySummary(total_practices=len(records), correct_practices=counts["CORRECTO"],
+                                     doubtful_practices=counts["DUDOSO"], incorrect_practices=counts["INCORRECTO"]),
+        records=records,
+    )
+
+
+def facet_output(docs, limit):
+    """Lo que devuelve el $facet del endpoint para esos documentos."""
+    fields = [f for f in activity.DAILY_RECORD_PROJECTION if f != "_id"]
+    page = docs[:min(limit or activity.ACTIVITY_PAGE_SIZE, activity.DAILY_MAX_PAGE_SIZE)]
+    return {
+        "summary": [{"_id": None, "total_practices": len(docs),
+                     **{f"{name}_practices": sum(1 for d in docs if d["evaluation"] == evaluation)
+                        for name, evaluation in (("correct", "CORRECTO"), ("doubtful", "DUDOSO"),
+                                                 ("incorrect", "INCORRECTO"))}}],
+        "records": [{"_id": str(d["_id"]), **{f: d[f] for f in fields}} for d in page],
+    }
+
+
+class FacetCollection:
+    """Devuelve un resultado de $facet fijo, como haría MongoDB, sin esperar red."""
+
+    def __init__(self, result):
+        self.result = result
+
+    def aggregate(self, pipeline):
+        result = self.result
+
+        class C:
+            async def to_list(self, length=None):
+                return [result]
+        return C()
+
+
+async def timed(fn, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        response = await fn()
+        # FastAPI serializa la respuesta con el response_model
+        response.model_dump_json(by_alias=True)
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return np.percentile(timings, [50, 95])
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--mongo-uri", default=None)
+    args = parser.parse_args()
+
+    nickname = "alumno_intenso"
+    docs = make_records(args.attempts, nickname)
+    date_str = DAY.isoformat()
+    client = None
+    if args.mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.mongo_uri)
+        db = client[f"bench_activity_{uuid.uuid4().hex[:8]}"]
+        collection = db.predictions
+        await collection.insert_many([dict(d) for d in docs])
+        from app.db.indexes import ensure_indexes
+        await ensure_indexes(db)
+
+        async def legacy():
+            found = [d async for d in collection.find(activity.build_daily_filter(nickname, DAY)).sort(activity.DAILY_SORT)]
+            return legacy_response(nickname, found)
+
+        def facet_collection(limit):
+            return collection
+    else:
+        async def legacy():
+            return legacy_response(nickname, docs)
+
+        def facet_collection(limit):
+            return FacetCollection(facet_output(docs, limit))
+
+    def facet(limit):
+        async def run():
+            activity.collection = facet_collection(limit)
+            # Sin caché: cada repetición pasa por la agregación
+            activity.daily_cache = activity.DailyActivityCache(ttl=0)
+            return await activity.get_daily_activity(nickname, date_str, 0, limit or None)
+        return run
+
+    cache = activity.DailyActivityCache(ttl=3600)
+
+    async def cached():
+        activity.collection = facet_collection(args.limit)
+        activity.daily_cache = cache
+        return await activity.get_daily_activity(nickname, date_str, 0, args.limit or None)
+
+    default = f"facet({activity.ACTIVITY_PAGE_SIZE})"
+    wire = {
+        "legacy": sum(len(bson.encode(d)) for d in docs),
+        f"facet({args.limit or activity.ACTIVITY_PAGE_SIZE})": len(bson.encode(facet_output(docs, args.limit))),
+        default: len(bson.encode(facet_output(docs, None))),
+    }
+    if not args.mongo_uri:
+        print("⚠️ Sin --mongo-uri: solo se mide la parte de Python, no la agregación en MongoDB")
+    try:
+        print(f"{'modo':<12} {'red KB':>8} {'p50 ms':>10} {'p95 ms':>10}")
+        for name, fn in (("legacy", legacy), (f"facet({args.limit or activity.ACTIVITY_PAGE_SIZE})", facet(args.limit)),
+                         (default, facet(0)), ("cached", cached)):
+            p50, p95 = await timed(fn, args.repeats)
+            size = f"{wire[name] / 1024:8.1f}" if name in wire else f"{'—':>8}"
+            print(f"{name:<12} {size} {p50:10.2f} {p95:10.2f}")
+    finally:
+        if client is not None:
+            await client.drop_database(db.name)
+            client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
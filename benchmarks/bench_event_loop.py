@@ -0,0 +1,82 @@
+"""
+Benchmark: latencia de los endpoints de lectura mientras /predict está saturado.
+
+Compara el forward pass ejecutado en el event loop ("inline", comportamiento
+anterior) con el executor dedicado ("thread"). Varios clientes saturan el
+batcher con secuencias aleatorias mientras una sonda mide cuánto tarda el
+event loop en atender una corrutina trivial, que es exactamente el trabajo
+de /health, /records o /progress antes de tocar MongoDB.
+
+Resultado de referencia (1 vCPU, TensorFlow 2.19 CPU, 16 clientes, 4 s):
+    inline: 152 pred/s, lectura p50 79.4 ms, p99 485.0 ms
+    thread: 172 pred/s, lectura p50  0.2 ms, p99   5.1 ms
+
+Uso:
+    python -m benchmarks.bench_event_loop --seconds 5 --clients 16
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from app.services.batcher import InferenceBatcher
+from app.services.inference_executor import InferenceExecutor
+from app.services.model_loader import get_model
+
+
+def _predict(batch):
+    return np.asarray(get_model().predict(batch, verbose=0))
+
+
+async def _saturate(batcher, stop_at, counter):
+    rng = np.random.default_rng()
+    while time.perf_counter() < stop_at:
+        await batcher.submit(rng.standard_normal((35, 42), dtype=np.float32))
+        counter[0] += 1
+
+
+async def _probe(stop_at, interval, samples):
+    # Una petición de lectura que llega en t tiene que esperar a que el loop
+    # quede libre: se mide el retraso entre el instante previsto y la ejecución.
+    while time.perf_counter() < stop_at:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(time.perf_counter() - expected, 0.0) * 1000.0)
+
+
+async def run_case(kind, seconds, clients, concurrency):
+    executor = InferenceExecutor(kind=kind, max_concurrency=concurrency)
+    batcher = InferenceBatcher(_predict, executor=executor)
+    stop_at = time.perf_counter() + seconds
+    counter, samples = [0], []
+    await asyncio.gather(
+        _probe(stop_at, 0.01, samples),
+        *(_saturate(batcher, stop_at, counter) for _ in range(clients)),
+    )
+    executor.shutdown()
+    p50, p99 = np.percentile(samples, [50, 99])
+    return {
+        "executor": kind,
+        "predictions_per_s": round(counter[0] / seconds, 1),
+        "read_latency_p50_ms": round(float(p50), 3),
+        "read_latency_p99_ms": round(float(p99), 3),
+        "read_latency_max_ms": round(float(max(samples)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args()
+
+    get_model()  # cargar fuera de la medición
+    for kind in ("inline", "thread"):
+        result = asyncio.run(run_case(kind, args.seconds, args.clients, args.concurrency))
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
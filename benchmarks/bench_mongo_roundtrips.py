@@ -0,0 +1,192 @@
+"""
+Benchmark: idas y vueltas a MongoDB de cada ``/predict``.
+
+    legacy    insert_one del registro + update_one + find_one de las estadísticas (3 en serie)
+    current   find_one_and_update (1) con el insert_one en segundo plano
+    buffered  find_one_and_update (1); el registro va al buffer write-behind (insert_many por lotes)
+    cached    buffer write-behind + caché de estadísticas: sin ida y vuelta si el alumno está en caché
+
+Solo se mide la parte de base de datos de ``predict_sequence`` (sin modelo),
+por petición, con ``--clients`` clientes enviando ``--requests`` peticiones en
+total. Con ``--mongo-uri`` se usan colecciones reales en una base de datos
+temporal que se borra al terminar; sin él, colecciones en memoria que esperan
+``--rtt-ms`` por llamada.
+
+Pendiente: la medición contra un ``mongod`` local que pedía el cambio. Aquí
+no había servidor, así que la tabla siguiente NO es esa medición: son
+colecciones en memoria con una espera fija por llamada y solo reflejan el
+número de idas y vueltas. Para la medición real:
+
+    docker run -d --rm -p 27017:27017 mongo:7
+    python -m benchmarks.bench_mongo_roundtrips --mongo-uri mongodb://localhost:27017
+
+Simulación de referencia (1 vCPU, colecciones en memoria, rtt 1 ms, 2000 peticiones
+sobre 100 pares (seña, alumno)):
+    clients  mode       p50 ms   p95 ms   roundtrips/req   inserts/req
+    1        legacy       3.51     5.07             3.00         1.000
+    1        current      1.22     1.61             1.00         1.000
+    1        buffered     1.19     1.29             1.00         0.003
+    1        cached       0.01     1.11             0.05         0.002
+    32       legacy       4.86     6.89             3.00         1.000
+    32       current      1.96     2.50             1.00         1.000
+    32       buffered     1.97     2.65             1.00         0.004
+    32       cached       0.01     1.24             0.07         0.002
+
+Con un ``mongod`` local (rtt de ~0,1-0,3 ms) cabe esperar una diferencia
+absoluta menor y más peso del coste del propio servidor, pero no se ha medido. El buffer no cambia la latencia de
+la respuesta (sigue esperando una ida y vuelta; con 32 clientes paga aquí el
+``ObjectId`` de cada registro, que con Motor genera igualmente
+``insert_one``) pero baja las inserciones de una por petición a una por
+cada ``WRITE_BUFFER_MAX_ITEMS`` registros. Con la caché de estadísticas solo
+el primer intento de cada par (y uno por ``STATS_CACHE_TTL_SECONDS``) espera
+a MongoDB.
+
+Uso:
+    python -m benchmarks.bench_mongo_roundtrips [--mongo-uri mongodb://localhost:27017] [--clients 1 32]
+                                                [--requests 2000] [--rtt-ms 1]
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+from pymongo import ReturnDocument
+
+from app.db.stats_cache import StatsCache
+from app.db.write_buffer import WriteBehindBuffer
+from benchmarks.latency_collection import LatencyCollection
+
+_pending = set()
+_buffers = {}
+_caches = {}
+
+
+def registro(i: int) -> dict:
+    return {
+        "timestamp": datetime.utcnow(),
+        "nickname": f"alumno_{i % 50}",
+        "expected_label": f"clase_{i % 20}",
+        "predicted_label": f"clase_{i % 20}",
+        "confidence": 90.0,
+        "evaluation": "CORRECTO",
+        "observation": "",
+    }
+
+
+def stats_update(doc: dict):
+    stats_filter = {"expected_label": doc["expected_label"], "nickname": doc["nickname"]}
+    return stats_filter, {"$inc": {"total": 1, "correct": 1, "confidence_sum": doc["confidence"]}}
+
+
+async def legacy(collection, stats_collection, doc: dict) -> dict:
+    await collection.insert_one(doc)
+    stats_filter, update = stats_update(doc)
+    await stats_collection.update_one(stats_filter, update, upsert=True)
+    return await stats_collection.find_one(stats_filter)
+
+
+async def current(collection, stats_collection, doc: dict) -> dict:
+    task = asyncio.get_running_loop().create_task(collection.insert_one(doc))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+    stats_filter, update = stats_update(doc)
+    return await stats_collection.find_one_and_update(
+        stats_filter, update, upsert=True, return_document=ReturnDocument.AFTER
+    )
+
+
+async def buffered(collection, stats_collection, doc: dict) -> dict:
+    buffer = _buffers.get(id(collection))
+    if buffer is None:
+        buffer = _buffers[id(collection)] = WriteBehindBuffer(collection, spool_path=os.devnull)
+    buffer.add(doc)
+    stats_filter, update = stats_update(doc)
+    return await stats_collection.find_one_and_update(
+        stats_filter, update, upsert=True, return_document=ReturnDocument.AFTER
+    )
+
+
+async def cached(collection, stats_collection, doc: dict) -> dict:
+    buffer = _buffers.get(id(collection))
+    if buffer is None:
+        buffer = _buffers[id(collection)] = WriteBehindBuffer(collection, spool_path=os.devnull)
+    cache = _caches.get(id(stats_collection))
+    if cache is None:
+        cache = _caches[id(stats_collection)] = StatsCache(stats_collection)
+    buffer.add(doc)
+    stats_filter, update = stats_update(doc)
+    return await cache.increment((stats_filter["expected_label"], stats_filter["nickname"]), update["$inc"])
+
+
+async def run(mode_fn, collection, stats_collection, clients: int, requests: int):
+    latencies = []
+    counter = iter(range(requests))
+
+    async def client():
+        for i in counter:
+            started = time.perf_counter()
+            await mode_fn(collection, stats_collection, registro(i))
+            latencies.append((time.perf_counter() - started) * 1000.0)
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    while _pending:
+        await asyncio.gather(*list(_pending))
+    for buffer in list(_buffers.values()) + list(_caches.values()):
+        await buffer.close()
+    _buffers.clear()
+    _caches.clear()
+    return np.percentile(latencies, [50, 95])
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", default=None, help="mongod real; sin él, colecciones en memoria")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--rtt-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    client = None
+    if args.mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.mongo_uri)
+        db = client[f"bench_roundtrips_{uuid.uuid4().hex[:8]}"]
+
+    else:
+        print(f"⚠️ Sin --mongo-uri: colecciones en memoria con rtt simulado de {args.rtt_ms} ms, no un mongod")
+
+    print(f"{'clients':<8} {'mode':<9} {'p50 ms':>7} {'p95 ms':>8}   roundtrips/req   inserts/req")
+    try:
+        for clients in args.clients:
+            for name, mode_fn in (("legacy", legacy), ("current", current), ("buffered", buffered), ("cached", cached)):
+                if client is not None:
+                    await db.predictions.drop()
+                    await db.prediction_stats.drop()
+                    collection, stats_collection = db.predictions, db.prediction_stats
+                    # Una pasada corta para abrir conexiones del pool
+                    await run(mode_fn, collection, stats_collection, clients, clients * 10)
+                    # Con la caché depende de cuántas claves se repiten: solo se cuenta en memoria
+                    roundtrips = {"legacy": "3.00", "cached": "—"}.get(name, "1.00")
+                else:
+                    collection = LatencyCollection(args.rtt_ms / 1000.0)
+                    stats_collection = LatencyCollection(args.rtt_ms / 1000.0)
+                p50, p95 = await run(mode_fn, collection, stats_collection, clients, args.requests)
+                inserts = "—"
+                if client is None:
+                    # Solo las que esperan a la respuesta: el insert en segundo plano no cuenta
+                    awaited = sum(stats_collection.calls[m] for m in ("update_one", "find_one", "find_one_and_update"))
+                    awaited += collection.calls["insert_one"] if name == "legacy" else 0
+                    roundtrips = f"{awaited / args.requests:.2f}"
+                    inserts = f"{sum(collection.calls.values()) / args.requests:.3f}"
+                print(f"{clients:<8} {name:<9} {p50:7.2f} {p95:8.2f}   {roundtrips:>14}   {inserts:>11}")
+    finally:
+        if client is not None:
+            await client.drop_database(db.name)
+            client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
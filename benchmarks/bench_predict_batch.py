@@ -0,0 +1,110 @@
+"""
+Benchmark: puntuar N secuencias con ``/predict`` uno a uno vs ``/predict/batch``.
+
+    sequential   predict_sequence por cada secuencia, una detrás de otra (un cliente en bucle)
+    concurrent   predict_sequence para todas a la vez (el micro-batching las agrupa)
+    batch        predict_batch: validación, forward pass y escrituras en bloque
+
+Se mide (mediana de ``--repeats``) desde el JSON ya parseado hasta la
+respuesta, sin HTTP. MongoDB se sustituye por colecciones en memoria que
+esperan ``--rtt-ms`` por llamada (``benchmarks/latency_collection.py``).
+
+Resultado de referencia (1 vCPU, NumPy 1.26, motor NumPy, rtt 1 ms):
+    items   mode          total ms   µs/item
+    200     sequential      1581.9    7909.4
+    200     concurrent       171.3     856.6
+    200     batch             61.9     309.6
+
+El micro-batching ya agrupa las peticiones concurrentes en lotes de
+``BATCH_MAX_SIZE``; el lote explícito ahorra además la llamada a
+MongoDB de cada secuencia y la espera de ``BATCH_WINDOW_MS`` de cada lote.
+
+Uso:
+    python -m benchmarks.bench_predict_batch [--model ruta.h5|.npz|.bundle] [--items 200] [--rtt-ms 1] [--repeats 5]
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+from app.config import CNN_LSTM_MODEL_PATH  # noqa: E402
+from app.db.stats_cache import StatsCache  # noqa: E402
+from app.db.write_buffer import WriteBehindBuffer  # noqa: E402
+from app.models import schema  # noqa: E402
+from app.models.schema import PredictRequest  # noqa: E402
+from app.services import predictor  # noqa: E402
+from app.services.label_catalog import LabelCatalog  # noqa: E402
+from app.services.model_registry import ModelRegistry, ModelVersion  # noqa: E402
+from app.services.numpy_engine import NumpyCNNLSTM  # noqa: E402
+from benchmarks.latency_collection import LatencyCollection  # noqa: E402
+
+
+def load_engine(path: str) -> NumpyCNNLSTM:
+    if path.endswith(".bundle"):
+        from app.services.model_bundle import ModelBundle
+        return ModelBundle.load(path).build_numpy_engine()
+    return NumpyCNNLSTM.load(path)
+
+
+async def run(mode: str, items, rtt: float) -> float:
+    predictor.record_buffer = WriteBehindBuffer(LatencyCollection(rtt), spool_path=os.devnull)
+    predictor.stats_cache = StatsCache(LatencyCollection(rtt))
+    started = time.perf_counter()
+    if mode == "batch":
+        await predictor.predict_batch(items)
+    elif mode == "concurrent":
+        await asyncio.gather(*(predictor.predict_sequence(PredictRequest(**item)) for item in items))
+    else:
+        for item in items:
+            await predictor.predict_sequence(PredictRequest(**item))
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    # Los registros los inserta el buffer write-behind: no cuentan en la respuesta
+    await predictor.record_buffer.close()
+    await predictor.stats_cache.close()
+    return elapsed_ms
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=str(CNN_LSTM_MODEL_PATH))
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=1.0)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = load_engine(args.model)
+    n_classes = engine.predict(np.zeros((1, 35, 42), dtype=np.float32)).shape[-1]
+    labels = [f"clase_{i}" for i in range(n_classes)]
+
+    class Encoder:
+        classes_ = labels
+
+    registry = ModelRegistry()
+    await registry.swap(ModelVersion("bench", engine, Encoder(), engine.predict, stats=registry.stats))
+    predictor.model_registry = registry
+    schema.label_catalog = LabelCatalog.from_labels(labels)
+
+    rng = np.random.default_rng(0)
+    items = [
+        {"sequence": rng.standard_normal((35, 42)).tolist(), "expected_label": labels[i % n_classes],
+         "nickname": f"alumno_{i % 10}"}
+        for i in range(args.items)
+    ]
+
+    print(f"{'items':<7} {'mode':<12} {'total ms':>9} {'µs/item':>9}")
+    for mode in ("sequential", "concurrent", "batch"):
+        # predict_sequence imprime trazas en cada petición; no ensuciar la salida
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            # La primera pasada calienta el motor para el tamaño de lote
+            timings = [await run(mode, items, args.rtt_ms / 1000.0) for _ in range(args.repeats + 1)][1:]
+        total_ms = float(np.median(timings))
+        print(f"{args.items:<7} {mode:<12} {total_ms:9.1f} {total_ms * 1000.0 / args.items:9.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
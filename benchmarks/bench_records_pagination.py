@@ -0,0 +1,128 @@
+"""
+Benchmark: ``/records`` con ``skip`` frente a paginación por cursor (timestamp, _id).
+
+Necesita un ``mongod`` (``--mongo-uri``): crea una base de datos temporal con
+``--records`` registros repartidos entre 1000 alumnos, crea los índices de
+``app/db/indexes.py`` y mide p50/p95 de la consulta de una página a varias
+profundidades. El cursor de cada profundidad se obtiene antes (fuera de la
+medida) con un ``skip``. También mide el coste de ``X-Total-Count``:
+``count_documents`` por petición frente a ``estimated_document_count`` y la
+caché por filtro. La base de datos se borra al terminar.
+
+Resultado esperado: con ``skip`` la latencia crece con la profundidad
+(el servidor recorre y descarta ``skip`` entradas del índice); con el cursor
+cada página es un rango del índice y la latencia no depende de la página.
+No hay cifras de referencia: no se ha ejecutado en un entorno con ``mongod``.
+
+Uso:
+    python -m benchmarks.bench_records_pagination --mongo-uri mongodb://localhost:27017
+        [--records 1000000] [--limit 100] [--pages 1 10 100 1000 10000] [--repeats 20]
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+from app.api.endpoints.records import (  # noqa: E402
+    RECORDS_SORT, TotalCountCache, after_cursor, build_records_filter, encode_cursor,
+)
+from app.db import indexes  # noqa: E402
+
+EVALUATIONS = ("CORRECTO", "INCORRECTO", "DUDOSO")
+
+
+async def seed(collection, n: int, batch: int = 10000) -> None:
+    start = datetime(2024, 1, 1)
+    for offset in range(0, n, batch):
+        await collection.insert_many([
+            {
+                "nickname": f"alumno_{i % 1000}",
+                "expected_label": f"clase_{i % 20}",
+                "predicted_label": f"clase_{i % 20}",
+                "evaluation": EVALUATIONS[i % 3],
+                "confidence": 50.0 + i % 50,
+                # Varios registros por segundo: el _id desempata
+                "timestamp": start + timedelta(milliseconds=(i // 4) * 250),
+            }
+            for i in range(offset, min(offset + batch, n))
+        ], ordered=False)
+
+
+async def timed(fn, repeats: int):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await fn()
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return np.percentile(timings, [50, 95])
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", required=True)
+    parser.add_argument("--records", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    from motor.motor_asyncio import AsyncIOMotorClient
+    client = AsyncIOMotorClient(args.mongo_uri)
+    db = client[f"bench_records_{uuid.uuid4().hex[:8]}"]
+    collection = db.predictions
+    try:
+        started = time.perf_counter()
+        await seed(collection, args.records)
+        await indexes.ensure_indexes(db)
+        print(f"🌱 {args.records} registros e índices en {time.perf_counter() - started:.1f} s")
+
+        for label, mongo_filter in (("sin filtro", build_records_filter()),
+                                    ("nickname", build_records_filter(nickname="alumno_7"))):
+            total = await collection.count_documents(mongo_filter)
+            print(f"\n/records {label} ({total} registros)")
+            print(f"{'página':>8} {'skip p50':>9} {'skip p95':>9} {'cursor p50':>11} {'cursor p95':>11}")
+            for page in args.pages:
+                skip = (page - 1) * args.limit
+                if skip >= total:
+                    continue
+
+                async def by_skip():
+                    await collection.find(mongo_filter).sort(RECORDS_SORT).skip(skip).limit(args.limit + 1).to_list(None)
+
+                cursor = None
+                if skip:
+                    boundary = await collection.find(mongo_filter).sort(RECORDS_SORT).skip(skip - 1).limit(1).to_list(1)
+                    cursor = encode_cursor(boundary[0])
+
+                async def by_cursor():
+                    await collection.find(after_cursor(mongo_filter, cursor)).sort(RECORDS_SORT) \
+                        .limit(args.limit + 1).to_list(None)
+
+                skip_p50, skip_p95 = await timed(by_skip, args.repeats)
+                cursor_p50, cursor_p95 = await timed(by_cursor, args.repeats)
+                print(f"{page:>8} {skip_p50:9.2f} {skip_p95:9.2f} {cursor_p50:11.2f} {cursor_p95:11.2f}")
+
+        print("\nX-Total-Count")
+        mongo_filter = build_records_filter(nickname="alumno_7")
+        cache = TotalCountCache(ttl=60)
+        for label, fn in (
+            ("count_documents({})", lambda: collection.count_documents({})),
+            ("estimated_document_count", lambda: collection.estimated_document_count()),
+            ("count_documents(nickname)", lambda: collection.count_documents(mongo_filter)),
+            ("caché por filtro (nickname)", lambda: cache.get(collection, mongo_filter)),
+        ):
+            p50, p95 = await timed(fn, args.repeats)
+            print(f"{label:<30} p50 {p50:8.2f} ms  p95 {p95:8.2f} ms")
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,111 @@
+"""
+Microbenchmark: validación de ``PredictRequest.sequence``, bucle Python vs NumPy.
+
+    legacy_validator   validador anterior: List[List[float]] de pydantic + float() por valor
+    numpy_validator    to_sequence_array: una llamada a np.asarray + forma y finitud
+    legacy_request     PredictRequest anterior completo + np.array en predict_sequence
+    numpy_request      PredictRequest actual (el array queda en el modelo)
+
+Resultado de referencia (1 vCPU, Python 3.11, pydantic 2.7, mediana por secuencia):
+    frames=35
+      legacy_validator    101.4 µs
+      numpy_validator      79.8 µs
+      legacy_request      207.9 µs
+      numpy_request       105.5 µs
+    frames=140
+      legacy_validator    465.7 µs
+      numpy_validator     232.2 µs
+      legacy_request      656.8 µs
+      numpy_request       253.7 µs
+
+Convertir listas de Python a un array cuesta ~50 ns por valor y no se puede
+evitar con JSON; el ahorro está en no recorrer los valores dos veces (pydantic
++ float()) ni volver a convertir en predict_sequence, y crece con los frames.
+
+Uso:
+    python -m benchmarks.bench_sequence_validation [--repeats 2000] [--frames 35 140]
+"""
+import argparse
+import contextlib
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+from pydantic import BaseModel, validator
+
+from app.models import schema
+from app.services.label_catalog import LabelCatalog
+from app.models.schema import PredictRequest, to_sequence_array
+
+LABEL = "dolor_de_cabeza"
+
+
+def legacy_validate_sequence(value):
+    """Copia del validador anterior, para comparar."""
+    if len(value) < 30:
+        raise ValueError(f"La secuencia debe tener al menos 30 frames, pero se recibieron {len(value)}.")
+    for frame in value:
+        if len(frame) != 42:
+            raise ValueError(f"Cada frame en la secuencia debe tener exactamente 42 valores (keypoints), pero se encontró un frame con {len(frame)} valores.")
+        for i, val in enumerate(frame):
+            try:
+                frame[i] = float(val)
+            except Exception:
+                raise ValueError(f"Valor no convertible a float: {val}")
+    return value
+
+
+class LegacySequence(BaseModel):
+    sequence: List[List[float]]
+
+    @validator("sequence")
+    def validate_sequence(cls, value):
+        return legacy_validate_sequence(value)
+
+
+class LegacyPredictRequest(LegacySequence):
+    expected_label: str
+    nickname: Optional[str] = None
+
+    @validator("expected_label")
+    def validate_label(cls, value):
+        return schema.PredictRequest.validate_label(value)
+
+
+def measure(fn, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=2000)
+    parser.add_argument("--frames", type=int, nargs="+", default=[35, 140])
+    args = parser.parse_args()
+
+    schema.label_catalog = LabelCatalog.from_labels([LABEL])
+    rng = np.random.default_rng(0)
+    for frames in args.frames:
+        sequence = rng.standard_normal((frames, 42)).tolist()
+        cases = {
+            "legacy_validator": lambda: LegacySequence(sequence=sequence),
+            "numpy_validator": lambda: to_sequence_array(sequence),
+            "legacy_request": lambda: np.array(
+                LegacyPredictRequest(sequence=sequence, expected_label=LABEL).sequence, dtype=np.float32),
+            "numpy_request": lambda: PredictRequest(sequence=sequence, expected_label=LABEL).sequence_array(),
+        }
+        print(f"frames={frames}")
+        for name, fn in cases.items():
+            # El validador de etiquetas imprime en cada petición; no ensuciar la salida
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                usec = measure(fn, args.repeats)
+            print(f"  {name:<18} {usec:8.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
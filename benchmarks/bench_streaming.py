@@ -0,0 +1,112 @@
+"""
+Benchmark: coste por frame del reconocimiento en vivo, ventana deslizante vs incremental.
+
+Una sesión recibe frames de uno en uno y quiere una predicción cada ``stride``
+frames sobre los últimos 35 (las mismas predicciones en ambos modos):
+
+    window       NumpyCNNLSTM.predict sobre la ventana completa cada ``stride`` frames
+    incremental  IncrementalState.push en cada frame (carriles con estado conv + LSTM)
+
+Se mide, para una sola sesión y sin batching, el tiempo de cada frame:
+``mean`` es el coste amortizado y ``p99``/``max`` el pico que paga el frame
+que dispara la predicción.
+
+Resultado de referencia (1 vCPU, NumPy 1.26, cnn_lstm_model.h5 sin normalización):
+    stride  mode          mean µs   p50 µs   p99 µs   max µs
+    4       window          131.9      1.9    736.8   3049.8
+    4       incremental      75.2     27.0    290.1   5048.6
+    5       window          132.8      2.0    816.7   2424.9
+    5       incremental     201.1    199.2    317.3   3837.4
+
+Con stride múltiplo de 4 (el stride total de los MaxPool) todas las ventanas
+comparten un flujo convolucional y el modo incremental cuesta algo más de la
+mitad por frame. Con stride 5 hacen falta cuatro flujos, uno por desfase, y
+sale más caro que la ventana completa.
+
+Los bundles de ``train_cnn_lstm_model`` traen un z-score por posición
+(35, 42) y cada ventana necesita su propio flujo convolucional. Mismos pesos
+en un bundle con z-score (35, 42):
+    stride  mode          mean µs   p50 µs   p99 µs   max µs
+    4       window          176.1      3.5    726.6   4820.4
+    4       incremental     430.2    256.3   1227.1   2784.0
+    5       window          135.8      2.1    704.2   1053.6
+    5       incremental     307.7    282.9    503.3   1787.9
+
+Ahí el modo incremental es 2-2.5x más lento, así que ``build_streaming_engine``
+no lo ofrece para esos modelos y las sesiones usan la ventana completa (la
+última línea de la salida indica el modo que usaría el servidor). La tabla
+se tomó con mean/std sintéticos porque el dataset no está en el repositorio;
+el coste solo depende de la forma del z-score.
+
+Uso:
+    python -m benchmarks.bench_streaming [--model ruta.h5|.npz|.bundle] [--frames 2000] [--strides 4 5]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.config import CNN_LSTM_MODEL_PATH, SEQUENCE_FRAMES
+from app.services.numpy_engine import NumpyCNNLSTM
+from app.services.streaming import FrameRingBuffer
+from app.services.streaming_engine import StreamingCNNLSTM, build_streaming_engine
+
+
+def load_engine(path: str) -> NumpyCNNLSTM:
+    if path.endswith(".bundle"):
+        from app.services.model_bundle import ModelBundle
+        return ModelBundle.load(path).build_numpy_engine()
+    return NumpyCNNLSTM.load(path)
+
+
+def run_window(engine, frames, stride):
+    buffer = FrameRingBuffer(SEQUENCE_FRAMES)
+    timings = []
+    for frame in frames:
+        started = time.perf_counter()
+        buffer.push(frame)
+        if buffer.full and (buffer.count - SEQUENCE_FRAMES) % stride == 0:
+            engine.predict(buffer.view())
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def run_incremental(streaming, frames, stride):
+    state = streaming.new_state(stride)
+    timings = []
+    for frame in frames:
+        started = time.perf_counter()
+        state.push(frame)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=str(CNN_LSTM_MODEL_PATH))
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--strides", type=int, nargs="+", default=[4, 5])
+    args = parser.parse_args()
+
+    engine = load_engine(args.model)
+    streaming = StreamingCNNLSTM.from_engine(engine)
+    frames = np.random.default_rng(0).standard_normal((args.frames, 42)).astype(np.float32)
+
+    print(f"{'stride':<7} {'mode':<12} {'mean µs':>8} {'p50 µs':>8} {'p99 µs':>8} {'max µs':>8}")
+    for stride in args.strides:
+        for mode, run in (("window", lambda: run_window(engine, frames, stride)),
+                          ("incremental", lambda: run_incremental(streaming, frames, stride))):
+            run()  # calentamiento
+            usec = np.array(run()[SEQUENCE_FRAMES:]) * 1e6
+            print(f"{stride:<7} {mode:<12} {usec.mean():8.1f} {np.percentile(usec, 50):8.1f} "
+                  f"{np.percentile(usec, 99):8.1f} {usec.max():8.1f}")
+
+    try:
+        build_streaming_engine(engine)
+        print("Modo servido con STREAM_INFERENCE=incremental: incremental")
+    except ValueError as e:
+        print(f"Modo servido con STREAM_INFERENCE=incremental: window ({e})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: coste de parsear el cuerpo de ``/predict`` hasta tener el array (35, 42).
+
+Mide cuerpo -> ``PredictRequest`` validado -> ``sequence_array()`` para cada formato:
+
+    json_lists        json.loads + PredictRequest(**payload) (camino anterior de FastAPI)
+    json_lists_rust   PredictRequest.model_validate_json (camino actual para JSON)
+    json_b64          JSON con ``sequence_b64`` (formato binario float32 en base64)
+    binary_float32    application/octet-stream float32, decodificado sin copia
+    binary_int16      application/octet-stream int16 cuantizado
+
+La validación de la etiqueta usa un catálogo fijo en memoria para medir solo el
+parseo de la secuencia.
+
+Resultado de referencia (1 vCPU, Python 3.11, pydantic 2.7, mediana por petición):
+    json_lists        bytes 30446   1053.0 µs
+    json_lists_rust   bytes 30446    462.3 µs
+    json_b64          bytes  7921     65.9 µs
+    binary_float32    bytes  5896     25.9 µs
+    binary_int16      bytes  2956     28.2 µs
+
+El cuerpo binario es 5x más pequeño y se parsea ~40x más rápido que el JSON
+de listas; lo que queda es sobre todo el coste fijo de pydantic.
+
+Uso:
+    python -m benchmarks.bench_wire_format [--repeats 2000]
+"""
+import argparse
+import base64
+import contextlib
+import json
+import os
+import time
+
+import numpy as np
+
+from app.models import schema
+from app.services.label_catalog import LabelCatalog
+from app.models.schema import PredictRequest
+from app.utils.wire_format import decode_sequence, encode_sequence
+
+LABEL = "dolor_de_cabeza"
+
+
+def build_cases(sequence: np.ndarray) -> dict:
+    lists = json.dumps({"sequence": sequence.tolist(), "expected_label": LABEL}).encode()
+    b64 = json.dumps({
+        "sequence_b64": base64.b64encode(encode_sequence(sequence)).decode(),
+        "expected_label": LABEL,
+    }).encode()
+    float32_body = encode_sequence(sequence)
+    int16_body = encode_sequence(sequence, dtype="int16")
+    return {
+        "json_lists": (lists, lambda body: PredictRequest(**json.loads(body))),
+        "json_lists_rust": (lists, PredictRequest.model_validate_json),
+        "json_b64": (b64, PredictRequest.model_validate_json),
+        "binary_float32": (float32_body, lambda body: PredictRequest.from_array(decode_sequence(body), LABEL)),
+        "binary_int16": (int16_body, lambda body: PredictRequest.from_array(decode_sequence(body), LABEL)),
+    }
+
+
+def measure(parse, body, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        parse(body).sequence_array()
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+
+    schema.label_catalog = LabelCatalog.from_labels([LABEL])
+    sequence = np.random.default_rng(0).standard_normal((35, 42)).astype(np.float32)
+    for name, (body, parse) in build_cases(sequence).items():
+        # El validador de etiquetas imprime en cada petición; no ensuciar la salida
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            usec = measure(parse, body, args.repeats)
+        print(f"{name:<16}  bytes {len(body):5d}  {usec:8.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Colección en memoria que imita a Motor con una latencia fija por llamada.
+
+Sustituye a MongoDB en los benchmarks cuando no hay un ``mongod`` a mano:
+cada método espera ``rtt`` segundos (una ida y vuelta) y mantiene los
+contadores de ``prediction_stats`` para que las respuestas sean realistas.
+``calls`` cuenta las idas y vueltas por método.
+"""
+import asyncio
+from collections import Counter
+
+
+class LatencyCollection:
+    """Colección en memoria con una latencia fija por llamada."""
+
+    def __init__(self, rtt: float):
+        self.rtt = rtt
+        self.stats = {}
+        self.calls = Counter()
+
+    async def _roundtrip(self, method: str) -> None:
+        self.calls[method] += 1
+        await asyncio.sleep(self.rtt)
+
+    def _inc(self, filt, update) -> dict:
+        stat = self.stats.setdefault((filt["expected_label"], filt["nickname"]),
+                                     {"total": 0, "correct": 0, "confidence_sum": 0.0})
+        for key, value in update["$inc"].items():
+            stat[key] += value
+        return stat
+
+    async def insert_one(self, doc):
+        await self._roundtrip("insert_one")
+
+    async def insert_many(self, docs, ordered=True):
+        await self._roundtrip("insert_many")
+
+    async def update_one(self, filt, update, upsert=False):
+        await self._roundtrip("update_one")
+        self._inc(filt, update)
+
+    async def find_one_and_update(self, filt, update, upsert=False, return_document=None):
+        await self._roundtrip("find_one_and_update")
+        return dict(self._inc(filt, update))
+
+    async def bulk_write(self, requests, ordered=True):
+        await self._roundtrip("bulk_write")
+        for op in requests:
+            self._inc(op._filter, op._doc)
+
+    async def find_one(self, filt):
+        await self._roundtrip("find_one")
+        return self.stats.get((filt["expected_label"], filt["nickname"]), {})
+
+    async def find(self, filt):
+        await self._roundtrip("find")
+        for f in filt["$or"]:
+            key = (f["expected_label"], f["nickname"])
+            if key in self.stats:
+                yield {"expected_label": key[0], "nickname": key[1], **self.stats[key]}
+
+
+__all__ = ["LatencyCollection"]
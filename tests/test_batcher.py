@@ -0,0 +1,117 @@
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.services.batcher import InferenceBatcher
+
+
+class RecordingModel:
+    """Devuelve como 'probabilidades' el primer valor de cada secuencia."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, batch):
+        self.calls.append(batch.shape)
+        return batch[:, 0, :3]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_forward_pass():
+    model = RecordingModel()
+    batcher = InferenceBatcher(model, window_ms=20, max_batch_size=16)
+
+    seqs = [np.full((35, 42), i, dtype=np.float32) for i in range(5)]
+    results = await asyncio.gather(*(batcher.submit(s) for s in seqs))
+
+    assert model.calls == [(5, 35, 42)]
+    for i, row in enumerate(results):
+        assert np.allclose(row, i)
+
+    stats = batcher.stats.snapshot()
+    assert stats["total_batches"] == 1
+    assert stats["total_requests"] == 5
+    assert stats["batch_size_histogram"] == {5: 1}
+    assert stats["queue_wait_ms"]["p99"] is not None
+
+
+@pytest.mark.asyncio
+async def test_max_batch_size_splits_batches():
+    model = RecordingModel()
+    batcher = InferenceBatcher(model, window_ms=20, max_batch_size=2)
+
+    seqs = [np.zeros((35, 42), dtype=np.float32) for _ in range(5)]
+    await asyncio.gather(*(batcher.submit(s) for s in seqs))
+
+    assert [shape[0] for shape in model.calls] == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_forward_errors_propagate_to_every_caller():
+    def failing(batch):
+        raise RuntimeError("boom")
+
+    batcher = InferenceBatcher(failing, window_ms=5)
+    seqs = [np.zeros((35, 42), dtype=np.float32) for _ in range(3)]
+    results = await asyncio.gather(*(batcher.submit(s) for s in seqs), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_thread_executor_runs_forward_off_the_event_loop():
+    import threading
+    from app.services.inference_executor import InferenceExecutor
+
+    threads = []
+
+    def forward(batch):
+        threads.append(threading.current_thread().name)
+        return batch[:, 0, :3]
+
+    executor = InferenceExecutor(kind="thread", max_concurrency=2)
+    batcher = InferenceBatcher(forward, window_ms=1, executor=executor)
+    try:
+        await batcher.submit(np.ones((35, 42), dtype=np.float32))
+    finally:
+        executor.shutdown()
+
+    assert threads and threads[0].startswith("inference")
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_queued_requests_and_restarts_on_submit():
+    model = RecordingModel()
+    batcher = InferenceBatcher(model, window_ms=50, max_batch_size=16)
+
+    seqs = [np.full((35, 42), i, dtype=np.float32) for i in range(3)]
+    pending = [asyncio.ensure_future(batcher.submit(s)) for s in seqs]
+    await asyncio.sleep(0)
+    await batcher.close()
+
+    results = await asyncio.gather(*pending)
+    assert [float(r[0]) for r in results] == [0.0, 1.0, 2.0]
+    assert batcher._worker.done()
+
+    # Tras cerrar, un submit nuevo levanta otro worker
+    assert float((await batcher.submit(seqs[1]))[0]) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_run_batch_is_one_call_alongside_idle_worker():
+    model = RecordingModel()
+    batcher = InferenceBatcher(model, window_ms=5, max_batch_size=2)
+    # El worker ocioso retiene su slot mientras espera la cola
+    await batcher.submit(np.zeros((35, 42), dtype=np.float32))
+
+    batch = np.stack([np.full((35, 42), i, dtype=np.float32) for i in range(5)])
+    outputs = await asyncio.wait_for(batcher.run_batch(batch), 1.0)
+
+    assert model.calls[-1] == (5, 35, 42)
+    assert np.allclose(outputs[:, 0], np.arange(5))
+    assert batcher.stats.total_requests == 6
+    await batcher.close()
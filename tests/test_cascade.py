@@ -0,0 +1,126 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.services.cascade import ModelCascade, build_cascade, calibrate_thresholds, cascade_report
+from app.services.model_registry import ModelVersion
+from app.services.numpy_engine import DENSE, LSTM, NumpyCNNLSTM
+
+
+def one_hot_probs(pred, conf, classes=3):
+    probs = np.full((len(pred), classes), 0.0)
+    probs[np.arange(len(pred)), pred] = conf
+    return probs
+
+
+def test_calibration_accepts_confident_correct_classes_only():
+    y = np.array([0, 0, 0, 0, 1, 1, 1, 1])
+    big = one_hot_probs(y, 1.0)
+    # Clase 0: el modelo pequeño acierta con confianza alta; clase 1: se equivoca con confianza alta
+    small = one_hot_probs(np.array([0, 0, 0, 0, 0, 0, 1, 1]), np.array([.99, .98, .97, .9, .95, .6, .9, .8]))
+
+    thresholds = calibrate_thresholds(small, big, y, max_accuracy_loss=0.0)
+    assert thresholds[0] == pytest.approx(0.97)
+    assert thresholds[1] == pytest.approx(0.8)
+    assert np.isinf(thresholds[2])
+    report = cascade_report(small, big, y, thresholds)
+    assert report["accuracy_loss"] == 0.0
+    assert report["escalation_rate"] == pytest.approx(3 / 8)
+
+    # Con presupuesto de un error se acepta la clase 0 entera
+    thresholds = calibrate_thresholds(small, big, y, max_accuracy_loss=1 / 8)
+    report = cascade_report(small, big, y, thresholds)
+    assert report["accuracy_loss"] <= 1 / 8
+    assert report["escalation_rate"] < 3 / 8
+
+
+def test_calibration_respects_min_confidence():
+    y = np.zeros(4, dtype=int)
+    big = one_hot_probs(y, 1.0)
+    small = one_hot_probs(y, np.array([0.9, 0.7, 0.45, 0.3]))
+    thresholds = calibrate_thresholds(small, big, y, max_accuracy_loss=0.0, min_confidence=0.5)
+    assert thresholds[0] == pytest.approx(0.7)
+
+
+class Recorder:
+    def __init__(self, fn):
+        self.fn = fn
+        self.calls = []
+
+    def __call__(self, batch):
+        self.calls.append(len(batch))
+        return self.fn(batch)
+
+
+def make_version():
+    # El pequeño está seguro de la clase 0 si el primer valor es positivo; el grande devuelve la clase 2
+    small = Recorder(lambda b: np.where(b[:, :1, 0] > 0, [[0.95, 0.05, 0.0]], [[0.6, 0.4, 0.0]]))
+    big = Recorder(lambda b: np.tile([0.0, 0.0, 1.0], (len(b), 1)))
+
+    class Encoder:
+        classes_ = ["a", "b", "c"]
+
+    version = ModelVersion("v", None, Encoder(), big)
+    version.cascade = ModelCascade(small, version.labels, {"per_class": {"a": 90.0}})
+    return version, small, big
+
+
+@pytest.mark.asyncio
+async def test_version_submit_escalates_only_uncertain_sequences():
+    version, small, big = make_version()
+
+    clear = await version.submit(np.ones((35, 42), dtype=np.float32))
+    doubtful = await version.submit(-np.ones((35, 42), dtype=np.float32))
+
+    assert np.argmax(clear) == 0
+    assert np.argmax(doubtful) == 2
+    assert big.calls == [1]
+    assert version.cascade.snapshot()["escalation_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_version_run_batch_sends_only_escalated_rows_to_big_model():
+    version, small, big = make_version()
+    batch = np.stack([np.full((35, 42), v, dtype=np.float32) for v in (1, -1, 1, -1, -1)])
+
+    probabilities = await version.run_batch(batch)
+
+    assert list(np.argmax(probabilities, axis=1)) == [0, 2, 0, 2, 2]
+    assert small.calls == [5]
+    assert big.calls == [3]
+    assert version.cascade.stats.escalated == 3
+
+
+def small_engine(classes):
+    rng = np.random.default_rng(0)
+
+    def w(*shape):
+        return (rng.standard_normal(shape) * 0.3).astype(np.float32)
+
+    # LSTM(16) + Dense, la topología de train_lstm_model en pequeño
+    return NumpyCNNLSTM([
+        (LSTM, w(42, 64), w(16, 64), w(64), False),
+        (DENSE, w(16, 8), w(8), "relu"),
+        (DENSE, w(8, classes), w(classes), "softmax"),
+    ])
+
+
+def test_build_cascade_checks_classes_and_prepends_bundle_affine(tmp_path):
+    weights = str(tmp_path / "lstm_model.npz")
+    engine = small_engine(3)
+    engine.save_npz(weights)
+    thresholds = {"per_class": {"a": 90.0}}
+
+    with pytest.raises(ValueError):
+        build_cascade("", weights, ["a", "b"], thresholds)
+    with pytest.raises(ValueError):
+        build_cascade("", weights, ["a", "b", "c"], {})
+
+    scale = np.full((35, 42), 2.0, dtype=np.float32)
+    shift = np.full((35, 42), -1.0, dtype=np.float32)
+    cascade = build_cascade("", weights, ["a", "b", "c"], thresholds, input_affine=(scale, shift))
+    x = np.random.default_rng(1).standard_normal((2, 35, 42)).astype(np.float32)
+    assert np.allclose(cascade.inference_fn(x), engine.predict(x * 2.0 - 1.0), atol=1e-6)
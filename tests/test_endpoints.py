@@ -13,16 +13,28 @@ class DummyEncoder:
     def inverse_transform(self, arr):
         return ["test"]
 
-sys.modules['app.services.model_loader'] = type('ML', (), {'model': DummyModel(), 'encoder': DummyEncoder()})()
+sys.modules['app.services.model_loader'] = type('ML', (), {
+    'model': DummyModel(),
+    'encoder': DummyEncoder(),
+    'get_model': staticmethod(lambda: DummyModel()),
+    'get_encoder': staticmethod(lambda: DummyEncoder()),
+    'get_inference_fn': staticmethod(lambda: DummyModel().predict),
+})()
 
 # Provide dummy database layer so importing app.main does not require Motor/MongoDB
 class DummyCollection:
     async def insert_one(self, doc):
         pass
+    async def insert_many(self, docs, ordered=True):
+        pass
+    async def bulk_write(self, requests, ordered=True):
+        pass
     async def update_one(self, *a, **kw):
         pass
     async def find_one(self, filt):
         return {}
+    async def find_one_and_update(self, *a, **kw):
+        return {}
     def find(self, *a, **kw):
         class C:
             async def __aiter__(self):
@@ -47,12 +59,23 @@ class DummyCollection:
     async def count_documents(self, f):
         return 0
 
+from app.db.global_counters import GlobalCounters
+from app.db.progress_rollups import ProgressRollups
+from app.db.stats_cache import StatsCache
+from app.db.write_buffer import WriteBehindBuffer
+
 sys.modules['app.db.mongodb'] = type('DB', (), {
     'collection': DummyCollection(),
     'stats_collection': DummyCollection(),
+    'record_buffer': WriteBehindBuffer(DummyCollection()),
+    'stats_cache': StatsCache(DummyCollection()),
+    'progress_collection': DummyCollection(),
+    'progress_rollups': ProgressRollups(DummyCollection()),
+    'global_counters': GlobalCounters(DummyCollection()),
 })()
 
 from app.main import app
+from app.services.predictor import model_registry
 
 
 client = TestClient(app)
@@ -62,3 +85,453 @@ def test_health_check():
     resp = client.get("/health")
     assert resp.status_code == 200
     assert resp.json() == {"status": "ok"}
+
+
+def test_ready_is_503_until_warm():
+    model_registry.status.update(ready=False, loading=True)
+    resp = client.get("/ready")
+    assert resp.status_code == 503
+    assert resp.json()["ready"] is False
+
+
+def test_ready_reports_durations():
+    model_registry.status.update(ready=True, loading=False, load_ms=120.5, warmup_ms=30.0)
+    resp = client.get("/ready")
+    assert resp.status_code == 200
+    assert resp.json()["load_ms"] == 120.5
+    assert resp.json()["warmup_ms"] == 30.0
+
+
+def test_admin_endpoints_disabled_without_token():
+    resp = client.post("/admin/models/activate", json={"version": "v2"})
+    assert resp.status_code == 403
+
+
+def test_admin_activate_rejects_path_traversal(monkeypatch):
+    from app.api.endpoints import admin
+
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "secreto")
+    resp = client.post("/admin/models/activate", json={"version": "../../x"}, headers={"X-Admin-Token": "secreto"})
+    assert resp.status_code == 400
+
+def test_predict_binary_requires_expected_label():
+    from app.utils.wire_format import encode_sequence
+
+    body = encode_sequence([[0.0] * 42] * 35)
+    resp = client.post("/predict", content=body, headers={"Content-Type": "application/octet-stream"})
+    assert resp.status_code == 422
+
+
+def test_predict_binary_rejects_malformed_body():
+    resp = client.post("/predict?expected_label=lbl", content=b"SGN1",
+                       headers={"Content-Type": "application/octet-stream"})
+    assert resp.status_code == 400
+
+
+def test_predict_batch_reports_item_errors():
+    resp = client.post("/predict/batch", json={"items": []})
+    assert resp.status_code == 422
+
+    resp = client.post("/predict/batch", json={"items": [
+        {"sequence": [[1.0] * 42] * 10, "expected_label": "lbl"},
+        {"expected_label": "lbl"},
+    ]})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert (body["total"], body["succeeded"], body["failed"]) == (2, 0, 2)
+    assert all(item["error"] and item["result"] is None for item in body["results"])
+
+
+def test_labels_served_from_catalog(monkeypatch):
+    from app.api.endpoints import labels
+    from app.services.label_catalog import LabelCatalog
+
+    catalog = LabelCatalog.from_labels(["mareo", "dolor"], levels={"mareo": "avanzado", "dolor": "principiante"})
+    monkeypatch.setattr(labels, "label_catalog", catalog)
+    resp = client.get("/labels")
+    assert resp.status_code == 200
+    assert [e["label"] for e in resp.json()] == ["mareo", "dolor"]
+
+
+def test_ws_predict_streams_predictions(monkeypatch):
+    import numpy as np
+    from app.services import streaming
+
+    windows = []
+
+    async def fake_predict_window(window, expected_label=None):
+        windows.append(window)
+        return {"predicted_label": "dolor", "confidence": 90.0, "recognized": True, "model_version": "v"}
+
+    monkeypatch.setattr(streaming, "predict_window", fake_predict_window)
+    frames = np.tile(np.arange(40, dtype="<f4")[:, None], (1, 42))
+    with client.websocket_connect("/ws/predict?stride=5") as ws:
+        assert ws.receive_json()["type"] == "ready"
+        ws.send_bytes(frames[:35].tobytes())
+        first = ws.receive_json()
+        ws.send_json({"frames": frames[35:].tolist()})
+        second = ws.receive_json()
+
+    assert (first["type"], first["frame"], first["predicted_label"]) == ("prediction", 35, "dolor")
+    assert second["frame"] == 40
+    assert windows[1][0, 0] == 5.0 and windows[1][-1, 0] == 39.0
+
+
+def test_ws_predict_reports_non_object_json_and_keeps_the_session(monkeypatch):
+    from app.services import streaming
+
+    async def fake_predict_window(window, expected_label=None):
+        return {"predicted_label": "dolor", "confidence": 90.0, "recognized": True, "model_version": "v"}
+
+    monkeypatch.setattr(streaming, "predict_window", fake_predict_window)
+    with client.websocket_connect("/ws/predict?stride=5") as ws:
+        assert ws.receive_json()["type"] == "ready"
+        ws.send_json([[0.5] * 42] * 35)
+        error = ws.receive_json()
+        ws.send_text("7")
+        assert ws.receive_json()["type"] == "error"
+        # La sesión sigue abierta después de los errores
+        ws.send_json({"frames": [[0.5] * 42] * 35})
+        prediction = ws.receive_json()
+
+    assert error["type"] == "error" and "objeto" in error["detail"]
+    assert (prediction["type"], prediction["frame"]) == ("prediction", 35)
+
+
+def test_ws_predict_rejects_over_session_limit(monkeypatch):
+    from app.services import streaming
+
+    monkeypatch.setattr(streaming, "stream_sessions", streaming.SessionLimiter(max_sessions=0))
+    with client.websocket_connect("/ws/predict") as ws:
+        assert ws.receive_json()["type"] == "error"
+
+
+def test_ws_predict_incremental_mode(monkeypatch):
+    import threading
+
+    import numpy as np
+    from app.services import streaming
+    from app.services.model_registry import ModelVersion
+    from app.services.streaming_engine import StreamingCNNLSTM
+    from tests.test_streaming_engine import random_engine
+
+    engine = random_engine()
+
+    class Encoder:
+        classes_ = ["a", "b", "c", "d", "e"]
+
+    version = ModelVersion("v-stream", engine, Encoder(), engine.predict)
+    version.streaming_engine = StreamingCNNLSTM.from_engine(engine)
+
+    async def fake_incremental_version():
+        return version
+
+    monkeypatch.setattr(streaming, "incremental_version", fake_incremental_version)
+    from app.services import predictor
+
+    threads = []
+    executor_run = predictor.inference_executor.run
+
+    async def traced_run(fn, batch):
+        def traced(frames):
+            threads.append(threading.current_thread().name)
+            return fn(frames)
+        return await executor_run(traced, batch)
+
+    monkeypatch.setattr(predictor.inference_executor, "run", traced_run)
+    frames = np.random.default_rng(0).standard_normal((39, 42)).astype("<f4")
+    with client.websocket_connect("/ws/predict?stride=4") as ws:
+        assert ws.receive_json()["mode"] == "incremental"
+        ws.send_bytes(frames.tobytes())
+        first = ws.receive_json()
+        second = ws.receive_json()
+
+    expected = engine.predict(frames[4:39])[0]
+    assert (first["frame"], second["frame"]) == (35, 39)
+    assert second["model_version"] == "v-stream"
+    assert second["predicted_label"] == Encoder.classes_[int(np.argmax(expected))]
+    assert second["confidence"] == round(float(expected.max()) * 100, 2)
+    # Los pasos incrementales corren en el executor de inferencia, no en el event loop
+    assert len(threads) == 1 and threads[0].startswith("inference")
+
+
+class RecordsCollection:
+    """predictions en memoria con el subconjunto de operadores que usa /records."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.finds = []
+
+    @classmethod
+    def matches(cls, doc, filt):
+        ops = {"$lt": lambda a, b: a < b, "$lte": lambda a, b: a <= b, "$gte": lambda a, b: a >= b}
+        for key, cond in filt.items():
+            if key == "$and":
+                if not all(cls.matches(doc, f) for f in cond):
+                    return False
+            elif key == "$or":
+                if not any(cls.matches(doc, f) for f in cond):
+                    return False
+            elif isinstance(cond, dict):
+                value = doc[key]
+                if key == "timestamp":
+                    cond = {op: v.replace(tzinfo=None) for op, v in cond.items()}
+                if not all(ops[op](value, v) for op, v in cond.items()):
+                    return False
+            elif doc.get(key) != cond:
+                return False
+        return True
+
+    def find(self, filt, projection=None):
+        self.finds.append(filt)
+        docs = sorted((d for d in self.docs if self.matches(d, filt)),
+                      key=lambda d: (d["timestamp"], d["_id"]), reverse=True)
+        if projection:
+            docs = [{k: v for k, v in d.items() if k == "_id" or k in projection} for d in docs]
+        outer = self
+
+        class Cursor:
+            def __init__(self):
+                self.docs = [dict(d) for d in docs]
+
+            def sort(self, *a, **kw):
+                return self
+
+            def batch_size(self, n):
+                outer.batch_size = n
+                return self
+
+            def skip(self, n):
+                outer.skipped = n
+                return self
+
+            def limit(self, n):
+                self.docs = [dict(d) for d in docs[:n]]
+                return self
+
+            async def __aiter__(self):
+                for doc in self.docs:
+                    yield doc
+        return Cursor()
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+    async def count_documents(self, filt):
+        self.counts = getattr(self, "counts", 0) + 1
+        return sum(1 for d in self.docs if self.matches(d, filt))
+
+
+def test_records_keyset_pagination_walks_every_record_once(monkeypatch):
+    from datetime import datetime, timedelta
+    from bson import ObjectId
+    from app.api.endpoints import records
+
+    base = datetime(2025, 1, 1)
+    # Timestamps repetidos de tres en tres: el _id desempata
+    docs = [{"_id": ObjectId(), "timestamp": base + timedelta(seconds=i // 3), "nickname": "ana" if i % 2 else "beto",
+             "evaluation": "CORRECTO"} for i in range(25)]
+    fake = RecordsCollection(docs)
+    monkeypatch.setattr(records, "collection", fake)
+    monkeypatch.setattr(records, "total_counts", records.TotalCountCache(ttl=60))
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+        resp = client.get("/records", params=params)
+        assert resp.status_code == 200
+        assert resp.headers["X-Total-Count"] == "25"
+        seen += [r["_id"] for r in resp.json()]
+        pages += 1
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    expected = [str(d["_id"]) for d in sorted(docs, key=lambda d: (d["timestamp"], d["_id"]), reverse=True)]
+    assert seen == expected
+    assert pages == 3
+
+    # Con filtro el total sale de count_documents una vez y después de la caché
+    for _ in range(2):
+        resp = client.get("/records", params={"nickname": "ana", "limit": 5})
+        assert resp.headers["X-Total-Count"] == "12"
+    assert fake.counts == 1
+    assert "X-Total-Count" not in client.get("/records", params={"include_total": "false"}).headers
+
+
+def test_records_rejects_invalid_cursor():
+    resp = client.get("/records", params={"cursor": "no-es-un-cursor"})
+    assert resp.status_code == 400
+
+
+def _export_docs():
+    from datetime import datetime, timedelta
+    from bson import ObjectId
+
+    base = datetime(2025, 1, 1)
+    return [{"_id": ObjectId(), "timestamp": base + timedelta(minutes=i), "nickname": "ana" if i % 2 else "beto",
+             "expected_label": "dolor", "predicted_label": "dolor", "evaluation": "CORRECTO",
+             "confidence": 90.0 + i, "observation": None, "model_version": "v1",
+             "sequence_shape": [35, 42]} for i in range(7)]
+
+
+def test_records_export_streams_ndjson_with_projection(monkeypatch):
+    import json
+    from app.api.endpoints import records
+    from app.services import record_export
+
+    fake = RecordsCollection(_export_docs())
+    monkeypatch.setattr(records, "collection", fake)
+    # Trozos de 3 filas: la respuesta llega en varios trozos
+    monkeypatch.setattr(record_export.ndjson_chunks, "__defaults__", (3,))
+
+    resp = client.get("/records/export", params={"nickname": "ana"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    assert 'filename="predictions.ndjson"' in resp.headers["content-disposition"]
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["nickname"] for r in rows] == ["ana"] * 3
+    assert list(rows[0]) == list(record_export.EXPORT_FIELDS)
+    assert rows[0]["timestamp"] == "2025-01-01T00:05:00+00:00"
+    assert fake.batch_size == records.EXPORT_BATCH_SIZE
+
+
+def test_records_export_csv(monkeypatch):
+    import csv
+    import io
+    from app.api.endpoints import records
+    from app.services import record_export
+
+    monkeypatch.setattr(records, "collection", RecordsCollection(_export_docs()))
+    resp = client.get("/records/export", params={"format": "csv", "evaluation": "CORRECTO"})
+    assert resp.status_code == 200
+    rows = list(csv.reader(io.StringIO(resp.text)))
+    assert rows[0] == list(record_export.EXPORT_FIELDS)
+    assert len(rows) == 8
+    assert rows[1][record_export.EXPORT_FIELDS.index("observation")] == ""
+
+    # Sin resultados: solo la cabecera
+    resp = client.get("/records/export", params={"format": "csv", "evaluation": "DUDOSO"})
+    assert resp.text.splitlines() == [",".join(record_export.EXPORT_FIELDS)]
+
+
+def test_records_export_parquet_row_groups(monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    import io
+    from app.api.endpoints import records
+    from app.services import record_export
+
+    monkeypatch.setattr(records, "collection", RecordsCollection(_export_docs()))
+    monkeypatch.setattr(record_export.parquet_chunks, "__defaults__", (3,))
+    resp = client.get("/records/export", params={"format": "parquet"})
+    assert resp.status_code == 200
+    parquet = pq.ParquetFile(io.BytesIO(resp.content))
+    assert parquet.metadata.num_rows == 7
+    assert parquet.metadata.num_row_groups == 3
+
+
+def test_records_export_parquet_without_pyarrow(monkeypatch):
+    from app.api.endpoints import records
+
+    monkeypatch.setattr(records, "parquet_available", lambda: False)
+    resp = client.get("/records/export", params={"format": "parquet"})
+    assert resp.status_code == 501
+
+
+def test_progress_reads_rollups(monkeypatch):
+    from datetime import datetime
+    from app.api.endpoints import progress
+
+    rollup = {"nickname": "ana", "label": "dolor", "total_attempts": 3, "correct_attempts": 1,
+              "doubtful_attempts": 1, "incorrect_attempts": 1, "confidence_sum": 200.75,
+              "min_confidence": 40.5, "max_confidence": 90.0, "last_attempt": datetime(2025, 1, 1, 0, 2)}
+    pipelines = []
+
+    class Rollups:
+        def aggregate(self, pipeline):
+            pipelines.append(pipeline)
+
+            async def docs():
+                yield dict(rollup)
+            return docs()
+
+    monkeypatch.setattr(progress, "progress_collection", Rollups())
+    resp = client.get("/progress", params={"nickname": "ana"})
+    assert resp.status_code == 200
+    item, = resp.json()
+    assert (item["label"], item["total_attempts"]) == ("dolor", 3)
+    assert (item["success_rate"], item["doubtful_rate"], item["incorrect_rate"]) == (33.33, 33.33, 33.33)
+    assert (item["average_confidence"], item["min_confidence"], item["max_confidence"]) == (66.92, 40.5, 90.0)
+    # Con nickname, una lectura por el índice (nickname, label); sin él se agrupan los acumulados
+    assert pipelines[0] == [{"$match": {"nickname": "ana"}}, {"$sort": {"label": 1}}]
+    client.get("/progress")
+    assert "$group" in pipelines[1][0]
+
+
+def test_global_distribution_reads_counters(monkeypatch):
+    from app.api.endpoints import statistics
+
+    class Counters:
+        async def read(self):
+            return {"CORRECTO": 6, "INCORRECTO": 3, "DUDOSO": 1, "NO_RECONOCIDA": 0}
+
+    monkeypatch.setattr(statistics, "global_counters", Counters())
+    resp = client.get("/stats/global_distribution")
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "total_evaluations": 10,
+        "distribution": [
+            {"evaluation_type": "CORRECTO", "count": 6, "percentage": 60.0},
+            {"evaluation_type": "INCORRECTO", "count": 3, "percentage": 30.0},
+            {"evaluation_type": "DUDOSO", "count": 1, "percentage": 10.0},
+        ],
+    }
+
+
+def test_daily_activity_facet_and_closed_day_cache(monkeypatch):
+    from datetime import datetime, timezone
+    from app.api.endpoints import activity
+
+    pipelines = []
+
+    class Activity:
+        def aggregate(self, pipeline):
+            pipelines.append(pipeline)
+
+            class C:
+                async def to_list(self, length=None):
+                    return [{
+                        "summary": [{"_id": None, "total_practices": 3, "correct_practices": 2,
+                                     "doubtful_practices": 0, "incorrect_practices": 1}],
+                        "records": [{"_id": "60d5ec49f0b2f3a1c4d4a9c1", "timestamp": datetime(2025, 1, 2, 10),
+                                     "predicted_label": "dolor", "expected_label": "dolor",
+                                     "confidence": 91.5, "evaluation": "CORRECTO"}],
+                    }]
+            return C()
+
+    monkeypatch.setattr(activity, "collection", Activity())
+    monkeypatch.setattr(activity, "daily_cache", activity.DailyActivityCache(ttl=60))
+
+    for _ in range(2):
+        resp = client.get("/activity/daily/ana/2025-01-02", params={"skip": 1, "limit": 1})
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["summary"] == {"total_practices": 3, "correct_practices": 2,
+                                   "doubtful_practices": 0, "incorrect_practices": 1}
+        assert [r["_id"] for r in body["records"]] == ["60d5ec49f0b2f3a1c4d4a9c1"]
+    # Día pasado: la segunda petición sale de la caché
+    assert len(pipelines) == 1
+    match, sort, facet = pipelines[0]
+    assert match["$match"]["nickname"] == "ana" and sort == {"$sort": {"timestamp": 1}}
+    assert facet["$facet"]["records"][:2] == [{"$skip": 1}, {"$limit": 1}]
+
+    # El día en curso se calcula siempre
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    client.get(f"/activity/daily/ana/{today}")
+    client.get(f"/activity/daily/ana/{today}")
+    assert len(pipelines) == 3
+    # Sin ?limit= la página tiene ACTIVITY_PAGE_SIZE registros: el $facet no puede devolver el día entero
+    assert pipelines[1][2]["$facet"]["records"][0] == {"$limit": activity.ACTIVITY_PAGE_SIZE}
+    assert activity.build_daily_pipeline("ana", datetime(2025, 1, 2).date(), 0, 10 ** 6)[2]["$facet"]["records"][0] == {
+        "$limit": activity.DAILY_MAX_PAGE_SIZE}
+    assert client.get(f"/activity/daily/ana/{today}", params={"limit": 1001}).status_code == 422
+    assert not activity.day_is_closed(datetime(2025, 1, 2).date(), now=datetime(2025, 1, 3, 0, 1, tzinfo=timezone.utc))
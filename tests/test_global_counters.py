@@ -0,0 +1,130 @@
+import os
+import re
+import sys
+
+import pytest
+from pymongo.errors import AutoReconnect
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.db import global_counters
+from app.db.global_counters import GlobalCounters
+
+
+class Counters:
+    """global_counters en memoria: update_one con $inc, bulk_write con $set, find y delete_many por $regex de _id."""
+
+    def __init__(self):
+        self.docs = {}
+        self.down = False
+        self.updates = []
+
+    async def update_one(self, filt, update, upsert=False):
+        if self.down:
+            raise AutoReconnect("sin servidor")
+        self.updates.append(filt["_id"])
+        counts = self.docs.setdefault(filt["_id"], {"_id": filt["_id"], "counts": {}})["counts"]
+        for field, n in update["$inc"].items():
+            evaluation = field.split(".", 1)[1]
+            counts[evaluation] = counts.get(evaluation, 0) + n
+
+    async def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            self.docs[op._filter["_id"]] = {"_id": op._filter["_id"], **op._doc["$set"]}
+
+    @staticmethod
+    def _matches(_id, cond):
+        return re.match(cond["$regex"], _id) is not None and _id not in cond.get("$nin", ())
+
+    async def delete_many(self, filt):
+        self.docs = {k: v for k, v in self.docs.items() if not self._matches(k, filt["_id"])}
+
+    async def find(self, filt):
+        for _id, doc in list(self.docs.items()):
+            if self._matches(_id, filt["_id"]):
+                yield doc
+
+
+class Predictions:
+    def __init__(self, counts):
+        self.counts = counts
+
+    async def aggregate(self, pipeline):
+        for evaluation, count in self.counts.items():
+            yield {"evaluation_type": evaluation, "count": count}
+
+
+def _records(**counts):
+    return [{"evaluation": evaluation} for evaluation, n in counts.items() for _ in range(n)]
+
+
+@pytest.mark.asyncio
+async def test_apply_spreads_over_shards_and_read_sums_them():
+    collection = Counters()
+    counters = GlobalCounters(collection, shards=4)
+    for _ in range(20):
+        await counters.apply(_records(CORRECTO=2, INCORRECTO=1) + [{"evaluation": None}, {}])
+
+    assert len(collection.updates) == 20
+    assert len(set(collection.updates)) > 1
+    assert await counters.read() == {"CORRECTO": 40, "INCORRECTO": 20}
+    assert counters.snapshot()["applied"] == 60
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_retried_with_the_next_apply():
+    collection = Counters()
+    counters = GlobalCounters(collection, shards=2)
+    collection.down = True
+    await counters.apply(_records(DUDOSO=3))
+    assert counters.snapshot()["pending"] == 3
+    collection.down = False
+    await counters.apply(_records(DUDOSO=1))
+    assert await counters.read() == {"DUDOSO": 4}
+    assert counters.snapshot()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_pending_counts_without_a_new_apply():
+    collection = Counters()
+    counters = GlobalCounters(collection, shards=2)
+    collection.down = True
+    await counters.apply(_records(CORRECTO=2))
+    await counters.flush()
+    assert counters.snapshot()["pending"] == 2
+    collection.down = False
+    await counters.flush()
+    assert await counters.read() == {"CORRECTO": 2}
+    assert counters.snapshot()["pending"] == 0
+
+@pytest.mark.asyncio
+async def test_backfill_rebuilds_from_history_and_check_compares():
+    collection = Counters()
+    collection.docs["evaluations:9"] = {"_id": "evaluations:9", "counts": {"CORRECTO": 5}}
+    counters = GlobalCounters(collection, shards=3)
+    await counters.apply(_records(CORRECTO=1))
+    predictions = Predictions({"CORRECTO": 7, "INCORRECTO": 2})
+
+    assert await global_counters.check(predictions, counters) == {
+        "CORRECTO": {"history": 7, "counters": 6}, "INCORRECTO": {"history": 2, "counters": 0},
+    }
+    assert await global_counters.backfill(predictions, counters) == {"CORRECTO": 7, "INCORRECTO": 2}
+    assert sorted(collection.docs) == ["evaluations:0", "evaluations:1", "evaluations:2"]
+    assert await global_counters.check(predictions, counters) == {}
+    await counters.apply(_records(INCORRECTO=1))
+    assert await counters.read() == {"CORRECTO": 7, "INCORRECTO": 3}
+
+
+@pytest.mark.asyncio
+async def test_read_counts_shards_above_the_configured_count():
+    collection = Counters()
+    wide = GlobalCounters(collection, shards=8)
+    for _ in range(40):
+        await wide.apply(_records(CORRECTO=1))
+    collection.docs["other:0"] = {"_id": "other:0", "counts": {"CORRECTO": 100}}
+
+    narrow = GlobalCounters(collection, shards=2)
+    assert any(_id not in ("evaluations:0", "evaluations:1") for _id in collection.updates)
+    assert await narrow.read() == {"CORRECTO": 40}
+    await narrow.apply(_records(DUDOSO=1))
+    assert collection.updates[-1] in ("evaluations:0", "evaluations:1")
+    assert await narrow.read() == {"CORRECTO": 40, "DUDOSO": 1}
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.services.label_catalog import LabelCatalog
+
+
+def _write_dataset(path, rows):
+    values = ",".join(["0.1"] * 6)
+    path.write_text("".join(f"{values},{label},{level}\n" for label, level in rows))
+
+
+def test_membership_is_normalized(tmp_path):
+    dataset = tmp_path / "dataset.csv"
+    _write_dataset(dataset, [("Dolor", "principiante"), ("mareo", "avanzado"), ("mareo", "avanzado")])
+    catalog = LabelCatalog(dataset)
+    catalog.refresh()
+
+    assert " dolor " in catalog and "MAREO" in catalog
+    assert "fiebre" not in catalog
+    assert catalog.get("dolor")["level"] == "principiante"
+    assert len(catalog) == 2
+
+
+def test_refreshes_only_when_content_changes(tmp_path):
+    dataset = tmp_path / "dataset.csv"
+    _write_dataset(dataset, [("dolor", "principiante")])
+    catalog = LabelCatalog(dataset, check_seconds=0)
+    assert catalog.refresh()
+    assert "dolor" in catalog
+    assert catalog.reloads == 1
+
+    # Mismo contenido con otro mtime: se compara el hash y no se vuelve a parsear
+    os.utime(dataset, ns=(0, 10**9))
+    assert not catalog.refresh()
+    assert catalog.reloads == 1
+
+    _write_dataset(dataset, [("dolor", "principiante"), ("fiebre", "intermedio")])
+    os.utime(dataset, ns=(0, 2 * 10**9))
+    # Las consultas no miran el archivo: el cambio llega con el siguiente refresh
+    assert "fiebre" not in catalog
+    assert catalog.refresh()
+    assert "fiebre" in catalog
+    assert catalog.reloads == 2
+
+
+@pytest.mark.asyncio
+async def test_watch_refreshes_off_the_event_loop(tmp_path, monkeypatch):
+    import threading
+
+    dataset = tmp_path / "dataset.csv"
+    _write_dataset(dataset, [("dolor", "principiante")])
+    catalog = LabelCatalog(dataset)
+    catalog.refresh()
+    threads = []
+    refresh = catalog.refresh
+    monkeypatch.setattr(catalog, "refresh", lambda: threads.append(threading.current_thread()) or refresh())
+
+    _write_dataset(dataset, [("dolor", "principiante"), ("fiebre", "intermedio")])
+    os.utime(dataset, ns=(0, 10**9))
+    task = asyncio.create_task(catalog.watch(0.01))
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if "fiebre" in catalog:
+            break
+    task.cancel()
+    assert "fiebre" in catalog
+    assert threads and threading.main_thread() not in threads
+
+
+def test_class_index_from_model_labels(tmp_path):
+    dataset = tmp_path / "dataset.csv"
+    _write_dataset(dataset, [("dolor", "principiante"), ("mareo", "avanzado")])
+    catalog = LabelCatalog(dataset)
+    catalog.refresh()
+    catalog.set_class_labels(["mareo", "dolor", "yo"])
+
+    assert catalog.get("dolor")["class_index"] == 1
+    # Etiquetas que solo conoce el modelo son válidas pero no se listan con nivel
+    assert "yo" in catalog
+    assert [e["label"] for e in catalog.entries(with_level=True)] == ["mareo", "dolor"]
+
+
+def test_missing_dataset_uses_model_labels(tmp_path):
+    catalog = LabelCatalog(tmp_path / "no_existe.csv")
+    catalog.refresh()
+    assert "dolor" not in catalog
+    catalog.set_class_labels(["dolor"])
+    assert "dolor" in catalog
+
+
+def test_levels_keep_every_distinct_pair_as_written(tmp_path):
+    dataset = tmp_path / "dataset.csv"
+    _write_dataset(dataset, [("dolor", "Principiante"), ("dolor", "avanzado"), ("dolor", "avanzado"),
+                             ("mareo", "experto"), ("fiebre", "")])
+    catalog = LabelCatalog(dataset)
+    catalog.refresh()
+
+    assert catalog.levels() == [{"label": "dolor", "level": "Principiante"}, {"label": "dolor", "level": "avanzado"}]
+    # Sin nivel válido no se listan, pero siguen siendo etiquetas válidas
+    assert "mareo" in catalog and "fiebre" in catalog
@@ -0,0 +1,137 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.config import CNN_LSTM_MODEL_PATH, ENCODER_PATH
+from app.services.model_bundle import ModelBundle, LabelTable
+from app.services.numpy_engine import NumpyCNNLSTM, _fold_layers
+
+
+def _small_layers(rng):
+    return [
+        {"class_name": "InputLayer", "config": {"name": "input", "batch_shape": [None, 35, 42]}, "weights": {}},
+        {"class_name": "LSTM", "config": {"name": "lstm", "activation": "tanh", "recurrent_activation": "sigmoid",
+                                          "return_sequences": False},
+         "weights": {"kernel": rng.standard_normal((42, 32)).astype(np.float32),
+                     "recurrent_kernel": rng.standard_normal((8, 32)).astype(np.float32),
+                     "bias": rng.standard_normal(32).astype(np.float32)}},
+        {"class_name": "Dense", "config": {"name": "dense", "activation": "softmax"},
+         "weights": {"kernel": rng.standard_normal((8, 3)).astype(np.float32),
+                     "bias": rng.standard_normal(3).astype(np.float32)}},
+    ]
+
+
+def test_roundtrip_is_memory_mapped(tmp_path):
+    rng = np.random.default_rng(0)
+    layers = _small_layers(rng)
+    mean, std = rng.standard_normal(42).astype(np.float32), rng.random(42).astype(np.float32) + 0.5
+    thresholds = {"default": 75.0, "per_class": {"b": 90.0}}
+    path = str(tmp_path / "model.bundle")
+    ModelBundle({"class_name": "Sequential", "config": {"layers": []}}, layers, ["a", "b", "c"],
+                mean, std, thresholds, version="v1").save(path)
+
+    bundle = ModelBundle.load(path)
+    assert bundle.version == "v1"
+    assert bundle.thresholds == thresholds
+    assert bundle.input_spec == {"frames": 35, "features": 42, "dtype": "float32"}
+    assert bundle.labels.inverse_transform([2, 0]) == ["c", "a"]
+    np.testing.assert_array_equal(bundle.mean, mean)
+    np.testing.assert_array_equal(bundle.std, std)
+
+    kernel = bundle.layers[1]["weights"]["kernel"]
+    assert isinstance(kernel.base, np.memmap) or isinstance(getattr(kernel.base, "base", None), np.memmap)
+    assert not kernel.flags.writeable
+
+    X = rng.standard_normal((4, 35, 42)).astype(np.float32)
+    expected = NumpyCNNLSTM(_fold_layers(layers)).predict(X)
+    np.testing.assert_allclose(bundle.build_numpy_engine().predict(X), expected, atol=1e-6)
+
+
+def test_rejects_foreign_files(tmp_path):
+    path = tmp_path / "not_a_bundle.bin"
+    path.write_bytes(b"\x00" * 64)
+    with pytest.raises(ValueError):
+        ModelBundle.load(str(path))
+
+
+def test_label_table_matches_encoder_interface():
+    table = LabelTable(["dolor", "yo"])
+    assert table.inverse_transform(np.array([1])) == ["yo"]
+    assert list(table.transform(["yo", "dolor"])) == [1, 0]
+    assert len(table) == 2
+
+
+@pytest.mark.skipif(not CNN_LSTM_MODEL_PATH.exists(), reason="cnn_lstm_model.h5 no disponible")
+def test_bundle_from_current_files_matches_keras(tmp_path):
+    pytest.importorskip("h5py")
+    tf = pytest.importorskip("tensorflow")
+    import joblib
+
+    path = str(tmp_path / "cnn_lstm.bundle")
+    ModelBundle.from_files(str(CNN_LSTM_MODEL_PATH), str(ENCODER_PATH)).save(path)
+    bundle = ModelBundle.load(path)
+
+    encoder = joblib.load(str(ENCODER_PATH))
+    assert list(bundle.labels.classes_) == list(encoder.classes_)
+
+    X = np.random.default_rng(1).standard_normal((3, 35, 42)).astype(np.float32)
+    expected = tf.keras.models.load_model(str(CNN_LSTM_MODEL_PATH), compile=False)(X, training=False).numpy()
+    np.testing.assert_allclose(bundle.build_keras_model()(X, training=False).numpy(), expected, atol=1e-6)
+    np.testing.assert_allclose(bundle.build_numpy_engine().predict(X), expected, atol=1e-5)
+
+
+def _raw_dataset(rng, n=16):
+    # Landmarks sin normalizar con escala y desplazamiento distintos por columna
+    scale = rng.random(35 * 42).astype(np.float32) * 200 + 1
+    offset = rng.standard_normal(35 * 42).astype(np.float32) * 300
+    return rng.standard_normal((n, 35 * 42)).astype(np.float32) * scale + offset
+
+
+def test_zscore_stage_matches_training_preprocessing(tmp_path):
+    from app.data_loader import zscore_stats, apply_zscore
+
+    rng = np.random.default_rng(4)
+    raw = _raw_dataset(rng)
+    mean, std = zscore_stats(raw)
+    normalized = apply_zscore(raw, mean, std).reshape(-1, 35, 42)
+
+    layers = _small_layers(rng)
+    path = str(tmp_path / "model.bundle")
+    ModelBundle({"class_name": "Sequential", "config": {"layers": []}}, layers, ["a", "b", "c"],
+                mean.reshape(35, 42), std.reshape(35, 42), preprocessing=[{"type": "zscore"}]).save(path)
+    bundle = ModelBundle.load(path)
+    assert bundle.info()["preprocessing"] == ["zscore"]
+
+    # Servir con landmarks crudos == entrenar con el z-score de load_dataset
+    expected = NumpyCNNLSTM(_fold_layers(layers)).predict(normalized)
+    served = bundle.build_numpy_engine().predict(raw.reshape(-1, 35, 42))
+    np.testing.assert_allclose(served, expected, atol=1e-5)
+
+
+@pytest.mark.skipif(not CNN_LSTM_MODEL_PATH.exists(), reason="cnn_lstm_model.h5 no disponible")
+def test_zscore_stage_is_part_of_the_keras_graph(tmp_path):
+    pytest.importorskip("h5py")
+    tf = pytest.importorskip("tensorflow")
+    from app.data_loader import zscore_stats, apply_zscore
+
+    rng = np.random.default_rng(5)
+    raw = _raw_dataset(rng, n=8)
+    mean, std = zscore_stats(raw)
+    path = str(tmp_path / "cnn_lstm.bundle")
+    ModelBundle.from_files(str(CNN_LSTM_MODEL_PATH), str(ENCODER_PATH),
+                           mean.reshape(35, 42), std.reshape(35, 42)).save(path)
+    bundle = ModelBundle.load(path)
+
+    trained = tf.keras.models.load_model(str(CNN_LSTM_MODEL_PATH), compile=False)
+    expected = trained(apply_zscore(raw, mean, std).reshape(-1, 35, 42), training=False).numpy()
+    X = raw.reshape(-1, 35, 42)
+    np.testing.assert_allclose(bundle.build_keras_model()(X, training=False).numpy(), expected, atol=1e-5)
+    np.testing.assert_allclose(bundle.build_numpy_engine().predict(X), expected, atol=1e-5)
+
+
+def test_zscore_stage_requires_stats():
+    with pytest.raises(ValueError):
+        ModelBundle({"config": {"layers": []}}, [], ["a"], preprocessing=[{"type": "zscore"}])
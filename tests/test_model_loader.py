@@ -0,0 +1,57 @@
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def loader():
+    # Carga una copia propia del módulo: otros tests sustituyen app.services.model_loader en sys.modules
+    spec = importlib.util.spec_from_file_location(
+        "model_loader_under_test", os.path.join(ROOT, "app", "services", "model_loader.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class SlowModel:
+    loads = 0
+
+    def __init__(self):
+        time.sleep(0.05)
+        SlowModel.loads += 1
+
+    def predict(self, batch, verbose=0):
+        return np.tile([0.9, 0.1], (len(batch), 1))
+
+
+def _patch_loading(monkeypatch, loader):
+    SlowModel.loads = 0
+    monkeypatch.setattr(loader, "_validate_paths", lambda: None)
+    monkeypatch.setattr(loader, "configure_tf_threading", lambda *a, **kw: None)
+    monkeypatch.setattr(loader, "LIGHT_BACKEND", True)
+    monkeypatch.setattr(loader, "NUMPY_BACKEND", False)
+    monkeypatch.setattr(loader, "TFLITE_BACKEND", False)
+    monkeypatch.setattr(loader, "TENSORFLOW_AVAILABLE", False)
+    monkeypatch.setattr(loader, "MockModel", SlowModel, raising=False)
+
+
+def test_concurrent_first_calls_load_once(monkeypatch, loader):
+    _patch_loading(monkeypatch, loader)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(loader.get_model())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert SlowModel.loads == 1
+    assert all(m is results[0] for m in results)
@@ -0,0 +1,180 @@
+import asyncio
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.services.model_registry import ModelRegistry, ModelVersion, BASE_VERSION
+
+
+class ConstantModel:
+    """Devuelve siempre la misma clase; ``gate`` permite retener el forward pass."""
+
+    def __init__(self, class_index, gate=None):
+        self.class_index = class_index
+        self.gate = gate
+
+    def __call__(self, batch):
+        if self.gate is not None:
+            self.gate.wait(timeout=5)
+        out = np.zeros((len(batch), 3), dtype=np.float32)
+        out[:, self.class_index] = 1.0
+        return out
+
+
+class Encoder:
+    classes_ = ["a", "b", "c"]
+
+    def inverse_transform(self, idx):
+        return [self.classes_[int(i)] for i in idx]
+
+
+def make_version(registry, name, class_index, gate=None):
+    return ModelVersion(name, None, Encoder(), ConstantModel(class_index, gate),
+                        executor=registry.executor, stats=registry.stats)
+
+
+def test_resolve_initial_prefers_current_then_latest(tmp_path):
+    registry = ModelRegistry(root=tmp_path)
+    assert registry.resolve_initial() == BASE_VERSION
+
+    (tmp_path / "v1").mkdir()
+    (tmp_path / "v2").mkdir()
+    assert registry.resolve_initial() == "v2"
+
+    (tmp_path / "CURRENT").write_text("v1\n")
+    assert registry.resolve_initial() == "v1"
+
+
+@pytest.mark.parametrize("name", ["../outside", "..", "v1/../../outside", "/tmp", "..\\outside", ""])
+def test_version_names_cannot_leave_the_registry(tmp_path, name):
+    root = tmp_path / "registry"
+    (root / "v1").mkdir(parents=True)
+    (tmp_path / "outside").mkdir()
+    (tmp_path / "outside" / "label_encoder.pkl").write_bytes(b"no se debe cargar")
+    registry = ModelRegistry(root=root)
+
+    with pytest.raises(ValueError):
+        registry.load(name)
+
+@pytest.mark.asyncio
+async def test_in_flight_requests_finish_on_previous_version(tmp_path):
+    from app.services.inference_executor import InferenceExecutor
+
+    registry = ModelRegistry(root=tmp_path, executor=InferenceExecutor("thread", max_concurrency=2))
+    gate = threading.Event()
+    await registry.swap(make_version(registry, "v1", 0, gate))
+    seq = np.ones((35, 42), dtype=np.float32)
+
+    async def request():
+        version = await registry.get_active()
+        probs = await version.batcher.submit(seq)
+        return version.name, version.label(int(np.argmax(probs)))
+
+    # El forward pass de v1 queda retenido en un hilo mientras se activa v2
+    in_flight = asyncio.create_task(request())
+    await asyncio.sleep(0.05)
+    swap = asyncio.create_task(registry.swap(make_version(registry, "v2", 1)))
+    await asyncio.sleep(0)
+
+    assert (await request()) == ("v2", "b")
+    gate.set()
+    assert (await in_flight) == ("v1", "a")
+    await swap
+    assert registry.readiness()["model_version"] == "v2"
+    registry.executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_activate_persists_current_and_reports_errors(tmp_path, monkeypatch):
+    registry = ModelRegistry(root=tmp_path)
+    (tmp_path / "v3").mkdir()
+    monkeypatch.setattr(registry, "load", lambda name: make_version(registry, name, 2))
+
+    version = await registry.activate("v3")
+    assert version.name == "v3"
+    assert (tmp_path / "CURRENT").read_text().strip() == "v3"
+    assert registry.readiness()["ready"] is True
+
+    monkeypatch.setattr(registry, "load", lambda name: registry._paths(name))
+    with pytest.raises(FileNotFoundError):
+        await registry.activate("missing")
+    assert registry.active().name == "v3"
+    assert "missing" in registry.readiness()["error"]
+
+
+@pytest.mark.asyncio
+async def test_watch_swaps_when_current_changes(tmp_path, monkeypatch):
+    registry = ModelRegistry(root=tmp_path)
+    monkeypatch.setattr(registry, "load", lambda name: make_version(registry, name, 0))
+    (tmp_path / "v1").mkdir()
+    (tmp_path / "v2").mkdir()
+    (tmp_path / "CURRENT").write_text("v1\n")
+    await registry.preload()
+    assert registry.active().name == "v1"
+
+    watcher = asyncio.create_task(registry.watch(0.01))
+    (tmp_path / "CURRENT").write_text("v2\n")
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if registry.active().name == "v2":
+            break
+    watcher.cancel()
+    assert registry.active().name == "v2"
+
+
+@pytest.mark.asyncio
+async def test_swap_publishes_class_labels_to_catalog(tmp_path):
+    from app.services.label_catalog import LabelCatalog
+
+    catalog = LabelCatalog.from_labels([])
+    registry = ModelRegistry(root=tmp_path, label_catalog=catalog)
+    await registry.swap(make_version(registry, "v1", 0))
+    assert catalog.get("c")["class_index"] == 2
+
+
+def test_process_executor_loads_the_version_in_the_worker(tmp_path, monkeypatch):
+    import pickle
+
+    from app.services import model_registry
+    from app.services.inference_executor import InferenceExecutor
+    from app.services.model_bundle import ModelBundle
+
+    model_loader = model_registry.model_loader
+    if not hasattr(model_loader, "load_bundle_from"):
+        pytest.skip("model_loader sustituido por el de test_endpoints (importado antes que el registro)")
+
+    # Motor NumPy en el proceso principal y en el worker (fork hereda los atributos, spawn el entorno)
+    monkeypatch.setenv("INFERENCE_BACKEND", "numpy")
+    monkeypatch.setattr(model_loader, "NUMPY_BACKEND", True)
+    monkeypatch.setattr(model_loader, "LIGHT_BACKEND", True)
+    rng = np.random.default_rng(0)
+    layers = [
+        {"class_name": "InputLayer", "config": {"name": "input", "batch_shape": [None, 35, 42]}, "weights": {}},
+        {"class_name": "LSTM", "config": {"name": "lstm", "activation": "tanh", "recurrent_activation": "sigmoid",
+                                          "return_sequences": False},
+         "weights": {"kernel": rng.standard_normal((42, 32)).astype(np.float32),
+                     "recurrent_kernel": rng.standard_normal((8, 32)).astype(np.float32),
+                     "bias": rng.standard_normal(32).astype(np.float32)}},
+        {"class_name": "Dense", "config": {"name": "dense", "activation": "softmax"},
+         "weights": {"kernel": rng.standard_normal((8, 3)).astype(np.float32),
+                     "bias": rng.standard_normal(3).astype(np.float32)}},
+    ]
+    (tmp_path / "v1").mkdir()
+    ModelBundle({"class_name": "Sequential", "config": {"layers": []}}, layers, ["a", "b", "c"],
+                version="v1").save(str(tmp_path / "v1" / "cnn_lstm.bundle"))
+
+    executor = InferenceExecutor("process", max_concurrency=1)
+    registry = ModelRegistry(root=tmp_path, executor=executor, warmup_batch_sizes=())
+    try:
+        version = registry.load("v1")
+        # Lo que recibe el pool no lleva el modelo ni el batcher
+        pickle.dumps(version.batcher._predict_fn)
+        batch = rng.standard_normal((4, 35, 42)).astype(np.float32)
+        probabilities = asyncio.run(version.run_batch(batch))
+        np.testing.assert_allclose(probabilities, version.inference_fn(batch), atol=1e-6)
+    finally:
+        executor.shutdown()
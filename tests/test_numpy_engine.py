@@ -0,0 +1,95 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.config import CNN_LSTM_MODEL_PATH, DATASET_PATH
+from app.services.numpy_engine import NumpyCNNLSTM
+
+pytest.importorskip("h5py")
+pytestmark = pytest.mark.skipif(not CNN_LSTM_MODEL_PATH.exists(), reason="cnn_lstm_model.h5 no disponible")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return NumpyCNNLSTM.from_keras_h5(str(CNN_LSTM_MODEL_PATH))
+
+
+@pytest.fixture(scope="module")
+def keras_model():
+    tf = pytest.importorskip("tensorflow")
+    return tf.keras.models.load_model(str(CNN_LSTM_MODEL_PATH), compile=False)
+
+
+def _parity_inputs():
+    if DATASET_PATH.exists():
+        from app.data_loader import load_dataset
+        _, X_test, _, _, _ = load_dataset()
+        return X_test.astype(np.float32)
+    # Sin dataset real: entradas con la misma escala que el z-score de entrenamiento
+    return np.random.default_rng(0).standard_normal((64, 35, 42), dtype=np.float32)
+
+
+def test_batchnorm_is_folded(engine):
+    kinds = [op[0] for op in engine.ops]
+    assert kinds == ["conv", "pool", "conv", "pool", "lstm", "lstm", "dense", "dense"]
+
+
+def test_parity_with_keras(engine, keras_model):
+    X = _parity_inputs()
+    expected = keras_model(X, training=False).numpy()
+    actual = engine.predict(X)
+
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, atol=1e-5)
+    assert (actual.argmax(axis=1) == expected.argmax(axis=1)).all()
+
+
+def test_npz_roundtrip(engine, tmp_path):
+    X = np.random.default_rng(1).standard_normal((4, 35, 42), dtype=np.float32)
+    path = tmp_path / "weights.npz"
+    engine.save_npz(str(path))
+
+    reloaded = NumpyCNNLSTM.load(str(path))
+    np.testing.assert_array_equal(reloaded.predict(X), engine.predict(X))
+
+
+def test_single_sequence_is_batched(engine):
+    seq = np.random.default_rng(2).standard_normal((35, 42), dtype=np.float32)
+    assert engine.predict(seq).shape == (1, len(engine.ops[-1][2]))
+
+
+def test_folding_handles_negative_batchnorm_scale():
+    from app.services.numpy_engine import _fold_layers
+
+    rng = np.random.default_rng(3)
+    gamma = rng.standard_normal(8).astype(np.float32)
+    gamma[::2] *= -1  # canales con escala negativa: el MaxPool debe usar el mínimo
+    bn = {"gamma": gamma, "beta": rng.standard_normal(8).astype(np.float32),
+          "moving_mean": rng.standard_normal(8).astype(np.float32),
+          "moving_variance": rng.random(8).astype(np.float32) + 0.5}
+    conv = {"kernel": rng.standard_normal((3, 42, 8)).astype(np.float32), "bias": rng.standard_normal(8).astype(np.float32)}
+    lstm = {"kernel": rng.standard_normal((8, 16)).astype(np.float32),
+            "recurrent_kernel": rng.standard_normal((4, 16)).astype(np.float32),
+            "bias": rng.standard_normal(16).astype(np.float32)}
+    layers = [
+        {"class_name": "Conv1D", "config": {"padding": "valid", "strides": [1], "activation": "relu"}, "weights": conv},
+        {"class_name": "BatchNormalization", "config": {"epsilon": 1e-3}, "weights": bn},
+        {"class_name": "MaxPooling1D", "config": {"pool_size": [2], "strides": [2], "padding": "valid"}, "weights": {}},
+        {"class_name": "LSTM", "config": {"activation": "tanh", "recurrent_activation": "sigmoid", "return_sequences": False}, "weights": lstm},
+    ]
+    folded = NumpyCNNLSTM(_fold_layers(layers))
+
+    scale = bn["gamma"] / np.sqrt(bn["moving_variance"] + 1e-3)
+    shift = bn["beta"] - bn["moving_mean"] * scale
+    reference = NumpyCNNLSTM([
+        ("conv", conv["kernel"], conv["bias"], "relu"),
+        ("affine", scale, shift),
+        ("pool", 2, None),
+        ("lstm", lstm["kernel"], lstm["recurrent_kernel"], lstm["bias"], False),
+    ])
+
+    X = rng.standard_normal((3, 35, 42)).astype(np.float32)
+    np.testing.assert_allclose(folded.predict(X), reference.predict(X), atol=1e-4)
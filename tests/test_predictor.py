@@ -5,6 +5,7 @@ from types import SimpleNamespace
 import pytest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from app.models import schema
+from app.services.label_catalog import LabelCatalog
 
 # Stub out the MongoDB layer so predictor can be imported without motor.
 class DummyCollection:
@@ -25,9 +26,33 @@ class DummyCollection:
     async def find_one(self, filt):
         return self.stats.get((filt.get("expected_label"), filt.get("nickname")), {"total": 0, "correct": 0, "confidence_sum": 0.0})
 
+    async def find_one_and_update(self, filt, update, upsert=False, return_document=None):
+        self.find_one_and_updates = getattr(self, "find_one_and_updates", 0) + 1
+        await self.update_one(filt, update, upsert=upsert)
+        return dict(self.stats[(filt.get("expected_label"), filt.get("nickname"))])
+
+    async def insert_many(self, docs, ordered=True):
+        self.inserted.extend(docs)
+
+    async def bulk_write(self, requests, ordered=True):
+        self.bulk_writes = getattr(self, "bulk_writes", 0) + 1
+        for op in requests:
+            await self.update_one(op._filter, op._doc, upsert=True)
+
+    async def find(self, filt):
+        for filt in filt.get("$or", [filt]):
+            key = (filt.get("expected_label"), filt.get("nickname"))
+            if key in self.stats:
+                yield {"expected_label": key[0], "nickname": key[1], **self.stats[key]}
+
+from app.db.stats_cache import StatsCache
+from app.db.write_buffer import WriteBehindBuffer
+
 sys.modules['app.db.mongodb'] = SimpleNamespace(
     collection=DummyCollection(),
     stats_collection=DummyCollection(),
+    record_buffer=WriteBehindBuffer(DummyCollection()),
+    stats_cache=StatsCache(DummyCollection()),
 )
 
 
@@ -48,20 +73,136 @@ def make_dummy_encoder(label="label"):
 
 
 @pytest.mark.asyncio
-async def test_predict_sequence_correct(monkeypatch):
-    sys.modules['app.services.model_loader'] = SimpleNamespace(model=make_dummy_model(), encoder=make_dummy_encoder("test"))
+async def test_predict_sequence_correct(monkeypatch, tmp_path):
+    dummy_model = make_dummy_model()
+    dummy_encoder = make_dummy_encoder("test")
+    sys.modules['app.services.model_loader'] = SimpleNamespace(
+        model=dummy_model,
+        encoder=dummy_encoder,
+        get_model=lambda: dummy_model,
+        get_encoder=lambda: dummy_encoder,
+        get_inference_fn=lambda: dummy_model.predict,
+    )
     import importlib
     predictor = importlib.import_module('app.services.predictor')
+    from app.services.model_registry import ModelRegistry, ModelVersion
+    registry = ModelRegistry()
+    await registry.swap(ModelVersion("v-test", dummy_model, dummy_encoder, dummy_model.predict, stats=registry.stats))
+    monkeypatch.setattr(predictor, "model_registry", registry)
 
-    monkeypatch.setattr(schema, "VALID_LABELS", ["test"])
+    monkeypatch.setattr(schema, "label_catalog", LabelCatalog.from_labels(["test"]))
 
     dummy_collection = DummyCollection()
-    monkeypatch.setattr(predictor, "collection", dummy_collection)
-    monkeypatch.setattr(predictor, "stats_collection", dummy_collection)
+    record_buffer = WriteBehindBuffer(dummy_collection, spool_path=tmp_path / "spool.jsonl")
+    stats_cache = StatsCache(dummy_collection, ttl_seconds=60)
+    monkeypatch.setattr(predictor, "record_buffer", record_buffer)
+    monkeypatch.setattr(predictor, "stats_cache", stats_cache)
 
-    seq = [[0.0] * 42 for _ in range(35)]
+    # Secuencia no degenerada: las secuencias vacías se rechazan como NO_RECONOCIDA
+    seq = [[float((i * 42 + j) % 7 + 1) for j in range(42)] for i in range(35)]
     req = schema.PredictRequest(sequence=seq, expected_label="test")
     resp = await predictor.predict_sequence(req)
     assert resp.evaluation == "CORRECTO"
     assert resp.success_rate == 100.0
+    assert resp.model_version == "v-test"
+    # Estadísticas en una sola ida y vuelta; el registro queda en el buffer write-behind
+    assert dummy_collection.find_one_and_updates == 1
+    assert not dummy_collection.inserted
+    await record_buffer.close()
     assert dummy_collection.inserted
+    assert dummy_collection.inserted[0]["model_version"] == "v-test"
+
+    # El segundo intento del mismo alumno se responde desde la caché
+    resp = await predictor.predict_sequence(req)
+    assert resp.success_rate == 100.0
+    assert dummy_collection.find_one_and_updates == 1
+    await stats_cache.close()
+    assert dummy_collection.stats[("test", None)]["total"] == 2
+
+
+def _sequence(seed):
+    return [[float((i * 42 + j + seed) % 7 + 1) for j in range(42)] for i in range(35)]
+
+
+@pytest.mark.asyncio
+async def test_predict_batch_one_forward_pass_and_bulk_writes(monkeypatch, tmp_path):
+    import importlib
+    import numpy as np
+    predictor = importlib.import_module('app.services.predictor')
+    from app.services.model_registry import ModelRegistry, ModelVersion
+
+    class Encoder:
+        classes_ = ["uno", "dos"]
+
+    calls = []
+
+    def inference_fn(batch):
+        calls.append(batch.shape)
+        # Clase 0 con 90% para las secuencias pares del lote, clase 1 con 80% para las impares
+        out = np.zeros((len(batch), 2), dtype=np.float32)
+        out[0::2, 0] = 0.9
+        out[1::2, 1] = 0.8
+        return out
+
+    registry = ModelRegistry()
+    await registry.swap(ModelVersion("v-batch", None, Encoder(), inference_fn, stats=registry.stats))
+    monkeypatch.setattr(predictor, "model_registry", registry)
+    monkeypatch.setattr(schema, "label_catalog", LabelCatalog.from_labels(["uno", "dos"]))
+    records, stats = DummyCollection(), DummyCollection()
+    record_buffer = WriteBehindBuffer(records, spool_path=tmp_path / "spool.jsonl")
+    monkeypatch.setattr(predictor, "record_buffer", record_buffer)
+    monkeypatch.setattr(predictor, "stats_cache", StatsCache(stats))
+
+    items = [
+        {"sequence": _sequence(0), "expected_label": "uno", "nickname": "ana"},
+        {"sequence": _sequence(1), "expected_label": "uno", "nickname": "ana"},
+        {"sequence": _sequence(2), "expected_label": "desconocida", "nickname": "ana"},
+        {"sequence": [[0.0] * 42] * 35, "expected_label": "dos"},
+        {"sequence": _sequence(3), "expected_label": "uno", "nickname": "ana"},
+    ]
+    resp = await predictor.predict_batch(items)
+
+    assert calls == [(3, 35, 42)]
+    assert (resp.total, resp.succeeded, resp.failed) == (5, 4, 1)
+    assert [r.index for r in resp.results] == [0, 1, 2, 3, 4]
+    assert "no es válida" in resp.results[2].error
+    assert resp.results[2].result is None
+    assert resp.results[3].result.evaluation == "NO_RECONOCIDA"
+    assert [resp.results[i].result.evaluation for i in (0, 1, 4)] == ["CORRECTO", "INCORRECTO", "CORRECTO"]
+    assert resp.results[1].result.observation
+    # Estadísticas agregadas por (etiqueta, nickname): una sola clave, una sola ida y vuelta
+    await record_buffer.close()
+    assert len(records.inserted) == 3
+    assert stats.find_one_and_updates == 1
+    assert stats.stats[("uno", "ana")]["total"] == 3
+    assert resp.results[4].result.success_rate == round(2 / 3 * 100, 2)
+
+
+@pytest.mark.asyncio
+async def test_predict_batch_ragged_items_fall_back_to_per_item_validation(monkeypatch):
+    import importlib
+    predictor = importlib.import_module('app.services.predictor')
+    monkeypatch.setattr(schema, "label_catalog", LabelCatalog.from_labels(["uno"]))
+
+    requests, errors = schema.parse_batch_items([
+        {"sequence": _sequence(0), "expected_label": "uno"},
+        {"sequence": _sequence(0)[:10], "expected_label": "uno"},
+        "no es un objeto",
+    ])
+    assert requests[0] is not None and errors[0] is None
+    assert requests[0].sequence_array().shape == (35, 42)
+    assert requests[1] is None and "al menos 30 frames" in errors[1]
+    assert requests[2] is None and errors[2]
+
+
+def test_evaluate_predictions_matches_scalar_version():
+    from app.services.evaluator import evaluate_prediction, evaluate_predictions
+
+    predicted = ["Uno", "uno", "dos", "uno"]
+    expected = ["uno", "uno", "uno", "UNO"]
+    confidences = [90.0, 50.0, 99.0, 75.0]
+    evaluations, correct = evaluate_predictions(predicted, expected, confidences, 75.0)
+    scalar = [evaluate_prediction(p, e, c, 75.0) for p, e, c in zip(predicted, expected, confidences)]
+    assert list(evaluations) == [e for e, _ in scalar]
+    assert list(correct) == [c for _, c in scalar]
+
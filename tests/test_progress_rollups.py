@@ -0,0 +1,179 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo import ReplaceOne
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.db import progress_rollups
+from app.db.progress_rollups import ProgressRollups
+from app.db.write_buffer import WriteBehindBuffer
+
+
+def _value(doc, expr):
+    if isinstance(expr, str) and expr.startswith("$"):
+        return doc.get(expr[1:])
+    if isinstance(expr, dict) and "$cond" in expr:
+        (field, value), then, otherwise = expr["$cond"][0]["$eq"], expr["$cond"][1], expr["$cond"][2]
+        return then if _value(doc, field) == value else otherwise
+    return expr
+
+
+class Collection:
+    """Colección en memoria con lo que usan los acumulados y el pipeline del historial."""
+
+    def __init__(self, docs=()):
+        self.docs = [dict(d) for d in docs]
+        self.down = False
+
+    def _match(self, doc, filt):
+        return all(doc.get(k) == v for k, v in filt.items() if k != "_id") and \
+            ("_id" not in filt or doc.get("_id") in filt["_id"]["$in"])
+
+    async def bulk_write(self, ops, ordered=True):
+        if self.down:
+            raise AutoReconnect("sin servidor")
+        for op in ops:
+            target = next((d for d in self.docs if self._match(d, op._filter)), None)
+            if isinstance(op, ReplaceOne):
+                if target is not None:
+                    self.docs.remove(target)
+                self.docs.append({"_id": len(self.docs) + 1000, **op._doc})
+                continue
+            if target is None:
+                target = {"_id": len(self.docs) + 1000, **op._filter}
+                self.docs.append(target)
+            for field, inc in op._doc.get("$inc", {}).items():
+                target[field] = target.get(field, 0) + inc
+            for op_name, pick in (("$min", min), ("$max", max)):
+                for field, value in op._doc.get(op_name, {}).items():
+                    target[field] = value if target.get(field) is None else pick(target[field], value)
+
+    async def find(self, filt):
+        for doc in list(self.docs):
+            if self._match(doc, filt):
+                yield dict(doc)
+
+    async def delete_many(self, filt):
+        self.docs = [d for d in self.docs if not self._match(d, filt)]
+
+    async def aggregate(self, pipeline, **kwargs):
+        docs = [d for d in self.docs if self._match(d, pipeline[0]["$match"])]
+        group = pipeline[1]["$group"]
+        groups = {}
+        for doc in docs:
+            key = tuple((k, _value(doc, v)) for k, v in group["_id"].items())
+            out = groups.setdefault(key, {"_id": dict(key)})
+            for field, acc in group.items():
+                if field == "_id":
+                    continue
+                (op, expr), = acc.items()
+                value = _value(doc, expr)
+                if op == "$sum":
+                    out[field] = out.get(field, 0) + value
+                elif out.get(field) is None:
+                    out[field] = value
+                else:
+                    out[field] = (min if op == "$min" else max)(out[field], value)
+        for out in groups.values():
+            yield out
+
+
+def _record(nickname, label, evaluation, confidence, minutes):
+    return {"nickname": nickname, "expected_label": label, "evaluation": evaluation,
+            "confidence": confidence, "timestamp": datetime(2025, 1, 1) + timedelta(minutes=minutes)}
+
+
+HISTORY = [
+    _record("ana", "dolor", "CORRECTO", 90.0, 0),
+    _record("ana", "dolor", "INCORRECTO", 40.5, 1),
+    _record("ana", "dolor", "DUDOSO", 70.25, 2),
+    _record("ana", "fiebre", "CORRECTO", 88.0, 3),
+    _record(None, "dolor", "CORRECTO", 99.0, 4),
+]
+
+
+@pytest.mark.asyncio
+async def test_apply_accumulates_counts_and_extremes_per_key():
+    rollups = Collection()
+    writer = ProgressRollups(rollups)
+    await writer.apply(HISTORY[:2])
+    await writer.apply(HISTORY[2:])
+
+    ana = {d["label"]: d for d in rollups.docs if d["nickname"] == "ana"}
+    assert ana["dolor"]["total_attempts"] == 3
+    assert (ana["dolor"]["correct_attempts"], ana["dolor"]["doubtful_attempts"],
+            ana["dolor"]["incorrect_attempts"]) == (1, 1, 1)
+    assert ana["dolor"]["confidence_sum"] == pytest.approx(200.75)
+    assert (ana["dolor"]["min_confidence"], ana["dolor"]["max_confidence"]) == (40.5, 90.0)
+    assert ana["dolor"]["last_attempt"] == HISTORY[2]["timestamp"]
+    assert len(rollups.docs) == 3
+    assert writer.snapshot() == {"applied": 5, "writes": 2, "failed_writes": 0, "pending_keys": 0}
+
+
+@pytest.mark.asyncio
+async def test_failed_write_is_retried_with_the_next_apply():
+    rollups = Collection()
+    writer = ProgressRollups(rollups)
+    rollups.down = True
+    await writer.apply(HISTORY[:2])
+    assert writer.snapshot()["pending_keys"] == 1
+    rollups.down = False
+    await writer.apply(HISTORY[2:3])
+    assert [d["total_attempts"] for d in rollups.docs] == [3]
+    assert writer.snapshot()["pending_keys"] == 0
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_pending_deltas_without_a_new_apply():
+    rollups = Collection()
+    writer = ProgressRollups(rollups)
+    rollups.down = True
+    await writer.apply(HISTORY[:2])
+    await writer.flush()
+    assert writer.snapshot()["pending_keys"] == 1
+    rollups.down = False
+    await writer.flush()
+    assert [d["total_attempts"] for d in rollups.docs] == [2]
+    assert writer.snapshot()["pending_keys"] == 0
+
+@pytest.mark.asyncio
+async def test_buffer_reports_only_inserted_records(tmp_path):
+    seen = []
+
+    async def on_insert(docs):
+        seen.extend(docs)
+
+    class Predictions:
+        async def insert_many(self, docs, ordered=True):
+            # El primero ya estaba (reinserción desde el spool)
+            raise BulkWriteError({"writeErrors": [{"index": 0, "code": 11000, "errmsg": "E11000"}]})
+
+    buffer = WriteBehindBuffer(Predictions(), spool_path=tmp_path / "spool.jsonl", on_insert=on_insert)
+    buffer.extend([{"n": 0}, {"n": 1}])
+    await buffer.close()
+    assert [d["n"] for d in seen] == [1]
+
+
+@pytest.mark.asyncio
+async def test_check_finds_drift_and_backfill_repairs_it():
+    predictions = Collection(HISTORY)
+    rollups = Collection()
+    writer = ProgressRollups(rollups)
+    await writer.apply(HISTORY)
+    assert await progress_rollups.check(predictions, rollups) == []
+
+    # Un registro insertado sin acumulado y un acumulado sin historial
+    predictions.docs.append(_record("ana", "fiebre", "INCORRECTO", 10.0, 5))
+    rollups.docs.append({"_id": 1, "nickname": "beto", "label": "dolor", "total_attempts": 1})
+    problems = await progress_rollups.check(predictions, rollups)
+    assert [(p["nickname"], p["label"], p["problem"]) for p in problems] == [
+        ("ana", "fiebre", "distinto"), ("beto", "dolor", "sin historial"),
+    ]
+    assert set(problems[0]["fields"]) == {"total_attempts", "incorrect_attempts", "confidence_sum",
+                                      "min_confidence", "last_attempt"}
+
+    assert await progress_rollups.backfill(predictions, rollups) == 3
+    assert await progress_rollups.check(predictions, rollups) == []
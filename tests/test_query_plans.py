@@ -0,0 +1,115 @@
+import os
+import sys
+from datetime import date, datetime, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.check_query_plans import index_names, plan_problems
+from app.db.indexes import INDEXES, ensure_indexes
+
+
+def ixscan(index, stage="IXSCAN"):
+    return {"stage": stage, "indexName": index, "keyPattern": {}}
+
+
+def test_find_plan_with_index_and_limit_passes():
+    explain = {"queryPlanner": {
+        "winningPlan": {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": ixscan("nickname_timestamp_id")}},
+        "rejectedPlans": [{"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}],
+    }}
+    assert plan_problems(explain) == []
+    assert index_names(explain) == ["nickname_timestamp_id"]
+
+
+def test_collscan_and_in_memory_sort_fail():
+    explain = {"queryPlanner": {"winningPlan": {
+        "stage": "SORT", "inputStage": {"stage": "FETCH", "inputStage": ixscan("evaluation_timestamp_id")},
+    }}}
+    assert plan_problems(explain) == ["SORT en memoria"]
+    explain = {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}
+    assert plan_problems(explain) == ["COLLSCAN"]
+
+
+def test_sort_after_group_is_ignored_in_sbe_and_classic_pipelines():
+    # SBE: el $group y el $sort posterior se empujan al plan de consulta
+    sbe = {"explainVersion": "2", "queryPlanner": {"winningPlan": {
+        "queryPlan": {"stage": "SORT", "inputStage": {"stage": "PROJECTION_DEFAULT", "inputStage": {
+            "stage": "GROUP", "inputStage": {"stage": "FETCH", "inputStage": ixscan("nickname_expected_label_timestamp")}}}},
+        "slotBasedPlan": {"stages": "[3] sort ..."},
+    }}}
+    assert plan_problems(sbe) == []
+    # Motor clásico: el plan va dentro de $cursor y el $sort es una etapa del pipeline
+    classic = {"stages": [
+        {"$cursor": {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}},
+        {"$group": {}}, {"$sort": {"sortKey": {"label": 1}}},
+    ]}
+    assert plan_problems(classic) == ["COLLSCAN"]
+
+
+class IndexCollection:
+    def __init__(self, created, name, existing=()):
+        self.created, self.name, self.existing = created, name, existing
+        self.dropped = []
+
+    async def index_information(self):
+        return {name: {} for name in self.existing}
+
+    async def drop_index(self, name):
+        self.created.setdefault("dropped", []).append(name)
+
+    async def create_indexes(self, indexes):
+        names = [index.document["name"] for index in indexes]
+        self.created.setdefault(self.name, []).extend(names)
+        return names
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_declares_every_read_path():
+    created = {}
+
+    class DB(dict):
+        def __missing__(self, name):
+            return IndexCollection(created, name, existing=("_id_", "timestamp"))
+
+    result = await ensure_indexes(DB())
+    assert created.pop("dropped") == ["timestamp"]
+    assert result == created
+    assert created["predictions"] == ["nickname_timestamp_id", "evaluation_timestamp_id", "timestamp_id",
+                                      "nickname_expected_label_timestamp"]
+    assert INDEXES["prediction_stats"][0].document["unique"] is True
+    # Idempotente: repetirlo pide los mismos índices
+    assert await ensure_indexes(DB()) == result
+
+
+def test_endpoint_filters_match_index_prefixes(monkeypatch):
+    from types import SimpleNamespace
+    monkeypatch.setitem(sys.modules, "app.db.mongodb", SimpleNamespace(collection=None))
+    from app.api.endpoints.activity import build_daily_filter
+    from app.api.endpoints.records import build_records_filter
+
+    f = build_records_filter(nickname="ana", date_from=datetime(2025, 1, 1), evaluation="CORRECTO")
+    assert f == {"nickname": "ana", "timestamp": {"$gte": datetime(2025, 1, 1, tzinfo=timezone.utc)},
+                 "evaluation": "CORRECTO"}
+    assert build_records_filter() == {}
+    assert set(build_daily_filter("ana", date(2025, 1, 2))) == {"nickname", "timestamp"}
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_tolerates_superseded_index_dropped_by_another_worker():
+    from pymongo.errors import OperationFailure
+
+    created = {}
+
+    class RacingCollection(IndexCollection):
+        async def drop_index(self, name):
+            raise OperationFailure("index not found with name [timestamp]", code=27)
+
+    class DB(dict):
+        def __missing__(self, name):
+            return RacingCollection(created, name, existing=("_id_", "timestamp"))
+
+    result = await ensure_indexes(DB())
+    assert "dropped" not in created
+    assert result["predictions"] == ["nickname_timestamp_id", "evaluation_timestamp_id", "timestamp_id",
+                                     "nickname_expected_label_timestamp"]
@@ -4,24 +4,74 @@ import pytest
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from app.models import schema
+from app.services.label_catalog import LabelCatalog
 
 
 def test_sequence_length_validation(monkeypatch):
-    monkeypatch.setattr(schema, "VALID_LABELS", ["lbl"])
+    monkeypatch.setattr(schema, "label_catalog", LabelCatalog.from_labels(["lbl"]))
     seq = [[0.0]*42 for _ in range(35)]
     data = schema.PredictRequest(sequence=seq, expected_label="lbl")
     assert len(data.sequence) == 35
 
 
 def test_invalid_frame_length(monkeypatch):
-    monkeypatch.setattr(schema, "VALID_LABELS", ["lbl"])
+    monkeypatch.setattr(schema, "label_catalog", LabelCatalog.from_labels(["lbl"]))
     seq = [[0.0]*40 for _ in range(35)]
     with pytest.raises(ValueError):
         schema.PredictRequest(sequence=seq, expected_label="lbl")
 
 
 def test_invalid_label(monkeypatch):
-    monkeypatch.setattr(schema, "VALID_LABELS", ["lbl"])
+    monkeypatch.setattr(schema, "label_catalog", LabelCatalog.from_labels(["lbl"]))
     seq = [[0.0]*42 for _ in range(35)]
     with pytest.raises(ValueError):
         schema.PredictRequest(sequence=seq, expected_label="bad")
+
+
+def test_sequence_b64(monkeypatch):
+    import base64
+    import numpy as np
+    from app.utils.wire_format import encode_sequence
+
+    monkeypatch.setattr(schema, "label_catalog", LabelCatalog.from_labels(["lbl"]))
+    seq = np.full((35, 42), 0.5, dtype=np.float32)
+    data = schema.PredictRequest(sequence_b64=base64.b64encode(encode_sequence(seq)).decode(), expected_label="lbl")
+    assert data.sequence is None
+    np.testing.assert_array_equal(data.sequence_array(), seq)
+
+
+def test_from_array_validates_shape_and_label(monkeypatch):
+    import numpy as np
+
+    monkeypatch.setattr(schema, "label_catalog", LabelCatalog.from_labels(["lbl"]))
+    data = schema.PredictRequest.from_array(np.zeros((35, 42), dtype=np.float32), "lbl")
+    assert data.sequence_array().shape == (35, 42)
+    with pytest.raises(ValueError):
+        schema.PredictRequest.from_array(np.zeros((35, 40), dtype=np.float32), "lbl")
+    with pytest.raises(ValueError):
+        schema.PredictRequest(expected_label="lbl")
+
+
+def test_sequence_is_kept_as_float32_array(monkeypatch):
+    import numpy as np
+
+    monkeypatch.setattr(schema, "label_catalog", LabelCatalog.from_labels(["lbl"]))
+    seq = [[float(i)] * 42 for i in range(35)]
+    data = schema.PredictRequest(sequence=seq, expected_label="lbl")
+    array = data.sequence_array()
+    assert array.dtype == np.float32 and array.shape == (35, 42)
+    assert array is data.sequence
+    assert array[34, 0] == 34.0
+
+
+@pytest.mark.parametrize("seq, message", [
+    ([[0.0] * 42 for _ in range(29)], "al menos 30 frames"),
+    ([[0.0] * 42 for _ in range(34)] + [[0.0] * 41], "exactamente 42 valores"),
+    ([[0.0] * 42 for _ in range(34)] + [["x"] * 42], "no convertible a float"),
+    ([[float("nan")] * 42 for _ in range(35)], "NaN o infinitos"),
+    ([[1e300] * 42 for _ in range(35)], "NaN o infinitos"),
+])
+def test_invalid_sequences(monkeypatch, seq, message):
+    monkeypatch.setattr(schema, "label_catalog", LabelCatalog.from_labels(["lbl"]))
+    with pytest.raises(ValueError, match=message):
+        schema.PredictRequest(sequence=seq, expected_label="lbl")
@@ -0,0 +1,174 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.db import stats_cache as stats_cache_module
+from app.db.stats_cache import StatsCache
+
+
+class StatsCollection:
+    """prediction_stats en memoria, compartida entre varias cachés (workers)."""
+
+    def __init__(self):
+        self.docs = {}
+        self.calls = []
+        self.down = False
+
+    def _inc(self, filt, inc):
+        doc = self.docs.setdefault((filt["expected_label"], filt["nickname"]),
+                                   {**filt, "total": 0, "correct": 0, "confidence_sum": 0.0})
+        for key, value in inc.items():
+            doc[key] += value
+        return doc
+
+    async def find_one_and_update(self, filt, update, upsert=False, return_document=None):
+        self.calls.append("find_one_and_update")
+        if self.down:
+            raise ConnectionError("sin servidor")
+        return dict(self._inc(filt, update["$inc"]))
+
+    async def bulk_write(self, requests, ordered=True):
+        self.calls.append("bulk_write")
+        if self.down:
+            raise ConnectionError("sin servidor")
+        for op in requests:
+            self._inc(op._filter, op._doc["$inc"])
+
+    async def find(self, filt):
+        self.calls.append("find")
+        for f in filt["$or"]:
+            key = (f["expected_label"], f["nickname"])
+            if key in self.docs:
+                yield dict(self.docs[key])
+
+
+def attempt(correct=True, confidence=90.0):
+    return {"total": 1, "correct": int(correct), "confidence_sum": confidence}
+
+
+KEY = ("hola", "ana")
+
+
+@pytest.mark.asyncio
+async def test_hits_apply_own_increments_without_reading():
+    collection = StatsCollection()
+    cache = StatsCache(collection, ttl_seconds=60)
+
+    first = await cache.increment(KEY, attempt())
+    second = await cache.increment(KEY, attempt(correct=False, confidence=50.0))
+
+    assert first["total"] == 1
+    assert second == {"total": 2, "correct": 1, "confidence_sum": 140.0}
+    assert collection.calls == ["find_one_and_update"]
+    assert cache.snapshot()["hits"] == 1
+
+    await cache.close()
+    assert collection.calls[-1] == "bulk_write"
+    assert collection.docs[KEY]["total"] == 2
+
+
+@pytest.mark.asyncio
+async def test_expired_entry_reconciles_with_other_workers(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(stats_cache_module.time, "monotonic", lambda: now[0])
+    collection = StatsCollection()
+    worker_a = StatsCache(collection, ttl_seconds=30)
+    worker_b = StatsCache(collection, ttl_seconds=30)
+
+    await worker_a.increment(KEY, attempt())
+    await worker_a.increment(KEY, attempt())
+    await worker_b.increment(KEY, attempt(correct=False))
+    # Dentro del TTL, A no ve el intento de B
+    assert (await worker_a.increment(KEY, attempt()))["total"] == 3
+
+    now[0] += 31
+    # Al caducar, A reconcilia: su incremento pendiente viaja con la lectura y ve el de B
+    reconciled = await worker_a.increment(KEY, attempt())
+    assert reconciled == {"total": 5, "correct": 4, "confidence_sum": 450.0}
+    assert collection.docs[KEY]["total"] == 5
+    await worker_a.close()
+    await worker_b.close()
+    assert collection.docs[KEY]["total"] == 5
+
+
+@pytest.mark.asyncio
+async def test_size_bound_evicts_least_recently_used_but_keeps_pending():
+    collection = StatsCollection()
+    cache = StatsCache(collection, max_entries=2, ttl_seconds=60)
+    for nickname in ("ana", "beto", "ana", "carla"):
+        await cache.increment(("hola", nickname), attempt())
+
+    assert list(cache._entries) == [("hola", "ana"), ("hola", "carla")]
+    await cache.close()
+    assert {key[1]: doc["total"] for key, doc in collection.docs.items()} == {"ana": 2, "beto": 1, "carla": 1}
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_retried():
+    collection = StatsCollection()
+    cache = StatsCache(collection, ttl_seconds=60)
+    await cache.increment(KEY, attempt())
+    await cache.increment(KEY, attempt())
+
+    collection.down = True
+    await cache.flush()
+    assert cache.snapshot()["failed_flushes"] == 1
+    collection.down = False
+    await cache.close()
+    assert collection.docs[KEY]["total"] == 2
+
+
+@pytest.mark.asyncio
+async def test_miss_waits_for_in_flight_flush_of_the_same_key():
+    import asyncio
+
+    collection = StatsCollection()
+    gate = asyncio.Event()
+    bulk_write = collection.bulk_write
+
+    async def slow_bulk_write(requests, ordered=True):
+        await gate.wait()
+        await bulk_write(requests, ordered)
+
+    collection.bulk_write = slow_bulk_write
+    cache = StatsCache(collection, ttl_seconds=60)
+    await cache.increment(KEY, attempt())
+    await cache.increment(KEY, attempt())
+    # El flush saca el incremento pendiente y espera en el bulk_write; la entrada caduca mientras
+    flush = asyncio.create_task(cache.flush())
+    await asyncio.sleep(0)
+    cache._entries.clear()
+    miss = asyncio.create_task(cache.increment(KEY, attempt()))
+    await asyncio.sleep(0.01)
+    assert not miss.done()
+
+    gate.set()
+    await flush
+    assert (await miss)["total"] == 3
+    await cache.close()
+    assert collection.docs[KEY]["total"] == 3
+
+
+@pytest.mark.asyncio
+async def test_batch_misses_use_one_bulk_write_and_one_find():
+    collection = StatsCollection()
+    cache = StatsCache(collection, ttl_seconds=60)
+    await cache.increment(KEY, attempt())
+
+    result = await cache.increment_many({KEY: attempt(), ("hola", "beto"): attempt(), ("adios", "ana"): attempt()})
+    assert result[KEY]["total"] == 2
+    assert collection.calls == ["find_one_and_update", "bulk_write", "find"]
+    await cache.close()
+
+
+@pytest.mark.asyncio
+async def test_disabled_cache_always_round_trips():
+    collection = StatsCollection()
+    cache = StatsCache(collection, ttl_seconds=0)
+    await cache.increment(KEY, attempt())
+    assert (await cache.increment(KEY, attempt()))["total"] == 2
+    assert collection.calls == ["find_one_and_update"] * 2
+    assert cache.snapshot()["entries"] == 0
+    await cache.close()
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.services.streaming import FrameRingBuffer, SessionLimiter, StreamSession, parse_frames
+
+
+def _frame(i):
+    return np.full(42, float(i), dtype=np.float32)
+
+
+def test_ring_buffer_keeps_last_window_in_order():
+    buffer = FrameRingBuffer(window=35)
+    for i in range(100):
+        buffer.push(_frame(i))
+
+    view = buffer.view()
+    assert view.shape == (35, 42)
+    np.testing.assert_array_equal(view[:, 0], np.arange(65, 100, dtype=np.float32))
+    assert not view.flags.owndata
+
+
+@pytest.mark.asyncio
+async def test_session_infers_on_first_full_window_then_every_stride():
+    seen = []
+
+    async def run(window, frame):
+        seen.append(frame)
+
+    session = StreamSession(stride=5, window=35)
+    for i in range(50):
+        if session.add_frames(_frame(i)[np.newaxis]):
+            session.start(run)
+        await asyncio.sleep(0)
+    assert seen == [35, 40, 45, 50]
+
+
+@pytest.mark.asyncio
+async def test_session_skips_while_previous_inference_is_running():
+    gate = asyncio.Event()
+    seen = []
+
+    async def run(window, frame):
+        seen.append((frame, float(window[-1, 0])))
+        await gate.wait()
+
+    session = StreamSession(stride=1, window=35)
+    for i in range(40):
+        if session.add_frames(_frame(i)[np.newaxis]):
+            session.start(run)
+        await asyncio.sleep(0)
+    assert seen == [(35, 34.0)]
+    assert session.skipped == 5
+
+    gate.set()
+    await asyncio.sleep(0)
+    session.add_frames(_frame(40)[np.newaxis])
+    assert session.start(run)
+    await session.close()
+
+
+@pytest.mark.asyncio
+async def test_close_retrieves_a_failed_inference():
+    import gc
+
+    errors = []
+    loop = asyncio.get_running_loop()
+    loop.set_exception_handler(lambda loop, context: errors.append(context["message"]))
+
+    async def run(window, frame):
+        raise RuntimeError("websocket cerrado")
+
+    session = StreamSession(stride=1, window=1)
+    assert session.add_frames(_frame(0)[np.newaxis])
+    session.start(run)
+    await asyncio.sleep(0)
+    assert session._pending.done()
+    await session.close()
+    del session
+    gc.collect()
+    loop.set_exception_handler(None)
+    assert errors == []
+
+def test_parse_frames_binary_and_json():
+    frames = np.arange(84, dtype="<f4").reshape(2, 42)
+    np.testing.assert_array_equal(parse_frames(frames.tobytes()), frames)
+    assert parse_frames([0.0] * 42).shape == (1, 42)
+    with pytest.raises(ValueError):
+        parse_frames([0.0] * 41)
+    with pytest.raises(ValueError):
+        parse_frames(b"\x00" * 10)
+    with pytest.raises(ValueError):
+        parse_frames([float("nan")] * 42)
+
+
+def test_session_limiter():
+    limiter = SessionLimiter(max_sessions=1)
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    limiter.release()
+    assert limiter.try_acquire()
+
@@ -0,0 +1,101 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.config import CNN_LSTM_MODEL_PATH
+from app.services.numpy_engine import AFFINE, CONV, DENSE, LSTM, POOL, NumpyCNNLSTM
+from app.services.streaming_engine import StreamingCNNLSTM
+
+
+def random_engine(seed=0, positional=False):
+    """Misma topología que build_model, con pesos aleatorios y capas más estrechas."""
+    rng = np.random.default_rng(seed)
+
+    def w(*shape):
+        return (rng.standard_normal(shape) * 0.3).astype(np.float32)
+
+    ops = [
+        (CONV, w(3, 42, 16), w(16), "relu"),
+        (POOL, 2, rng.random(16) < 0.3),
+        (CONV, w(3, 16, 24), w(24), "relu"),
+        (POOL, 2, None),
+        (LSTM, w(24, 4 * 32), w(32, 4 * 32), w(4 * 32), True),
+        (LSTM, w(32, 4 * 16), w(16, 4 * 16), w(4 * 16), False),
+        (DENSE, w(16, 16), w(16), "relu"),
+        (DENSE, w(16, 5), w(5), "softmax"),
+    ]
+    if positional:
+        ops.insert(0, (AFFINE, 1.0 + w(35, 42), w(35, 42)))
+    return NumpyCNNLSTM(ops)
+
+
+def stream(engine, frames, stride):
+    state = StreamingCNNLSTM.from_engine(engine).new_state(stride)
+    results = []
+    for i, frame in enumerate(frames):
+        for start, probabilities in state.push(frame):
+            results.append((i, start, probabilities))
+    return state, results
+
+
+@pytest.mark.parametrize("stride", [1, 4, 5])
+@pytest.mark.parametrize("positional", [False, True])
+def test_matches_full_window_model(stride, positional):
+    engine = random_engine(positional=positional)
+    frames = np.random.default_rng(1).standard_normal((80, 42)).astype(np.float32)
+
+    _, results = stream(engine, frames, stride)
+
+    starts = list(range(0, 80 - 35 + 1, stride))
+    assert [start for _, start, _ in results] == starts
+    for i, start, probabilities in results:
+        assert i == start + 34
+        np.testing.assert_allclose(probabilities, engine.predict(frames[start:start + 35])[0], atol=1e-5)
+
+
+def test_windows_share_conv_stream_when_stride_is_aligned():
+    engine = random_engine()
+    frames = np.zeros((60, 42), dtype=np.float32)
+    state, _ = stream(engine, frames, stride=4)
+    assert len(state._groups) == 1
+
+    state, _ = stream(random_engine(positional=True), frames, stride=4)
+    # Un grupo por ventana abierta: inicios 28, 32, ..., 56
+    assert len(state._groups) == 8
+
+
+@pytest.mark.skipif(not CNN_LSTM_MODEL_PATH.exists(), reason="cnn_lstm_model.h5 no disponible")
+def test_matches_served_model():
+    pytest.importorskip("h5py")
+    engine = NumpyCNNLSTM.from_keras_h5(str(CNN_LSTM_MODEL_PATH))
+    frames = np.random.default_rng(2).standard_normal((50, 42)).astype(np.float32)
+
+    _, results = stream(engine, frames, stride=4)
+
+    assert len(results) == 4
+    for _, start, probabilities in results:
+        np.testing.assert_allclose(probabilities, engine.predict(frames[start:start + 35])[0], atol=1e-5)
+
+
+def test_positional_zscore_falls_back_to_window_mode():
+    from app.services.streaming_engine import build_streaming_engine
+
+    with pytest.raises(ValueError):
+        build_streaming_engine(random_engine(positional=True))
+
+    # Un z-score (35, 42) igual en todas las posiciones se pliega a uno por feature
+    engine = random_engine()
+    rng = np.random.default_rng(3)
+    scale, shift = 1.0 + rng.random(42).astype(np.float32), rng.standard_normal(42).astype(np.float32)
+    engine.ops.insert(0, (AFFINE, np.tile(scale, (35, 1)), np.tile(shift, (35, 1))))
+    streaming = build_streaming_engine(engine)
+    assert not streaming.positional
+
+    frames = rng.standard_normal((43, 42)).astype(np.float32)
+    state = streaming.new_state(4)
+    results = [r for frame in frames for r in state.push(frame)]
+    assert [start for start, _ in results] == [0, 4, 8]
+    np.testing.assert_allclose(results[-1][1], engine.predict(frames[8:43])[0], atol=1e-5)
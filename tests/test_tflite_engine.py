@@ -0,0 +1,50 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.config import CNN_LSTM_MODEL_PATH
+
+tf = pytest.importorskip("tensorflow")
+pytestmark = pytest.mark.skipif(not CNN_LSTM_MODEL_PATH.exists(), reason="cnn_lstm_model.h5 no disponible")
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    from app.model_utils import load_keras_model, export_tflite
+
+    model = load_keras_model(str(CNN_LSTM_MODEL_PATH))
+    paths = export_tflite(model, tmp_path_factory.mktemp("tflite"), variants=("float32", "int8"))
+    return model, paths
+
+
+def test_float32_variant_matches_keras(exported):
+    from app.services.tflite_engine import TFLiteModel
+
+    model, paths = exported
+    X = np.random.default_rng(0).standard_normal((5, 35, 42), dtype=np.float32)
+    expected = model(X, training=False).numpy()
+
+    actual = TFLiteModel(paths["float32"]).predict(X)
+    np.testing.assert_allclose(actual, expected, atol=1e-5)
+
+
+def test_one_interpreter_per_thread(exported):
+    from app.services.tflite_engine import TFLiteModel
+
+    _, paths = exported
+    engine = TFLiteModel(paths["int8"])
+    X = np.zeros((2, 35, 42), dtype=np.float32)
+
+    threads = [threading.Thread(target=engine.predict, args=(X,)) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    engine.predict(X)
+    engine.predict(X)
+
+    assert engine.interpreters_created == 4
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.utils.wire_format import HEADER, decode_sequence, decode_sequence_b64, encode_sequence
+
+
+def _sequence():
+    return np.random.default_rng(0).standard_normal((35, 42)).astype(np.float32)
+
+
+def test_float32_roundtrip_is_zero_copy():
+    seq = _sequence()
+    body = encode_sequence(seq)
+    assert len(body) == HEADER.size + 35 * 42 * 4
+
+    decoded = decode_sequence(body)
+    np.testing.assert_array_equal(decoded, seq)
+    assert decoded.dtype == np.float32
+    assert not decoded.flags.owndata and not decoded.flags.writeable
+
+
+def test_int16_roundtrip_within_quantization_step():
+    seq = _sequence()
+    body = encode_sequence(seq, dtype="int16")
+    assert len(body) == HEADER.size + 35 * 42 * 2
+
+    decoded = decode_sequence(body)
+    step = np.abs(seq).max() / 32767.0
+    assert decoded.dtype == np.float32
+    assert np.abs(decoded - seq).max() <= step
+
+
+@pytest.mark.parametrize("body", [
+    b"",
+    b"XXXX" + encode_sequence(np.zeros((35, 42)))[4:],
+    encode_sequence(np.zeros((35, 42)))[:-4],
+])
+def test_rejects_malformed_bodies(body):
+    with pytest.raises(ValueError):
+        decode_sequence(body)
+
+
+def test_b64_rejects_invalid_base64():
+    with pytest.raises(ValueError):
+        decode_sequence_b64("no es base64!")
@@ -0,0 +1,161 @@
+import asyncio
+import os
+import sys
+
+import pytest
+from pymongo.errors import BulkWriteError, ServerSelectionTimeoutError
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.db.write_buffer import WriteBehindBuffer
+
+
+class Collection:
+    """insert_many en memoria que puede simular MongoDB caído."""
+
+    def __init__(self):
+        self.docs = {}
+        self.calls = []
+        self.down = False
+
+    async def insert_many(self, docs, ordered=True):
+        if self.down:
+            raise ServerSelectionTimeoutError("sin servidor")
+        self.calls.append(len(docs))
+        duplicates = [{"index": i, "code": 11000, "errmsg": "E11000"} for i, d in enumerate(docs) if d["_id"] in self.docs]
+        for doc in docs:
+            self.docs.setdefault(doc["_id"], doc)
+        if duplicates:
+            raise BulkWriteError({"writeErrors": duplicates})
+
+
+@pytest.mark.asyncio
+async def test_flushes_on_size_and_on_interval(tmp_path):
+    collection = Collection()
+    buffer = WriteBehindBuffer(collection, max_items=3, flush_ms=20, spool_path=tmp_path / "spool.jsonl")
+
+    buffer.extend({"n": i} for i in range(3))
+    await asyncio.sleep(0)
+    assert collection.calls == [3]
+
+    buffer.add({"n": 3})
+    assert buffer.snapshot()["depth"] == 1
+    await asyncio.sleep(0.05)
+    assert collection.calls == [3, 1]
+    assert buffer.snapshot()["flushed"] == 4
+    assert buffer.snapshot()["flush_ms"]["p50"] is not None
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_spools_while_mongo_is_down_and_replays_once(tmp_path):
+    collection = Collection()
+    spool = tmp_path / "spool.jsonl"
+    buffer = WriteBehindBuffer(collection, max_items=10, flush_ms=60000, spool_path=spool)
+
+    collection.down = True
+    buffer.extend({"n": i} for i in range(4))
+    await buffer.close()
+    assert buffer.snapshot()["spooled"] == 4
+    assert len(spool.read_text().splitlines()) == 4
+
+    # Un proceso nuevo encuentra el spool y lo reinserta con la siguiente escritura
+    collection.down = False
+    buffer = WriteBehindBuffer(collection, max_items=10, flush_ms=60000, spool_path=spool)
+    assert buffer.spooled == 4
+    buffer.add({"n": 4})
+    await buffer.flush()
+    assert sorted(d["n"] for d in collection.docs.values()) == [0, 1, 2, 3, 4]
+    assert not spool.exists()
+    assert buffer.snapshot()["replayed"] == 4
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_replay_of_partially_written_spool_ignores_duplicates(tmp_path):
+    collection = Collection()
+    spool = tmp_path / "spool.jsonl"
+    buffer = WriteBehindBuffer(collection, max_items=10, flush_ms=60000, spool_path=spool)
+    buffer.extend({"n": i} for i in range(3))
+    await buffer.flush()
+    # El mismo lote acaba también en el spool (p. ej. timeout tras escribirse)
+    buffer._spool(list(collection.docs.values()))
+
+    await buffer.flush()
+    assert len(collection.docs) == 3
+    assert buffer.snapshot()["spooled"] == 0
+    assert buffer.snapshot()["last_error"] is None
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_overflow_goes_to_spool_when_mongo_is_slow(tmp_path):
+    collection = Collection()
+    collection.down = True
+    buffer = WriteBehindBuffer(collection, max_items=2, flush_ms=60000, spool_path=tmp_path / "s.jsonl", max_pending=4)
+    buffer.extend({"n": i} for i in range(6))
+    assert buffer.snapshot()["depth"] == 2
+    assert buffer.spooled == 4
+    await buffer.close()
+    assert buffer.spooled == 6
+
+
+@pytest.mark.asyncio
+async def test_batch_written_before_a_timeout_reaches_on_insert_once(tmp_path):
+    collection = Collection()
+    seen = []
+
+    async def on_insert(docs):
+        seen.extend(d["n"] for d in docs)
+
+    written_then_timeout = collection.insert_many
+
+    async def insert_many(docs, ordered=True):
+        await written_then_timeout(docs, ordered)
+        raise ServerSelectionTimeoutError("timeout tras escribir")
+
+    spool = tmp_path / "spool.jsonl"
+    buffer = WriteBehindBuffer(collection, max_items=2, flush_ms=60000, spool_path=spool, on_insert=on_insert)
+    collection.insert_many = insert_many
+    buffer.extend({"n": i} for i in range(3))
+    await buffer.flush()
+    # El primer lote llegó a escribirse; el segundo ni se intentó
+    assert len(collection.docs) == 2 and seen == []
+    assert buffer.snapshot()["spooled"] == 3
+
+    del collection.insert_many
+    buffer.add({"n": 3})
+    await buffer.flush()
+    assert sorted(seen) == [0, 1, 2, 3]
+    assert "_spool_attempted" not in str(collection.docs)
+
+    # Otro spool con los mismos documentos (ya contados): no se vuelven a contar
+    buffer._spool(list(collection.docs.values()))
+    await buffer.flush()
+    assert sorted(seen) == [0, 1, 2, 3]
+    await buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_replay_resumes_after_the_counted_batches(tmp_path):
+    collection = Collection()
+    seen = []
+
+    async def on_insert(docs):
+        seen.extend(d["n"] for d in docs)
+
+    spool = tmp_path / "spool.jsonl"
+    buffer = WriteBehindBuffer(collection, max_items=2, flush_ms=60000, spool_path=spool, on_insert=on_insert)
+    collection.down = True
+    buffer.extend({"n": i} for i in range(4))
+    await buffer.close()
+
+    # Un proceso anterior reinsertó y contó el primer lote y murió antes de terminar
+    os.replace(spool, str(spool) + ".replay")
+    buffer._set_replay_done(2)
+    collection.down = False
+    buffer = WriteBehindBuffer(collection, max_items=2, flush_ms=60000, spool_path=spool, on_insert=on_insert)
+    assert buffer.spooled == 2
+    await buffer.flush()
+    assert seen == [2, 3]
+    assert not os.path.exists(str(spool) + ".replay.done")
+    await buffer.close()